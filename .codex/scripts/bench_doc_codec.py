@@ -0,0 +1,655 @@
+#!/usr/bin/env python3
+from __future__ import annotations
+
+"""Benchmarks the template codecs (`doc_codec.py`) against the previous code.
+
+It builds one corpus per document kind from `make_workspace.py`'s generators:
+- `task`: task.json dicts (a few with empty fields), plus `--fuzz` task.md
+  texts mixing tricky field lines (`:` / `：`, checked boxes, hints, bad JSON
+  lists, comma lists, placeholders, stray titles, indented and unknown keys).
+- `paper`: research.json entries, some with only a paper_id.
+- `session`: session.json dicts with 1-4 entries each.
+- `rethink`: rethink.json dicts, some fields left empty.
+
+and checks, for every document:
+- task / paper / session: `render` follows the template while the previous
+  renderers (`render_task_md`, `render_paper_note` and the markdown
+  `make_workspace.py` used to write) had their own layout, so the texts
+  differ; both must parse to the same values;
+- task / paper: `parse` (of the rendered and, for task, the fuzz texts) gives
+  the same result as the previous `parse_task_text` / `parse_note_lines`,
+  except that task titles are also read without the trailing `.` and the
+  template's example items are no longer parsed (`bench_note_parser.py`
+  fuzzes the note parser further);
+- every kind: a round trip is stable, i.e. `d1 = parse(render(d))` renders to
+  the same text and parses back to `d1`; for session / rethink `d1` also
+  holds the same values as `d` (session.md does not show `stage`).
+
+Then it reports MB/s (of markdown) for `parse` and `render`, old vs new, where
+there was an old version. The old renderers are hand-written f-strings, one
+per kind, while the codec walks the template's line list for every document,
+so they are faster at rendering; the numbers are there to keep an eye on the
+gap, not to claim a speedup.
+
+Usage:
+  python .codex/scripts/bench_doc_codec.py
+  python .codex/scripts/bench_doc_codec.py --docs 5000 --fuzz 20000
+"""
+
+import argparse
+import json
+import random
+import re
+import time
+from datetime import date, timedelta
+from typing import Any, Callable
+
+import bench_note_parser
+import doc_codec
+import make_workspace as mw
+
+
+# The previous task parser / renderer and paper renderer, kept verbatim for the
+# comparison (the previous note parser is in `bench_note_parser.py`).
+
+_LEGACY_HEADER_RE = re.compile(r"^#\s+Task:\s+(?P<task_id>[^.]+)\.\s*$")
+_LEGACY_BULLET_RE = re.compile(r"^- \[(?P<state>[ xX])\]\s+(?P<rest>.*)$")
+# Hints that the template and `render_task_md` put after some values; they are
+# not part of the value (kept, they would grow by one copy per round trip).
+_LEGACY_HINT_RE = re.compile(r"\s*\((?:例如[:：][^()]*|时间/算力|能指导 next step 的信息)\)\s*$")
+
+
+def _legacy_strip_backticks(s: str) -> str:
+    x = s.strip()
+    if len(x) >= 2 and x[0] == "`" and x[-1] == "`":
+        return x[1:-1]
+    return x
+
+
+def _legacy_is_placeholder(s: str) -> bool:
+    x = s.strip()
+    return x in {"…", "...", "...", "......", ""} or "…" in x
+
+
+def _legacy_parse_kv(rest: str) -> tuple[str, str] | None:
+    # Supports both ":" and "：" as delimiter.
+    if "：" in rest:
+        k, v = rest.split("：", 1)
+        return k.strip(), v.strip()
+    if ":" in rest:
+        k, v = rest.split(":", 1)
+        return k.strip(), v.strip()
+    return None
+
+
+def _legacy_parse_json_list(value: str) -> list[Any] | None:
+    v = _legacy_strip_backticks(value).strip()
+    if not v.startswith("["):
+        return None
+    try:
+        out = json.loads(v)
+    except json.JSONDecodeError:
+        return None
+    return out if isinstance(out, list) else None
+
+
+def _legacy_set_path(obj: dict[str, Any], path: str, value: Any) -> None:
+    parts = path.split(".")
+    cur: dict[str, Any] = obj
+    for k in parts[:-1]:
+        if k not in cur or not isinstance(cur[k], dict):
+            cur[k] = {}
+        cur = cur[k]
+    cur[parts[-1]] = value
+
+
+_LEGACY_KEY_MAP: dict[str, str] = {
+    "task_id": "task_id",
+    "stage": "stage",
+    "created_at": "created_at",
+    "paper_id": "source.paper_id",
+    "url": "source.url",
+    "来源补充": "source.desc",
+    "为什么现在做": "background.why_now",
+    "hypothesis": "hypothesis",
+    "variables": "design.variables",
+    "baseline": "design.baseline",
+    "data_split": "design.data_split",
+    "metrics": "design.metrics",
+    "budget": "design.budget",
+    "pass": "acceptance.pass",
+    "fail_but_useful": "acceptance.fail_but_useful",
+    "result_summary": "result_summary",
+    "decision": "decision",
+}
+
+_LEGACY_LIST_KEYS: dict[str, str] = {
+    "changes": "changes",
+    "inputs": "inputs",
+    "outputs": "outputs",
+    "next_tasks": "next_tasks",
+}
+
+
+def _legacy_parse_task_text(text: str) -> dict[str, Any]:
+    out: dict[str, Any] = {}
+
+    for raw in text.splitlines():
+        line = raw.rstrip()
+        m = _LEGACY_HEADER_RE.match(line.strip())
+        if m:
+            out["task_id"] = m.group("task_id").strip()
+            continue
+
+        m = _LEGACY_BULLET_RE.match(line.strip())
+        if not m:
+            continue
+
+        rest = m.group("rest").strip()
+        kv = _legacy_parse_kv(rest)
+        if kv is None:
+            continue
+        key, value = kv
+        if not key:
+            continue
+
+        if key in _LEGACY_LIST_KEYS:
+            parsed = _legacy_parse_json_list(value)
+            if parsed is not None:
+                _legacy_set_path(out, _LEGACY_LIST_KEYS[key], parsed)
+                continue
+            # Allow comma-separated list as fallback.
+            v = _legacy_strip_backticks(value).strip()
+            if not v:
+                _legacy_set_path(out, _LEGACY_LIST_KEYS[key], [])
+                continue
+            if _legacy_is_placeholder(v):
+                continue
+            items = [x.strip() for x in v.split(",") if x.strip()]
+            _legacy_set_path(out, _LEGACY_LIST_KEYS[key], items)
+            continue
+
+        if key in _LEGACY_KEY_MAP:
+            v = _legacy_strip_backticks(_LEGACY_HINT_RE.sub("", value)).strip()
+            if _legacy_is_placeholder(v):
+                continue
+            _legacy_set_path(out, _LEGACY_KEY_MAP[key], v)
+            continue
+
+    return out
+
+
+# The one intended change from the previous task parser: the title is also
+# read in the template's form (`# Task: <task_id>`, no trailing `.`). The
+# reference feeds such lines to the previous parser as a `task_id` field.
+_TEMPLATE_TITLE_RE = re.compile(r"#\s+Task:\s+(.*?)\.?")
+
+
+def _reference_parse_task_text(text: str) -> dict[str, Any]:
+    lines = []
+    for raw in text.splitlines():
+        m = _TEMPLATE_TITLE_RE.fullmatch(raw.strip())
+        if m and not _LEGACY_HEADER_RE.match(raw.strip()):
+            raw = f"- [ ] task_id: {m.group(1)}"
+        lines.append(raw)
+    return _legacy_parse_task_text("\n".join(lines))
+
+
+def _legacy_dump_json_inline(value: Any) -> str:
+    return json.dumps(value, ensure_ascii=False)
+
+
+def _legacy_get_str(x: Any, default: str = "...") -> str:
+    s = str(x or "").strip()
+    return s if s else default
+
+
+def _legacy_get_dict(x: Any) -> dict[str, Any]:
+    return x if isinstance(x, dict) else {}
+
+
+def _legacy_get_list(x: Any) -> list[Any]:
+    return x if isinstance(x, list) else []
+
+
+def _legacy_render_task_md(task: dict[str, Any]) -> str:
+    task_id = _legacy_get_str(task.get("task_id", ""), default="")
+    if not task_id:
+        raise ValueError("task.json missing `task_id`")
+
+    stage_raw = str(task.get("stage", "") or "").strip()
+    stage = stage_raw if stage_raw else "1-验证"
+
+    created_at_raw = str(task.get("created_at", "") or "").strip()
+    created_at = created_at_raw if created_at_raw else "YYYY-MM-DD"
+
+    source = _legacy_get_dict(task.get("source", {}))
+    paper_id = _legacy_get_str(source.get("paper_id", ""))
+    url = _legacy_get_str(source.get("url", ""))
+    source_desc = _legacy_get_str(source.get("desc", ""))
+
+    background = _legacy_get_dict(task.get("background", {}))
+    why_now = _legacy_get_str(background.get("why_now", ""))
+
+    hypothesis = _legacy_get_str(task.get("hypothesis", ""))
+
+    design = _legacy_get_dict(task.get("design", {}))
+    variables = _legacy_get_str(design.get("variables", ""))
+    baseline = _legacy_get_str(design.get("baseline", ""))
+    data_split_raw = str(design.get("data_split", "") or "").strip()
+    data_split = data_split_raw if data_split_raw else "遵循 `.codex/EVAL.md`."
+    metrics = _legacy_get_str(design.get("metrics", ""))
+    budget = _legacy_get_str(design.get("budget", ""))
+
+    acceptance = _legacy_get_dict(task.get("acceptance", {}))
+    passed = _legacy_get_str(acceptance.get("pass", ""))
+    fail_but_useful = _legacy_get_str(acceptance.get("fail_but_useful", ""))
+
+    changes = _legacy_get_list(task.get("changes", []))
+    inputs = _legacy_get_list(task.get("inputs", []))
+    outputs = _legacy_get_list(task.get("outputs", []))
+
+    result_summary = _legacy_get_str(task.get("result_summary", ""))
+    decision = _legacy_get_str(task.get("decision", ""))
+    next_tasks = _legacy_get_list(task.get("next_tasks", []))
+
+    md: list[str] = []
+    md.append(f"# Task: {task_id}.")
+    md.append("")
+
+    md.append("## 0. Meta.")
+    md.append(f"- [ ] task_id: {task_id}  ")
+    md.append(f"- [ ] stage: {stage}  ")
+    md.append(f"- [ ] created_at: {created_at}  ")
+    md.append(f"- [ ] paper_id: `{paper_id}`  ")
+    md.append(f"- [ ] url: `{url}`  ")
+    md.append("")
+
+    md.append("## 1. 背景与来源.")
+    md.append(f"- [ ] 来源补充：{source_desc} (例如：论文 issue，对话，直觉)  ")
+    md.append(f"- [ ] 为什么现在做：{why_now}  ")
+    md.append("")
+
+    md.append("## 2. 假设 (Hypothesis).")
+    md.append(f"- [ ] hypothesis：{hypothesis}  ")
+    md.append("")
+
+    md.append("## 3. 实验设计 (Design).")
+    md.append(f"- [ ] variables：{variables}  ")
+    md.append(f"- [ ] baseline：{baseline}  ")
+    md.append(f"- [ ] data_split：{data_split}  ")
+    md.append(f"- [ ] metrics：{metrics}  ")
+    md.append(f"- [ ] budget：{budget} (时间/算力)  ")
+    md.append("")
+
+    md.append("## 4. 验收标准 (Acceptance).")
+    md.append(f"- [ ] pass：{passed}  ")
+    md.append(f"- [ ] fail_but_useful：{fail_but_useful} (能指导 next step 的信息)  ")
+    md.append("")
+
+    md.append("## 5. 产物 (Artifacts).")
+    md.append(f"- [ ] changes: `{_legacy_dump_json_inline(changes)}`  ")
+    md.append(f"- [ ] inputs: `{_legacy_dump_json_inline(inputs)}`  ")
+    md.append(f"- [ ] outputs: `{_legacy_dump_json_inline(outputs)}`  ")
+    md.append("")
+
+    md.append("## 6. 写回 (Write-back).")
+    md.append(f"- [ ] result_summary：{result_summary}  ")
+    md.append(f"- [ ] decision：{decision}  ")
+    md.append(f"- [ ] next_tasks: `{_legacy_dump_json_inline(next_tasks)}`  ")
+    md.append("")
+
+    return "\n".join(md)
+
+
+def _legacy_note_is_placeholder(s: str) -> bool:
+    x = s.strip()
+    if not x:
+        return True
+    if x in {"…", "...", "...", "......"}:
+        return True
+    if x.lower() in {"tbd", "todo"}:
+        return True
+    if "<paper_id>" in x or "<file>" in x:
+        return True
+    return "…" in x
+
+
+def _legacy_bullet_list_from_text(text: str) -> list[str]:
+    t = (text or "").strip()
+    if not t:
+        return ["- ..."]
+    lines = [ln.strip() for ln in t.splitlines() if ln.strip()]
+    return [f"- {ln}" for ln in lines] if lines else ["- ..."]
+
+
+def _legacy_bullet_list_from_items(
+    items: list[Any] | Any,
+    placeholder: list[str],
+) -> list[str]:
+    if isinstance(items, list) and items:
+        out: list[str] = []
+        for it in items:
+            s = str(it).strip()
+            if _legacy_note_is_placeholder(s):
+                continue
+            out.append(f"- {s}")
+        return out or placeholder
+    return placeholder
+
+
+def _legacy_render_paper_note(entry: dict[str, Any]) -> str:
+    paper_id = str(entry.get("paper_id", "")).strip()
+    if not paper_id:
+        raise ValueError("paper entry missing `paper_id`")
+
+    title = str(entry.get("title", "")).strip() or "..."
+    year = int(entry.get("year", 0) or 0)
+    authors = entry.get("authors", [])
+    if not isinstance(authors, list):
+        authors = []
+    tags = entry.get("tags", [])
+    if not isinstance(tags, list):
+        tags = []
+    used_in_tasks = (
+        entry.get("used_in_tasks", [])
+        if isinstance(entry.get("used_in_tasks", []), list)
+        else []
+    )
+
+    pdf_path = str(entry.get("pdf_path", "")).strip() or "0-调研/references/<file>.pdf"
+    url = str(entry.get("url", "")).strip() or "..."
+    code_url = str(entry.get("code_url", "")).strip() or "..."
+
+    problem_lines = _legacy_bullet_list_from_text(str(entry.get("problem", "") or ""))
+    method_lines = _legacy_bullet_list_from_text(str(entry.get("method", "") or ""))
+
+    key_claims_lines = _legacy_bullet_list_from_items(
+        entry.get("key_claims", []),
+        placeholder=["- claim-1: ... (evidence: ...)", "- claim-2: ..."],
+    )
+    limitations_lines = _legacy_bullet_list_from_items(
+        entry.get("limitations", []),
+        placeholder=["- ..."],
+    )
+    open_questions_lines = _legacy_bullet_list_from_items(
+        entry.get("open_questions", []),
+        placeholder=["- ..."],
+    )
+    what_we_can_reuse_lines = _legacy_bullet_list_from_items(
+        entry.get("what_we_can_reuse", []),
+        placeholder=["- ..."],
+    )
+    hypotheses_lines = _legacy_bullet_list_from_items(
+        entry.get("hypotheses", []),
+        placeholder=["- H1: ... (variable: ...; protocol: ...; metric: ...; falsify if: ...)"],
+    )
+
+    md = []
+    md.append(f"# Paper Note: {paper_id}")
+    md.append("")
+    md.append("## 0. Meta")
+    md.append(f"- **paper_id**: {paper_id}  ")
+    md.append(f"- **title**: {title}  ")
+    md.append(f"- **year**: {year}  ")
+    md.append(f"- **authors**: `{_legacy_dump_json_inline(authors)}`  ")
+    md.append(f"- **tags**: `{_legacy_dump_json_inline(tags)}`  ")
+    md.append(f"- **pdf_path**: `{pdf_path}`  ")
+    md.append(f"- **url**: {url}  ")
+    md.append(f"- **code_url**: {code_url}  ")
+    md.append(f"- **used_in_tasks**: `{_legacy_dump_json_inline(used_in_tasks)}`  ")
+    md.append("")
+    md.append("## 1. Abstract (摘要)")
+    md.append("")
+    md.append("逐段翻译，简洁清晰、口语化，但不能产生歧义或信息丢失.")
+    md.append("")
+    md.append("> **Note:** 关键术语统一使用 English term (中文术语). 数字、指标、对比对象与适用范围必须保留.")
+    md.append("")
+    md.append("## 2. Introduction (引言)")
+    md.append("")
+    md.append("逐段翻译，重点理清研究逻辑与相关工作之间的关系 (不引入 paper 没有的推断).")
+    md.append("")
+    md.append("## 3. Methodology (方法)")
+    md.append("")
+    md.append("逐段翻译，重点关注细节，必要时用 note block 把符号、shape、损失项、训练/推理流程与实现细节注释清楚.")
+    md.append("")
+    md.append("> **Note:** 对于每个关键符号，优先写清: 含义、shape、取值范围、单位/物理意义 (如果 paper 给了).")
+    md.append("")
+    md.append("## 4. Experiments (实验)")
+    md.append("")
+    md.append("逐段翻译，重点写清做了什么实验，以及为什么能支持结论 (claim -> evidence).")
+    md.append("")
+    md.append("## 5. Problem (paper)")
+    md.extend(problem_lines)
+    md.append("")
+    md.append("## 6. Method (paper)")
+    md.extend(method_lines)
+    md.append("")
+    md.append("## 7. Key claims (paper)")
+    md.extend(key_claims_lines)
+    md.append("")
+    md.append("## 8. Limitations (paper)")
+    md.extend(limitations_lines)
+    md.append("")
+    md.append("## 9. Open questions (reading)")
+    md.extend(open_questions_lines)
+    md.append("")
+    md.append("## 10. What we can reuse (our project)")
+    md.extend(what_we_can_reuse_lines)
+    md.append("")
+    md.append("## 11. Hypotheses we can test (our project)")
+    md.extend(hypotheses_lines)
+    md.append("")
+
+    return "\n".join(md)
+
+
+def _legacy_render_session(session: dict[str, Any]) -> str:
+    # The markdown `make_workspace.py` used to write next to session.json.
+    md = [f"# Session: {session['date']}.", ""]
+    for e in session["entries"]:
+        md += [
+            f"## {e['timestamp'][:10]} {e['timestamp'][11:16]} ({e['mode']})",
+            f"- **Context:** {e['context'] or '…'}  ",
+            f"- **Work done:** {'; '.join(e['work_done']) or '…'}  ",
+            f"- **Decisions:** {'; '.join(e['decisions']) or '…'}  ",
+            f"- **Issues:** {'; '.join(e['issues']) or '…'}  ",
+            f"- **Next step:** {'; '.join(e['next_steps']) or '…'}  ",
+            "",
+        ]
+    return "\n".join(md)
+
+
+_FUZZ_TASK_LINES = [
+    "# Task: 260101-task-001.",
+    "# Task: 260101-task-002",
+    "#  Task:  260101-task-003.  ",
+    "#Task: 260101-task-004.",
+    "# Task: a.b.",
+    "## 0. Meta.",
+    "## 3. 实验设计 (Design).",
+    "- [ ] task_id: 260101-task-009  ",
+    "- [x] stage: 2-实验  ",
+    "- [X] decision：go",
+    "- [ ] created_at: YYYY-MM-DD  ",
+    "- [ ] paper_id: `260001-01`  ",
+    "- [ ] paper_id: `...`  ",
+    "- [ ] url: `https://example.org/x`",
+    "- [ ] 来源补充：论文 issue (例如：论文 issue，对话，直觉)  ",
+    "- [ ] 来源补充：... (例如：论文 issue，对话，直觉)  ",
+    "- [ ] 为什么现在做：…  ",
+    "- [ ] hypothesis：如果做 A，那么 B 会下降  ",
+    "- [ ] hypothesis: a: b：c",
+    "- [ ] budget：4 GPU-hours (时间/算力)  ",
+    "- [ ] budget：(时间/算力)",
+    "- [ ] fail_but_useful：rmse < 0.1 (能指导 next step 的信息)  ",
+    "- [ ] metrics：rmse (per field)",
+    "- [ ] changes: `[\"src/a.py\", \"src/b.py\"]`  ",
+    "- [ ] changes: src/a.py, src/b.py , ,",
+    "- [ ] inputs: `[1, 2`",
+    "- [ ] inputs: ",
+    "- [ ] outputs: …",
+    "- [ ] outputs: `{\"a\": 1}`",
+    "- [ ] next_tasks: `[]`",
+    "- [ ] unknown: value",
+    "- [ ] : no key",
+    "- [ ]stage: 3-写作",
+    "- [] stage: 3-写作",
+    "-  [ ] stage: 3-写作",
+    "  - [ ] metrics: indented  ",
+    "- [ ] baseline",
+    "- plain bullet",
+    "",
+    "   ",
+    mw._ZH,
+]
+
+
+def _fuzz_task(rng: random.Random) -> str:
+    lines = [rng.choice(_FUZZ_TASK_LINES) for _ in range(rng.randint(0, 40))]
+    return "\n".join(lines) + ("\n" if rng.random() < 0.7 else "")
+
+
+def _make_rethink(rng: random.Random, k: int, day: date) -> dict[str, Any]:
+    def maybe(value: str) -> str:
+        return value if rng.random() < 0.8 else ""
+
+    return {
+        "id": f"{day.strftime('%y%m%d')}-rethink-{k % 100:02d}",
+        "title": maybe(" ".join(rng.sample(mw._WORDS, 4))),
+        "stage": rng.choice(["1-验证", "2-实验和写作"]),
+        "status": rng.choice(["draft", "polished", "final"]),
+        "source_task": maybe(mw._task_id(k)),
+        "created_at": day.isoformat(),
+        "draft": maybe(f"A{k} @ {day.isoformat()}"),
+        "polish": maybe(f"B{k} @ {day.isoformat()}"),
+        "review": maybe(f"C{k} @ {day.isoformat()}"),
+        "conclusion": maybe(mw._ZH[: rng.randint(10, 40)].strip()),
+        "scope": maybe(f"only {rng.choice(mw._WORDS)} grids"),
+        "reasoning": [f"{rng.choice(mw._WORDS)} -> {rng.choice(mw._WORDS)}" for _ in range(rng.randint(0, 5))],
+    }
+
+
+def _corpora(rng: random.Random, docs: int) -> dict[str, list[dict[str, Any]]]:
+    day = date(2026, 1, 1)
+    tasks = [mw._make_task(rng, k, day + timedelta(days=k % 300)) for k in range(docs)]
+    for task in tasks[::17]:
+        task["hypothesis"] = ""
+        task["design"]["budget"] = ""
+        task["changes"] = []
+    papers = [mw._make_entry(rng, i, docs // mw.PAPERS_PER_TASK) for i in range(docs)]
+    papers[::13] = [{"paper_id": e["paper_id"]} for e in papers[::13]]
+    sessions = []
+    for k in range(docs):
+        session = mw._session_files(rng, day + timedelta(days=k))[1]
+        for e in session["entries"]:
+            e["decisions"] = rng.sample(mw._WORDS, rng.randint(0, 2))
+        sessions.append(session)
+    rethinks = [_make_rethink(rng, k, day + timedelta(days=k % 300)) for k in range(docs)]
+    return {"task": tasks, "paper": papers, "session": sessions, "rethink": rethinks}
+
+
+def _timed(fn: Callable[[], Any], repeat: int) -> tuple[Any, float]:
+    best = float("inf")
+    out = None
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        out = fn()
+        best = min(best, time.perf_counter() - t0)
+    return out, best
+
+
+def _round_trip_error(codec: doc_codec.Codec, doc: dict[str, Any], exact: bool) -> str | None:
+    text = codec.render(doc)
+    d1 = codec.parse(text, str(doc.get("paper_id", "")))
+    # A partial parse only has the fields the document shows.
+    if exact and (any(doc.get(k) != v for k, v in d1.items()) if codec.spec.partial else d1 != doc):
+        return "parse(render(doc)) != doc"
+    text1 = codec.render(d1)
+    if text1 != text:
+        return "render(parse(text)) != text"
+    if codec.parse(text1, str(doc.get("paper_id", ""))) != d1:
+        return "parse is not stable"
+    return None
+
+
+def _check(name: str, what: str, docs: list[Any], old: list[Any], new: list[Any]) -> bool:
+    for doc, a, b in zip(docs, old, new):
+        if a != b:
+            print(f"MISMATCH in {name} ({what}): {str(doc)[:200]!r}")
+            return False
+    return True
+
+
+def main() -> int:
+    p = argparse.ArgumentParser()
+    p.add_argument("--docs", type=int, default=2000, help="Documents per kind. Default: 2000.")
+    p.add_argument("--fuzz", type=int, default=5000, help="Random tricky task.md texts. Default: 5000.")
+    p.add_argument("--repeat", type=int, default=3, help="Runs per variant (best is reported). Default: 3.")
+    p.add_argument("--seed", type=int, default=0, help="Random seed for the synthetic data. Default: 0.")
+    args = p.parse_args()
+
+    rng = random.Random(args.seed)
+    corpora = _corpora(rng, args.docs)
+    fuzz = [_fuzz_task(rng) for _ in range(args.fuzz)]
+    old_render: dict[str, Callable[[dict[str, Any]], str]] = {
+        "task": _legacy_render_task_md,
+        "paper": _legacy_render_paper_note,
+        "session": _legacy_render_session,
+    }
+    old_parse: dict[str, Callable[[list[str]], Any]] = {
+        "task": lambda lines: _reference_parse_task_text("\n".join(lines)),
+        "paper": lambda lines: bench_note_parser._legacy_parse_note_lines("260000-00", lines),
+    }
+
+    print(f"{'kind':<8} {'stage':<7} {'docs':>6} {'MB':>7} {'old MB/s':>9} {'new MB/s':>9} {'speedup':>8}")
+
+    def report(name: str, stage: str, n: int, mb: float, old_dt: float | None, new_dt: float) -> None:
+        old_col = f"{mb / old_dt:>9.1f}" if old_dt else f"{'-':>9}"
+        speed = f"{old_dt / new_dt:>7.2f}x" if old_dt else f"{'-':>8}"
+        print(f"{name:<8} {stage:<7} {n:>6} {mb:>7.2f} {old_col} {mb / new_dt:>9.1f} {speed}")
+
+    for name, docs in corpora.items():
+        codec = doc_codec.get_codec(name)
+        texts, new_dt = _timed(lambda: [codec.render(d) for d in docs], args.repeat)
+        mb = sum(len(t.encode("utf-8")) for t in texts) / 1e6
+        old_dt = None
+        if name in old_render:
+            old_texts, old_dt = _timed(lambda: [old_render[name](d) for d in docs], args.repeat)
+            pid = [str(d.get("paper_id", "")) for d in docs]
+            old_values = [codec.parse(t, p) for t, p in zip(old_texts, pid)]
+            new_values = [codec.parse(t, p) for t, p in zip(texts, pid)]
+            if not _check(name, "render", docs, old_values, new_values):
+                return 1
+        report(name, "render", len(docs), mb, old_dt, new_dt)
+
+        split = [t.splitlines() for t in texts]
+        if name == "task":
+            # The fuzz texts go through the same comparison.
+            split += [t.splitlines() for t in fuzz]
+            mb += sum(len(t.encode("utf-8")) for t in fuzz) / 1e6
+        if name == "paper":
+            parsed, new_dt = _timed(lambda: [codec.parse_lines(lines, "260000-00") for lines in split], args.repeat)
+        else:
+            parsed, new_dt = _timed(lambda: [codec.parse_lines(lines)[0] for lines in split], args.repeat)
+        old_dt = None
+        if name in old_parse:
+            old_parsed, old_dt = _timed(lambda: [old_parse[name](lines) for lines in split], args.repeat)
+            if name == "paper":
+                old_parsed = [(bench_note_parser._without_examples(e), h) for e, h in old_parsed]
+            if not _check(name, "parse", split, old_parsed, parsed):
+                return 1
+        report(name, "parse", len(split), mb, old_dt, new_dt)
+
+        exact = name in {"session", "rethink"}
+        for doc in docs:
+            err = _round_trip_error(codec, doc, exact)
+            if err is not None:
+                print(f"ROUND TRIP in {name}: {err}: {str(doc)[:200]!r}")
+                return 1
+    print("renders, parses and round trips match")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,179 @@
+#!/usr/bin/env python3
+from __future__ import annotations
+
+"""Stress test for concurrent leaderboard appends (`leaderboard.py`).
+
+`--writers` processes are started, wait on a shared barrier, then all append
+`--rows` rows each to one leaderboard.csv (in a temp dir, or in `--dir`, e.g.
+a directory on the shared NFS mount). Writers take turns among three modes:
+- `row`: one `append_row` per row;
+- `batch`: a `LeaderboardWriter` flushing every `--batch` rows;
+- `threads`: two threads in the process, each calling `append_row` (the
+  threads share the process's record locks).
+
+The `notes` column is a payload of 0-`--notes-max` characters derived from
+(seed, writer, seq), with commas, quotes, CJK text and sometimes a newline, so
+most rows are larger than a pipe buffer and need CSV quoting. Afterwards the file
+must have the header exactly once, as its first record, and every expected row
+exactly once, with the right payload and, per writer (thread), in seq order.
+
+`--naive` runs the same load through what the runs did before
+(`open(path, "a")` + `csv.writer`, header written when the file is empty) to
+show the failures the locking prevents; it is reported, not treated as an
+error.
+
+Usage:
+  python .codex/scripts/bench_leaderboard.py
+  python .codex/scripts/bench_leaderboard.py --writers 400 --rows 100 --naive
+  python .codex/scripts/bench_leaderboard.py --dir /mnt/shared/tmp --writers 200
+"""
+
+import argparse
+import csv
+import multiprocessing as mp
+import random
+import shutil
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+import leaderboard
+
+_ALPHABET = "abcxyz0123, \"'；深度学习。"
+
+
+def _notes(seed: int, writer: str, seq: int, notes_max: int) -> str:
+    rng = random.Random(f"{seed}:{writer}:{seq}")
+    text = "".join(rng.choice(_ALPHABET) for _ in range(rng.randint(0, notes_max)))
+    if rng.random() < 0.05:
+        text += "\nsecond line"
+    return text
+
+
+def _row(seed: int, writer: str, seq: int, notes_max: int) -> list[str]:
+    return ["2026-01-01T00:00:00", writer, "seq", str(seq), "", _notes(seed, writer, seq, notes_max)]
+
+
+def _naive_append(path: Path, rows: list[list[str]]) -> None:
+    with open(path, "a", encoding="utf-8", newline="") as f:
+        writer = csv.writer(f, lineterminator="\n")
+        if f.tell() == 0:
+            writer.writerow(leaderboard.HEADER)
+        writer.writerows(rows)
+
+
+def _writer_ids(w: int) -> list[str]:
+    return [f"w{w:04d}-t0", f"w{w:04d}-t1"] if w % 3 == 2 else [f"w{w:04d}"]
+
+
+def _work(path: Path, w: int, args: argparse.Namespace, barrier: mp.Barrier) -> None:
+    barrier.wait()
+    if args.naive:
+        append = lambda rows: _naive_append(path, rows)  # noqa: E731
+    else:
+        append = lambda rows: leaderboard.append_rows(path, rows)  # noqa: E731
+
+    def run(writer: str) -> None:
+        rows = [_row(args.seed, writer, seq, args.notes_max) for seq in range(args.rows)]
+        if w % 3 == 1:
+            if args.naive:
+                for k in range(0, len(rows), args.batch):
+                    append(rows[k : k + args.batch])
+            else:
+                with leaderboard.LeaderboardWriter(path, max_rows=args.batch) as out:
+                    out.add_many(rows)
+        else:
+            for row in rows:
+                append([row])
+
+    threads = [threading.Thread(target=run, args=(writer,)) for writer in _writer_ids(w)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+
+def _verify(path: Path, args: argparse.Namespace) -> list[str]:
+    with open(path, encoding="utf-8", newline="") as f:
+        records = list(csv.reader(f))
+    problems: list[str] = []
+    if not records or records[0] != list(leaderboard.HEADER):
+        problems.append("first record is not the header")
+    headers = sum(1 for r in records[1:] if r == list(leaderboard.HEADER))
+    if headers:
+        problems.append(f"{headers} extra header record(s)")
+    expected = {writer: 0 for w in range(args.writers) for writer in _writer_ids(w)}
+    bad = dupes = order = 0
+    seen: set[tuple[str, int]] = set()
+    for r in records[1:]:
+        if r == list(leaderboard.HEADER):
+            continue
+        try:
+            writer, seq = r[1], int(r[3])
+            ok = len(r) == len(leaderboard.HEADER) and writer in expected
+            ok = ok and r[5] == _notes(args.seed, writer, seq, args.notes_max)
+        except (IndexError, ValueError):
+            ok = False
+        if not ok:
+            bad += 1
+            continue
+        if (writer, seq) in seen:
+            dupes += 1
+            continue
+        seen.add((writer, seq))
+        if seq != expected[writer]:
+            order += 1
+        expected[writer] = seq + 1
+    missing = len(expected) * args.rows - len(seen)
+    counts = [(bad, "corrupt record(s)"), (dupes, "duplicate row(s)"), (order, "out-of-order row(s)"), (missing, "missing row(s)")]
+    for count, what in counts:
+        if count:
+            problems.append(f"{count} {what}")
+    problems.extend(leaderboard.check_file(path))
+    return problems
+
+
+def main() -> int:
+    p = argparse.ArgumentParser()
+    p.add_argument("--writers", type=int, default=200, help="Writer processes. Default: 200.")
+    p.add_argument("--rows", type=int, default=50, help="Rows per writer (per thread). Default: 50.")
+    p.add_argument("--batch", type=int, default=10, help="Rows per flush for batch writers. Default: 10.")
+    p.add_argument("--notes-max", type=int, default=3000, help="Max characters in the notes column. Default: 3000.")
+    p.add_argument("--dir", type=Path, default=None, help="Directory for the test file. Default: a temp dir.")
+    p.add_argument("--naive", action="store_true", help="Also run the unlocked open/append writer for comparison.")
+    p.add_argument("--seed", type=int, default=0, help="Random seed for the payloads. Default: 0.")
+    args = p.parse_args()
+
+    tmp = Path(tempfile.mkdtemp(prefix="bench-leaderboard-", dir=args.dir))
+    failed = False
+    try:
+        print(f"{'variant':<8} {'writers':>7} {'rows':>7} {'MB':>7} {'time s':>7} {'rows/s':>8}  result")
+        for naive in ([False, True] if args.naive else [False]):
+            args.naive = naive
+            path = tmp / ("naive.csv" if naive else "leaderboard.csv")
+            ctx = mp.get_context("fork")
+            barrier = ctx.Barrier(args.writers + 1)
+            procs = [ctx.Process(target=_work, args=(path, w, args, barrier)) for w in range(args.writers)]
+            for proc in procs:
+                proc.start()
+            barrier.wait()
+            t0 = time.perf_counter()
+            for proc in procs:
+                proc.join()
+            dt = time.perf_counter() - t0
+            rows = sum(len(_writer_ids(w)) for w in range(args.writers)) * args.rows
+            mb = path.stat().st_size / 1e6 if path.exists() else 0.0
+            problems = _verify(path, args)
+            if any(proc.exitcode for proc in procs):
+                problems.append(f"{sum(1 for proc in procs if proc.exitcode)} writer(s) failed")
+            result = "; ".join(problems) if problems else "ok"
+            print(f"{'naive' if naive else 'locked':<8} {args.writers:>7} {rows:>7} {mb:>7.2f} {dt:>7.2f} {rows / dt:>8.0f}  {result}")
+            failed = failed or (bool(problems) and not naive)
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,408 @@
+#!/usr/bin/env python3
+from __future__ import annotations
+
+"""Benchmarks paper note parsing against the previous parser.
+
+It builds three corpora:
+- `real`: notes rendered by `paper_json2md.render_paper_note`, with long
+  bilingual translations in Abstract / Introduction / Methodology /
+  Experiments (default ~200 KB per note) and filled bullet sections.
+- `short`: freshly generated notes (template text only, a few KB each).
+- `fuzz`: random mixes of tricky lines (numbered / bare / whitespace-only
+  `## ` headings, placeholders, JSON and comma lists, bad years, indented
+  bullets, `\\r\\n` and other `splitlines()` breaks, no final newline).
+
+and reports MB/s for two stages:
+- `parse`: `note_document.parse_note_lines` vs the previous line parser
+  (`.rstrip()` and a heading check on every line), on the same lines.
+- `read+parse`: `DocumentLoader.note` (no parse cache) on files in a temp
+  dir vs a text-mode `open` + `splitlines` + the previous parser.
+
+Both must give the same text, entry and heading offsets for every document,
+except that the template's example items (`claim-1: ... (evidence: ...)`)
+are no longer parsed as items.
+
+Usage:
+  python .codex/scripts/bench_note_parser.py
+  python .codex/scripts/bench_note_parser.py --notes 100 --note-kb 400 --fuzz 5000
+"""
+
+import argparse
+import json
+import random
+import re
+import shutil
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Callable
+
+import doc_codec
+import note_document as notes
+import paper_json2md as json2md
+
+
+_EN = (
+    "We propose a neural operator that learns the solution map of parametric PDEs "
+    "and evaluate it on Darcy flow, Burgers and Navier-Stokes benchmarks."
+)
+_ZH = "我们提出一种神经算子 (neural operator)，学习参数化偏微分方程 (PDE) 的解映射，并在多个基准上评估."
+_NOTE_BLOCK = "> **Note:** $u_\\theta(x) \\in \\mathbb{R}^{B \\times N \\times C}$，B 为 batch，N 为网格点数."
+
+
+def _paragraphs(rng: random.Random, nbytes: int) -> str:
+    out: list[str] = []
+    size = 0
+    while size < nbytes:
+        kind = rng.random()
+        if kind < 0.45:
+            par = " ".join([_EN] * rng.randint(1, 4))
+        elif kind < 0.9:
+            par = "".join([_ZH] * rng.randint(1, 4))
+        elif kind < 0.95:
+            par = _NOTE_BLOCK
+        else:
+            # Lists inside translated sections are not bullet sections.
+            par = "\n".join(f"- step {k}: {_ZH[:20]}" for k in range(rng.randint(2, 5)))
+        out.append(par)
+        size += len(par.encode("utf-8")) + 2
+    return "\n\n".join(out)
+
+
+def _real_note(rng: random.Random, i: int, note_kb: int) -> str:
+    pid = f"{260000 + i // 100:06d}-{i % 100:02d}"
+    entry = {
+        "paper_id": pid,
+        "title": f"Neural Operators {i}",
+        "year": 2020 + i % 5,
+        "authors": ["A. Author", "B. 作者"],
+        "tags": ["pde", "operator"],
+        "problem": "\n".join(_EN for _ in range(rng.randint(1, 3))),
+        "method": _ZH,
+        "key_claims": [f"claim-{k}: {_EN[:60]} (evidence: Table {k})" for k in range(4)],
+        "limitations": [_ZH[:30]],
+        "open_questions": [],
+        "what_we_can_reuse": ["the spectral layer"],
+        "hypotheses": ["H1: resolution invariance (variable: grid; metric: L2)"],
+        "used_in_tasks": ["260101-task-001"],
+    }
+    text = json2md.render_paper_note(entry)
+    per_section = note_kb * 1024 // 4
+    for heading in ("## 1. Abstract", "## 2. Introduction", "## 3. Methodology", "## 4. Experiments"):
+        start = text.index(heading)
+        cut = text.index("\n## ", start)
+        text = text[:cut] + "\n" + _paragraphs(rng, per_section) + "\n" + text[cut:]
+    return text
+
+
+_FUZZ_LINES = [
+    "# Paper Note: 260000-00",
+    "## 0. Meta",
+    "## Meta",
+    "##  0.  Meta  (元数据)",
+    "## ",
+    "##   ",
+    "##\tMeta",
+    "##Meta",
+    "### 5. Problem (paper)",
+    "## 5. Problem (paper)",
+    "## 6. Method",
+    "## 7. Key claims (paper)",
+    "## 8. Limitations",
+    "## 9. Open questions (reading)",
+    "## 10. What we can reuse (our project)",
+    "## 11. Hypotheses we can test (our project)",
+    "## 1. Abstract (摘要)",
+    "## 12. Notes",
+    "- **paper_id**: 260000-00  ",
+    "- **title**: `A Title`",
+    "- **title**: ...",
+    "- **year**: 2023  ",
+    "- **year**: `2021`",
+    "- **year**: soon",
+    '- **authors**: `["A", "B"]`  ',
+    "- **authors**: A, B , , C",
+    "- **tags**: `[1, 2`",
+    '- **tags**: `{"a": 1}`',
+    "- **used_in_tasks**: `[]`",
+    "- **pdf_path**: `0-调研/references/<file>.pdf`",
+    "- **url**: https://example.org/paper  ",
+    "- **code_url**: TBD",
+    "- **unknown**: value",
+    "- **bad*key**: value",
+    "- plain bullet",
+    "  - indented bullet",
+    "\t- tab bullet  ",
+    "- ",
+    "-",
+    "- ...",
+    "- claim-1: ... (evidence: ...)",
+    "- claim-2: real claim",
+    "- 中文要点，含 … 省略号",
+    "- todo",
+    "* star bullet",
+    "",
+    "   ",
+    _EN,
+    _ZH,
+    "　- full-width space bullet",
+]
+_FUZZ_BREAKS = ["\n"] * 40 + ["\r\n", "\r", "\x0b", "\x0c", "\x1c", "\x85", " ", " "]
+
+
+def _fuzz_note(rng: random.Random) -> str:
+    n = rng.randint(0, 60)
+    parts: list[str] = []
+    odd = rng.random() < 0.2
+    for _ in range(n):
+        parts.append(rng.choice(_FUZZ_LINES))
+        parts.append(rng.choice(_FUZZ_BREAKS) if odd else "\n")
+    if parts and rng.random() < 0.3:
+        parts.pop()  # no final newline
+    return "".join(parts)
+
+
+def _short_note(i: int) -> str:
+    return json2md.render_paper_note({"paper_id": f"260001-{i % 100:02d}"})
+
+
+_LEGACY_META_LINE_RE = re.compile(r"^- \*\*(?P<key>[^*]+)\*\*:\s*(?P<value>.*)$")
+
+
+def _legacy_strip_backticks(s: str) -> str:
+    x = s.strip()
+    if len(x) >= 2 and x[0] == "`" and x[-1] == "`":
+        return x[1:-1]
+    return x
+
+
+def _legacy_is_placeholder(s: str) -> bool:
+    x = s.strip()
+    if not x:
+        return True
+    if x in {"…", "...", "...", "......"}:
+        return True
+    if x.lower() in {"tbd", "todo"}:
+        return True
+    if "<paper_id>" in x or "<file>" in x:
+        return True
+    if x.endswith(("...", "......", "…", "...")):
+        return True
+    return "…" in x
+
+
+def _legacy_parse_json_list(value: str) -> list[Any] | None:
+    v = _legacy_strip_backticks(value).strip()
+    if not v.startswith("["):
+        return None
+    try:
+        out = json.loads(v)
+    except json.JSONDecodeError:
+        return None
+    return out if isinstance(out, list) else None
+
+
+def _legacy_default_entry(paper_id: str) -> dict[str, Any]:
+    return {
+        "paper_id": paper_id,
+        "title": "",
+        "year": 0,
+        "authors": [],
+        "tags": [],
+        "pdf_path": "",
+        "url": "",
+        "code_url": "",
+        "problem": "",
+        "method": "",
+        "key_claims": [],
+        "limitations": [],
+        "open_questions": [],
+        "what_we_can_reuse": [],
+        "hypotheses": [],
+        "used_in_tasks": [],
+        "followed": [],
+    }
+
+
+def _legacy_parse_note_lines(paper_id: str, lines: list[str]) -> tuple[dict[str, Any], dict[str, int]]:
+    # The previous parser (and its helpers above), kept verbatim for the comparison.
+    entry: dict[str, Any] = _legacy_default_entry(paper_id)
+    headings: dict[str, int] = {}
+
+    in_meta = False
+    current_label: str | None = None
+
+    buckets: dict[str, list[str]] = {
+        "Problem": [],
+        "Method": [],
+        "Key claims": [],
+        "Limitations": [],
+        "Open questions": [],
+        "What we can reuse": [],
+        "Hypotheses we can test": [],
+    }
+
+    for i, raw in enumerate(lines):
+        line = raw.rstrip()
+        if line.startswith("## "):
+            headings.setdefault(line.strip(), i)
+            heading = line[3:].strip()
+            heading = re.sub(r"^\d+\.\s+", "", heading).strip()
+            label = heading.split("(", 1)[0].strip()
+
+            in_meta = label == "Meta"
+            current_label = label if label in buckets else None
+            continue
+
+        if in_meta:
+            m = _LEGACY_META_LINE_RE.match(line.strip())
+            if not m:
+                continue
+            key = m.group("key").strip()
+            value = m.group("value").strip()
+            if _legacy_is_placeholder(value):
+                continue
+
+            if key in {"authors", "tags", "used_in_tasks"}:
+                parsed = _legacy_parse_json_list(value)
+                if parsed is not None:
+                    entry[key] = parsed
+                else:
+                    entry[key] = [
+                        x.strip()
+                        for x in _legacy_strip_backticks(value).split(",")
+                        if x.strip()
+                    ]
+                continue
+
+            if key == "year":
+                try:
+                    entry["year"] = int(_legacy_strip_backticks(value))
+                except ValueError:
+                    pass
+                continue
+
+            if key in {"pdf_path"}:
+                entry["pdf_path"] = _legacy_strip_backticks(value)
+                continue
+
+            if key in {"paper_id", "title", "url", "code_url"}:
+                entry[key] = _legacy_strip_backticks(value)
+                continue
+
+            continue
+
+        if current_label and line.lstrip().startswith("- "):
+            item = line.lstrip()[2:].strip()
+            if _legacy_is_placeholder(item):
+                continue
+            if current_label in buckets:
+                buckets[current_label].append(item)
+
+    if buckets["Problem"]:
+        entry["problem"] = "\n".join(buckets["Problem"])
+    if buckets["Method"]:
+        entry["method"] = "\n".join(buckets["Method"])
+
+    entry["key_claims"] = buckets["Key claims"]
+    entry["limitations"] = buckets["Limitations"]
+    entry["open_questions"] = buckets["Open questions"]
+    entry["what_we_can_reuse"] = buckets["What we can reuse"]
+    entry["hypotheses"] = buckets["Hypotheses we can test"]
+
+    return entry, headings
+
+
+def _without_examples(entry: dict[str, Any]) -> dict[str, Any]:
+    # The one intended change from the previous parser: the template's own
+    # example items (`claim-1: ...`, `claim-1: ... (evidence: ...)`) are no
+    # longer parsed.
+    for slot in doc_codec.get_codec("paper").slots.values():
+        value = entry.get(slot.path[0])
+        if isinstance(value, list):
+            entry[slot.path[0]] = [x for x in value if x not in slot.examples]
+        elif isinstance(value, str) and value:
+            entry[slot.path[0]] = "\n".join(x for x in value.split("\n") if x not in slot.examples)
+    return entry
+
+
+def _timed(fn: Callable[[], Any], repeat: int) -> tuple[Any, float]:
+    best = float("inf")
+    out = None
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        out = fn()
+        best = min(best, time.perf_counter() - t0)
+    return out, best
+
+
+def main() -> int:
+    p = argparse.ArgumentParser()
+    p.add_argument("--notes", type=int, default=50, help="Real-shaped notes.")
+    p.add_argument("--note-kb", type=int, default=200, help="Approximate size of one real-shaped note.")
+    p.add_argument("--short", type=int, default=2000, help="Template-only notes.")
+    p.add_argument("--fuzz", type=int, default=3000, help="Random tricky documents.")
+    p.add_argument("--repeat", type=int, default=3, help="Runs per variant (best is reported).")
+    p.add_argument("--seed", type=int, default=0, help="Random seed for the synthetic data.")
+    args = p.parse_args()
+
+    rng = random.Random(args.seed)
+    corpora = {
+        "real": [_real_note(rng, i, args.note_kb) for i in range(args.notes)],
+        "short": [_short_note(i) for i in range(args.short)],
+        "fuzz": [_fuzz_note(rng) for _ in range(args.fuzz)],
+    }
+
+    tmp = Path(tempfile.mkdtemp(prefix="bench-notes-"))
+    try:
+        print(f"{'corpus':<7} {'stage':<11} {'docs':>6} {'MB':>7} {'old MB/s':>9} {'new MB/s':>9} {'speedup':>8}")
+        for name, docs in corpora.items():
+            mb = sum(len(t.encode("utf-8")) for t in docs) / 1e6
+            paths = []
+            for i, text in enumerate(docs):
+                path = tmp / f"{name}-{i}.md"
+                path.write_bytes(text.encode("utf-8"))
+                paths.append(path)
+            split = [t.splitlines() for t in docs]
+
+            def parse_old() -> list[Any]:
+                return [_legacy_parse_note_lines("260000-00", lines) for lines in split]
+
+            def parse_new() -> list[Any]:
+                return [notes.parse_note_lines("260000-00", lines) for lines in split]
+
+            def read_old() -> list[Any]:
+                out = []
+                for path in paths:
+                    with open(path, encoding="utf-8") as f:
+                        text = f.read()
+                    out.append((text, *_legacy_parse_note_lines(path.stem, text.splitlines())))
+                return out
+
+            def read_new() -> list[Any]:
+                loader = notes.DocumentLoader()
+                return [loader.note(path) for path in paths]
+
+            for stage, old_fn, new_fn in [("parse", parse_old, parse_new), ("read+parse", read_old, read_new)]:
+                old, old_dt = _timed(old_fn, args.repeat)
+                new, new_dt = _timed(new_fn, args.repeat)
+                if stage == "read+parse":
+                    # `text` is decoded lazily, outside the timed run.
+                    new = [(doc.text, doc.entry, doc.headings) for doc in new]
+                for text, a, b in zip(docs, old, new):
+                    a = (*a[:-2], _without_examples(a[-2]), a[-1])
+                    if a != b:
+                        print(f"MISMATCH in {name} corpus ({stage}): {text[:200]!r}")
+                        return 1
+                print(
+                    f"{name:<7} {stage:<11} {len(docs):>6} {mb:>7.2f} {mb / old_dt:>9.1f}"
+                    f" {mb / new_dt:>9.1f} {old_dt / new_dt:>7.2f}x"
+                )
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+    print("text, entries and heading offsets match")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
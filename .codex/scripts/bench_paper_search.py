@@ -0,0 +1,202 @@
+#!/usr/bin/env python3
+from __future__ import annotations
+
+"""Benchmarks `paper_search` on a synthetic registry (default: 50k papers).
+
+It writes a research.json and one note per paper (translated sections with
+English and Chinese text) to a temp dir, then reports:
+- the cold index build, a no-op update (only stat calls) and the update after
+  editing one note and one entry;
+- query latency (p50 / p95 / max) for single terms, multi-term, prefix,
+  field-limited and Chinese phrase queries, with and without `--year` /
+  `--tag` facets.
+
+Result sets are checked against a brute-force scan of the generated text
+(every hit must contain all terms, and no matching paper may be missing).
+
+Usage:
+  python .codex/scripts/bench_paper_search.py
+  python .codex/scripts/bench_paper_search.py --papers 10000 --queries 100
+"""
+
+import argparse
+import json
+import random
+import shutil
+import statistics
+import tempfile
+import time
+from collections import Counter
+from pathlib import Path
+from typing import Any
+
+import paper_search as ps
+import workspace_index as wsi
+
+
+_ZH = ["深度学习", "偏微分方程", "神经算子", "物理约束", "扩散模型", "数据同化", "湍流", "边界条件"]
+
+
+def _vocab(rng: random.Random, n: int) -> list[str]:
+    syll = ["ka", "lo", "ri", "te", "su", "mi", "no", "va", "ze", "pu", "gra", "dif", "op"]
+    words = {"".join(rng.choice(syll) for _ in range(rng.randint(2, 4))) for _ in range(n * 2)}
+    return sorted(words)[:n]
+
+
+def _make_papers(n: int, seed: int) -> tuple[list[dict[str, Any]], dict[str, str]]:
+    rng = random.Random(seed)
+    vocab = _vocab(rng, 5000)
+    # Zipf-like: a few words are common, most are rare.
+    weights = [1 / (i + 1) for i in range(len(vocab))]
+
+    def text(k: int) -> str:
+        return " ".join(rng.choices(vocab, weights, k=k))
+
+    entries: list[dict[str, Any]] = []
+    note_texts: dict[str, str] = {}
+    for i in range(n):
+        pid = f"{260000 + i // 100:06d}-{i % 100:02d}"
+        entries.append(
+            {
+                "paper_id": pid,
+                "title": text(6).title(),
+                "year": 2000 + rng.randint(0, 24),
+                "authors": [f"Author{rng.randint(0, 3000)}" for _ in range(3)],
+                "tags": [f"tag{rng.randint(0, 40)}" for _ in range(2)],
+                "problem": text(30),
+                "method": text(30),
+                "key_claims": [text(10) for _ in range(2)],
+                "hypotheses": [text(8)],
+                "followed": [],
+            }
+        )
+        zh = "".join(rng.choices(_ZH, k=3))
+        note_texts[pid] = f"本文研究{zh}。\n{text(60)}\n{text(60)}"
+    return entries, note_texts
+
+
+def _write_workspace(root: Path, entries: list[dict[str, Any]], note_texts: dict[str, str]) -> None:
+    (root / "notes").mkdir(parents=True)
+    (root / "research.json").write_text(
+        json.dumps({"research": entries}, ensure_ascii=False, indent=2) + "\n", encoding="utf-8"
+    )
+    for pid, body in note_texts.items():
+        note = (
+            f"# Paper Note: {pid}\n\n## 0. Meta\n- **paper_id**: {pid}  \n\n"
+            f"## 1. Abstract (摘要)\n\n{body}\n\n## 5. Problem (paper)\n- ...\n"
+        )
+        (root / "notes" / f"{pid}.md").write_text(note, encoding="utf-8")
+
+
+def _naive_hits(
+    entries: list[dict[str, Any]],
+    note_texts: dict[str, str],
+    terms: list[str],
+    years: tuple[int, int] | None,
+    tag: str | None,
+) -> set[str]:
+    out: set[str] = set()
+    for e in entries:
+        if years is not None and not years[0] <= e["year"] <= years[1]:
+            continue
+        if tag is not None and tag not in e["tags"]:
+            continue
+        fields = [ps._as_text(e.get(k)) for k in ps.COLUMNS if k != "note"]
+        blob = "\n".join(fields + [note_texts[e["paper_id"]]]).lower()
+        words = set(blob.split())
+        if all((t in blob) if ps._CJK_RE.search(t) else (t in words) for t in terms):
+            out.add(e["paper_id"])
+    return out
+
+
+def _percentiles(samples: list[float]) -> str:
+    ms = sorted(x * 1000 for x in samples)
+    p95 = ms[min(len(ms) - 1, int(len(ms) * 0.95))]
+    return f"p50={statistics.median(ms):.2f}ms p95={p95:.2f}ms max={ms[-1]:.2f}ms"
+
+
+def main() -> int:
+    p = argparse.ArgumentParser()
+    p.add_argument("--papers", type=int, default=50_000, help="Synthetic papers (one note each).")
+    p.add_argument("--queries", type=int, default=200, help="Queries per query kind.")
+    p.add_argument("--seed", type=int, default=0, help="Random seed for the synthetic data.")
+    args = p.parse_args()
+
+    entries, note_texts = _make_papers(args.papers, args.seed)
+    tmp = Path(tempfile.mkdtemp(prefix="bench-search-"))
+    try:
+        _write_workspace(tmp, entries, note_texts)
+        research_json = tmp / "research.json"
+        search = ps.SearchIndex(tmp / "search.sqlite", research_json, tmp / "notes")
+
+        def update() -> ps.UpdateStats:
+            return search.update(wsi.WorkspaceIndex(research_json, stream=True))
+
+        cold = update()
+        noop = update()
+        # Edit one note and one entry (new mtime and size).
+        pid = entries[len(entries) // 2]["paper_id"]
+        note = tmp / "notes" / f"{pid}.md"
+        note.write_text(note.read_text(encoding="utf-8").replace("本文", "本文用数据同化"), encoding="utf-8")
+        entries[0]["title"] = "Zzyzx Benchmark Marker"
+        research_json.write_text(
+            json.dumps({"research": entries}, ensure_ascii=False, indent=2) + "\n", encoding="utf-8"
+        )
+        one = update()
+        print(f"papers={len(entries)}")
+        print(f"cold build:  {cold.summary()}")
+        print(f"no-op:       {noop.summary()}")
+        print(f"edit 1+1:    {one.summary()}")
+        if (one.notes_updated, one.papers_updated, one.papers_added) != (1, 1, 0):
+            print("MISMATCH: incremental update touched more than the edited note and entry")
+            return 1
+
+        rng = random.Random(args.seed + 1)
+        counts = Counter(w for e in entries[:2000] for w in e["problem"].split())
+        vocab = sorted(counts)
+        common = [w for w, _ in counts.most_common(20)]
+        stems = [w[:-2] for w in vocab if len(w) >= 6]
+        kinds: dict[str, list[tuple[str, tuple[int, int] | None, str | None]]] = {
+            "1 term": [(rng.choice(vocab), None, None) for _ in range(args.queries)],
+            "1 common term": [(rng.choice(common), None, None) for _ in range(args.queries)],
+            "2 terms": [(f"{rng.choice(common)} {rng.choice(vocab)}", None, None) for _ in range(args.queries)],
+            "prefix": [(rng.choice(stems) + "*", None, None) for _ in range(args.queries)],
+            "field": [(f"title:{rng.choice(common)}", None, None) for _ in range(args.queries)],
+            "chinese": [(rng.choice(_ZH), None, None) for _ in range(args.queries)],
+            "term+facets": [
+                (rng.choice(common), (2010, 2015), f"tag{rng.randint(0, 40)}") for _ in range(args.queries)
+            ],
+        }
+        print(f"{'query kind':<14} latency (limit=20)                       with facet counts")
+        worst = 0.0
+        for kind, queries in kinds.items():
+            plain: list[float] = []
+            faceted: list[float] = []
+            for q, years, tag in queries:
+                tags = [tag] if tag else []
+                t0 = time.perf_counter()
+                search.search(q, years, tags, 20)
+                plain.append(time.perf_counter() - t0)
+                t0 = time.perf_counter()
+                search.search(q, years, tags, 20)
+                search.facets(q, years, tags)
+                faceted.append(time.perf_counter() - t0)
+            worst = max(worst, statistics.median(plain))
+            print(f"{kind:<14} {_percentiles(plain):<40} {_percentiles(faceted)}")
+
+        checks = [c for kind in ("1 term", "2 terms", "chinese", "term+facets") for c in kinds[kind][:5]]
+        for q, years, tag in checks:
+            got = {h.paper_id for h in search.search(q, years, [tag] if tag else [], len(entries))}
+            want = _naive_hits(entries, note_texts, q.lower().split(), years, tag)
+            if got != want:
+                print(f"MISMATCH: {q!r} years={years} tag={tag}: index={len(got)} brute-force={len(want)}")
+                return 1
+        print(f"result sets match brute force ({len(checks)} queries)")
+        search.close()
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+from __future__ import annotations
+
+"""Benchmarks the reference PDF walker (scandir) against the old double rglob.
+
+It builds a synthetic reference tree (default: 100k files, ~10% non-pdf noise)
+in a temp dir, then runs both walkers and reports wall time and the number of
+file-system calls made through `os.stat`, `os.lstat` and `os.scandir` (this is
+what `pathlib` and `os.path.realpath` use on Python 3.11+; on 3.10 pathlib binds
+these at import time, so the "old" column undercounts).
+
+Usage:
+  python .codex/scripts/bench_reference_walk.py
+  python .codex/scripts/bench_reference_walk.py --files 20000 --keep-dir /tmp/refs
+"""
+
+import argparse
+import os
+import shutil
+import tempfile
+import time
+from collections import Counter
+from pathlib import Path
+from typing import Any, Callable
+
+import check_unrecognized_references as ref_audit
+import workspace_index as wsi
+
+
+COUNTED_OS_FUNCS = ["stat", "lstat", "scandir"]
+
+
+def _legacy_iter_pdf_rels(ref_dirs: list[Path]) -> list[str]:
+    # The pre-scandir walker plus the double resolve `audit()` used to do per file.
+    pdfs: list[Path] = []
+    for d in ref_dirs:
+        if not d.exists():
+            continue
+        for p in d.rglob("*.pdf"):
+            if p.is_file():
+                pdfs.append(p)
+        for p in d.rglob("*.PDF"):
+            if p.is_file():
+                pdfs.append(p)
+
+    seen: set[Path] = set()
+    out: list[Path] = []
+    for p in sorted(pdfs, key=lambda x: x.as_posix().lower()):
+        if p not in seen:
+            seen.add(p)
+            out.append(p)
+    root = ref_audit.ROOT.resolve()
+    rels = []
+    for p in out:
+        try:
+            rels.append(p.resolve().resolve().relative_to(root).as_posix())
+        except ValueError:
+            rels.append(p.resolve().as_posix())
+    return rels
+
+
+def _scandir_pdf_rels(ref_dirs: list[Path]) -> list[str]:
+    wsi._RELPATH_CACHE.clear()
+    wsi._REALDIR_CACHE.clear()
+    return [f.rel for f in ref_audit._scan_pdfs(ref_dirs)]
+
+
+def _make_tree(root: Path, n_files: int, fanout: int) -> None:
+    for i in range(n_files):
+        sub = root / f"d{i % fanout:03d}" / f"e{(i // fanout) % fanout:03d}"
+        if i % fanout == 0 or not sub.exists():
+            sub.mkdir(parents=True, exist_ok=True)
+        if i % 10 == 9:
+            name = f"paper-{i:06d}.txt"
+        elif i % 7 == 0:
+            name = f"paper-{i:06d}.PDF"
+        else:
+            name = f"paper-{i:06d}.pdf"
+        (sub / name).write_bytes(b"%PDF-1.4\n")
+
+
+def _count_os_calls(fn: Callable[[], Any]) -> tuple[Any, Counter[str], float]:
+    counts: Counter[str] = Counter()
+    originals = {name: getattr(os, name) for name in COUNTED_OS_FUNCS}
+
+    def _wrap(name: str, orig: Callable[..., Any]) -> Callable[..., Any]:
+        def inner(*args: Any, **kwargs: Any) -> Any:
+            counts[name] += 1
+            return orig(*args, **kwargs)
+
+        return inner
+
+    for name, orig in originals.items():
+        setattr(os, name, _wrap(name, orig))
+    try:
+        t0 = time.perf_counter()
+        out = fn()
+        dt = time.perf_counter() - t0
+    finally:
+        for name, orig in originals.items():
+            setattr(os, name, orig)
+    return out, counts, dt
+
+
+def main() -> int:
+    p = argparse.ArgumentParser()
+    p.add_argument("--files", type=int, default=100_000, help="Files in the synthetic tree.")
+    p.add_argument("--fanout", type=int, default=40, help="Sub-directories per level.")
+    p.add_argument(
+        "--keep-dir",
+        type=Path,
+        default=None,
+        help="Build (or reuse) the tree here instead of a temp dir.",
+    )
+    args = p.parse_args()
+
+    tmp: str | None = None
+    if args.keep_dir is not None:
+        tree = args.keep_dir
+        if not tree.exists():
+            _make_tree(tree, args.files, args.fanout)
+    else:
+        tmp = tempfile.mkdtemp(prefix="bench-refs-")
+        tree = Path(tmp)
+        _make_tree(tree, args.files, args.fanout)
+
+    try:
+        old, old_calls, old_dt = _count_os_calls(lambda: _legacy_iter_pdf_rels([tree]))
+        new, new_calls, new_dt = _count_os_calls(lambda: _scandir_pdf_rels([tree]))
+    finally:
+        if tmp is not None:
+            shutil.rmtree(tmp, ignore_errors=True)
+
+    if old != new:
+        print(f"MISMATCH: old={len(old)} pdfs, new={len(new)} pdfs")
+        return 1
+
+    print(f"tree: files={args.files}, pdfs={len(new)}")
+    print(f"{'walker':<10} {'wall_s':>8} " + " ".join(f"{n:>9}" for n in COUNTED_OS_FUNCS))
+    for name, dt, calls in [("rglob", old_dt, old_calls), ("scandir", new_dt, new_calls)]:
+        cols = " ".join(f"{calls[n]:>9}" for n in COUNTED_OS_FUNCS)
+        print(f"{name:<10} {dt:>8.3f} {cols}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,183 @@
+#!/usr/bin/env python3
+from __future__ import annotations
+
+"""Benchmarks peak memory of streaming research.json vs loading it whole.
+
+It writes a synthetic research.json (default: 100k top-level entries, each
+with 0-2 `followed` entries; optionally one more entry whose `followed` chain
+is `--chain-depth` levels deep) to a temp dir, then iterates all entries in a
+fresh subprocess per variant and reports wall time and peak RSS (`ru_maxrss`):
+- `full`: `json.loads` + `workspace_index.iter_paper_entries` (what every
+  script did before).
+- `stream-json` / `stream-orjson`: `research_stream.iter_research_entries`
+  with the stdlib parser / orjson (skipped if orjson is not installed).
+- `baseline`: the interpreter plus imports, no research.json.
+
+All variants must yield the same (location, entry) sequence (compared by
+digest, with `followed` lists emptied as `research_stream` yields them).
+
+Usage:
+  python .codex/scripts/bench_research_stream.py
+  python .codex/scripts/bench_research_stream.py --entries 20000 --chain-depth 2000
+"""
+
+import argparse
+import copy
+import hashlib
+import json
+import random
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Any
+
+import research_stream
+import workspace_index as wsi
+
+
+def _entry(template: dict[str, Any], i: int, rng: random.Random) -> dict[str, Any]:
+    e = copy.deepcopy(template)
+    e["paper_id"] = f"{260000 + i // 100:06d}-{i % 100:02d}"
+    e["title"] = f"Paper {i}: a synthetic title about 深度学习 and things"
+    e["year"] = 2000 + i % 25
+    e["authors"] = [f"Author {i}-{k}" for k in range(rng.randint(1, 6))]
+    e["tags"] = [f"tag{rng.randint(0, 50)}" for _ in range(3)]
+    e["pdf_path"] = f"0-调研/references/p{i}.pdf"
+    e["problem"] = " ".join(f"word{rng.randint(0, 999)}" for _ in range(40))
+    e["method"] = " ".join(f"word{rng.randint(0, 999)}" for _ in range(40))
+    e["key_claims"] = [f"claim {k} of paper {i}" for k in range(3)]
+    e["followed"] = []
+    return e
+
+
+def _write_registry(path: Path, n: int, chain_depth: int, seed: int) -> int:
+    # Written entry by entry (indent=2 like the repo's research.json), so the
+    # generator itself stays small.
+    rng = random.Random(seed)
+    template = wsi.load_json(wsi.TEMPLATES_DIR / "paper_entry.json")
+    i = 0
+    with open(path, "w", encoding="utf-8") as f:
+        f.write('{\n  "research": [')
+        if chain_depth:
+            # Spliced by hand: `json.dumps` itself recurses per nesting level.
+            for _ in range(chain_depth):
+                head = json.dumps(_entry(template, i, rng), ensure_ascii=False)
+                f.write(head[: -len('[]}')] + "[")
+                i += 1
+            f.write(json.dumps(_entry(template, i, rng), ensure_ascii=False) + "]}" * chain_depth)
+            i += 1
+        for top in range(n):
+            e = _entry(template, i, rng)
+            i += 1
+            for _ in range(rng.randint(0, 2)):
+                e["followed"].append(_entry(template, i, rng))
+                i += 1
+            text = json.dumps(e, ensure_ascii=False, indent=2).replace("\n", "\n    ")
+            f.write(("\n    " if top == 0 and not chain_depth else ",\n    ") + text)
+        f.write("\n  ]\n}\n")
+    return i
+
+
+def _digest(pairs: Any) -> tuple[int, str]:
+    h = hashlib.blake2b(digest_size=16)
+    count = 0
+    for e, loc in pairs:
+        if isinstance(e.get("followed"), list):
+            e = {**e, "followed": []}
+        h.update(loc.encode("utf-8"))
+        h.update(json.dumps(e, sort_keys=True, ensure_ascii=False).encode("utf-8"))
+        count += 1
+    return count, h.hexdigest()
+
+
+def _child(variant: str, path: Path) -> int:
+    t0 = time.perf_counter()
+    if variant == "baseline":
+        count, digest = 0, ""
+    elif variant == "full":
+        data = json.loads(path.read_text(encoding="utf-8"))
+        count, digest = _digest(wsi.iter_paper_entries(data.get("research", [])))
+    else:
+        parser = variant.split("-", 1)[1]
+        count, digest = _digest(research_stream.iter_research_entries(path, parser=parser))
+    dt = time.perf_counter() - t0
+    peak_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    print(json.dumps({"entries": count, "digest": digest, "wall_s": dt, "peak_kb": peak_kb}))
+    return 0
+
+
+def _run_child(variant: str, path: Path) -> dict[str, Any]:
+    proc = subprocess.run(
+        [sys.executable, __file__, "--child", variant, str(path)],
+        capture_output=True,
+        text=True,
+    )
+    if proc.returncode != 0:
+        last = (proc.stderr.strip().splitlines() or ["?"])[-1]
+        return {"error": last}
+    return json.loads(proc.stdout)
+
+
+def main() -> int:
+    p = argparse.ArgumentParser()
+    p.add_argument("--entries", type=int, default=100_000, help="Top-level entries.")
+    p.add_argument(
+        "--chain-depth",
+        type=int,
+        default=0,
+        help="Add one entry with a `followed` chain this deep (0 = none).",
+    )
+    p.add_argument("--seed", type=int, default=0, help="Random seed for the synthetic data.")
+    p.add_argument(
+        "--keep-file",
+        type=Path,
+        default=None,
+        help="Write (or reuse) the registry here instead of a temp dir.",
+    )
+    p.add_argument("--child", nargs=2, metavar=("VARIANT", "PATH"), help=argparse.SUPPRESS)
+    args = p.parse_args()
+
+    if args.child:
+        return _child(args.child[0], Path(args.child[1]))
+
+    tmp: str | None = None
+    if args.keep_file is not None:
+        path = args.keep_file
+        if not path.exists():
+            _write_registry(path, args.entries, args.chain_depth, args.seed)
+    else:
+        tmp = tempfile.mkdtemp(prefix="bench-research-")
+        path = Path(tmp) / "research.json"
+        _write_registry(path, args.entries, args.chain_depth, args.seed)
+
+    variants = ["baseline", "full", "stream-json"]
+    if research_stream.orjson is not None:
+        variants.append("stream-orjson")
+    try:
+        size_mb = path.stat().st_size / 1e6
+        results = {v: _run_child(v, path) for v in variants}
+    finally:
+        if tmp is not None:
+            shutil.rmtree(tmp, ignore_errors=True)
+
+    ok = [r for v, r in results.items() if v != "baseline" and "error" not in r]
+    if len({(r["entries"], r["digest"]) for r in ok}) > 1:
+        print("MISMATCH: " + ", ".join(f"{v}={r.get('entries')}" for v, r in results.items()))
+        return 1
+
+    print(f"file: {size_mb:.1f} MB, entries={ok[0]['entries'] if ok else '?'}")
+    print(f"{'variant':<14} {'wall_s':>8} {'peak_rss_mb':>12}")
+    for v, r in results.items():
+        if "error" in r:
+            print(f"{v:<14} failed: {r['error']}")
+        else:
+            print(f"{v:<14} {r['wall_s']:>8.3f} {r['peak_kb'] / 1024:>12.1f}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,264 @@
+#!/usr/bin/env python3
+from __future__ import annotations
+
+"""Times the `.codex/scripts` tools end to end on a synthetic workspace.
+
+It builds a workspace with `make_workspace.py` in a temp dir (or reuses
+`--workspace`) and runs each tool in a fresh process from the workspace's own
+copy of the scripts, so they work on the synthetic data with default paths:
+- cold: after emptying the workspace's `data/cache/` (parse cache, audit
+  manifest, PDF hash cache, search index). The OS page cache is not dropped.
+- warm: right after, with those caches in place (`--repeat` runs, best kept).
+
+Every run records wall time, peak RSS of the tool process (`ru_maxrss` from
+`wait4`; tools run with their default `--jobs 1`, so there are no workers to
+miss) and the exit code. Sync tools run with `--dry-run`, so the workspace is
+the same for every run.
+
+Results are written to `bench_output.txt` (repo root) as JSON lines:
+- `{"record": "env", ...}`: Python, platform, workspace parameters.
+- `{"record": "run", "tool", "mode", "wall_s", "max_rss_kb", "exit"}`.
+- `{"record": "regression", "tool", "mode", "metric", "value", "baseline", "ratio"}`.
+- `{"record": "summary", "runs", "regressions", "failures", "baseline"}`.
+
+Regression check: runs are compared with `--baseline` (default: the previous
+output file), but only if it was made with the same workspace parameters. A
+run is flagged when its wall time exceeds the baseline by more than
+`--max-slowdown` and by at least `--min-delta` seconds (timings of short runs
+are noisy), or its peak RSS by more than `--max-rss-growth`. Flagged
+regressions or failed tools make the exit code 1.
+
+Usage:
+  python .codex/scripts/bench_suite.py
+  python .codex/scripts/bench_suite.py --papers 20000 --note-kb 32 --repeat 3
+  python .codex/scripts/bench_suite.py --workspace /tmp/ws --tools audit references
+"""
+
+import argparse
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Any
+
+import make_workspace
+import workspace_index as wsi
+
+
+ROOT = wsi.ROOT
+
+OUTPUT_PATH = ROOT / "bench_output.txt"
+
+# (name, script and arguments), run from the workspace root.
+TOOLS: list[tuple[str, list[str]]] = [
+    ("audit", ["audit_stage0.py", "--tasks"]),
+    ("audit-incremental", ["audit_stage0.py", "--tasks", "--incremental"]),
+    ("paper-md2json", ["paper_md2json.py", "--update-existing", "--dry-run"]),
+    ("paper-json2md", ["paper_json2md.py", "--overwrite", "--dry-run"]),
+    ("task-md2json", ["task_md2json.py", "--update-existing", "--dry-run"]),
+    ("task-json2md", ["task_json2md.py", "--overwrite", "--dry-run"]),
+    ("references", ["check_unrecognized_references.py"]),
+    ("search", ["paper_search.py", "operator", "--limit", "20"]),
+]
+
+
+def _clear_cache(workspace: Path) -> None:
+    cache = workspace / "data" / "cache"
+    if not cache.exists():
+        return
+    for child in cache.iterdir():
+        if child.name == ".gitkeep":
+            continue
+        if child.is_dir() and not child.is_symlink():
+            shutil.rmtree(child)
+        else:
+            child.unlink()
+
+
+def _run_tool(workspace: Path, argv: list[str]) -> dict[str, Any]:
+    script = workspace / ".codex" / "scripts" / argv[0]
+    with tempfile.TemporaryFile() as err:
+        t0 = time.perf_counter()
+        proc = subprocess.Popen(
+            [sys.executable, str(script), *argv[1:]],
+            cwd=workspace,
+            stdin=subprocess.DEVNULL,
+            stdout=subprocess.DEVNULL,
+            stderr=err,
+        )
+        _, status, usage = os.wait4(proc.pid, 0)
+        wall = time.perf_counter() - t0
+        proc.returncode = os.waitstatus_to_exitcode(status)
+        err.seek(0)
+        stderr = err.read().decode("utf-8", "replace")
+    # ru_maxrss is in KiB on Linux and in bytes on macOS.
+    rss_kb = usage.ru_maxrss // 1024 if sys.platform == "darwin" else usage.ru_maxrss
+    out: dict[str, Any] = {"wall_s": round(wall, 4), "max_rss_kb": rss_kb, "exit": proc.returncode}
+    if proc.returncode != 0:
+        out["stderr"] = stderr[-2000:]
+    return out
+
+
+def _load_records(path: Path) -> list[dict[str, Any]]:
+    if not path.exists():
+        return []
+    records = []
+    for line in path.read_text(encoding="utf-8").splitlines():
+        try:
+            rec = json.loads(line)
+        except ValueError:
+            continue
+        if isinstance(rec, dict):
+            records.append(rec)
+    return records
+
+
+def _baseline_runs(records: list[dict[str, Any]], workspace: dict[str, Any]) -> dict[tuple[str, str], dict[str, Any]] | None:
+    env = next((r for r in records if r.get("record") == "env"), None)
+    if env is None or env.get("workspace") != workspace:
+        return None
+    return {(r["tool"], r["mode"]): r for r in records if r.get("record") == "run" and "tool" in r and "mode" in r}
+
+
+def _regressions(
+    run: dict[str, Any],
+    base: dict[str, Any],
+    max_slowdown: float,
+    min_delta: float,
+    max_rss_growth: float,
+) -> list[dict[str, Any]]:
+    out = []
+    wall, base_wall = run["wall_s"], base.get("wall_s")
+    if isinstance(base_wall, (int, float)) and base_wall > 0:
+        if wall > base_wall * max_slowdown and wall - base_wall >= min_delta:
+            out.append({"metric": "wall_s", "value": wall, "baseline": base_wall, "ratio": round(wall / base_wall, 3)})
+    rss, base_rss = run["max_rss_kb"], base.get("max_rss_kb")
+    if isinstance(base_rss, int) and base_rss > 0 and rss > base_rss * max_rss_growth:
+        out.append({"metric": "max_rss_kb", "value": rss, "baseline": base_rss, "ratio": round(rss / base_rss, 3)})
+    return out
+
+
+def main() -> int:
+    p = argparse.ArgumentParser()
+    p.add_argument(
+        "--workspace",
+        type=Path,
+        default=None,
+        help="Existing workspace (from make_workspace.py) to use. Default: build one in a temp dir.",
+    )
+    p.add_argument("--papers", type=int, default=2000, help="Papers in the generated workspace.")
+    p.add_argument("--note-kb", type=int, default=8, help="Translated text per generated note (KB).")
+    p.add_argument("--pdf-kb", type=int, default=16, help="Size of each generated PDF (KB).")
+    p.add_argument("--seed", type=int, default=0, help="Random seed for the generated workspace.")
+    p.add_argument("--keep", action="store_true", help="Keep the generated workspace and print its path.")
+    p.add_argument(
+        "--tools",
+        nargs="+",
+        choices=[name for name, _ in TOOLS],
+        default=None,
+        help="Subset of tools to run. Default: all.",
+    )
+    p.add_argument("--repeat", type=int, default=1, help="Warm runs per tool (best is recorded).")
+    p.add_argument("--output", type=Path, default=OUTPUT_PATH, help="Output file. Default: bench_output.txt.")
+    p.add_argument(
+        "--baseline",
+        type=Path,
+        default=None,
+        help="Earlier output to compare with. Default: the existing `--output` file.",
+    )
+    p.add_argument("--max-slowdown", type=float, default=1.3, help="Wall-time ratio that counts as a regression.")
+    p.add_argument("--min-delta", type=float, default=0.25, help="Smallest wall-time increase (s) that is flagged.")
+    p.add_argument("--max-rss-growth", type=float, default=1.3, help="Peak-RSS ratio that counts as a regression.")
+    args = p.parse_args()
+
+    baseline_path = args.baseline or args.output
+    baseline_records = _load_records(baseline_path)
+
+    tmp: Path | None = None
+    build_s = 0.0
+    if args.workspace is not None:
+        workspace = args.workspace.resolve()
+        marker = workspace / make_workspace.MARKER
+        params = json.loads(marker.read_text(encoding="utf-8")) if marker.exists() else {"path": str(workspace)}
+    else:
+        tmp = Path(tempfile.mkdtemp(prefix="bench-ws-"))
+        workspace = tmp / "ws"
+        t0 = time.perf_counter()
+        make_workspace.make_workspace(
+            workspace, papers=args.papers, note_kb=args.note_kb, pdf_kb=args.pdf_kb, seed=args.seed
+        )
+        build_s = time.perf_counter() - t0
+        params = json.loads((workspace / make_workspace.MARKER).read_text(encoding="utf-8"))
+
+    baseline = _baseline_runs(baseline_records, params)
+    records: list[dict[str, Any]] = [
+        {
+            "record": "env",
+            "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+            "workspace": params,
+            "build_s": round(build_s, 3),
+        }
+    ]
+    regressions = 0
+    failures = 0
+    wanted = set(args.tools or [name for name, _ in TOOLS])
+    try:
+        print(f"{'tool':<18} {'mode':<5} {'wall s':>8} {'RSS MB':>7} {'exit':>4}  vs baseline")
+        for name, argv in TOOLS:
+            if name not in wanted:
+                continue
+            _clear_cache(workspace)
+            runs = [("cold", _run_tool(workspace, argv))]
+            warm = [_run_tool(workspace, argv) for _ in range(max(1, args.repeat))]
+            runs.append(("warm", min(warm, key=lambda r: r["wall_s"]) | {"max_rss_kb": max(r["max_rss_kb"] for r in warm)}))
+            for mode, run in runs:
+                rec = {"record": "run", "tool": name, "mode": mode, **run}
+                records.append(rec)
+                note = ""
+                base = baseline.get((name, mode)) if baseline else None
+                if base is not None:
+                    found = _regressions(run, base, args.max_slowdown, args.min_delta, args.max_rss_growth)
+                    for reg in found:
+                        records.append({"record": "regression", "tool": name, "mode": mode, **reg})
+                    regressions += len(found)
+                    note = f"{run['wall_s'] / base['wall_s']:.2f}x" if base.get("wall_s") else ""
+                    if found:
+                        note += "  REGRESSION (" + ", ".join(r["metric"] for r in found) + ")"
+                if run["exit"] != 0:
+                    failures += 1
+                    note += "  FAILED"
+                print(f"{name:<18} {mode:<5} {run['wall_s']:>8.3f} {run['max_rss_kb'] / 1024:>7.1f} {run['exit']:>4}  {note}")
+    finally:
+        if tmp is not None:
+            if args.keep:
+                print(f"workspace kept: {workspace}")
+            else:
+                shutil.rmtree(tmp, ignore_errors=True)
+
+    runs_n = sum(1 for r in records if r["record"] == "run")
+    records.append(
+        {
+            "record": "summary",
+            "runs": runs_n,
+            "regressions": regressions,
+            "failures": failures,
+            "baseline": wsi.relpath_str(baseline_path) if baseline is not None else None,
+        }
+    )
+    args.output.write_text("".join(json.dumps(r, ensure_ascii=False) + "\n" for r in records), encoding="utf-8")
+    if baseline is None and baseline_records:
+        print(f"baseline {wsi.relpath_str(baseline_path)} skipped: different workspace parameters")
+    print(f"done: {runs_n} run(s), {regressions} regression(s), {failures} failure(s) -> {wsi.relpath_str(args.output)}")
+    return 1 if regressions or failures else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
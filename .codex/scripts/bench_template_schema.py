@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+from __future__ import annotations
+
+"""Benchmarks compiled template validators against the old per-call type maps.
+
+It generates synthetic paper entries (default: 100k, ~5% with a missing key,
+an extra key or a wrong type) and validates them twice: with the pre-compiler
+`_validate_paper_entry` (type map rebuilt from the template, isinstance chain
+per key) and with `audit_stage0._validate_paper_entry` on a compiled
+`template_schema` validator. Both must report the same issues.
+
+Usage:
+  python .codex/scripts/bench_template_schema.py
+  python .codex/scripts/bench_template_schema.py --records 20000 --repeat 5
+"""
+
+import argparse
+import copy
+import random
+import time
+from typing import Any, Callable
+
+import audit_stage0
+import template_schema as schema
+import workspace_index as wsi
+
+
+def _legacy_validate(
+    entry: dict[str, Any],
+    loc: str,
+    template_types: dict[str, type],
+) -> list[tuple[str, str]]:
+    # The pre-compiler schema check (type map + isinstance chain per key).
+    issues: list[tuple[str, str]] = []
+    missing = [k for k in template_types.keys() if k not in entry]
+    if missing:
+        issues.append((loc, f"missing keys: {missing}"))
+
+    extra = [k for k in entry.keys() if k not in template_types]
+    if extra:
+        issues.append((loc, f"extra keys (allowed but review): {extra}"))
+
+    for k, want_t in template_types.items():
+        if k not in entry:
+            continue
+        got = entry.get(k)
+        if got is None:
+            continue
+        if want_t is list:
+            if not isinstance(got, list):
+                issues.append((loc, f"type mismatch: {k} should be list, got {type(got).__name__}"))
+            continue
+        if want_t is int:
+            if not isinstance(got, int):
+                issues.append((loc, f"type mismatch: {k} should be int, got {type(got).__name__}"))
+            continue
+        if want_t is str:
+            if not isinstance(got, str):
+                issues.append((loc, f"type mismatch: {k} should be str, got {type(got).__name__}"))
+            continue
+
+    paper_id = str(entry.get("paper_id", "")).strip()
+    if paper_id and not audit_stage0.PAPER_ID_RE.match(paper_id):
+        issues.append((loc, f"paper_id format unexpected: {paper_id} (expected YYMMDD-NN)"))
+
+    followed = entry.get("followed", [])
+    if followed is not None and not isinstance(followed, list):
+        issues.append((loc, "followed should be a list"))
+    return issues
+
+
+def _make_entries(template: dict[str, Any], n: int, seed: int) -> list[dict[str, Any]]:
+    rng = random.Random(seed)
+    keys = list(template)
+    out: list[dict[str, Any]] = []
+    for i in range(n):
+        e = copy.deepcopy(template)
+        e["paper_id"] = f"{260000 + i // 100:06d}-{i % 100:02d}"
+        e["title"] = f"Paper {i}"
+        e["year"] = 2000 + i % 25
+        e["authors"] = [f"A{i}", f"B{i}"]
+        r = rng.random()
+        if r < 0.02:
+            del e[rng.choice(keys)]
+        elif r < 0.035:
+            e["notes"] = "extra"
+        elif r < 0.05:
+            e[rng.choice(keys)] = rng.choice([1.5, {"x": 1}, "s", 3])
+        out.append(e)
+    return out
+
+
+def _timed(fn: Callable[[], Any], repeat: int) -> tuple[Any, float]:
+    best = float("inf")
+    out = None
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        out = fn()
+        best = min(best, time.perf_counter() - t0)
+    return out, best
+
+
+def main() -> int:
+    p = argparse.ArgumentParser()
+    p.add_argument("--records", type=int, default=100_000, help="Synthetic paper entries.")
+    p.add_argument("--repeat", type=int, default=3, help="Runs per variant (best is reported).")
+    p.add_argument("--seed", type=int, default=0, help="Random seed for the synthetic data.")
+    args = p.parse_args()
+
+    template_path = wsi.TEMPLATES_DIR / "paper_entry.json"
+    entries = _make_entries(wsi.load_json(template_path), args.records, args.seed)
+    locs = [f"research[{i}]" for i in range(len(entries))]
+
+    def legacy() -> list[tuple[str, str]]:
+        template_types = {k: type(v) for k, v in wsi.load_json(template_path).items()}
+        out: list[tuple[str, str]] = []
+        for e, loc in zip(entries, locs):
+            out.extend(_legacy_validate(e, loc, template_types))
+        return out
+
+    def compiled() -> list[tuple[str, str]]:
+        validator = schema.load_validator(template_path)
+        out: list[tuple[str, str]] = []
+        for e, loc in zip(entries, locs):
+            out.extend(
+                (it.where, it.message)
+                for it in audit_stage0._validate_paper_entry(e, loc, validator)
+            )
+        return out
+
+    old, old_dt = _timed(legacy, args.repeat)
+    t0 = time.perf_counter()
+    schema.load_validator(template_path)
+    compile_dt = time.perf_counter() - t0
+    new, new_dt = _timed(compiled, args.repeat)
+
+    if old != new:
+        print(f"MISMATCH: legacy={len(old)} issues, compiled={len(new)} issues")
+        return 1
+
+    print(f"records={len(entries)}, issues={len(new)}, compile_s={compile_dt:.6f}")
+    print(f"{'variant':<10} {'wall_s':>8} {'records/s':>12}")
+    for name, dt in [("legacy", old_dt), ("compiled", new_dt)]:
+        print(f"{name:<10} {dt:>8.3f} {len(entries) / dt:>12.0f}")
+    print(f"speedup: {old_dt / new_dt:.2f}x")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
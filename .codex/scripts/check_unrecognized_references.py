@@ -7,9 +7,15 @@ This script is for the "paper intake" loop:
 - PDFs live in `0-调研/references/` (or `0-调研/reference/` for legacy).
 - If a PDF is recognized/registered, there should be a matching entry in
   `0-调研/research.json` (either in the top-level `research` list, or nested
-  under `followed`) with a `paper_id` (e.g. 260123-01) and `pdf_path`.
+  under `followed`) with a `paper_id` (e.g. 260123-01) and `pdf_path`. A
+  sharded registry (`0-调研/research.d/`) is read through the same index.
 - Each registered paper should also have a note file:
   `0-调研/notes/<paper_id>.md`.
+- PDFs are also indexed by content (SHA-256), so byte-identical copies under
+  different paths are reported, and an unrecognized PDF whose content matches a
+  registered `pdf_path` is mapped back to its `paper_id`. Hashes are cached in
+  `data/cache/pdf_hashes.json`, keyed by (path, size, mtime_ns, inode), so
+  unchanged files are only stat-ed.
 
 Usage:
   python .codex/scripts/check_unrecognized_references.py
@@ -17,14 +23,23 @@ Usage:
 """
 
 import argparse
+import hashlib
 import json
+import os
 import sys
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from pathlib import Path
 from typing import Any
 
+import note_document as notes
+import workspace_index as wsi
 
-ROOT = Path(__file__).resolve().parents[2]
+
+ROOT = wsi.ROOT
+
+HASH_CACHE_PATH = ROOT / "data" / "cache" / "pdf_hashes.json"
+HASH_CACHE_VERSION = 1
+HASH_CHUNK_BYTES = 1 << 20
 
 
 @dataclass(frozen=True)
@@ -33,6 +48,12 @@ class AuditResult:
     missing_pdfs: list[str]
     missing_notes: list[str]
     duplicate_pdf_refs: dict[str, list[str]]
+    # sha256 -> relpaths of byte-identical PDFs (only groups with 2+ paths).
+    duplicate_pdf_contents: dict[str, list[str]] = field(default_factory=dict)
+    # unrecognized relpath -> paper_ids whose registered pdf has the same content.
+    content_matches: dict[str, list[str]] = field(default_factory=dict)
+    # relpath -> sha256 of every scanned PDF (empty without the content index).
+    content_index: dict[str, str] = field(default_factory=dict)
 
     def has_issues(self) -> bool:
         return bool(
@@ -40,25 +61,10 @@ class AuditResult:
             or self.missing_pdfs
             or self.missing_notes
             or self.duplicate_pdf_refs
+            or self.duplicate_pdf_contents
         )
 
 
-def _load_json(path: Path) -> dict[str, Any]:
-    try:
-        return json.loads(path.read_text(encoding="utf-8"))
-    except FileNotFoundError as e:
-        raise FileNotFoundError(f"missing file: {path}") from e
-    except json.JSONDecodeError as e:
-        raise ValueError(f"invalid json: {path} ({e})") from e
-
-
-def _relpath_str(path: Path) -> str:
-    try:
-        return path.resolve().relative_to(ROOT.resolve()).as_posix()
-    except Exception:
-        return path.as_posix()
-
-
 def _find_reference_dirs(explicit: list[Path] | None) -> list[Path]:
     if explicit:
         return [p if p.is_absolute() else (ROOT / p) for p in explicit]
@@ -70,93 +76,205 @@ def _find_reference_dirs(explicit: list[Path] | None) -> list[Path]:
     return [p for p in candidates if p.exists()]
 
 
-def _iter_pdfs(ref_dirs: list[Path]) -> list[Path]:
-    pdfs: list[Path] = []
+@dataclass(frozen=True)
+class PdfFile:
+    """One PDF found by `_scan_pdfs`.
+
+    `entry` is the `os.DirEntry` from the scan; its stat result is cached, so
+    callers that need size/mtime/inode do not pay for another lookup.
+    """
+
+    rel: str
+    entry: os.DirEntry
+
+    @property
+    def path(self) -> Path:
+        return Path(self.entry.path)
+
+    def stat(self) -> os.stat_result:
+        return self.entry.stat()
+
+
+def _scan_pdfs(ref_dirs: list[Path]) -> list[PdfFile]:
+    """Walks reference dirs once with `os.scandir`, matching `.pdf` case-insensitively.
+
+    Each reference dir is resolved once; relpaths of the files below it are
+    derived by string joins instead of resolving every file. Symlinked files are
+    the exception (resolved individually, like before); symlinked directories are
+    not descended into, which matches the previous `rglob` behavior.
+
+    Args:
+        ref_dirs: Directories that contain PDFs.
+
+    Returns:
+        PDFs sorted by relpath (case-insensitive), without duplicates.
+    """
+    found: dict[str, PdfFile] = {}
     for d in ref_dirs:
         if not d.exists():
             continue
-        for p in d.rglob("*.pdf"):
-            if p.is_file():
-                pdfs.append(p)
-        for p in d.rglob("*.PDF"):
-            if p.is_file():
-                pdfs.append(p)
-
-    seen: set[Path] = set()
-    out: list[Path] = []
-    for p in sorted(pdfs, key=lambda x: x.as_posix().lower()):
-        if p not in seen:
-            seen.add(p)
-            out.append(p)
-    return out
-
-
-def _normalize_entry_pdf_path(pdf_path: str) -> Path | None:
-    if not pdf_path:
-        return None
-
-    p = Path(pdf_path)
-    if not p.is_absolute():
-        p = ROOT / p
-    # We do not require the file to exist.
-    return p.resolve(strict=False)
-
-
-def _iter_paper_entries(entries: list[Any] | Any) -> list[dict[str, Any]]:
-    out: list[dict[str, Any]] = []
-    if not isinstance(entries, list):
-        return out
-    for e in entries:
-        if not isinstance(e, dict):
-            continue
-        out.append(e)
-        followed = e.get("followed", [])
-        out.extend(_iter_paper_entries(followed))
-    return out
+        base = d.resolve().as_posix()
+        stack = [base]
+        while stack:
+            cur = stack.pop()
+            try:
+                it = os.scandir(cur)
+            except OSError:
+                continue
+            with it:
+                for entry in it:
+                    name = entry.name
+                    if entry.is_dir(follow_symlinks=False):
+                        stack.append(f"{cur}/{name}")
+                        continue
+                    if not name.lower().endswith(".pdf") or not entry.is_file():
+                        continue
+                    full = entry.path
+                    if entry.is_symlink():
+                        rel = wsi.relpath_str(full)
+                    elif full.startswith(wsi.ROOT_PREFIX):
+                        rel = full[len(wsi.ROOT_PREFIX) :]
+                    else:
+                        rel = full
+                    if rel not in found:
+                        found[rel] = PdfFile(rel=rel, entry=entry)
+    return [found[rel] for rel in sorted(found, key=str.lower)]
+
+
+def _iter_pdfs(ref_dirs: list[Path]) -> list[Path]:
+    return [f.path for f in _scan_pdfs(ref_dirs)]
+
 
+def _sha256_file(path: Path) -> str:
+    h = hashlib.sha256()
+    size = 0
+    with path.open("rb") as f:
+        while True:
+            chunk = f.read(HASH_CHUNK_BYTES)
+            if not chunk:
+                break
+            h.update(chunk)
+            size += len(chunk)
+    notes.LOADER.count_read(path, size)
+    return h.hexdigest()
 
-def audit(research_json: Path, notes_dir: Path, ref_dirs: list[Path]) -> AuditResult:
+
+def _load_hash_cache(path: Path) -> dict[str, list[Any]]:
+    # A broken or outdated cache only costs a re-hash, so never fail on it.
+    try:
+        data = json.loads(path.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return {}
+    if not isinstance(data, dict) or data.get("version") != HASH_CACHE_VERSION:
+        return {}
+    files = data.get("files", {})
+    return files if isinstance(files, dict) else {}
+
+
+def _write_hash_cache(path: Path, files: dict[str, list[Any]]) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+    tmp.write_text(
+        json.dumps({"version": HASH_CACHE_VERSION, "files": files}, sort_keys=True)
+        + "\n",
+        encoding="utf-8",
+    )
+    os.replace(tmp, path)
+
+
+def build_content_index(
+    pdfs: list[PdfFile],
+    cache_path: Path,
+    keep: set[str] | None = None,
+) -> dict[str, str]:
+    """Maps each PDF relpath to its SHA-256, reusing cached hashes when possible.
+
+    A cached hash is reused only if (size, mtime_ns, inode) of the file still
+    match, so a warm run only stats files. Entries for files that disappeared
+    are dropped, except the relpaths listed in `keep` (registered `pdf_path`s),
+    so a renamed PDF can still be matched to the entry that used to point at it.
+
+    Args:
+        pdfs: PDF files to index (from `_scan_pdfs`); relpaths are the cache keys.
+        cache_path: JSON cache file, usually `data/cache/pdf_hashes.json`.
+        keep: Relpaths whose stale cache entries should survive.
+
+    Returns:
+        Dict relpath -> sha256 hex digest. Stale entries kept via `keep` are
+        included as well.
+    """
+    cached = _load_hash_cache(cache_path)
+    files: dict[str, list[Any]] = {}
+    index: dict[str, str] = {}
+    dirty = False
+
+    for f in pdfs:
+        rel = f.rel
+        try:
+            st = f.stat()
+        except OSError:
+            continue
+        key = [st.st_size, st.st_mtime_ns, st.st_ino]
+        hit = cached.get(rel)
+        if isinstance(hit, list) and len(hit) == 4 and hit[:3] == key:
+            sha = str(hit[3])
+        else:
+            sha = _sha256_file(f.path)
+            dirty = True
+        files[rel] = [*key, sha]
+        index[rel] = sha
+
+    for rel in keep or set():
+        hit = cached.get(rel)
+        if rel not in files and isinstance(hit, list) and len(hit) == 4:
+            files[rel] = hit
+            index[rel] = str(hit[3])
+
+    if dirty or files.keys() != cached.keys():
+        _write_hash_cache(cache_path, files)
+    return index
+
+
+def audit(
+    research_json: Path,
+    notes_dir: Path,
+    ref_dirs: list[Path],
+    hash_cache: Path | None = HASH_CACHE_PATH,
+    index: wsi.WorkspaceIndex | None = None,
+) -> AuditResult:
     """Audits PDF references vs research.json and notes/.
 
     Args:
         research_json: Path to `0-调研/research.json`.
         notes_dir: Path to `0-调研/notes/`.
         ref_dirs: One or more directories that contain PDFs.
+        hash_cache: Hash cache for the content index. `None` disables content
+            matching (path-only audit).
+        index: Workspace index to read research.json from. Default: the
+            process-wide index for `research_json`.
 
     Returns:
         AuditResult containing unrecognized PDFs, missing PDFs/notes, and duplicates.
     """
-    data = _load_json(research_json)
-    research_entries = data.get("research", [])
-    if not isinstance(research_entries, list):
-        raise ValueError(f"`research` must be a list in {research_json}")
-    entries = _iter_paper_entries(research_entries)
-
-    pdf_to_paper_ids: dict[str, list[str]] = {}
+    if index is None:
+        index = wsi.get_index(research_json=research_json)
+    pdf_to_paper_ids = index.pdf_to_paper_ids
     paper_id_to_pdf: dict[str, str] = {}
-
-    for e in entries:
-        if not isinstance(e, dict):
-            continue
-        paper_id = str(e.get("paper_id", "")).strip()
-        pdf_path = str(e.get("pdf_path", "")).strip()
-        if not paper_id:
-            continue
-        p = _normalize_entry_pdf_path(pdf_path)
-        if p is None:
-            continue
-        rel = _relpath_str(p)
-        pdf_to_paper_ids.setdefault(rel, []).append(paper_id)
-        paper_id_to_pdf[paper_id] = rel
+    for rel, paper_ids in pdf_to_paper_ids.items():
+        for paper_id in paper_ids:
+            paper_id_to_pdf[paper_id] = rel
 
     duplicate_pdf_refs = {k: v for k, v in pdf_to_paper_ids.items() if len(v) > 1}
 
-    pdfs = _iter_pdfs(ref_dirs)
-    pdf_rels = [_relpath_str(p.resolve()) for p in pdfs]
+    pdfs = _scan_pdfs(ref_dirs)
+    pdf_rels = [f.rel for f in pdfs]
+    scanned = set(pdf_rels)
 
     unrecognized_pdfs = [rel for rel in pdf_rels if rel not in pdf_to_paper_ids]
     missing_pdfs: list[str] = []
     for rel in pdf_to_paper_ids.keys():
+        if rel in scanned:
+            continue
         p = Path(rel)
         if not p.is_absolute():
             p = ROOT / p
@@ -166,14 +284,40 @@ def audit(research_json: Path, notes_dir: Path, ref_dirs: list[Path]) -> AuditRe
     missing_notes: list[str] = []
     for paper_id in sorted(paper_id_to_pdf.keys()):
         note_path = notes_dir / f"{paper_id}.md"
-        if not note_path.exists():
-            missing_notes.append(f"{paper_id} -> {_relpath_str(note_path)}")
+        if not os.path.exists(note_path):
+            missing_notes.append(f"{paper_id} -> {wsi.relpath_str(note_path)}")
+
+    duplicate_pdf_contents: dict[str, list[str]] = {}
+    content_matches: dict[str, list[str]] = {}
+    sha_by_rel: dict[str, str] = {}
+    if hash_cache is not None:
+        sha_by_rel = build_content_index(pdfs, hash_cache, keep=set(pdf_to_paper_ids))
+
+        by_sha: dict[str, list[str]] = {}
+        for rel in pdf_rels:
+            if rel in sha_by_rel:
+                by_sha.setdefault(sha_by_rel[rel], []).append(rel)
+        duplicate_pdf_contents = {
+            sha: sorted(rels) for sha, rels in by_sha.items() if len(rels) > 1
+        }
+
+        registered_by_sha: dict[str, set[str]] = {}
+        for rel, pids in pdf_to_paper_ids.items():
+            if rel in sha_by_rel:
+                registered_by_sha.setdefault(sha_by_rel[rel], set()).update(pids)
+        for rel in unrecognized_pdfs:
+            pids = registered_by_sha.get(sha_by_rel.get(rel, ""))
+            if pids:
+                content_matches[rel] = sorted(pids)
 
     return AuditResult(
         unrecognized_pdfs=sorted(unrecognized_pdfs),
         missing_pdfs=sorted(missing_pdfs),
         missing_notes=missing_notes,
         duplicate_pdf_refs=duplicate_pdf_refs,
+        duplicate_pdf_contents=duplicate_pdf_contents,
+        content_matches=content_matches,
+        content_index=sha_by_rel,
     )
 
 
@@ -185,7 +329,11 @@ def _print_report(result: AuditResult) -> None:
     if result.unrecognized_pdfs:
         print("Unrecognized PDFs (exists in references/, missing in research.json):")
         for p in result.unrecognized_pdfs:
-            print(f"- {p}")
+            pids = result.content_matches.get(p)
+            if pids:
+                print(f"- {p} (same content as: {', '.join(pids)})")
+            else:
+                print(f"- {p}")
         print()
 
     if result.missing_pdfs:
@@ -205,6 +353,12 @@ def _print_report(result: AuditResult) -> None:
         for pdf_path, paper_ids in sorted(result.duplicate_pdf_refs.items()):
             joined = ", ".join(sorted(paper_ids))
             print(f"- {pdf_path}: {joined}")
+        print()
+
+    if result.duplicate_pdf_contents:
+        print("Same content, different path (byte-identical PDFs):")
+        for sha, rels in sorted(result.duplicate_pdf_contents.items(), key=lambda x: x[1]):
+            print(f"- sha256:{sha[:12]}: {', '.join(rels)}")
 
 
 def main() -> int:
@@ -228,6 +382,17 @@ def main() -> int:
         default=None,
         help="PDFs directory to scan (repeatable). Default: 0-调研/references/.",
     )
+    p.add_argument(
+        "--hash-cache",
+        type=Path,
+        default=HASH_CACHE_PATH,
+        help="Content hash cache file. Default: data/cache/pdf_hashes.json.",
+    )
+    p.add_argument(
+        "--no-content-index",
+        action="store_true",
+        help="Only match PDFs by path (skip SHA-256 content index).",
+    )
     p.add_argument(
         "--strict",
         action="store_true",
@@ -244,6 +409,7 @@ def main() -> int:
         research_json=args.research_json,
         notes_dir=args.notes_dir,
         ref_dirs=ref_dirs,
+        hash_cache=None if args.no_content_index else args.hash_cache,
     )
     _print_report(result)
     if args.strict and result.has_issues():
@@ -0,0 +1,877 @@
+#!/usr/bin/env python3
+from __future__ import annotations
+
+"""Markdown <-> JSON codec compiled from the document templates.
+
+Task, paper, session and rethink documents share one parser and one renderer.
+`get_codec(kind)` compiles a kind's two templates in `.codex/templates/`
+(`task.md` + `task.json`, `paper_note.md` + `paper_entry.json`, `session.md` +
+`session.json`, `rethink.md` + `rethink.json`) once per process:
+- the title line (`# Task: <task_id>`) names the json fields it shows;
+- every field line (`- [ ] key: value`, `- **key**: value`, `- **Key:** value`)
+  becomes a field: json path (the json template leaf of that name, or
+  `DocSpec.aliases`), type (from the json template), the text before the value,
+  backticks, default text and trailing hint (`... (时间/算力)`, rendered only
+  with the default);
+- a section whose label names a json field (`## 7. Key claims (paper)` ->
+  `key_claims`) becomes an item slot (`- item` or `1. item` lines), with the
+  template's own lines as the placeholder when there are no items (their
+  example items, like `claim-1: ...`, are never parsed);
+- a heading with `<...>` placeholders (session) starts a repeated entry;
+- everything else is literal text, copied as is when rendering.
+
+Parsing is one pass over the lines: each `## ` heading picks the handler of
+its section with one dict lookup on the label, field keys are looked up in a
+dict, and a line outside fields and slots costs a prefix test. Rendering walks
+the compiled op list (literal line, title, field, slot, entries), so the
+output follows the template line by line. Parsing also accepts the older
+rendered forms (`## 0. Meta.`, `# Task: <id>.`, `key：value`).
+`DocSpec` holds what the templates cannot say: key aliases, placeholder
+rules, whether a parse returns only the fields it found.
+`Codec.version` is a digest of the templates and of this file, so parse-cache
+ids change with either.
+
+`bench_doc_codec.py` checks the codecs against the previous hand-written
+parsers / renderers, checks round trips, and times both.
+
+Usage:
+  python .codex/scripts/doc_codec.py parse 1-验证/tasks/260101-task-001/task.md
+  python .codex/scripts/doc_codec.py render task 1-验证/tasks/260101-task-001/task.json
+"""
+
+import argparse
+import hashlib
+import json
+import re
+import sys
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Sequence
+
+
+TEMPLATES_DIR = Path(__file__).resolve().parents[1] / "templates"
+
+# Part of every `Codec.version`: editing the codec invalidates cached parses.
+_SOURCE_DIGEST = hashlib.blake2b(Path(__file__).read_bytes(), digest_size=6).hexdigest()
+
+_HEADING_NUMBER_RE = re.compile(r"^\d+\.\s+")
+_TOKEN_RE = re.compile(r"<[^<>]+>")
+# A field line: `- [ ] key：value` / `- [x] key: value` (first `：`, else first
+# `:`), `- **key**: value` or `- **Key:** value`; groups: four key forms, value.
+_FIELD_LINE_RE = re.compile(r"- (?:\[[ xX]\]\s(?:([^：]*)：|([^:]*):)|\*\*(?:([^*]+)\*\*:|([^*]+):\*\*))(.*)")
+# Template values that only show the expected form: `<人>`, `YYYY-MM-DD`, `a | b`.
+_FORM_RE = re.compile(r"<[^<>]+>|YY|\s\|\s")
+
+
+def heading_label(line: str) -> str:
+    """Returns the section label of a `## ...` heading line.
+
+    `## 7. Key claims (paper)` -> `Key claims`: the number prefix, anything
+    from the first `(` on and a trailing `.` are dropped.
+    """
+    heading = _HEADING_NUMBER_RE.sub("", line[3:].strip()).strip()
+    return heading.split("(", 1)[0].strip().rstrip(".").rstrip()
+
+
+def strip_backticks(s: str) -> str:
+    x = s.strip()
+    if len(x) >= 2 and x[0] == "`" and x[-1] == "`":
+        return x[1:-1]
+    return x
+
+
+def parse_json_list(value: str) -> list[Any] | None:
+    v = strip_backticks(value).strip()
+    if not v.startswith("["):
+        return None
+    try:
+        out = json.loads(v)
+    except json.JSONDecodeError:
+        return None
+    return out if isinstance(out, list) else None
+
+
+def _strict_placeholder(s: str) -> bool:
+    x = s.strip()
+    return x in {"…", "...", "......", ""} or "…" in x
+
+
+def _note_placeholder(s: str) -> bool:
+    # `_strict_placeholder`, plus tbd / todo, path placeholders and any "..."
+    # suffix (e.g. "claim-1: ...").
+    x = s.strip()
+    return (
+        not x
+        or "…" in x
+        or x.endswith("...")
+        or ("<" in x and ("<paper_id>" in x or "<file>" in x))
+        or (len(x) <= 4 and x.lower() in {"tbd", "todo"})
+    )
+
+
+PLACEHOLDER_RULES = {"strict": _strict_placeholder, "note": _note_placeholder}
+
+
+def _ts_to_md(value: str) -> str:
+    # 2026-01-01T11:00:00 -> 2026-01-01 11:00
+    return value[:16].replace("T", " ")
+
+
+def _ts_from_md(value: str) -> str:
+    return value.replace(" ", "T", 1) + ":00" if len(value) == 16 else value
+
+
+@dataclass(frozen=True)
+class DocSpec:
+    """What a document kind needs besides its two templates.
+
+    Attributes:
+        md_template: Markdown template file name.
+        json_template: JSON template file name.
+        aliases: md key, section label or title / heading `<token>` -> dotted
+            json path, where the name alone does not find the json leaf.
+        placeholder: `strict` or `note` (see `PLACEHOLDER_RULES`): values that
+            count as "not filled in".
+        template_placeholders: Also treat a field's (or the title's) template
+            value as unfilled when it only shows the expected form (`<人>`,
+            `YYYY-MM-DD`, `draft | final`).
+        partial: A parse returns only the fields found (merged into the json by
+            the caller); otherwise it starts from the json template, emptied.
+        scoped: Field lines only count in the section that declares them.
+        id_path: Json path filled from the caller's document id (file stem).
+        parse_title: Read the title line's fields.
+        required: Message of the ValueError raised when rendering a document
+            without its (first) title field.
+        converters: Json path -> (to md, from md) for values shown differently.
+        examples: Example items that older renderers wrote instead of the
+            template's own; like those, never parsed as items.
+    """
+
+    md_template: str
+    json_template: str
+    aliases: dict[str, str] = field(default_factory=dict)
+    placeholder: str = "strict"
+    template_placeholders: bool = False
+    partial: bool = False
+    scoped: bool = True
+    id_path: str = ""
+    parse_title: bool = True
+    required: str = ""
+    converters: dict[str, tuple[Any, Any]] = field(default_factory=dict)
+    examples: tuple[str, ...] = ()
+
+
+SPECS: dict[str, DocSpec] = {
+    "task": DocSpec(
+        "task.md",
+        "task.json",
+        aliases={"来源补充": "source.desc", "为什么现在做": "background.why_now"},
+        partial=True,
+        scoped=False,
+        required="task.json missing `task_id`",
+    ),
+    "paper": DocSpec(
+        "paper_note.md",
+        "paper_entry.json",
+        aliases={"Hypotheses we can test": "hypotheses"},
+        placeholder="note",
+        examples=("claim-1: ... (evidence: ...)",),
+        id_path="paper_id",
+        parse_title=False,
+        required="paper entry missing `paper_id`",
+    ),
+    "session": DocSpec(
+        "session.md",
+        "session.json",
+        aliases={"<YYMMDD>": "date", "<YYYY-MM-DD HH:MM>": "timestamp", "<mode>": "mode", "Next step": "next_steps"},
+        partial=True,
+        converters={"timestamp": (_ts_to_md, _ts_from_md)},
+    ),
+    "rethink": DocSpec(
+        "rethink.md",
+        "rethink.json",
+        aliases={
+            "<一句话标题>": "title",
+            "来源 task": "source_task",
+            "初稿": "draft",
+            "润色": "polish",
+            "终审": "review",
+            "一句话结论": "conclusion",
+            "适用范围/边界": "scope",
+            "思考链": "reasoning",
+        },
+        placeholder="note",
+        template_placeholders=True,
+    ),
+}
+
+
+@dataclass(frozen=True)
+class Field:
+    """One `key: value` line of a template.
+
+    Attributes:
+        key: Key as written in the md.
+        path: Json path.
+        kind: `str`, `int`, `list` (inline JSON list) or `joined` (list shown
+            as `a; b`).
+        prefix: Template text before the value (`- [ ] budget: `).
+        hint: Template text after the value (` (时间/算力)`), shown with the
+            default only.
+        trailing: Line end: a markdown line break (`  `), which all field
+            lines have; a few template lines with a hint lack it, but every
+            document written so far has it.
+        quote: The value is wrapped in backticks.
+        default: Shown when the value is empty.
+        template_value: The template's value (without backticks or hint).
+    """
+
+    key: str
+    path: tuple[str, ...]
+    kind: str
+    prefix: str
+    hint: str
+    trailing: str
+    quote: bool
+    default: str
+    template_value: str
+
+    @property
+    def dotted(self) -> str:
+        return ".".join(self.path)
+
+
+@dataclass(frozen=True)
+class Slot:
+    """A section whose items (`- x` or `1. x` lines) are one json field."""
+
+    path: tuple[str, ...]
+    text: bool  # json string: items joined by "\n"
+    numbered: bool
+    suffix: str  # after each rendered item
+    placeholder: tuple[str, ...]  # template lines, rendered when empty
+    examples: frozenset[str]  # their item texts: never parsed as items
+
+
+@dataclass
+class Section:
+    fields: dict[str, Field] = field(default_factory=dict)
+    slot: Slot | None = None
+
+
+@dataclass(frozen=True)
+class EntryBlock:
+    """A repeated section (one per element of a json list)."""
+
+    path: tuple[str, ...]
+    heading: str  # template heading
+    tokens: tuple[tuple[str, tuple[str, ...]], ...]  # (token, path in entry)
+    parts: tuple[str | tuple[str, tuple[str, ...]], ...]  # heading text and tokens
+    heading_re: re.Pattern[str]
+    fields: dict[str, Field]  # md key -> field, in template order
+    empty: dict[str, Any]
+
+
+# Ops of the renderer: one per template line (or slot / entry block).
+_LIT, _TITLE, _FIELD, _SLOT, _ENTRIES = range(5)
+
+
+def _empty(value: Any) -> Any:
+    """The json template `value` with every leaf emptied."""
+    if isinstance(value, dict):
+        return {k: _empty(v) for k, v in value.items()}
+    if isinstance(value, list):
+        return []
+    if isinstance(value, bool):
+        return False
+    if isinstance(value, int):
+        return 0
+    return ""
+
+
+def _clone(empty: dict[str, Any]) -> dict[str, Any]:
+    """A fresh copy of an `_empty` dict (much cheaper than `copy.deepcopy`)."""
+    return {k: _clone(v) if type(v) is dict else [] if type(v) is list else v for k, v in empty.items()}
+
+
+def _leaf_paths(obj: dict[str, Any], prefix: tuple[str, ...] = ()) -> dict[str, list[tuple[str, ...]]]:
+    out: dict[str, list[tuple[str, ...]]] = {}
+    for k, v in obj.items():
+        out.setdefault(k, []).append((*prefix, k))
+        if isinstance(v, dict):
+            for name, paths in _leaf_paths(v, (*prefix, k)).items():
+                out.setdefault(name, []).extend(paths)
+    return out
+
+
+def _get(obj: Any, path: tuple[str, ...]) -> Any:
+    for k in path:
+        if not isinstance(obj, dict):
+            return None
+        obj = obj.get(k)
+    return obj
+
+
+def _set(obj: dict[str, Any], path: tuple[str, ...], value: Any) -> None:
+    for k in path[:-1]:
+        if not isinstance(obj.get(k), dict):
+            obj[k] = {}
+        obj = obj[k]
+    obj[path[-1]] = value
+
+
+def _split_field_line(line: str) -> tuple[str, str, str] | None:
+    """`(key, text before the value, value)` of a template field line."""
+    if line.startswith("- [ ] "):
+        rest = line[6:]
+        i = rest.find("：")
+        j = rest.find(":")
+        if i < 0 and j < 0:
+            return None
+        if i >= 0:
+            key, start = rest[:i], i + 1
+        else:
+            key, start = rest[:j], j + 1
+        while start < len(rest) and rest[start] == " ":
+            start += 1
+        return key.strip(), line[: 6 + start], rest[start:]
+    if line.startswith("- **"):
+        j = line.find("**", 4)
+        if j < 0:
+            return None
+        key = line[4:j]
+        if line.startswith("**: ", j):
+            return key, line[: j + 4], line[j + 4 :]
+        if key.endswith(":") and line.startswith("** ", j):
+            return key[:-1], line[: j + 3], line[j + 3 :]
+    return None
+
+
+def _item_line(line: str) -> tuple[bool, str] | None:
+    """`(numbered, text)` of a `- x` or `1. x` line, else None."""
+    x = line.lstrip()
+    if x.startswith("- "):
+        return False, x[2:].strip()
+    n = 0
+    while n < len(x) and x[n].isdigit():
+        n += 1
+    if n and x.startswith(". ", n):
+        return True, x[n + 2 :].strip()
+    return None
+
+
+class Codec:
+    """Parser and renderer of one document kind (see module doc)."""
+
+    def __init__(self, kind: str, spec: DocSpec, md_text: str, json_text: str) -> None:
+        self.kind = kind
+        self.spec = spec
+        self.is_placeholder = PLACEHOLDER_RULES[spec.placeholder]
+        self.version = hashlib.blake2b(
+            "\0".join([_SOURCE_DIGEST, md_text, json_text]).encode("utf-8"), digest_size=6
+        ).hexdigest()
+        self.template: dict[str, Any] = json.loads(json_text)
+        self.empty = _empty(self.template)
+        self.fields: list[Field] = []
+        self.sections: dict[str, Section] = {}
+        self.entries: EntryBlock | None = None
+        self.ops: list[tuple[int, Any]] = []
+        # Title: literal text and `(token, json path)` parts, in line order;
+        # `title_path` is the first field's path.
+        self.title_parts: list[str | tuple[str, tuple[str, ...]]] = []
+        self.title_tokens: list[tuple[str, tuple[str, ...]]] = []
+        self.title_path: tuple[str, ...] = ()
+        self.slots: dict[tuple[str, ...], Slot] = {}
+        self._heading_sections: dict[str, Section | None] = {}
+        self._compile(md_text)
+        self.all_fields = {f.key: f for f in self.fields}
+        self.title_re = self._title_re()
+        hints = sorted({f.hint.strip() for f in self.fields if f.hint})
+        self.hint_ends = tuple({h[-1] for h in hints})  # a value can only end in a hint if it ends so
+        self.hint_re = (
+            re.compile(r"\s*(?:" + "|".join(_hint_pattern(h) for h in hints) + r")\s*$") if hints else None
+        )
+
+    # Compiling
+
+    def _path(self, name: str, leaves: dict[str, list[tuple[str, ...]]]) -> tuple[str, ...] | None:
+        alias = self.spec.aliases.get(name)
+        if alias is not None:
+            return tuple(alias.split("."))
+        paths = leaves.get(name) or leaves.get(name.lower().replace(" ", "_"))
+        if paths is None:
+            return None
+        if len(paths) > 1:
+            raise ValueError(f"{self.spec.md_template}: ambiguous field {name!r}: {paths}")
+        return paths[0]
+
+    def _field(self, line: str, leaves: dict[str, list[tuple[str, ...]]], types: Any) -> Field | None:
+        split = _split_field_line(line.rstrip())
+        if split is None:
+            return None
+        key, prefix, value = split
+        path = self._path(key, leaves)
+        if path is None:
+            return None
+        core, hint = value, ""
+        if value.endswith(")") and " (" in value:
+            head = value[: value.rfind(" (")]
+            if head in {"...", "…"} or (len(head) >= 2 and head[0] == head[-1] == "`"):
+                core, hint = head, value[len(head) :]
+        quote = len(core) >= 2 and core[0] == core[-1] == "`"
+        inner = core[1:-1] if quote else core
+        tvalue = _get(types, path)
+        if isinstance(tvalue, list):
+            kind = "list" if quote else "joined"
+        elif isinstance(tvalue, int) and not isinstance(tvalue, bool):
+            kind = "int"
+        else:
+            kind = "str"
+        default = inner
+        for marker in ("...", "…"):
+            if marker in inner:
+                default = marker
+                break
+        return Field(key, path, kind, prefix, hint, "  ", quote, default, inner)
+
+    def _compile(self, md_text: str) -> None:
+        leaves = _leaf_paths(self.template)
+        lines = md_text.splitlines()
+        section = Section()  # before the first heading
+        block: list[str] | None = None  # lines of the repeated entry section
+        for i, line in enumerate(lines):
+            if i == 0 and line.startswith("# ") and _TOKEN_RE.search(line):
+                self._compile_title(line, leaves)
+                self.ops.append((_TITLE, None))
+                continue
+            if line.startswith("## "):
+                if block is not None:
+                    raise ValueError(f"{self.spec.md_template}: a section after the repeated one is not supported")
+                if _TOKEN_RE.search(line):
+                    block = [line]
+                    continue
+                section = self.sections.setdefault(heading_label(line.strip()), Section())
+                path = self._path(heading_label(line.strip()), leaves)
+                self.ops.append((_LIT, line))
+                if path is not None and isinstance(_get(self.template, path), (list, str)):
+                    section.slot = self._slot(lines, i, path)
+                    if not section.slot.placeholder:
+                        self.ops.append((_SLOT, section.slot))
+                continue
+            if block is not None:
+                block.append(line)
+                continue
+            f = self._field(line, leaves, self.template)
+            if f is not None:
+                self.fields.append(f)
+                section.fields[f.key] = f
+                self.ops.append((_FIELD, f))
+            elif section.slot is not None and _item_line(line) is not None:
+                # The slot's placeholder lines: the slot renders in their place.
+                if line == section.slot.placeholder[0]:
+                    self.ops.append((_SLOT, section.slot))
+            else:
+                self.ops.append((_LIT, line))
+        if block is not None:
+            self._compile_entries(block)
+        self.slots = {sec.slot.path: sec.slot for sec in self.sections.values() if sec.slot is not None}
+
+    def _slot(self, lines: list[str], at: int, path: tuple[str, ...]) -> Slot:
+        placeholder: list[str] = []
+        numbered = False
+        suffix = ""
+        for line in lines[at + 1 :]:
+            if line.startswith("## "):
+                break
+            item = _item_line(line)
+            if item is not None:
+                if not placeholder:
+                    numbered = item[0]
+                    suffix = line[len(line.rstrip()) :]
+                placeholder.append(line)
+        examples = frozenset(item[1] for item in map(_item_line, placeholder) if item is not None)
+        examples |= frozenset(self.spec.examples)
+        return Slot(path, isinstance(_get(self.template, path), str), numbered, suffix, tuple(placeholder), examples)
+
+    def _compile_title(self, line: str, leaves: dict[str, list[tuple[str, ...]]]) -> None:
+        # A token that names no json field stays literal text.
+        text = ""
+        pos = 0
+        for m in _TOKEN_RE.finditer(line):
+            token = m.group(0)
+            path = self._path(token, leaves) or self._path(token[1:-1], leaves)
+            text += line[pos : m.start()]
+            pos = m.end()
+            if path is None:
+                text += token
+                continue
+            self.title_parts += [text, (token, path)]
+            self.title_tokens.append((token, path))
+            text = ""
+        self.title_parts.append(text + line[pos:])
+        if self.title_tokens:
+            self.title_path = self.title_tokens[0][1]
+
+    def _compile_entries(self, block: list[str]) -> None:
+        heading = block[0].rstrip()
+        parent = next(
+            (k for k, v in self.template.items() if isinstance(v, list) and v and isinstance(v[0], dict)),
+            None,
+        )
+        if parent is None:
+            raise ValueError(f"{self.spec.md_template}: no json list of objects for {heading!r}")
+        item = self.template[parent][0]
+        item_leaves = _leaf_paths(item)
+        tokens: list[tuple[str, tuple[str, ...]]] = []
+        parts: list[str | tuple[str, tuple[str, ...]]] = []
+        pattern = ""
+        pos = 0
+        for m in _TOKEN_RE.finditer(heading):
+            path = self._path(m.group(0), item_leaves)
+            if path is None:
+                raise ValueError(f"{self.spec.md_template}: unknown heading token {m.group(0)!r}")
+            tokens.append((m.group(0), path))
+            parts += [heading[pos : m.start()], (m.group(0), path)]
+            pattern += re.escape(heading[pos : m.start()]) + "(.+?)"
+            pos = m.end()
+        parts.append(heading[pos:])
+        pattern += re.escape(heading[pos:])
+        fields = [f for f in (self._field(line, item_leaves, item) for line in block[1:]) if f is not None]
+        self.entries = EntryBlock(
+            (parent,),
+            heading,
+            tuple(tokens),
+            tuple(parts),
+            re.compile("^" + pattern + "$"),
+            {f.key: f for f in fields},
+            _empty(item),
+        )
+        self.ops.append((_ENTRIES, None))
+
+    # Parsing
+
+    def parse(self, text: str, doc_id: str = "") -> dict[str, Any]:
+        """Parses document text into its json dict (see `parse_lines`)."""
+        return self.parse_lines(text.splitlines(), doc_id)[0]
+
+    def parse_lines(self, lines: list[str], doc_id: str = "") -> tuple[dict[str, Any], dict[str, int]]:
+        """Parses document lines into `(doc, headings)`.
+
+        Args:
+            lines: Document text split by `str.splitlines()`.
+            doc_id: Fills `DocSpec.id_path` (the note's file stem for papers).
+
+        Returns:
+            `doc` follows the json template (only the fields found if the spec
+            is `partial`); `headings` maps each stripped `## ...` line to its
+            first line index.
+        """
+        spec = self.spec
+        doc: dict[str, Any] = {} if spec.partial else _clone(self.empty)
+        if spec.id_path:
+            _set(doc, tuple(spec.id_path.split(".")), doc_id)
+        headings: dict[str, int] = {}
+        items: dict[tuple[str, ...], list[str]] = {}
+        entries: list[dict[str, Any]] | None = None
+        fields = None if spec.scoped else self.all_fields
+        target: dict[str, Any] = doc
+        bucket: list[str] | None = None
+        examples: frozenset[str] = frozenset()
+        title = spec.parse_title and bool(self.title_path)
+        block = self.entries
+        field_line = _FIELD_LINE_RE.match
+        title_line = self.title_re.fullmatch if title else None
+
+        # One pass; lines outside fields and slots (most of a paper note) cost
+        # a prefix test or two.
+        for i, raw in enumerate(lines):
+            if raw.startswith("## ") and raw[3:].strip():
+                line = raw.strip()
+                headings.setdefault(line, i)
+                section = self._section_of(line)
+                bucket = None
+                if section is not None:
+                    target = doc
+                    if spec.scoped:
+                        fields = section.fields or None
+                    if section.slot is not None:
+                        bucket = items.setdefault(section.slot.path, [])
+                        examples = section.slot.examples
+                elif block is not None and (m := block.heading_re.match(line)) is not None:
+                    target = _clone(block.empty)
+                    for (token, path), value in zip(block.tokens, m.groups()):
+                        value = value.strip()
+                        if value == token:  # the template's own heading
+                            continue
+                        conv = spec.converters.get(".".join(path))
+                        _set(target, path, conv[1](value) if conv else value)
+                    if entries is None:
+                        entries = []
+                    entries.append(target)
+                    fields = block.fields
+                elif spec.scoped:
+                    fields = None
+                continue
+            if bucket is not None:
+                item = _item_line(raw)
+                if item is not None and item[1] not in examples and not self.is_placeholder(item[1]):
+                    bucket.append(item[1])
+                continue
+            if fields is None and not title:
+                continue
+            s = raw.strip()
+            # `match_field`, inlined.
+            if fields is not None and (m := field_line(s)) is not None:
+                a, b, c, d, value = m.groups()
+                f = fields.get((a or b or c or d or "").strip())
+                if f is not None:
+                    self._apply(target, f, value.strip())
+            elif title and (m := title_line(s)) is not None:
+                for (token, path), value in zip(self.title_tokens, m.groups()):
+                    value = value.strip()
+                    if not (spec.template_placeholders and self._unfilled(value, token)):
+                        _set(doc, path, value)
+
+        for path, values in items.items():
+            if values:
+                _set(doc, path, "\n".join(values) if self.slots[path].text else values)
+        if entries is not None:
+            _set(doc, block.path, entries)
+        return doc, headings
+
+    def _section_of(self, line: str) -> Section | None:
+        # Notes repeat the same few headings; remember their labels' sections.
+        try:
+            return self._heading_sections[line]
+        except KeyError:
+            section = self.sections.get(heading_label(line))
+            if len(self._heading_sections) < 4096:
+                self._heading_sections[line] = section
+            return section
+
+    def _title_re(self) -> re.Pattern[str]:
+        # `# Rethink: <id> - <title>` -> `#\s+Rethink:(\s(?:(?! - ).)+) - (.*?)\.?`:
+        # the first value starts after whitespace, no value may contain the
+        # text after it (the suffix is stripped, like the line), and a line
+        # that ends in a token may end in `.` (as older renders did).
+        parts = self.title_parts
+        if not self.title_tokens:
+            return re.compile(r"(?!)")
+        pattern = r"#\s+" + re.escape(parts[0][1:].strip())
+        for k in range(1, len(parts), 2):
+            follow = parts[k + 1] if k + 2 < len(parts) else parts[k + 1].strip()
+            lead = r"\s" if k == 1 else ""
+            if follow:
+                pattern += rf"({lead}(?:(?!{re.escape(follow)}).)+){re.escape(follow)}"
+            else:
+                pattern += rf"({lead}.*?)\.?"
+        return re.compile(pattern)
+
+    def match_field(self, s: str, fields: dict[str, Field] | None = None) -> tuple[Field, str] | None:
+        """`(field, raw value)` of a stripped field line, or None.
+
+        Checkbox lines split at the first `：`, else the first `:`.
+        """
+        m = _FIELD_LINE_RE.match(s)
+        if m is None:
+            return None
+        a, b, c, d, value = m.groups()
+        f = (self.all_fields if fields is None else fields).get((a or b or c or d or "").strip())
+        return None if f is None else (f, value.strip())
+
+    def _unfilled(self, v: str, template_value: str) -> bool:
+        return self.is_placeholder(v) or (
+            self.spec.template_placeholders and v == template_value and _FORM_RE.search(v) is not None
+        )
+
+    def _apply(self, doc: dict[str, Any], f: Field, value: str) -> None:
+        if f.kind == "list":
+            out: Any = parse_json_list(value)
+            if out is None:
+                v = strip_backticks(value).strip()
+                if v and self._unfilled(v, f.template_value):
+                    return
+                # Allow a comma-separated list as fallback.
+                out = [x for x in (x.strip() for x in v.split(",")) if x]
+        else:
+            if self.hint_re is not None and value.endswith(self.hint_ends):
+                value = self.hint_re.sub("", value)
+            v = value.strip()
+            if len(v) >= 2 and v[0] == "`" and v[-1] == "`":
+                v = v[1:-1].strip()
+            if self._unfilled(v, f.template_value):
+                return
+            if f.kind == "str":
+                conv = self.spec.converters.get(f.dotted) if self.spec.converters else None
+                out = conv[1](v) if conv else v
+            elif f.kind == "joined":
+                out = [x for x in (x.strip() for x in v.split(";")) if x]
+            else:
+                try:
+                    out = int(v)
+                except ValueError:
+                    return
+        if len(f.path) == 1:
+            doc[f.path[0]] = out
+        else:
+            _set(doc, f.path, out)
+
+    # Rendering
+
+    def render(self, doc: dict[str, Any]) -> str:
+        """Renders a json dict into document text, line by line after the template.
+
+        Raises:
+            ValueError: If the spec requires the title field and it is empty.
+        """
+        if self.spec.required and not str(_get(doc, self.title_path) or "").strip():
+            raise ValueError(self.spec.required)
+        lines: list[str] = []
+        for op, arg in self.ops:
+            if op == _LIT:
+                lines.append(arg)
+            elif op == _TITLE:
+                lines.append(self.title_line(doc))
+            elif op == _FIELD:
+                lines.append(self._field_line(arg, _get(doc, arg.path)))
+            elif op == _SLOT:
+                lines.extend(self._slot_lines(arg, _get(doc, arg.path)))
+            else:
+                lines.extend(self._entry_lines(doc))
+        # Drops the trailing empty lines (no line ends in "\n": values are stripped).
+        return "\n".join(lines).rstrip("\n") + "\n"
+
+    def title_line(self, doc: dict[str, Any]) -> str:
+        """The document's title line (a token whose field is empty stays as is)."""
+        return self._fill(self.title_parts, doc)
+
+    def _fill(self, parts: Sequence[str | tuple[str, tuple[str, ...]]], doc: Any) -> str:
+        # Literal text and `(token, path)` parts; an empty field keeps its token.
+        out: list[str] = []
+        for part in parts:
+            if isinstance(part, str):
+                out.append(part)
+                continue
+            token, path = part
+            value = str(_get(doc, path) or "").strip()
+            conv = self.spec.converters.get(".".join(path)) if value else None
+            out.append((conv[0](value) if conv else value) or token)
+        return "".join(out)
+
+    def _field_line(self, f: Field, value: Any) -> str:
+        if f.kind == "list":
+            text = _dump_list(value) if value else ""
+        elif f.kind == "int":
+            text = str(int(value or 0))
+        elif f.kind == "joined":
+            text = _joined(value)
+        else:
+            text = str(value or "").strip()
+            conv = self.spec.converters.get(f.dotted) if text else None
+            if conv:
+                text = conv[0](text)
+        q = "`" if f.quote else ""
+        if not text:
+            return f"{f.prefix}{q}{f.default}{q}{f.hint}{f.trailing}"
+        return f"{f.prefix}{q}{text}{q}{f.trailing}"
+
+    def _slot_lines(self, slot: Slot, value: Any) -> Sequence[str]:
+        if slot.text and value:
+            texts = [t for ln in str(value).splitlines() if (t := ln.strip())]
+        elif isinstance(value, list):
+            texts = [t for x in value if (t := str(x).strip()) not in slot.examples and not self.is_placeholder(t)]
+        else:
+            texts = []
+        if not texts:
+            return slot.placeholder
+        if slot.numbered:
+            return [f"{n}. {t}{slot.suffix}" for n, t in enumerate(texts, 1)]
+        return [f"- {t}{slot.suffix}" for t in texts]
+
+    def _entry_lines(self, doc: dict[str, Any]) -> list[str]:
+        block = self.entries
+        entries = _get(doc, block.path)
+        out: list[str] = []
+        for entry in entries if isinstance(entries, list) else []:
+            if not isinstance(entry, dict):
+                continue
+            if out:
+                out.append("")
+            out.append(self._fill(block.parts, entry))
+            out.extend(self._field_line(f, _get(entry, f.path)) for f in block.fields.values())
+        return out
+
+
+# `json.dumps(..., ensure_ascii=False)` builds a new encoder on every call.
+_encode = json.JSONEncoder(ensure_ascii=False).encode
+
+
+def _dump_list(value: Any) -> str:
+    return _encode(value) if isinstance(value, list) and value else "[]"
+
+
+def _joined(value: Any) -> str:
+    # A list shown as `a; b`: stripped, empty items dropped.
+    if not isinstance(value, list):
+        return ""
+    return "; ".join(t for x in value if (t := str(x).strip()))
+
+
+def _hint_pattern(hint: str) -> str:
+    # `(例如: a，b)` marks example text: any example is a hint, either colon.
+    inner = hint[1:-1]
+    if inner.startswith("例如"):
+        return r"\(例如[:：\s][^()]*\)"
+    return re.escape(hint)
+
+
+_CODECS: dict[str, Codec] = {}
+
+
+def get_codec(kind: str, templates_dir: Path = TEMPLATES_DIR) -> Codec:
+    """The compiled codec of `kind` (`task`, `paper`, `session`, `rethink`), built once per process."""
+    key = f"{kind}:{templates_dir}"
+    codec = _CODECS.get(key)
+    if codec is None:
+        spec = SPECS[kind]
+        md_text = (templates_dir / spec.md_template).read_text(encoding="utf-8")
+        json_text = (templates_dir / spec.json_template).read_text(encoding="utf-8")
+        codec = _CODECS[key] = Codec(kind, spec, md_text, json_text)
+    return codec
+
+
+def kind_of(path: Path) -> str:
+    """Document kind of a workspace markdown / json file, by its name."""
+    name = path.name
+    if name in {"task.md", "task.json"}:
+        return "task"
+    if re.match(r"^\d{6}-session\.(md|json)$", name):
+        return "session"
+    if re.match(r"^\d{6}-rethink-\d{2}\.(md|json)$", name):
+        return "rethink"
+    return "paper"
+
+
+def main() -> int:
+    p = argparse.ArgumentParser()
+    sub = p.add_subparsers(dest="command", required=True)
+    sp = sub.add_parser("parse", help="Print the json of a markdown document.")
+    sp.add_argument("path", type=Path)
+    sp.add_argument("--kind", choices=sorted(SPECS), default=None, help="Document kind (default: from the file name).")
+    sr = sub.add_parser("render", help="Print the markdown of a json document.")
+    sr.add_argument("kind", choices=sorted(SPECS))
+    sr.add_argument("path", type=Path)
+    args = p.parse_args()
+
+    if args.command == "parse":
+        codec = get_codec(args.kind or kind_of(args.path))
+        doc = codec.parse(args.path.read_text(encoding="utf-8"), args.path.stem)
+        print(json.dumps(doc, indent=2, ensure_ascii=False))
+        return 0
+    doc = json.loads(args.path.read_text(encoding="utf-8"))
+    sys.stdout.write(get_codec(args.kind).render(doc))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
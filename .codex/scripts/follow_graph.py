@@ -0,0 +1,313 @@
+#!/usr/bin/env python3
+from __future__ import annotations
+
+"""Index of the `followed` lineage graph in research.json.
+
+A paper's `followed` list holds the papers read because of it, so the registry
+is a forest of lineages keyed by paper_id. `FollowGraph.build` makes one pass
+over the `(entry, location)` pairs in document order (with an explicit
+ancestor stack, so deep chains cannot hit the recursion limit) and keeps:
+- forward (`children`) and reverse (`parents`) adjacency between paper_ids;
+- per paper: its first location, the parent there, its lineage depth and the
+  top-level paper the lineage starts from (`root_of`);
+- `duplicates`: paper_ids that appear in more than one place;
+- `cycles`: groups of paper_ids that follow each other in a loop (e.g. A
+  follows B in one place and B follows A in another), found with an
+  iterative Tarjan pass.
+
+`ancestors()` and `descendants()` walk the adjacency with a visited set, so
+they cost O(result) and stop on cycles; `lineage()` and `depth()` follow the
+parent of each paper's first occurrence, which always comes earlier in the
+document.
+
+The graph is cached in `data/cache/follow_graph.json`, keyed by the
+fingerprint (size, mtime_ns, inode) of research.json, or of the store manifest
+when the registry is sharded (the manifest holds the topology).
+`audit_stage0.py` takes its duplicate paper_id and cycle checks from it.
+
+Usage:
+  python .codex/scripts/follow_graph.py check
+  python .codex/scripts/follow_graph.py ancestors 260101-01
+  python .codex/scripts/follow_graph.py descendants 260101-01
+  python .codex/scripts/follow_graph.py lineage 260101-01
+"""
+
+import argparse
+import json
+import os
+from collections.abc import Iterable
+from pathlib import Path
+from typing import Any
+
+import workspace_index as wsi
+
+
+ROOT = wsi.ROOT
+
+CACHE_PATH = ROOT / "data" / "cache" / "follow_graph.json"
+GRAPH_VERSION = 1
+
+
+class FollowGraph:
+    """paper_id-level view of the nested `followed` lists.
+
+    Papers without a paper_id are not nodes; their `followed` items hang off
+    the nearest ancestor that has one. Query methods raise `KeyError` for an
+    unknown paper_id.
+    """
+
+    def __init__(self) -> None:
+        self.ids: list[str] = []  # document order of first occurrence
+        self.children: dict[str, list[str]] = {}
+        self.parents: dict[str, list[str]] = {}
+        self.location: dict[str, str] = {}
+        self.first_parent: dict[str, str | None] = {}
+        self.depth_of: dict[str, int] = {}
+        self.root_of: dict[str, str] = {}
+        self.duplicates: dict[str, list[str]] = {}  # paper_id -> every location
+        self.cycles: list[list[str]] = []
+
+    @classmethod
+    def build(cls, entries_with_loc: Iterable[tuple[dict[str, Any], str]]) -> FollowGraph:
+        """Builds the graph from pre-order pairs such as `iter_paper_entries()`."""
+        g = cls()
+        # (location, paper_id) of the current entry's ancestors.
+        path: list[tuple[str, str | None]] = []
+        edges: set[tuple[str, str]] = set()
+        for e, loc in entries_with_loc:
+            cut = loc.rfind(".followed[")
+            parent_loc = loc[:cut] if cut >= 0 else None
+            while path and path[-1][0] != parent_loc:
+                path.pop()
+            parent = path[-1][1] if path else None
+            pid = str(e.get("paper_id", "")).strip()
+            if not pid:
+                path.append((loc, parent))
+                continue
+            path.append((loc, pid))
+
+            if pid in g.location:
+                g.duplicates.setdefault(pid, [g.location[pid]]).append(loc)
+            else:
+                g.ids.append(pid)
+                g.location[pid] = loc
+                g._place(pid, parent)
+            if parent is not None and (parent, pid) not in edges:
+                edges.add((parent, pid))
+                g.children.setdefault(parent, []).append(pid)
+                g.parents.setdefault(pid, []).append(parent)
+        g.cycles = g._find_cycles()
+        return g
+
+    def _place(self, pid: str, parent: str | None) -> None:
+        # The parent's first occurrence precedes this one, so it is placed.
+        self.first_parent[pid] = parent
+        self.depth_of[pid] = self.depth_of[parent] + 1 if parent is not None else 0
+        self.root_of[pid] = self.root_of[parent] if parent is not None else pid
+
+    def _find_cycles(self) -> list[list[str]]:
+        # Strongly connected components with more than one paper (or a paper
+        # that follows itself), without recursion.
+        order = {pid: i for i, pid in enumerate(self.ids)}
+        index: dict[str, int] = {}
+        low: dict[str, int] = {}
+        stack: list[str] = []
+        on_stack: set[str] = set()
+        out: list[list[str]] = []
+        for start in self.ids:
+            if start in index:
+                continue
+            index[start] = low[start] = len(index)
+            stack.append(start)
+            on_stack.add(start)
+            work = [(start, iter(self.children.get(start, ())))]
+            while work:
+                node, it = work[-1]
+                for child in it:
+                    if child not in index:
+                        index[child] = low[child] = len(index)
+                        stack.append(child)
+                        on_stack.add(child)
+                        work.append((child, iter(self.children.get(child, ()))))
+                        break
+                    if child in on_stack:
+                        low[node] = min(low[node], index[child])
+                else:
+                    work.pop()
+                    if work:
+                        up = work[-1][0]
+                        low[up] = min(low[up], low[node])
+                    if low[node] == index[node]:
+                        comp: list[str] = []
+                        while True:
+                            x = stack.pop()
+                            on_stack.discard(x)
+                            comp.append(x)
+                            if x == node:
+                                break
+                        if len(comp) > 1 or node in self.children.get(node, ()):
+                            out.append(sorted(comp, key=order.__getitem__))
+        return sorted(out, key=lambda comp: order[comp[0]])
+
+    def __contains__(self, pid: str) -> bool:
+        return pid in self.location
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def _walk(self, pid: str, adjacency: dict[str, list[str]]) -> list[str]:
+        if pid not in self.location:
+            raise KeyError(pid)
+        seen = {pid}
+        out: list[str] = []
+        frontier = [pid]
+        while frontier:
+            nxt: list[str] = []
+            for node in frontier:
+                for other in adjacency.get(node, ()):
+                    if other not in seen:
+                        seen.add(other)
+                        out.append(other)
+                        nxt.append(other)
+            frontier = nxt
+        return out
+
+    def ancestors(self, pid: str) -> list[str]:
+        """Every paper whose `followed` lists lead to `pid`, nearest first."""
+        return self._walk(pid, self.parents)
+
+    def descendants(self, pid: str) -> list[str]:
+        """Every paper reached from `pid` through `followed`, nearest first."""
+        return self._walk(pid, self.children)
+
+    def lineage(self, pid: str) -> list[str]:
+        """Path from the top-level paper down to `pid` (first occurrences)."""
+        out = [pid]
+        parent = self.first_parent[pid]
+        while parent is not None:
+            out.append(parent)
+            parent = self.first_parent[parent]
+        out.reverse()
+        return out
+
+    def depth(self, pid: str) -> int:
+        """0 for a top-level paper, 1 for a paper it follows, and so on."""
+        return self.depth_of[pid]
+
+    def to_json(self) -> dict[str, Any]:
+        pos = {pid: i for i, pid in enumerate(self.ids)}
+        edges: list[int] = []
+        for pid in self.ids:
+            for child in self.children.get(pid, ()):
+                edges += (pos[pid], pos[child])
+        return {
+            "ids": self.ids,
+            "locations": [self.location[pid] for pid in self.ids],
+            "first_parent": [-1 if (p := self.first_parent[pid]) is None else pos[p] for pid in self.ids],
+            "edges": edges,
+            "duplicates": self.duplicates,
+            "cycles": self.cycles,
+        }
+
+    @classmethod
+    def from_json(cls, data: dict[str, Any]) -> FollowGraph:
+        g = cls()
+        ids = g.ids = data["ids"]
+        g.location = dict(zip(ids, data["locations"]))
+        for pid, parent in zip(ids, data["first_parent"]):
+            g._place(pid, ids[parent] if parent >= 0 else None)
+        edges = data["edges"]
+        for i in range(0, len(edges), 2):
+            parent, child = ids[edges[i]], ids[edges[i + 1]]
+            g.children.setdefault(parent, []).append(child)
+            g.parents.setdefault(child, []).append(parent)
+        g.duplicates = data["duplicates"]
+        g.cycles = data["cycles"]
+        return g
+
+
+def _fingerprint(path: Path) -> str | None:
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return f"{st.st_size}:{st.st_mtime_ns}:{st.st_ino}"
+
+
+def load_graph(index: wsi.WorkspaceIndex, cache_path: Path | None = CACHE_PATH) -> FollowGraph:
+    """Returns the follow graph of `index`'s registry, from the cache if current.
+
+    Args:
+        index: Workspace index (its `iter_entries()` is read on a cache miss).
+        cache_path: Cache file, or None to always build.
+    """
+    source = index.store.manifest_path if index.store is not None else index.research_json
+    # Taken before the build: if the source changes meanwhile, the stored key
+    # is already stale.
+    key = {"version": GRAPH_VERSION, "source": source.resolve().as_posix(), "fingerprint": _fingerprint(source)}
+    if cache_path is not None and key["fingerprint"] is not None:
+        try:
+            data = json.loads(cache_path.read_text(encoding="utf-8"))
+            if data.get("key") == key:
+                return FollowGraph.from_json(data["graph"])
+        except (OSError, ValueError, KeyError, TypeError, AttributeError):
+            pass  # a broken cache only costs a rebuild
+
+    graph = FollowGraph.build(index.iter_entries())
+    if cache_path is not None and key["fingerprint"] is not None:
+        cache_path.parent.mkdir(parents=True, exist_ok=True)
+        wsi.write_text_atomic(cache_path, json.dumps({"key": key, "graph": graph.to_json()}, ensure_ascii=False))
+    return graph
+
+
+def main() -> int:
+    p = argparse.ArgumentParser()
+    p.add_argument(
+        "command",
+        choices=["check", "ancestors", "descendants", "lineage"],
+        help="check: duplicates and cycles; ancestors/descendants/lineage: query one paper.",
+    )
+    p.add_argument("paper_id", nargs="?", default="", help="Paper to query (not used by `check`).")
+    p.add_argument(
+        "--research-json",
+        type=Path,
+        default=wsi.RESEARCH_JSON,
+        help="Path to 0-调研/research.json.",
+    )
+    p.add_argument("--no-cache", action="store_true", help="Build the graph without data/cache/follow_graph.json.")
+    args = p.parse_args()
+    if args.command != "check" and not args.paper_id:
+        p.error(f"{args.command} needs a paper_id")
+
+    index = wsi.get_index(research_json=args.research_json, stream=True)
+    graph = load_graph(index, None if args.no_cache else CACHE_PATH)
+
+    if args.command == "check":
+        for pid, locs in sorted(graph.duplicates.items()):
+            print(f"- duplicate paper_id {pid}: {', '.join(locs)}")
+        for comp in graph.cycles:
+            print(f"- follow cycle between: {', '.join(comp)}")
+        n_edges = sum(len(v) for v in graph.children.values())
+        print(
+            f"done: {len(graph)} paper(s), {n_edges} link(s), {len(graph.duplicates)} duplicate(s), "
+            f"{len(graph.cycles)} cycle(s)"
+        )
+        return 1 if graph.duplicates or graph.cycles else 0
+
+    pid = args.paper_id.strip()
+    if pid not in graph:
+        print(f"error: unknown paper_id: {pid}")
+        return 2
+    if args.command == "lineage":
+        print(" -> ".join(graph.lineage(pid)))
+        print(f"done: depth={graph.depth(pid)}, root={graph.root_of[pid]}, at {graph.location[pid]}")
+        return 0
+    found = graph.ancestors(pid) if args.command == "ancestors" else graph.descendants(pid)
+    for other in found:
+        print(other)
+    print(f"done: {len(found)} {args.command} of {pid}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,91 @@
+from __future__ import annotations
+
+"""Per-phase wall time and file I/O counters for `.codex/scripts` tools.
+
+A `PhaseTimer` wraps named phases of a run and records, for each one, wall
+time plus the files/bytes read through a `DocumentLoader` (the process-wide
+`note_document.LOADER` by default; worker processes merge their counters into
+it, and PDF hashing reports its reads there as well).
+
+Usage (inside a script):
+  timer = PhaseTimer()
+  with timer.phase("references"):
+      ...
+  for line in timer.report_lines():
+      print(line)
+"""
+
+import time
+from collections.abc import Iterator
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass
+
+import note_document as notes
+
+
+@dataclass
+class PhaseStats:
+    """Cost of one phase (`files_read` counts distinct files)."""
+
+    name: str
+    wall_s: float = 0.0
+    files_read: int = 0
+    reads: int = 0
+    bytes_read: int = 0
+    parses: int = 0
+
+    def to_json(self) -> dict[str, str | int | float]:
+        out = asdict(self)
+        out["wall_s"] = round(self.wall_s, 6)
+        return out
+
+    def summary(self) -> str:
+        return (
+            f"wall_s={self.wall_s:.3f}, files_read={self.files_read}, reads={self.reads}, "
+            f"bytes_read={self.bytes_read}, parses={self.parses}"
+        )
+
+
+class PhaseTimer:
+    """Records a `PhaseStats` per `phase()` block, in execution order."""
+
+    def __init__(self, loader: notes.DocumentLoader | None = None) -> None:
+        self.loader = loader if loader is not None else notes.LOADER
+        self.phases: list[PhaseStats] = []
+
+    @contextmanager
+    def phase(self, name: str) -> Iterator[PhaseStats]:
+        stats = self.loader.stats
+        reads_before = stats.reads.copy()
+        bytes_before = stats.bytes_read
+        parses_before = stats.parses
+        rec = PhaseStats(name=name)
+        t0 = time.perf_counter()
+        try:
+            yield rec
+        finally:
+            rec.wall_s = time.perf_counter() - t0
+            delta = stats.reads - reads_before
+            rec.files_read = len(delta)
+            rec.reads = sum(delta.values())
+            rec.bytes_read = stats.bytes_read - bytes_before
+            rec.parses = stats.parses - parses_before
+            self.phases.append(rec)
+
+    def total(self) -> PhaseStats:
+        """Sum over all phases (`files_read` may count a file once per phase)."""
+        out = PhaseStats(name="total")
+        for rec in self.phases:
+            out.wall_s += rec.wall_s
+            out.files_read += rec.files_read
+            out.reads += rec.reads
+            out.bytes_read += rec.bytes_read
+            out.parses += rec.parses
+        return out
+
+    def report_lines(self) -> list[str]:
+        """Text report, one `- <phase>: ...` line per phase plus the total."""
+        lines = ["Timings:"]
+        for rec in [*self.phases, self.total()]:
+            lines.append(f"- {rec.name}: {rec.summary()}")
+        return lines
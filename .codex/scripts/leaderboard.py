@@ -0,0 +1,339 @@
+#!/usr/bin/env python3
+from __future__ import annotations
+
+"""Concurrent-safe appends to the leaderboards (`1-验证/leaderboard.csv`,
+`2-实验和写作/results/leaderboard.csv`).
+
+Many runs append to the same file at once, possibly from several machines
+sharing the workspace over NFS. A plain `open(path, "a")` + `csv.writer` can
+interleave rows (buffered writes are split at the buffer size, and O_APPEND is
+not atomic on NFS) or write the header twice when two runs create the file.
+Every append here
+- takes an exclusive `fcntl.lockf` lock on the file (POSIX record locks are
+  forwarded to the server on NFS; a process-local lock serializes threads,
+  which share the process's record locks);
+- checks the header (the first line) against the expected one, writing it if
+  the file is empty, and raises `ValueError` on a mismatch instead of adding
+  rows that no reader can map to columns;
+- starts on a new line if the file does not end with one (the rest of a row
+  from a writer that crashed mid-write stays on its own line);
+- writes all its rows with one `os.write` (looped only on a short write,
+  still under the lock), fsyncs and then unlocks, so the next writer, on any
+  client, sees the complete rows.
+
+`LeaderboardWriter` buffers rows and flushes them under a single lock (at
+`max_rows`, on `flush()` and when the `with` block ends), for runs that log
+many metrics. `bench_leaderboard.py` is the multi-process stress test.
+
+Usage:
+  python .codex/scripts/leaderboard.py append --task-id 260101-task-001 --metric-name rmse --metric-value 0.12
+  python .codex/scripts/leaderboard.py append --file 2-实验和写作/results/leaderboard.csv --task-id 260101-task-001 \\
+      --metric-name rmse --metric-value 0.12 --cost "1 GPU-hour" --notes 260101-case-001
+  python .codex/scripts/leaderboard.py check
+"""
+
+import argparse
+import csv
+import fcntl
+import io
+import os
+import threading
+import time
+from collections.abc import Iterable, Mapping, Sequence
+from datetime import datetime
+from pathlib import Path
+from typing import Any
+
+import workspace_index as wsi
+
+ROOT = wsi.ROOT
+
+HEADER = ("timestamp", "task_id", "metric_name", "metric_value", "cost", "notes")
+
+Row = Mapping[str, Any] | Sequence[Any]
+
+# Polling interval bounds while waiting for the lock with a timeout.
+_POLL_MIN = 0.001
+_POLL_MAX = 0.05
+
+_THREAD_LOCKS: dict[str, threading.Lock] = {}
+_THREAD_LOCKS_GUARD = threading.Lock()
+
+
+def _thread_lock(path: Path) -> threading.Lock:
+    key = os.path.realpath(path)
+    with _THREAD_LOCKS_GUARD:
+        lock = _THREAD_LOCKS.get(key)
+        if lock is None:
+            lock = _THREAD_LOCKS[key] = threading.Lock()
+        return lock
+
+
+def format_rows(rows: Iterable[Row], header: Sequence[str] = HEADER) -> str:
+    """CSV text (`\\n` line ends) for `rows`, in `header` column order.
+
+    A row is a mapping (missing columns are empty) or a sequence with one
+    value per column; `None` is written as an empty value.
+
+    Raises:
+        ValueError: If a mapping has a key that is not in `header`, or a
+            sequence has the wrong number of values.
+    """
+    columns = set(header)
+    buf = io.StringIO()
+    writer = csv.writer(buf, lineterminator="\n")
+    for row in rows:
+        if isinstance(row, Mapping):
+            unknown = [k for k in row if k not in columns]
+            if unknown:
+                raise ValueError(f"unknown leaderboard column(s): {', '.join(map(str, unknown))}")
+            values = [row.get(k) for k in header]
+        else:
+            values = list(row)
+            if len(values) != len(header):
+                raise ValueError(f"leaderboard row has {len(values)} value(s), expected {len(header)}: {values!r}")
+        writer.writerow(["" if v is None else v for v in values])
+    return buf.getvalue()
+
+
+def _acquire(fd: int, path: Path, timeout: float | None) -> None:
+    if timeout is None:
+        fcntl.lockf(fd, fcntl.LOCK_EX)
+        return
+    deadline = time.monotonic() + timeout
+    delay = _POLL_MIN
+    while True:
+        try:
+            fcntl.lockf(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            return
+        except (BlockingIOError, PermissionError):  # EAGAIN / EACCES: held by another process
+            pass
+        left = deadline - time.monotonic()
+        if left <= 0:
+            raise TimeoutError(f"could not lock {path} within {timeout}s")
+        time.sleep(min(delay, left))
+        delay = min(delay * 2, _POLL_MAX)
+
+
+def _read_header(fd: int, size: int) -> str:
+    # The first line, read in small chunks (a leaderboard header is short).
+    chunks: list[bytes] = []
+    offset = 0
+    while offset < size:
+        chunk = os.pread(fd, 4096, offset)
+        if not chunk:
+            break
+        end = chunk.find(b"\n")
+        if end >= 0:
+            chunks.append(chunk[:end])
+            break
+        chunks.append(chunk)
+        offset += len(chunk)
+    return b"".join(chunks).decode("utf-8").rstrip("\r")
+
+
+def append_rows(
+    path: Path,
+    rows: Iterable[Row],
+    header: Sequence[str] = HEADER,
+    *,
+    timeout: float | None = None,
+    fsync: bool = True,
+) -> int:
+    """Appends `rows` to the leaderboard at `path` under an exclusive lock.
+
+    The file (and its directory) is created with `header` if missing or empty.
+    All rows go in with a single write, so concurrent writers never interleave
+    and either all or none of a call's rows follow one another in the file.
+
+    Args:
+        path: The leaderboard CSV.
+        rows: Mappings or sequences (see `format_rows`).
+        header: Expected columns; the file's first line must match exactly.
+        timeout: Seconds to wait for the lock (None: wait indefinitely).
+        fsync: Flush the rows to disk (and to the server on NFS) before
+            releasing the lock.
+
+    Returns:
+        The number of rows appended.
+
+    Raises:
+        ValueError: If a row is invalid, or the file's header differs from
+            `header`.
+        TimeoutError: If the lock was not acquired within `timeout`.
+    """
+    rows = list(rows)
+    if not rows:
+        return 0
+    body = format_rows(rows, header)
+    header_line = format_rows([header], header)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with _thread_lock(path):
+        fd = os.open(path, os.O_RDWR | os.O_APPEND | os.O_CREAT, 0o644)
+        try:
+            _acquire(fd, path, timeout)
+            # Sizes are only read under the lock: on NFS it revalidates the
+            # cached attributes, so this sees the other clients' appends.
+            size = os.fstat(fd).st_size
+            if size == 0:
+                data = header_line + body
+            else:
+                found = _read_header(fd, size)
+                if found != header_line.rstrip("\n"):
+                    raise ValueError(f"leaderboard header mismatch in {path}: {found!r} != {header_line.rstrip()!r}")
+                torn = os.pread(fd, 1, size - 1) != b"\n"
+                data = ("\n" if torn else "") + body
+            view = memoryview(data.encode("utf-8"))
+            while view:
+                view = view[os.write(fd, view):]
+            if fsync:
+                os.fsync(fd)
+        finally:
+            os.close(fd)  # also releases the record lock
+    return len(rows)
+
+
+def append_row(
+    path: Path,
+    row: Row,
+    header: Sequence[str] = HEADER,
+    *,
+    timeout: float | None = None,
+    fsync: bool = True,
+) -> None:
+    """Appends one row; see `append_rows`."""
+    append_rows(path, [row], header, timeout=timeout, fsync=fsync)
+
+
+class LeaderboardWriter:
+    """Buffers rows for one leaderboard and appends them in batches.
+
+    Each flush is one `append_rows` call: one lock, one write. Rows are checked
+    when added, so a bad row raises at the call that produced it, not later
+    at flush time. Use it as a context manager so the remaining rows are
+    flushed when the block ends (also on an exception: the rows logged so far
+    are kept).
+    """
+
+    def __init__(
+        self,
+        path: Path,
+        header: Sequence[str] = HEADER,
+        *,
+        max_rows: int | None = None,
+        timeout: float | None = None,
+        fsync: bool = True,
+    ) -> None:
+        """
+        Args:
+            path: The leaderboard CSV.
+            header: Expected columns (see `append_rows`).
+            max_rows: Flush automatically once this many rows are buffered
+                (None: only on `flush()` / at the end of the `with` block).
+            timeout: Lock timeout per flush, in seconds (None: wait).
+            fsync: Passed to `append_rows`.
+        """
+        self.path = path
+        self.header = tuple(header)
+        self.max_rows = max_rows
+        self.timeout = timeout
+        self.fsync = fsync
+        self.pending: list[Row] = []
+        self.written = 0
+        self._lock = threading.Lock()
+
+    def add(self, row: Row) -> None:
+        format_rows([row], self.header)  # validate now
+        with self._lock:
+            self.pending.append(row)
+            full = self.max_rows is not None and len(self.pending) >= self.max_rows
+        if full:
+            self.flush()
+
+    def add_many(self, rows: Iterable[Row]) -> None:
+        for row in rows:
+            self.add(row)
+
+    def flush(self) -> int:
+        """Appends the buffered rows; returns how many were written."""
+        with self._lock:
+            rows, self.pending = self.pending, []
+            if not rows:
+                return 0
+            try:
+                n = append_rows(self.path, rows, self.header, timeout=self.timeout, fsync=self.fsync)
+            except BaseException:
+                self.pending[:0] = rows  # keep them for a retry
+                raise
+            self.written += n
+            return n
+
+    def __enter__(self) -> LeaderboardWriter:
+        return self
+
+    def __exit__(self, *exc: object) -> None:
+        self.flush()
+
+
+def check_file(path: Path, header: Sequence[str] = HEADER) -> list[str]:
+    """Problems in a leaderboard: header mismatch, rows with the wrong width.
+
+    Returns:
+        One message per problem (empty if the file is well formed or missing).
+    """
+    try:
+        with open(path, encoding="utf-8", newline="") as f:
+            records = list(csv.reader(f))
+    except FileNotFoundError:
+        return []
+    if not records:
+        return []
+    problems: list[str] = []
+    rel = wsi.relpath_str(path)
+    if records[0] != list(header):
+        problems.append(f"{rel}: header mismatch: {','.join(records[0])}")
+    for i, record in enumerate(records[1:], start=2):
+        if record and len(record) != len(header):
+            problems.append(f"{rel}: record {i} has {len(record)} field(s), expected {len(header)}")
+    return problems
+
+
+def main() -> int:
+    p = argparse.ArgumentParser()
+    sub = p.add_subparsers(dest="command", required=True)
+    a = sub.add_parser("append", help="Append one row.")
+    a.add_argument("--file", type=Path, default=wsi.LEADERBOARDS[0], help="Leaderboard CSV. Default: 1-验证/leaderboard.csv.")
+    a.add_argument("--timestamp", default="", help="Row timestamp. Default: now (local time, seconds).")
+    a.add_argument("--task-id", required=True, help="task_id of the run.")
+    a.add_argument("--metric-name", required=True, help="Metric name, e.g. rmse.")
+    a.add_argument("--metric-value", required=True, help="Metric value.")
+    a.add_argument("--cost", default="", help="Cost, e.g. `1 GPU-hour`. Default: empty.")
+    a.add_argument("--notes", default="", help="Free text (e.g. the case_id). Default: empty.")
+    a.add_argument("--timeout", type=float, default=None, help="Seconds to wait for the lock. Default: wait.")
+    c = sub.add_parser("check", help="Check the header and row widths.")
+    c.add_argument("files", nargs="*", type=Path, help="Leaderboard CSVs. Default: both leaderboards.")
+    args = p.parse_args()
+
+    if args.command == "append":
+        row = {
+            "timestamp": args.timestamp or datetime.now().isoformat(timespec="seconds"),
+            "task_id": args.task_id,
+            "metric_name": args.metric_name,
+            "metric_value": args.metric_value,
+            "cost": args.cost,
+            "notes": args.notes,
+        }
+        append_row(args.file, row, timeout=args.timeout)
+        print(f"done: appended 1 row to {wsi.relpath_str(args.file)}")
+        return 0
+
+    problems = [m for path in (args.files or wsi.LEADERBOARDS) for m in check_file(path)]
+    for message in problems:
+        print(f"- {message}")
+    if not problems:
+        print("OK: leaderboards are well formed.")
+    return 1 if problems else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
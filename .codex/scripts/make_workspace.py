@@ -0,0 +1,461 @@
+#!/usr/bin/env python3
+from __future__ import annotations
+
+"""Builds a synthetic workspace for benchmarking the `.codex/scripts` tools.
+
+The workspace is a self-contained copy of this repo's layout: `.codex/scripts`
+and `.codex/templates` are copied in, so every script run from
+`<dest>/.codex/scripts/` resolves `ROOT` to `<dest>` and works on the synthetic
+data with its default paths. It contains:
+- `0-调研/research.json`: `--papers` entries in total; about a quarter of the
+  top-level papers have 1-3 `followed` entries, some nested one level deeper.
+  About 0.5% re-register an earlier paper (same authors, a reworded title and
+  problem) under a new paper_id.
+- `0-调研/notes/<paper_id>.md`: rendered by `paper_json2md`, with translated
+  sections of about `--note-kb` KB. About 1% of notes drift from their entry
+  and 0.5% are missing, so the sync and audit tools have something to report.
+- `0-调研/references/`: one small valid PDF per paper (title block, Info dict
+  for most, `--pdf-kb` of padding), plus unregistered PDFs and byte-identical
+  copies (1% each).
+- `1-验证/tasks/<task_id>/task.json` + `task.md`: one task per 20 papers.
+- `2-实验和写作/runs/<case_id>/case.json`: `--cases-per-task` per task.
+- `session/YYMMDD-session.md` + `.json`: `--sessions` days.
+- both `leaderboard.csv` files: one row per task / per case.
+
+The same arguments and seed always give the same files. A generated workspace
+is marked with `.synthetic-workspace`; `--force` only replaces marked dirs.
+
+Usage:
+  python .codex/scripts/make_workspace.py --dest /tmp/ws
+  python .codex/scripts/make_workspace.py --dest /tmp/ws --papers 20000 --note-kb 64 --force
+"""
+
+import argparse
+import csv
+import io
+import json
+import random
+import shutil
+import sys
+import time
+import zlib
+from datetime import date, timedelta
+from pathlib import Path
+from typing import Any
+
+import doc_codec
+import leaderboard
+import note_document as notes
+import paper_json2md as json2md
+import task_json2md
+import task_md2json
+import workspace_index as wsi
+
+
+ROOT = wsi.ROOT
+
+MARKER = ".synthetic-workspace"
+PAPERS_PER_TASK = 20
+LEADERBOARD_HEADER = leaderboard.HEADER
+
+_EN = (
+    "We propose a neural operator that learns the solution map of parametric PDEs "
+    "and evaluate it on Darcy flow, Burgers and Navier-Stokes benchmarks."
+)
+_ZH = "我们提出一种神经算子 (neural operator)，学习参数化偏微分方程 (PDE) 的解映射，并在多个基准上评估."
+_WORDS = [
+    "neural", "operator", "diffusion", "transformer", "graph", "spectral", "sparse",
+    "attention", "turbulence", "mesh", "surrogate", "physics", "inverse", "kernel",
+    "multiscale", "fourier", "latent", "flow", "solver", "uncertainty",
+]
+_TAGS = ["pde", "operator", "cfd", "diffusion", "graph", "benchmark", "theory", "data"]
+_NOTE_SECTIONS = ("## 1. Abstract", "## 2. Introduction", "## 3. Methodology", "## 4. Experiments")
+
+
+def _paper_id(i: int) -> str:
+    return f"{260000 + i // 100:06d}-{i % 100:02d}"
+
+
+def _task_id(k: int) -> str:
+    return f"PV1-S{k:04d}"
+
+
+def _arxiv_id(i: int) -> str:
+    return f"{15 + i % 10:02d}{1 + i % 12:02d}.{i % 100000:05d}"
+
+
+def _prose(rng: random.Random, nbytes: int) -> str:
+    out: list[str] = []
+    size = 0
+    while size < nbytes:
+        par = " ".join([_EN] * rng.randint(1, 4)) if rng.random() < 0.5 else "".join([_ZH] * rng.randint(1, 4))
+        out.append(par)
+        size += len(par.encode("utf-8")) + 2
+    return "\n\n".join(out)
+
+
+def _make_entry(rng: random.Random, i: int, n_tasks: int) -> dict[str, Any]:
+    pid = _paper_id(i)
+    title = " ".join(rng.sample(_WORDS, 4)).title()
+    return {
+        "paper_id": pid,
+        "title": f"{title} ({i})",
+        "year": rng.randint(2015, 2025),
+        "authors": [f"A{rng.randint(1, 999)}. Author" for _ in range(rng.randint(1, 5))],
+        "tags": rng.sample(_TAGS, rng.randint(1, 3)),
+        "pdf_path": f"0-调研/references/{pid}.pdf",
+        "url": f"https://arxiv.org/abs/{_arxiv_id(i)}",
+        "code_url": f"https://github.com/example/paper-{i}" if rng.random() < 0.4 else "",
+        "problem": f"{' '.join(rng.choices(_WORDS, k=24)).capitalize()}.",
+        "method": _ZH,
+        "key_claims": [f"claim-{k}: {' '.join(rng.sample(_WORDS, 5))} (evidence: Table {k})" for k in range(1, 4)],
+        "limitations": [_ZH[: rng.randint(10, 40)]],
+        "open_questions": [f"does {rng.choice(_WORDS)} transfer?"] if rng.random() < 0.5 else [],
+        "what_we_can_reuse": [f"the {rng.choice(_WORDS)} layer"],
+        "hypotheses": [f"H1: {rng.choice(_WORDS)} helps (variable: {rng.choice(_WORDS)}; metric: L2)"],
+        "used_in_tasks": [_task_id(i // PAPERS_PER_TASK)] if i // PAPERS_PER_TASK < n_tasks else [],
+        "followed": [],
+    }
+
+
+def _make_twin(rng: random.Random, entry: dict[str, Any], original: dict[str, Any]) -> None:
+    # Re-registration of `original` under `entry`'s id: same authors, one word
+    # of the title and of the problem changed.
+    words = original["title"].split()
+    words[rng.randrange(len(words) - 1)] = rng.choice(_WORDS).title()
+    entry["title"] = " ".join(words)
+    entry["authors"] = list(original["authors"])
+    words = original["problem"].split()
+    words[rng.randrange(len(words))] = rng.choice(_WORDS)
+    entry["problem"] = " ".join(words)
+
+
+def _nest(rng: random.Random, flat: list[dict[str, Any]]) -> list[dict[str, Any]]:
+    # Moves some entries under earlier ones: 1-3 children for ~1 in 4 top-level
+    # papers, and sometimes a grandchild.
+    top: list[dict[str, Any]] = []
+    i = 0
+    while i < len(flat):
+        parent = flat[i]
+        top.append(parent)
+        i += 1
+        if rng.random() < 0.25:
+            for _ in range(rng.randint(1, 3)):
+                if i >= len(flat):
+                    break
+                child = flat[i]
+                parent["followed"].append(child)
+                i += 1
+                if rng.random() < 0.2 and i < len(flat):
+                    child["followed"].append(flat[i])
+                    i += 1
+    return top
+
+
+def _note_text(rng: random.Random, entry: dict[str, Any], note_kb: int) -> str:
+    text = json2md.render_paper_note(entry)
+    per_section = note_kb * 1024 // len(_NOTE_SECTIONS)
+    if per_section <= 0:
+        return text
+    for heading in _NOTE_SECTIONS:
+        start = text.find(heading)
+        cut = text.find("\n## ", start)
+        if start < 0 or cut < 0:
+            continue
+        text = text[:cut] + "\n" + _prose(rng, per_section) + "\n" + text[cut:]
+    return text
+
+
+def _sync_entry(entry: dict[str, Any], text: str) -> None:
+    # Makes the entry equal to what the note parses to, so that only the
+    # deliberate drift shows up as md/json differences.
+    parsed, _ = notes.parse_note_lines(entry["paper_id"], notes.decode_text(text.encode("utf-8")).splitlines())
+    for key, value in parsed.items():
+        if key != "followed":
+            entry[key] = value
+
+
+def _pdf_escape(text: str) -> bytes:
+    return text.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)").encode("latin-1", "replace")
+
+
+def _pdf_bytes(rng: random.Random, meta: dict[str, Any], nbytes: int) -> bytes:
+    # A small well-formed PDF: one page with the title block (Flate content
+    # stream), an Info dict for ~70% of files, and `nbytes` of padding.
+    lines = [
+        b"BT /F1 16 Tf 72 720 Td (" + _pdf_escape(meta["title"]) + b") Tj",
+        b"0 -24 Td /F1 11 Tf (" + _pdf_escape(", ".join(meta["authors"])) + b") Tj",
+        b"0 -16 Td (arXiv:" + meta["arxiv_id"].encode("ascii") + b"v1) Tj",
+        b"0 -32 Td [(" + _pdf_escape(_EN[:40]) + b") -250 (" + _pdf_escape(_EN[40:]) + b")] TJ ET",
+    ]
+    content = zlib.compress(b"\n".join(lines))
+    info = b"<< /Producer (make_workspace) /CreationDate (D:%d0101000000Z)" % meta["year"]
+    if rng.random() < 0.7:
+        info += b" /Title (" + _pdf_escape(meta["title"]) + b") /Author (" + _pdf_escape("; ".join(meta["authors"])) + b")"
+    padding = rng.randbytes(nbytes)
+    objects = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        b"<< /Type /Pages /Kids [3 0 R] /Count 1 >>",
+        b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] /Resources << /Font << /F1 5 0 R >> >> /Contents 4 0 R >>",
+        b"<< /Length %d /Filter /FlateDecode >>\nstream\n%s\nendstream" % (len(content), content),
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>",
+        info + b" >>",
+        b"<< /Length %d >>\nstream\n%s\nendstream" % (len(padding), padding),
+    ]
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for n, body in enumerate(objects, start=1):
+        offsets.append(len(out))
+        out += b"%d 0 obj\n%s\nendobj\n" % (n, body)
+    xref = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    out += b"".join(b"%010d 00000 n \n" % off for off in offsets)
+    out += b"trailer\n<< /Size %d /Root 1 0 R /Info 6 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref)
+    return bytes(out)
+
+
+def _write_json(path: Path, data: Any) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps(data, ensure_ascii=False, indent=2) + "\n", encoding="utf-8")
+
+
+def _write_csv(path: Path, rows: list[list[Any]]) -> None:
+    buf = io.StringIO()
+    writer = csv.writer(buf, lineterminator="\n")
+    writer.writerow(LEADERBOARD_HEADER)
+    writer.writerows(rows)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(buf.getvalue(), encoding="utf-8")
+
+
+def _make_task(rng: random.Random, k: int, day: date) -> dict[str, Any]:
+    task = wsi.load_json(wsi.TEMPLATES_DIR / "task.json")
+    task = json.loads(json.dumps(task))  # the loader shares parsed objects
+    pid = _paper_id(k * PAPERS_PER_TASK)
+    task.update(
+        {
+            "task_id": _task_id(k),
+            "created_at": day.isoformat(),
+            "source": {"paper_id": pid, "url": "", "desc": f"reproduce {pid}"},
+            "background": {"why_now": _ZH},
+            "hypothesis": f"H{k}: {' '.join(rng.sample(_WORDS, 6))}",
+            "design": {
+                "variables": rng.choice(_WORDS),
+                "baseline": "FNO",
+                "data_split": "train/val/test = 8/1/1",
+                "metrics": "rmse",
+                "budget": f"{rng.randint(1, 48)} GPU-hours",
+            },
+            "acceptance": {"pass": "rmse < 0.05", "fail_but_useful": "rmse < 0.1"},
+            "changes": [f"src/{rng.choice(_WORDS)}.py"],
+            "inputs": ["data/raw/darcy.h5"],
+            "outputs": [f"2-实验和写作/runs/PE1-S{k:04d}-r1"],
+            "result_summary": "",
+            "decision": rng.choice(["", "go", "stop"]),
+            "next_tasks": [_task_id(k + 1)] if rng.random() < 0.3 else [],
+        }
+    )
+    return task
+
+
+def _sync_task(task: dict[str, Any], md: str) -> None:
+    # Same idea as `_sync_entry`, with task_md2json's merge rules.
+    for key, value in task_md2json.parse_task_text(md).items():
+        if isinstance(value, dict) and isinstance(task.get(key), dict):
+            task[key].update(value)
+        else:
+            task[key] = value
+
+
+def _make_case(rng: random.Random, k: int, j: int, day: date) -> dict[str, Any]:
+    case = wsi.load_json(wsi.TEMPLATES_DIR / "case.json")
+    case = json.loads(json.dumps(case))
+    case.update(
+        {
+            "case_id": f"PE1-S{k:04d}-r{j}",
+            "task_id": _task_id(k),
+            "created_at": f"{day.isoformat()}T{rng.randint(0, 23):02d}:00:00",
+            "command": f"python train.py --seed {j}",
+            "seeds": [j],
+            "metrics": {"rmse": round(rng.uniform(0.01, 0.2), 4)},
+        }
+    )
+    return case
+
+
+def _session_files(rng: random.Random, day: date) -> tuple[str, dict[str, Any]]:
+    d = day.strftime("%y%m%d")
+    entries = []
+    for hour in sorted(rng.sample(range(8, 22), rng.randint(1, 4))):
+        entries.append(
+            {
+                "timestamp": f"{day.isoformat()}T{hour:02d}:00:00",
+                "mode": rng.choice(["planning", "audit", "coding", "optimization", "organize"]),
+                "context": _ZH[:30],
+                "work_done": [f"ran {rng.choice(_WORDS)} sweep"],
+                "decisions": [],
+                "issues": [],
+                "next_steps": [],
+            }
+        )
+    session = {"date": d, "stage": "project", "entries": entries}
+    return doc_codec.get_codec("session").render(session), session
+
+
+def _copy_tooling(dest: Path) -> None:
+    ignore = shutil.ignore_patterns("__pycache__", "*.pyc")
+    for name in ("scripts", "templates"):
+        shutil.copytree(ROOT / ".codex" / name, dest / ".codex" / name, ignore=ignore)
+
+
+def make_workspace(
+    dest: Path,
+    papers: int,
+    note_kb: int = 8,
+    pdf_kb: int = 16,
+    cases_per_task: int = 2,
+    sessions: int = 60,
+    seed: int = 0,
+) -> dict[str, int]:
+    """Writes a synthetic workspace into an empty (or missing) `dest`.
+
+    Args:
+        dest: Target directory; becomes the `ROOT` of its copied scripts.
+        papers: Total number of paper entries, `followed` ones included.
+        note_kb: Approximate size of one note's translated sections.
+        pdf_kb: Size of each fake PDF.
+        cases_per_task: Cases under `2-实验和写作/runs` per task.
+        sessions: Number of session days.
+        seed: Random seed.
+
+    Returns:
+        Counts of what was written.
+    """
+    rng = random.Random(seed)
+    n_tasks = max(1, papers // PAPERS_PER_TASK)
+    start = date(2026, 1, 1)
+
+    dest.mkdir(parents=True, exist_ok=True)
+    (dest / MARKER).write_text(
+        json.dumps({"papers": papers, "note_kb": note_kb, "pdf_kb": pdf_kb, "seed": seed}) + "\n",
+        encoding="utf-8",
+    )
+    _copy_tooling(dest)
+    (dest / "data" / "cache").mkdir(parents=True, exist_ok=True)
+
+    notes_dir = dest / "0-调研" / "notes"
+    refs_dir = dest / "0-调研" / "references"
+    notes_dir.mkdir(parents=True)
+    refs_dir.mkdir(parents=True)
+
+    counts = {"papers": papers, "notes": 0, "pdfs": 0, "tasks": n_tasks, "cases": 0, "sessions": sessions}
+    flat = [_make_entry(rng, i, n_tasks) for i in range(papers)]
+    for i in range(1, papers):
+        if rng.random() < 0.005:
+            _make_twin(rng, flat[i], flat[rng.randrange(i)])
+    for i, entry in enumerate(flat):
+        pid = entry["paper_id"]
+        text = _note_text(rng, entry, note_kb)
+        _sync_entry(entry, text)
+        roll = rng.random()
+        if roll < 0.005:
+            pass  # missing note
+        else:
+            if roll < 0.015:
+                text = text.replace("- **year**: ", "- **year**: 1999  \n- **old_year**: ", 1)
+            (notes_dir / f"{pid}.md").write_bytes(text.encode("utf-8"))
+            counts["notes"] += 1
+        data = _pdf_bytes(rng, {**entry, "arxiv_id": _arxiv_id(i)}, pdf_kb * 1024)
+        (refs_dir / f"{pid}.pdf").write_bytes(data)
+        counts["pdfs"] += 1
+        if rng.random() < 0.01:
+            (refs_dir / f"{pid}-copy.pdf").write_bytes(data)
+            counts["pdfs"] += 1
+        if rng.random() < 0.01:
+            other = _make_entry(rng, papers + i, 0)
+            data = _pdf_bytes(rng, {**other, "arxiv_id": _arxiv_id(papers + i)}, pdf_kb * 1024)
+            (refs_dir / f"unregistered-{pid}.pdf").write_bytes(data)
+            counts["pdfs"] += 1
+
+    _write_json(
+        dest / "0-调研" / "research.json",
+        {"research": _nest(rng, flat), "schema_hint": "See .codex/templates/paper_entry.json for per-paper fields."},
+    )
+
+    task_rows: list[list[Any]] = []
+    case_rows: list[list[Any]] = []
+    for k in range(n_tasks):
+        day = start + timedelta(days=k % 365)
+        task = _make_task(rng, k, day)
+        task_dir = dest / "1-验证" / "tasks" / task["task_id"]
+        md = task_json2md.render_task_md(task)
+        _sync_task(task, md)
+        _write_json(task_dir / "task.json", task)
+        (task_dir / "task.md").write_text(md, encoding="utf-8")
+        best = None
+        for j in range(1, cases_per_task + 1):
+            case = _make_case(rng, k, j, day)
+            _write_json(dest / "2-实验和写作" / "runs" / case["case_id"] / "case.json", case)
+            rmse = case["metrics"]["rmse"]
+            case_rows.append([case["created_at"], task["task_id"], "rmse", rmse, "1 GPU-hour", case["case_id"]])
+            best = rmse if best is None else min(best, rmse)
+            counts["cases"] += 1
+        task_rows.append([f"{day.isoformat()}T00:00:00", task["task_id"], "rmse", best or "", "", ""])
+    _write_csv(dest / "1-验证" / "leaderboard.csv", task_rows)
+    _write_csv(dest / "2-实验和写作" / "results" / "leaderboard.csv", case_rows)
+
+    session_dir = dest / "session"
+    session_dir.mkdir(parents=True)
+    for s in range(sessions):
+        day = start + timedelta(days=s)
+        md, js = _session_files(rng, day)
+        d = day.strftime("%y%m%d")
+        (session_dir / f"{d}-session.md").write_text(md, encoding="utf-8")
+        _write_json(session_dir / f"{d}-session.json", js)
+    return counts
+
+
+def main() -> int:
+    p = argparse.ArgumentParser()
+    p.add_argument("--dest", type=Path, required=True, help="Directory to create the workspace in.")
+    p.add_argument("--papers", type=int, default=2000, help="Total paper entries, `followed` ones included.")
+    p.add_argument("--note-kb", type=int, default=8, help="Approximate translated text per note (KB).")
+    p.add_argument("--pdf-kb", type=int, default=16, help="Size of each fake PDF (KB).")
+    p.add_argument("--cases-per-task", type=int, default=2, help="Cases per task under 2-实验和写作/runs.")
+    p.add_argument("--sessions", type=int, default=60, help="Number of session days.")
+    p.add_argument("--seed", type=int, default=0, help="Random seed for the synthetic data.")
+    p.add_argument(
+        "--force",
+        action="store_true",
+        help="Replace `--dest` if it holds an earlier synthetic workspace.",
+    )
+    args = p.parse_args()
+
+    dest: Path = args.dest.resolve()
+    if dest == ROOT.resolve() or dest in ROOT.resolve().parents:
+        print(f"error: {dest} contains the scripts being copied", file=sys.stderr)
+        return 2
+    if dest.exists() and any(dest.iterdir()):
+        if not (args.force and (dest / MARKER).exists()):
+            hint = " (use --force)" if (dest / MARKER).exists() else " and is not a synthetic workspace"
+            print(f"error: {dest} is not empty{hint}", file=sys.stderr)
+            return 2
+        shutil.rmtree(dest)
+
+    t0 = time.perf_counter()
+    counts = make_workspace(
+        dest,
+        papers=args.papers,
+        note_kb=args.note_kb,
+        pdf_kb=args.pdf_kb,
+        cases_per_task=args.cases_per_task,
+        sessions=args.sessions,
+        seed=args.seed,
+    )
+    summary = ", ".join(f"{k}={v}" for k, v in counts.items())
+    print(f"done: {summary} in {dest} ({time.perf_counter() - t0:.1f}s)")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,390 @@
+#!/usr/bin/env python3
+from __future__ import annotations
+
+"""Finds likely duplicate papers in research.json (MinHash + banded LSH).
+
+Exact duplicates (same paper_id or pdf_path) are caught by the audit; this
+catches the same paper registered twice under different ids, e.g. a preprint
+and its published version. Each entry becomes a set of shingles:
+- word 3-grams of the normalized title + `problem` text (lowercase, NFKC,
+  punctuation dropped; CJK characters count as words);
+- one shingle per normalized author name.
+
+A MinHash signature (`NUM_PERM` 32-bit values) estimates the Jaccard
+similarity of two such sets. Signatures are split into `BANDS` bands; papers
+that agree on a whole band land in the same bucket and become candidate
+pairs, so the work is near-linear in the number of papers instead of
+all-pairs. Candidates whose estimated similarity reaches `--threshold` are
+reported. With 32 bands of 4 rows, a pair at similarity 0.5 is a candidate
+with probability ~0.87, and at 0.6 ~0.99.
+
+Signatures are computed with NumPy when it is installed (a pure-Python
+fallback gives identical values) and cached in `data/cache/near_dup.sqlite`,
+keyed by a digest of the entry's title, authors and problem, so a re-run only
+hashes new or edited entries; rows of entries that are gone are dropped.
+
+`audit_stage0.py --near-duplicates` reports the pairs as
+`research-near-duplicate` issues.
+
+Usage:
+  python .codex/scripts/near_duplicates.py
+  python .codex/scripts/near_duplicates.py --threshold 0.7 --no-cache
+"""
+
+import argparse
+import hashlib
+import random
+import re
+import sqlite3
+import sys
+import time
+import unicodedata
+from array import array
+from collections.abc import Iterable
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Any
+
+import workspace_index as wsi
+
+try:
+    import numpy as np
+except ImportError:  # optional; the pure-Python path gives the same signatures
+    np = None
+
+
+ROOT = wsi.ROOT
+
+CACHE_PATH = ROOT / "data" / "cache" / "near_dup.sqlite"
+NUM_PERM = 128
+BANDS = 32
+ROWS = NUM_PERM // BANDS
+SEED = 1
+DEFAULT_THRESHOLD = 0.5
+# Buckets larger than this (e.g. many entries with only placeholder text) are
+# not expanded into pairs.
+MAX_BUCKET = 500
+# Bump when shingling or hashing changes, so cached signatures are dropped.
+FORMAT = f"minhash/1:{NUM_PERM}:{SEED}:{sys.byteorder}"
+
+_MERSENNE = (1 << 61) - 1
+_MASK32 = (1 << 32) - 1
+_MASK64 = (1 << 64) - 1
+_TOKEN_RE = re.compile(r"[^\W\d_]+|\d+", re.U)
+_CJK_RE = re.compile(r"[\u3040-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uac00-\ud7af]")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL);
+CREATE TABLE IF NOT EXISTS signatures (digest BLOB PRIMARY KEY, sig BLOB NOT NULL) WITHOUT ROWID;
+"""
+
+
+def _tokens(text: str) -> list[str]:
+    out: list[str] = []
+    for tok in _TOKEN_RE.findall(unicodedata.normalize("NFKC", text).lower()):
+        if _CJK_RE.search(tok):
+            out.extend(tok)  # no word boundaries: one token per character
+        else:
+            out.append(tok)
+    return out
+
+
+def _text(value: Any) -> str:
+    return value.strip() if isinstance(value, str) else ""
+
+
+def _source(entry: dict[str, Any]) -> tuple[str, list[str], str]:
+    authors = entry.get("authors")
+    names = [a for a in authors if isinstance(a, str)] if isinstance(authors, list) else []
+    return _text(entry.get("title")), names, _text(entry.get("problem"))
+
+
+def shingles(entry: dict[str, Any]) -> set[str]:
+    """The shingle set of one paper entry (empty if it has no usable text)."""
+    title, authors, problem = _source(entry)
+    words = _tokens(f"{title} {problem}")
+    out = {" ".join(words[i : i + 3]) for i in range(len(words) - 2)} if len(words) >= 3 else set(words)
+    for name in authors:
+        name = " ".join(_tokens(name))
+        if name:
+            out.add(f"@{name}")
+    return out
+
+
+def _entry_digest(entry: dict[str, Any]) -> bytes:
+    title, authors, problem = _source(entry)
+    raw = "\x1e".join([title, "\x1f".join(authors), problem])
+    return hashlib.blake2b(raw.encode("utf-8"), digest_size=16).digest()
+
+
+def _shingle_hash(s: str) -> int:
+    return int.from_bytes(hashlib.blake2b(s.encode("utf-8"), digest_size=4).digest(), "little")
+
+
+class MinHasher:
+    """`NUM_PERM` universal hash functions `((a * x + b) mod 2**64) mod p`.
+
+    The wrap to 64 bits is what NumPy's uint64 arithmetic does; the
+    pure-Python path applies it explicitly so both give the same values.
+    """
+
+    def __init__(self, num_perm: int = NUM_PERM, seed: int = SEED) -> None:
+        rng = random.Random(seed)
+        self.a = [rng.randrange(1, _MERSENNE) for _ in range(num_perm)]
+        self.b = [rng.randrange(0, _MERSENNE) for _ in range(num_perm)]
+        self.num_perm = num_perm
+        if np is not None:
+            self._a = np.array(self.a, dtype=np.uint64)
+            self._b = np.array(self.b, dtype=np.uint64)
+
+    def signatures(self, sets: list[set[str]]) -> list[bytes]:
+        """Signatures of non-empty shingle sets, as native-order uint32 bytes."""
+        if np is None:
+            return [self._signature_py([_shingle_hash(s) for s in shs]) for shs in sets]
+        out: list[bytes] = []
+        # Batches of ~8k shingles: the hash matrix is rows x NUM_PERM x 8 bytes.
+        batch: list[list[int]] = []
+        size = 0
+        for shs in sets:
+            batch.append([_shingle_hash(s) for s in shs])
+            size += len(shs)
+            if size >= 8192:
+                out.extend(self._signatures_np(batch))
+                batch, size = [], 0
+        if batch:
+            out.extend(self._signatures_np(batch))
+        return out
+
+    def _signature_py(self, xs: list[int]) -> bytes:
+        sig = array(
+            "I",
+            [min([(((a * x + b) & _MASK64) % _MERSENNE) & _MASK32 for x in xs]) for a, b in zip(self.a, self.b)],
+        )
+        return sig.tobytes()
+
+    def _signatures_np(self, batch: list[list[int]]) -> list[bytes]:
+        lengths = np.array([len(xs) for xs in batch])
+        xs = np.fromiter((x for row in batch for x in row), dtype=np.uint64, count=int(lengths.sum()))
+        with np.errstate(over="ignore"):
+            hv = (xs[:, None] * self._a[None, :] + self._b[None, :]) % np.uint64(_MERSENNE)
+        hv &= np.uint64(_MASK32)
+        starts = np.concatenate(([0], np.cumsum(lengths)[:-1]))
+        mins = np.minimum.reduceat(hv, starts, axis=0).astype(np.uint32)
+        return [row.tobytes() for row in mins]
+
+
+class SignatureCache:
+    """entry digest -> signature, in one SQLite file.
+
+    `load()` reads every row (the registry's signatures are all needed
+    anyway); `save()` adds the new rows and drops the ones not used this run.
+    """
+
+    def __init__(self, path: Path = CACHE_PATH) -> None:
+        self.path = path
+        self.rows: dict[bytes, bytes] = {}
+        self.new: dict[bytes, bytes] = {}
+        self.used: set[bytes] = set()
+
+    def load(self) -> None:
+        self.rows = {}
+        if not self.path.exists():
+            return
+        try:
+            conn = sqlite3.connect(self.path, timeout=60)
+            try:
+                meta = dict(conn.execute("SELECT key, value FROM meta"))
+                if meta.get("format") == FORMAT:
+                    self.rows = dict(conn.execute("SELECT digest, sig FROM signatures"))
+            finally:
+                conn.close()
+        except sqlite3.DatabaseError:
+            self.rows = {}  # a broken cache only costs a rebuild
+
+    def get(self, digest: bytes) -> bytes | None:
+        sig = self.rows.get(digest) or self.new.get(digest)
+        if sig is not None:
+            self.used.add(digest)
+        return sig
+
+    def put(self, digest: bytes, sig: bytes) -> None:
+        self.new[digest] = sig
+        self.used.add(digest)
+
+    def save(self) -> None:
+        stale = [d for d in self.rows if d not in self.used]
+        if not self.new and not stale:
+            return
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(self.path, timeout=60)
+        try:
+            with conn:
+                conn.executescript(SCHEMA)
+                meta = dict(conn.execute("SELECT key, value FROM meta"))
+                if meta.get("format") != FORMAT:
+                    conn.execute("DELETE FROM signatures")
+                    conn.execute("INSERT OR REPLACE INTO meta VALUES ('format', ?)", (FORMAT,))
+                conn.executemany("DELETE FROM signatures WHERE digest = ?", ((d,) for d in stale))
+                conn.executemany("INSERT OR REPLACE INTO signatures VALUES (?, ?)", self.new.items())
+        finally:
+            conn.close()
+
+
+@dataclass
+class NearDuplicate:
+    """Two paper entries that likely describe the same paper."""
+
+    paper_id: str
+    other_id: str
+    similarity: float
+    location: str
+    other_location: str
+
+
+@dataclass
+class ScanStats:
+    """What one `find_near_duplicates` call did."""
+
+    entries: int = 0
+    skipped: int = 0  # no usable text
+    cached: int = 0
+    hashed: int = 0
+    candidates: int = 0
+    oversized_buckets: int = 0
+    seconds: float = 0.0
+
+    def summary(self) -> str:
+        return ", ".join(f"{k}={v}" for k, v in asdict(self).items() if k != "seconds")
+
+
+def _agreement(sigs: list[bytes], pairs: list[tuple[int, int]]) -> list[float]:
+    # Fraction of equal signature positions = estimated Jaccard similarity.
+    if not pairs:
+        return []
+    if np is not None:
+        mat = np.frombuffer(b"".join(sigs), dtype=np.uint32).reshape(len(sigs), NUM_PERM)
+        idx = np.array(pairs, dtype=np.intp)
+        out: list[float] = []
+        for lo in range(0, len(idx), 8192):  # bounds the gathered rows to ~8 MB
+            chunk = idx[lo : lo + 8192]
+            out.extend(((mat[chunk[:, 0]] == mat[chunk[:, 1]]).sum(axis=1) / NUM_PERM).tolist())
+        return out
+    rows = [array("I", s) for s in sigs]
+    return [sum(map(int.__eq__, rows[i], rows[j])) / NUM_PERM for i, j in pairs]
+
+
+def find_near_duplicates(
+    entries_with_loc: Iterable[tuple[dict[str, Any], str]],
+    threshold: float = DEFAULT_THRESHOLD,
+    cache: SignatureCache | None = None,
+) -> tuple[list[NearDuplicate], ScanStats]:
+    """Likely duplicate pairs among `(entry, location)` pairs.
+
+    Only the signature and ids of each entry are kept, so a streamed iterator
+    such as `WorkspaceIndex.iter_entries()` stays bounded in memory. Pairs
+    with the same paper_id are skipped (the audit reports those already).
+
+    Returns:
+        Pairs ordered by the first paper's document position, and stats.
+    """
+    t0 = time.perf_counter()
+    stats = ScanStats()
+    hasher = MinHasher()
+    ids: list[str] = []
+    locs: list[str] = []
+    sigs: list[bytes] = []  # b"" until its batch is hashed
+    pending: list[tuple[int, bytes, set[str]]] = []
+
+    def flush() -> None:
+        for (k, digest, _), sig in zip(pending, hasher.signatures([shs for _, _, shs in pending])):
+            sigs[k] = sig
+            if cache is not None:
+                cache.put(digest, sig)
+        stats.hashed += len(pending)
+        pending.clear()
+
+    if cache is not None:
+        cache.load()
+    for entry, loc in entries_with_loc:
+        stats.entries += 1
+        digest = _entry_digest(entry)
+        sig = cache.get(digest) if cache is not None else None
+        if sig is None:
+            shs = shingles(entry)
+            if not shs:
+                stats.skipped += 1
+                continue
+            pending.append((len(sigs), digest, shs))
+        else:
+            stats.cached += 1
+        ids.append(str(entry.get("paper_id", "")).strip())
+        locs.append(loc)
+        sigs.append(sig or b"")
+        if len(pending) >= 1024:
+            flush()  # keeps only signatures, not shingle sets, in memory
+    flush()
+    if cache is not None:
+        cache.save()
+
+    band_bytes = ROWS * 4
+    pairs: set[tuple[int, int]] = set()
+    for band in range(BANDS):
+        lo = band * band_bytes
+        buckets: dict[bytes, list[int]] = {}
+        for k, sig in enumerate(sigs):
+            buckets.setdefault(sig[lo : lo + band_bytes], []).append(k)
+        for members in buckets.values():
+            if len(members) < 2:
+                continue
+            if len(members) > MAX_BUCKET:
+                stats.oversized_buckets += 1
+                continue
+            for x in range(len(members)):
+                for y in range(x + 1, len(members)):
+                    i, j = members[x], members[y]
+                    if ids[i] != ids[j] or not ids[i]:
+                        pairs.add((i, j))
+    stats.candidates = len(pairs)
+
+    ordered = sorted(pairs)
+    found = [
+        NearDuplicate(ids[i], ids[j], round(sim, 3), locs[i], locs[j])
+        for (i, j), sim in zip(ordered, _agreement(sigs, ordered))
+        if sim >= threshold
+    ]
+    stats.seconds = time.perf_counter() - t0
+    return found, stats
+
+
+def main() -> int:
+    p = argparse.ArgumentParser()
+    p.add_argument(
+        "--research-json",
+        type=Path,
+        default=wsi.RESEARCH_JSON,
+        help="Path to 0-调研/research.json.",
+    )
+    p.add_argument(
+        "--threshold",
+        type=float,
+        default=DEFAULT_THRESHOLD,
+        help=f"Estimated Jaccard similarity that counts as a duplicate. Default: {DEFAULT_THRESHOLD}.",
+    )
+    p.add_argument("--no-cache", action="store_true", help="Hash every entry without data/cache/near_dup.sqlite.")
+    args = p.parse_args()
+
+    index = wsi.get_index(research_json=args.research_json, stream=True)
+    found, stats = find_near_duplicates(
+        index.iter_entries(), args.threshold, None if args.no_cache else SignatureCache()
+    )
+    for dup in found:
+        print(f"- {dup.paper_id or dup.location} ~ {dup.other_id or dup.other_location}: similarity {dup.similarity:.2f}")
+    print(
+        f"done: {len(found)} likely duplicate pair(s), {stats.summary()}, "
+        f"backend={'numpy' if np is not None else 'python'} ({stats.seconds:.1f}s)"
+    )
+    return 1 if found else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
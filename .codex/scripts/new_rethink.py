@@ -3,6 +3,10 @@ from __future__ import annotations
 
 """Create a new rethink note under 1-验证/rethinks with YYMMDD-rethink-NN.md naming.
 
+The note is rendered by the rethink codec (`doc_codec.py`) from a rethink.json
+dict holding the id, created_at, stage and source task, so it has exactly the
+layout that `doc_codec.py parse` reads back.
+
 This is intended for systematic fail-case management during stage 1-验证.
 Workflow requirement (enforced by humans, not this script):
   - Human writes the first draft.
@@ -20,8 +24,11 @@ import re
 from datetime import datetime
 from pathlib import Path
 
+import doc_codec
+import workspace_index as wsi
+
 
-ROOT = Path(__file__).resolve().parents[2]
+ROOT = wsi.ROOT
 
 FILENAME_RE = re.compile(r"^(?P<date>\d{6})-rethink-(?P<n>\d{2})\.md$")
 
@@ -85,33 +92,32 @@ def _next_index(out_dir: Path, yymmdd: str) -> int:
     return max_n + 1
 
 
-def _fill_template(
-    template_text: str,
+def _codec(template_path: Path) -> doc_codec.Codec:
+    # The default template is the shared one; another md template is compiled
+    # against the standard rethink.json.
+    if template_path == doc_codec.TEMPLATES_DIR / "rethink.md":
+        return doc_codec.get_codec("rethink")
+    spec = doc_codec.SPECS["rethink"]
+    json_text = (doc_codec.TEMPLATES_DIR / spec.json_template).read_text(encoding="utf-8")
+    return doc_codec.Codec("rethink", spec, template_path.read_text(encoding="utf-8"), json_text)
+
+
+def _render(
+    codec: doc_codec.Codec,
     *,
     rethink_id: str,
     created_at: str,
     source_task: str | None,
 ) -> str:
-    lines = template_text.splitlines()
-    out: list[str] = []
-    for i, line in enumerate(lines):
-        if i == 0 and line.startswith("# Rethink:"):
-            out.append(f"# Rethink: {rethink_id} - <一句话标题>")
-            continue
-        if line.startswith("- [ ] id:"):
-            out.append(f"- [ ] id: {rethink_id}  ")
-            continue
-        if line.startswith("- [ ] created_at:"):
-            out.append(f"- [ ] created_at: {created_at}  ")
-            continue
-        if line.startswith("- [ ] 润色:"):
-            out.append("- [ ] 润色: GPT-5.2-xhigh @ YYYY-MM-DD  ")
-            continue
-        if source_task and line.startswith("- [ ] 来源 task:"):
-            out.append(f"- [ ] 来源 task: `{source_task}`  ")
-            continue
-        out.append(line)
-    return "\n".join(out).rstrip("\n") + "\n"
+    # Fields left empty render as the template's text (`status: draft |
+    # polished | final`, `初稿: <人> @ YYYY-MM-DD`, ...), for the human to fill.
+    doc = codec.empty | {
+        "id": rethink_id,
+        "stage": codec.template.get("stage", ""),
+        "created_at": created_at,
+        "source_task": source_task or "",
+    }
+    return codec.render(doc)
 
 
 def main() -> int:
@@ -139,15 +145,13 @@ def main() -> int:
     if out_path.exists() and not args.overwrite:
         raise SystemExit(f"file already exists: {out_path} (use --overwrite)")
 
-    template_text = template_path.read_text(encoding="utf-8")
-    created_at = _to_created_at(yymmdd)
-    filled = _fill_template(
-        template_text,
+    filled = _render(
+        _codec(template_path),
         rethink_id=rethink_id,
-        created_at=created_at,
+        created_at=_to_created_at(yymmdd),
         source_task=args.source_task,
     )
-    out_path.write_text(filled, encoding="utf-8")
+    wsi.write_text_atomic(out_path, filled)
 
     print(out_path)
     return 0
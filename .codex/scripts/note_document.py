@@ -0,0 +1,256 @@
+from __future__ import annotations
+
+"""Single-read paper note documents and a shared file loader.
+
+A `NoteDocument` holds everything the scripts need from one note: raw text,
+lines, heading offsets and the parsed research.json entry. It is built from one
+read and one parse; `DocumentLoader` does the reading (and caches JSON files
+such as research.json and templates), and counts reads/bytes/parses so a run
+can prove that no file was read twice.
+
+With a `parse_cache.ParseCache` attached (`DocumentLoader.parse_cache`), parse
+results of unchanged content come from disk: a hit costs one read, one hash
+and one lookup; the note text is then decoded only if something asks for it.
+
+`parse_note_lines` is the paper codec of `doc_codec.py` (compiled from
+`paper_note.md` + `paper_entry.json`): a single pass over the lines, where a
+line outside the Meta and bullet sections costs one prefix test.
+`bench_note_parser.py` measures it against the previous parser and checks both
+give the same result.
+
+Used by:
+- `audit_stage0.py` (notes, sessions, templates, research.json).
+- `check_unrecognized_references.py` (research.json).
+- `paper_md2json.py` / `paper_json2md.py`.
+"""
+
+import json
+import os
+import threading
+from collections import Counter
+from collections.abc import Callable
+from dataclasses import dataclass, field
+from functools import cached_property
+from pathlib import Path
+from typing import Any
+
+import doc_codec
+
+
+_PAPER = doc_codec.get_codec("paper")
+
+# Parser id in the parse cache; bump when `parse_note_lines` output changes.
+# The codec version follows the note / entry templates and `doc_codec.py`.
+NOTE_PARSER = f"note/2:{_PAPER.version}"
+
+heading_label = doc_codec.heading_label
+
+
+def decode_text(data: bytes) -> str:
+    """Decodes UTF-8 file content with universal newlines (like `Path.read_text`)."""
+    text = data.decode("utf-8")
+    if "\r" in text:
+        text = text.replace("\r\n", "\n").replace("\r", "\n")
+    return text
+
+
+def parse_note_lines(paper_id: str, lines: list[str]) -> tuple[dict[str, Any], dict[str, int]]:
+    """Parses note lines into a research.json entry, collecting heading offsets.
+
+    Args:
+        paper_id: Paper id (the note file stem).
+        lines: Note content split by `str.splitlines()`.
+
+    Returns:
+        (entry, headings). `entry` follows `.codex/templates/paper_entry.json`;
+        `headings` maps each stripped `## ...` line to its first line index.
+    """
+    return _PAPER.parse_lines(lines, paper_id)
+
+
+@dataclass(frozen=True)
+class NoteDocument:
+    """One paper note, read once and parsed once.
+
+    `text` and `lines` are decoded from `data` on first use, so a note whose
+    parse came from the parse cache is never decoded unless needed.
+
+    Attributes:
+        path: Note file path (`0-调研/notes/<paper_id>.md`).
+        data: Raw file content.
+        headings: Stripped `## ...` heading line -> first line index.
+        entry: Parsed research.json entry.
+    """
+
+    path: Path
+    data: bytes
+    headings: dict[str, int]
+    entry: dict[str, Any]
+
+    @cached_property
+    def text(self) -> str:
+        """Raw text (universal newlines, like `Path.read_text`)."""
+        return decode_text(self.data)
+
+    @cached_property
+    def lines(self) -> list[str]:
+        """`text.splitlines()`."""
+        return self.text.splitlines()
+
+    @property
+    def first_line(self) -> str | None:
+        """`lines[0]` (None for an empty file), decoding only that line."""
+        if not self.data:
+            return None
+        # b"\n" never occurs inside a multi-byte UTF-8 sequence.
+        end = self.data.find(b"\n")
+        head = self.data if end < 0 else self.data[: end + 1]
+        return (decode_text(head).splitlines() or [""])[0]
+
+    @property
+    def paper_id(self) -> str:
+        return self.path.stem.strip()
+
+    def has_heading(self, heading: str) -> bool:
+        # Offsets cover proper heading lines; the substring fallback keeps the
+        # audit's historical "heading text appears anywhere" semantics.
+        return heading in self.headings or heading in self.text
+
+
+@dataclass
+class LoaderStats:
+    """Read/parse counters of a `DocumentLoader` (mergeable across processes)."""
+
+    reads: Counter[str] = field(default_factory=Counter)
+    bytes_read: int = 0
+    parses: int = 0
+    cache_hits: int = 0
+    cache_misses: int = 0
+
+    def merge(self, other: LoaderStats) -> None:
+        self.reads.update(other.reads)
+        self.bytes_read += other.bytes_read
+        self.parses += other.parses
+        self.cache_hits += other.cache_hits
+        self.cache_misses += other.cache_misses
+
+    def to_json(self) -> dict[str, int]:
+        return {
+            "files_read": len(self.reads),
+            "reads": sum(self.reads.values()),
+            "max_reads_per_file": max(self.reads.values(), default=0),
+            "bytes_read": self.bytes_read,
+            "parses": self.parses,
+            "cache_hits": self.cache_hits,
+            "cache_misses": self.cache_misses,
+        }
+
+    def summary(self) -> str:
+        return ", ".join(f"{k}={v}" for k, v in self.to_json().items())
+
+
+class DocumentLoader:
+    """Reads workspace files once per run and counts every read.
+
+    JSON files (research.json, templates, session json) are cached by resolved
+    path, so every caller in the process shares one parse. Notes are not kept
+    in memory (a large registry would keep every note); each phase that needs a
+    note gets the same `NoteDocument` from a single `note()` call. Markdown
+    parses go through `parse_cache` (a `parse_cache.ParseCache`) when set.
+
+    `read_bytes`, `read_text` and `parse` may be called from several threads
+    at once (only the counters are locked; reads and parses run in parallel).
+    """
+
+    def __init__(self, parse_cache: Any = None) -> None:
+        self.stats = LoaderStats()
+        self.parse_cache = parse_cache
+        self._json: dict[str, Any] = {}
+        self._stats_lock = threading.Lock()
+
+    def count_read(self, path: Path, nbytes: int) -> None:
+        """Records a read done outside the loader (e.g. hashing a PDF)."""
+        with self._stats_lock:
+            self.stats.reads[os.fspath(path)] += 1
+            self.stats.bytes_read += nbytes
+
+    def _count(self, name: str) -> None:
+        with self._stats_lock:
+            setattr(self.stats, name, getattr(self.stats, name) + 1)
+
+    def read_bytes(self, path: Path) -> bytes:
+        with open(path, "rb") as f:
+            data = f.read()
+        self.count_read(path, len(data))
+        return data
+
+    def read_text(self, path: Path) -> str:
+        """Reads a UTF-8 file with universal newlines (like `Path.read_text`).
+
+        One binary read and one decode: text-mode `open` decodes and
+        translates newlines chunk by chunk, about twice as slow on large notes.
+        """
+        return decode_text(self.read_bytes(path))
+
+    def parse(self, path: Path, parser: str, parse_text: Callable[[str], Any]) -> tuple[bytes, Any]:
+        """Reads `path` and returns `(content, parse_text(text))`.
+
+        With a parse cache, the result is looked up by content digest and
+        `parser` (an id that changes whenever `parse_text` output would), and
+        `parse_text` only runs on a miss. The result must be marshallable.
+        """
+        data = self.read_bytes(path)
+        cache = self.parse_cache
+        if cache is None:
+            value = parse_text(decode_text(data))
+            self._count("parses")
+            return data, value
+
+        digest = cache.digest(data)
+        value = cache.get(digest, parser)
+        if value is not cache.MISSING:
+            self._count("cache_hits")
+            return data, value
+        self._count("cache_misses")
+        value = parse_text(decode_text(data))
+        self._count("parses")
+        cache.put(digest, parser, value)
+        return data, value
+
+    def json(self, path: Path) -> Any:
+        """Loads and caches a JSON file.
+
+        Raises:
+            FileNotFoundError: If the file does not exist.
+            ValueError: If the file is not valid JSON.
+        """
+        key = os.path.abspath(path)
+        if key in self._json:
+            return self._json[key]
+        try:
+            data = json.loads(self.read_text(path))
+        except FileNotFoundError as e:
+            raise FileNotFoundError(f"missing file: {path}") from e
+        except json.JSONDecodeError as e:
+            raise ValueError(f"invalid json: {path} ({e})") from e
+        self.stats.parses += 1
+        self._json[key] = data
+        return data
+
+    def note(self, path: Path) -> NoteDocument:
+        paper_id = path.stem.strip()
+        # The default entry carries the file stem, so it is part of the id.
+        data, (entry, headings) = self.parse(
+            path,
+            f"{NOTE_PARSER}:{paper_id}",
+            lambda text: parse_note_lines(paper_id, text.splitlines()),
+        )
+        return NoteDocument(path=path, data=data, headings=headings, entry=entry)
+
+    def forget(self, path: Path) -> None:
+        """Drops a cached JSON file (call after writing it)."""
+        self._json.pop(os.path.abspath(path), None)
+
+
+# Process-wide loader shared by all scripts imported into one run.
+LOADER = DocumentLoader()
@@ -7,89 +7,52 @@ This is a helper script for the 0-调研 intake loop:
 - Source of truth for metadata lives in `0-调研/research.json`.
 - Each paper should have a note file in `0-调研/notes/<paper_id>.md`.
 - It also supports nested entries under `followed`.
+- With a sharded registry (`0-调研/research.d/`, see research_store.py),
+  `--paper_id` reads only those shards.
 
 Default behavior:
 - Only creates missing notes.
 - Does not overwrite existing notes unless `--overwrite` is set.
+- A note whose rendered content is identical to the file on disk is never
+  rewritten (its mtime stays put, so watchers and caches see no change); the
+  summary counts it as `unchanged`.
+- `--jobs N` renders on a process pool, in batches of entries.
 
 Usage:
   python .codex/scripts/paper_json2md.py --create-missing
   python .codex/scripts/paper_json2md.py --paper_id 260123-01 --overwrite
+  python .codex/scripts/paper_json2md.py --create-missing --stream
+  python .codex/scripts/paper_json2md.py --overwrite --jobs 0
 """
 
 import argparse
-import json
+import os
+from collections import deque
+from collections.abc import Iterable, Iterator
+from concurrent.futures import Future, ProcessPoolExecutor
 from pathlib import Path
 from typing import Any
 
+import doc_codec
+import workspace_index as wsi
 
-ROOT = Path(__file__).resolve().parents[2]
 
+ROOT = wsi.ROOT
 
-def _load_json(path: Path) -> dict[str, Any]:
-    try:
-        return json.loads(path.read_text(encoding="utf-8"))
-    except FileNotFoundError as e:
-        raise FileNotFoundError(f"missing file: {path}") from e
-    except json.JSONDecodeError as e:
-        raise ValueError(f"invalid json: {path} ({e})") from e
-
-
-def _dump_json_inline(value: Any) -> str:
-    return json.dumps(value, ensure_ascii=False)
+# Entries per worker task: large enough to amortize pickling, small enough
+# that `--stream` keeps only a few batches in memory.
+BATCH_SIZE = 256
 
 
-def _iter_paper_entries(entries: list[Any] | Any) -> list[dict[str, Any]]:
-    out: list[dict[str, Any]] = []
-    if not isinstance(entries, list):
-        return out
-    for e in entries:
-        if not isinstance(e, dict):
-            continue
-        out.append(e)
-        out.extend(_iter_paper_entries(e.get("followed", [])))
-    return out
-
-
-def _is_placeholder(s: str) -> bool:
-    x = s.strip()
-    if not x:
-        return True
-    if x in {"…", "...", "...", "......"}:
-        return True
-    if x.lower() in {"tbd", "todo"}:
-        return True
-    if "<paper_id>" in x or "<file>" in x:
-        return True
-    return "…" in x
-
-
-def _bullet_list_from_text(text: str) -> list[str]:
-    t = (text or "").strip()
-    if not t:
-        return ["- ..."]
-    lines = [ln.strip() for ln in t.splitlines() if ln.strip()]
-    return [f"- {ln}" for ln in lines] if lines else ["- ..."]
-
-
-def _bullet_list_from_items(
-    items: list[Any] | Any,
-    placeholder: list[str],
-) -> list[str]:
-    if isinstance(items, list) and items:
-        out: list[str] = []
-        for it in items:
-            s = str(it).strip()
-            if _is_placeholder(s):
-                continue
-            out.append(f"- {s}")
-        return out or placeholder
-    return placeholder
+_CODEC = doc_codec.get_codec("paper")
 
 
 def render_paper_note(entry: dict[str, Any]) -> str:
     """Renders a single paper entry into a note markdown string.
 
+    The renderer is the paper codec of `doc_codec.py`, compiled from
+    `.codex/templates/paper_note.md` + `paper_entry.json`.
+
     Args:
         entry: A dict that follows `.codex/templates/paper_entry.json`.
 
@@ -99,109 +62,122 @@ def render_paper_note(entry: dict[str, Any]) -> str:
     Raises:
         ValueError: If `paper_id` is missing.
     """
-    paper_id = str(entry.get("paper_id", "")).strip()
-    if not paper_id:
-        raise ValueError("paper entry missing `paper_id`")
-
-    title = str(entry.get("title", "")).strip() or "..."
-    year = int(entry.get("year", 0) or 0)
-    authors = entry.get("authors", [])
-    if not isinstance(authors, list):
-        authors = []
-    tags = entry.get("tags", [])
-    if not isinstance(tags, list):
-        tags = []
-    used_in_tasks = (
-        entry.get("used_in_tasks", [])
-        if isinstance(entry.get("used_in_tasks", []), list)
-        else []
-    )
+    return _CODEC.render(entry)
 
-    pdf_path = str(entry.get("pdf_path", "")).strip() or "0-调研/references/<file>.pdf"
-    url = str(entry.get("url", "")).strip() or "..."
-    code_url = str(entry.get("code_url", "")).strip() or "..."
 
-    problem_lines = _bullet_list_from_text(str(entry.get("problem", "") or ""))
-    method_lines = _bullet_list_from_text(str(entry.get("method", "") or ""))
+def _same_content(path: Path, data: bytes) -> bool:
+    # A size mismatch settles it without reading the file.
+    try:
+        if path.stat().st_size != len(data):
+            return False
+        return path.read_bytes() == data
+    except FileNotFoundError:
+        return False
 
-    key_claims_lines = _bullet_list_from_items(
-        entry.get("key_claims", []),
-        placeholder=["- claim-1: ... (evidence: ...)", "- claim-2: ..."],
-    )
-    limitations_lines = _bullet_list_from_items(
-        entry.get("limitations", []),
-        placeholder=["- ..."],
-    )
-    open_questions_lines = _bullet_list_from_items(
-        entry.get("open_questions", []),
-        placeholder=["- ..."],
-    )
-    what_we_can_reuse_lines = _bullet_list_from_items(
-        entry.get("what_we_can_reuse", []),
-        placeholder=["- ..."],
-    )
-    hypotheses_lines = _bullet_list_from_items(
-        entry.get("hypotheses", []),
-        placeholder=["- H1: ... (variable: ...; protocol: ...; metric: ...; falsify if: ...)"],
-    )
 
-    md = []
-    md.append(f"# Paper Note: {paper_id}")
-    md.append("")
-    md.append("## 0. Meta")
-    md.append(f"- **paper_id**: {paper_id}  ")
-    md.append(f"- **title**: {title}  ")
-    md.append(f"- **year**: {year}  ")
-    md.append(f"- **authors**: `{_dump_json_inline(authors)}`  ")
-    md.append(f"- **tags**: `{_dump_json_inline(tags)}`  ")
-    md.append(f"- **pdf_path**: `{pdf_path}`  ")
-    md.append(f"- **url**: {url}  ")
-    md.append(f"- **code_url**: {code_url}  ")
-    md.append(f"- **used_in_tasks**: `{_dump_json_inline(used_in_tasks)}`  ")
-    md.append("")
-    md.append("## 1. Abstract (摘要)")
-    md.append("")
-    md.append("逐段翻译，简洁清晰、口语化，但不能产生歧义或信息丢失.")
-    md.append("")
-    md.append("> **Note:** 关键术语统一使用 English term (中文术语). 数字、指标、对比对象与适用范围必须保留.")
-    md.append("")
-    md.append("## 2. Introduction (引言)")
-    md.append("")
-    md.append("逐段翻译，重点理清研究逻辑与相关工作之间的关系 (不引入 paper 没有的推断).")
-    md.append("")
-    md.append("## 3. Methodology (方法)")
-    md.append("")
-    md.append("逐段翻译，重点关注细节，必要时用 note block 把符号、shape、损失项、训练/推理流程与实现细节注释清楚.")
-    md.append("")
-    md.append("> **Note:** 对于每个关键符号，优先写清: 含义、shape、取值范围、单位/物理意义 (如果 paper 给了).")
-    md.append("")
-    md.append("## 4. Experiments (实验)")
-    md.append("")
-    md.append("逐段翻译，重点写清做了什么实验，以及为什么能支持结论 (claim -> evidence).")
-    md.append("")
-    md.append("## 5. Problem (paper)")
-    md.extend(problem_lines)
-    md.append("")
-    md.append("## 6. Method (paper)")
-    md.extend(method_lines)
-    md.append("")
-    md.append("## 7. Key claims (paper)")
-    md.extend(key_claims_lines)
-    md.append("")
-    md.append("## 8. Limitations (paper)")
-    md.extend(limitations_lines)
-    md.append("")
-    md.append("## 9. Open questions (reading)")
-    md.extend(open_questions_lines)
-    md.append("")
-    md.append("## 10. What we can reuse (our project)")
-    md.extend(what_we_can_reuse_lines)
-    md.append("")
-    md.append("## 11. Hypotheses we can test (our project)")
-    md.extend(hypotheses_lines)
-    md.append("")
-
-    return "\n".join(md)
+def write_paper_note(
+    entry: dict[str, Any],
+    notes_dir: Path,
+    create_missing: bool,
+    overwrite: bool,
+    dry_run: bool = False,
+) -> str:
+    """Writes `notes/<paper_id>.md` for one entry, honoring create/overwrite.
+
+    An existing note whose bytes already match the rendered note is left
+    untouched.
+
+    Returns:
+        `created`, `updated`, `unchanged` or `skipped`; with `dry_run`,
+        `create` or `overwrite` for a planned write.
+    """
+    note_path = notes_dir / f"{str(entry.get('paper_id', '')).strip()}.md"
+    exists = note_path.exists()
+    if exists and not overwrite:
+        return "skipped"
+    if (not exists) and (not create_missing) and (not overwrite):
+        return "skipped"
+
+    text = render_paper_note(entry)
+    if exists and _same_content(note_path, text.encode("utf-8")):
+        return "unchanged"
+    if dry_run:
+        return "overwrite" if exists else "create"
+
+    # Atomic: an interrupted run never leaves a truncated note.
+    wsi.write_text_atomic(note_path, text)
+    return "updated" if exists else "created"
+
+
+def _write_note_batch(
+    batch: list[dict[str, Any]],
+    notes_dir: Path,
+    create_missing: bool,
+    overwrite: bool,
+    dry_run: bool,
+) -> list[str]:
+    # Runs in a worker process; returns one action per entry, in order.
+    return [
+        write_paper_note(e, notes_dir, create_missing, overwrite, dry_run) for e in batch
+    ]
+
+
+def _batches(entries: Iterable[dict[str, Any]], size: int) -> Iterator[list[dict[str, Any]]]:
+    batch: list[dict[str, Any]] = []
+    for e in entries:
+        batch.append(e)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def write_paper_notes(
+    entries: Iterable[dict[str, Any]],
+    notes_dir: Path,
+    create_missing: bool,
+    overwrite: bool,
+    dry_run: bool = False,
+    jobs: int = 1,
+) -> Iterator[tuple[dict[str, Any], str]]:
+    """Runs `write_paper_note` over `entries`, on a process pool if `jobs` > 1.
+
+    At most `2 * jobs` batches are in flight, so a streamed registry is never
+    held in memory at once. A batch that repeats a paper_id from a batch still
+    in flight is submitted only after that batch is done, so duplicate entries
+    write their note one after the other, in registry order, as with `jobs=1`.
+
+    Yields:
+        `(entry, action)` pairs in the order of `entries`.
+    """
+    if jobs <= 1:
+        for e in entries:
+            yield e, write_paper_note(e, notes_dir, create_missing, overwrite, dry_run)
+        return
+
+    pending: deque[tuple[int, list[dict[str, Any]], Future[list[str]]]] = deque()
+    last_batch: dict[str, int] = {}  # paper_id -> last batch that has it
+    with ProcessPoolExecutor(max_workers=jobs) as ex:
+        for seq, batch in enumerate(_batches(entries, BATCH_SIZE)):
+            deps: set[int] = set()
+            for e in batch:
+                pid = str(e.get("paper_id", "")).strip()
+                prev = last_batch.get(pid)
+                if prev is not None and prev != seq:
+                    deps.add(prev)
+                last_batch[pid] = seq
+            for s, _, fut in pending:
+                if s in deps:
+                    fut.result()
+            fut = ex.submit(_write_note_batch, batch, notes_dir, create_missing, overwrite, dry_run)
+            pending.append((seq, batch, fut))
+            if len(pending) >= 2 * jobs:
+                _, done, fut = pending.popleft()
+                yield from zip(done, fut.result())
+        while pending:
+            _, done, fut = pending.popleft()
+            yield from zip(done, fut.result())
 
 
 def main() -> int:
@@ -239,51 +215,65 @@ def main() -> int:
         action="store_true",
         help="Do not write files; only print what would change.",
     )
+    p.add_argument(
+        "--stream",
+        action="store_true",
+        help="Stream research.json one entry at a time (bounded memory for large registries).",
+    )
+    p.add_argument(
+        "--jobs",
+        type=int,
+        default=1,
+        help="Worker processes for rendering (0 = all cores). Default: 1.",
+    )
     args = p.parse_args()
 
-    data = _load_json(args.research_json)
-    research_entries = data.get("research", [])
-    if not isinstance(research_entries, list):
-        raise ValueError(f"`research` must be a list in {args.research_json}")
-    entries = _iter_paper_entries(research_entries)
-
+    index = wsi.get_index(research_json=args.research_json, stream=args.stream)
     wanted = set(args.paper_id or [])
+    store = index.store
+    if store is not None and wanted:
+        ids = [pid for pid in dict.fromkeys(args.paper_id) if store.has_entry(pid)]
+        entries: Iterable[Any] = (store.read_entry(pid) for pid in ids)
+    else:
+        entries = (e for e, _ in index.iter_entries())
     args.notes_dir.mkdir(parents=True, exist_ok=True)
 
+    def selected() -> Iterator[dict[str, Any]]:
+        for e in entries:
+            if not isinstance(e, dict):
+                continue
+            paper_id = str(e.get("paper_id", "")).strip()
+            if not paper_id:
+                continue
+            if wanted and paper_id not in wanted:
+                continue
+            yield e
+
     created = 0
     updated = 0
+    unchanged = 0
     skipped = 0
-    for e in entries:
-        if not isinstance(e, dict):
-            continue
-        paper_id = str(e.get("paper_id", "")).strip()
-        if not paper_id:
-            continue
-        if wanted and paper_id not in wanted:
-            continue
-
-        note_path = args.notes_dir / f"{paper_id}.md"
-        exists = note_path.exists()
-        if exists and not args.overwrite:
-            skipped += 1
-            continue
-        if (not exists) and (not args.create_missing) and (not args.overwrite):
-            skipped += 1
-            continue
-
-        content = render_paper_note(e)
-        if args.dry_run:
-            action = "overwrite" if exists else "create"
-            print(f"{action}: {note_path}")
-            continue
-
-        note_path.write_text(content, encoding="utf-8")
-        if exists:
+    for e, action in write_paper_notes(
+        selected(),
+        args.notes_dir,
+        create_missing=args.create_missing,
+        overwrite=args.overwrite,
+        dry_run=args.dry_run,
+        jobs=args.jobs if args.jobs > 0 else (os.cpu_count() or 1),
+    ):
+        if action in {"create", "overwrite"}:
+            paper_id = str(e.get("paper_id", "")).strip()
+            print(f"{action}: {args.notes_dir / f'{paper_id}.md'}")
+        elif action == "created":
+            created += 1
+        elif action == "updated":
             updated += 1
+        elif action == "unchanged":
+            unchanged += 1
         else:
-            created += 1
+            skipped += 1
 
-    print(f"done: created={created}, updated={updated}, skipped={skipped}")
+    print(f"done: created={created}, updated={updated}, unchanged={unchanged}, skipped={skipped}")
     return 0
 
 
@@ -14,109 +14,67 @@ It parses:
 Usage:
   python .codex/scripts/paper_md2json.py --update-existing
   python .codex/scripts/paper_md2json.py --create-missing
+  python .codex/scripts/paper_md2json.py --update-existing --dry-run
 
 Notes:
   - Existing entries are matched by `paper_id`, including nested entries under
     `followed`.
   - When creating missing entries, this script appends to the top-level
     `research` list.
+  - research.json is only written if an entry was created or a parsed field
+    differs from the stored value, and then atomically (temp file + fsync +
+    rename), so readers never see a partly written file.
+  - With a sharded registry (`0-调研/research.d/`, see research_store.py), only
+    the shards of the parsed notes are read and only changed/new shards are
+    written; research.json is left as is (`--export` refreshes it).
+  - Parses of unchanged notes are reused from `data/cache/parse/` (shared with
+    the audit, see parse_cache.py); `--no-parse-cache` turns that off.
 """
 
 import argparse
 import json
-import re
+from dataclasses import dataclass, field
 from pathlib import Path
 from typing import Any
 
+import note_document as notes
+import parse_cache
+import research_store
+import workspace_index as wsi
 
-ROOT = Path(__file__).resolve().parents[2]
 
+ROOT = wsi.ROOT
 
-META_LINE_RE = re.compile(r"^- \*\*(?P<key>[^*]+)\*\*:\s*(?P<value>.*)$")
 
+_MISSING = object()
 
-def _load_json(path: Path) -> dict[str, Any]:
-    try:
-        return json.loads(path.read_text(encoding="utf-8"))
-    except FileNotFoundError as e:
-        raise FileNotFoundError(f"missing file: {path}") from e
-    except json.JSONDecodeError as e:
-        raise ValueError(f"invalid json: {path} ({e})") from e
+
+@dataclass
+class MergeResult:
+    """Outcome of `merge_notes` (paper_ids in processing order)."""
+
+    created: list[str] = field(default_factory=list)
+    updated: list[str] = field(default_factory=list)
+    unchanged: list[str] = field(default_factory=list)
+    # paper_id -> [(key, old value or _MISSING, new value)] for updated entries.
+    diffs: dict[str, list[tuple[str, Any, Any]]] = field(default_factory=dict)
+
+    @property
+    def changed(self) -> bool:
+        return bool(self.created or self.updated)
 
 
 def _write_json(path: Path, data: dict[str, Any]) -> None:
-    path.write_text(
-        json.dumps(data, indent=2, ensure_ascii=False) + "\n",
-        encoding="utf-8",
-    )
+    wsi.write_text_atomic(path, research_store.dump_json_text(data))
 
 
-def _strip_backticks(s: str) -> str:
-    x = s.strip()
-    if len(x) >= 2 and x[0] == "`" and x[-1] == "`":
-        return x[1:-1]
-    return x
-
-
-def _is_placeholder(s: str) -> bool:
-    x = s.strip()
-    if not x:
-        return True
-    if x in {"…", "...", "...", "......"}:
-        return True
-    if x.lower() in {"tbd", "todo"}:
-        return True
-    if "<paper_id>" in x or "<file>" in x:
-        return True
-    # Also treat any "..." / "…" suffix as placeholder, e.g. "claim-1: ...".
-    if x.endswith(("...", "......", "…", "...")):
-        return True
-    return "…" in x
-
-
-def _parse_json_list(value: str) -> list[Any] | None:
-    v = _strip_backticks(value).strip()
-    if not v.startswith("["):
-        return None
-    try:
-        out = json.loads(v)
-    except json.JSONDecodeError:
-        return None
-    return out if isinstance(out, list) else None
-
-
-def _default_entry(paper_id: str) -> dict[str, Any]:
-    return {
-        "paper_id": paper_id,
-        "title": "",
-        "year": 0,
-        "authors": [],
-        "tags": [],
-        "pdf_path": "",
-        "url": "",
-        "code_url": "",
-        "problem": "",
-        "method": "",
-        "key_claims": [],
-        "limitations": [],
-        "open_questions": [],
-        "what_we_can_reuse": [],
-        "hypotheses": [],
-        "used_in_tasks": [],
-        "followed": [],
-    }
-
-
-def _iter_paper_entries(entries: list[Any] | Any) -> list[dict[str, Any]]:
-    out: list[dict[str, Any]] = []
-    if not isinstance(entries, list):
-        return out
-    for e in entries:
-        if not isinstance(e, dict):
-            continue
-        out.append(e)
-        out.extend(_iter_paper_entries(e.get("followed", [])))
-    return out
+def _same_value(a: Any, b: Any) -> bool:
+    # `1 == 1.0 == True`, but they serialize differently.
+    return type(a) is type(b) and a == b
+
+
+def _format_value(v: Any) -> str:
+    return "<missing>" if v is _MISSING else json.dumps(v, ensure_ascii=False)
 
 
 def parse_paper_note(path: Path) -> dict[str, Any]:
@@ -128,94 +86,135 @@ def parse_paper_note(path: Path) -> dict[str, Any]:
     Returns:
         A dict that follows `.codex/templates/paper_entry.json` (extended fields).
     """
-    paper_id = path.stem.strip()
-    entry: dict[str, Any] = _default_entry(paper_id)
-
-    lines = path.read_text(encoding="utf-8").splitlines()
-
-    in_meta = False
-    current_label: str | None = None
-
-    buckets: dict[str, list[str]] = {
-        "Problem": [],
-        "Method": [],
-        "Key claims": [],
-        "Limitations": [],
-        "Open questions": [],
-        "What we can reuse": [],
-        "Hypotheses we can test": [],
-    }
-
-    for raw in lines:
-        line = raw.rstrip()
-        if line.startswith("## "):
-            heading = line[3:].strip()
-            heading = re.sub(r"^\d+\.\s+", "", heading).strip()
-            label = heading.split("(", 1)[0].strip()
-
-            in_meta = label == "Meta"
-            current_label = label if label in buckets else None
+    return notes.LOADER.note(path).entry
+
+
+def merge_notes(
+    note_paths: list[Path],
+    research_entries: list[Any],
+    by_paper_id: dict[str, dict[str, Any]],
+    update_existing: bool,
+    create_missing: bool,
+) -> MergeResult:
+    """Merges parsed notes into research entries (in place).
+
+    Args:
+        note_paths: Note files to parse, in processing order.
+        research_entries: The top-level `research` list (new entries are appended).
+        by_paper_id: paper_id -> entry, including nested `followed` entries.
+        update_existing: Update entries that already exist.
+        create_missing: Append entries for notes without one.
+
+    Returns:
+        Created, updated (at least one field differs) and unchanged paper_ids,
+        plus the per-key diff of each updated entry.
+    """
+    result = MergeResult()
+    for path in note_paths:
+        if path.name == ".gitkeep":
             continue
+        paper_id = path.stem.strip()
 
-        if in_meta:
-            m = META_LINE_RE.match(line.strip())
-            if not m:
+        parsed = parse_paper_note(path)
+        if paper_id in by_paper_id:
+            if not update_existing:
                 continue
-            key = m.group("key").strip()
-            value = m.group("value").strip()
-            if _is_placeholder(value):
+            dst = by_paper_id[paper_id]
+            # Update only known fields, keep any extra keys. Notes never carry
+            # `followed`, so the nested entries are kept as well.
+            diff = [
+                (k, dst.get(k, _MISSING), v)
+                for k, v in parsed.items()
+                if k not in {"paper_id", "followed"} and not _same_value(dst.get(k, _MISSING), v)
+            ]
+            if not diff:
+                result.unchanged.append(paper_id)
                 continue
-
-            if key in {"authors", "tags", "used_in_tasks"}:
-                parsed = _parse_json_list(value)
-                if parsed is not None:
-                    entry[key] = parsed
-                else:
-                    # Fallback: comma-separated string.
-                    entry[key] = [
-                        x.strip()
-                        for x in _strip_backticks(value).split(",")
-                        if x.strip()
-                    ]
+            for k, _, v in diff:
+                dst[k] = v
+            result.updated.append(paper_id)
+            result.diffs[paper_id] = diff
+        else:
+            if not create_missing:
                 continue
+            research_entries.append(parsed)
+            by_paper_id[paper_id] = parsed
+            result.created.append(paper_id)
+    return result
 
-            if key == "year":
-                try:
-                    entry["year"] = int(_strip_backticks(value))
-                except ValueError:
-                    pass
-                continue
 
-            if key in {"pdf_path"}:
-                entry["pdf_path"] = _strip_backticks(value)
-                continue
+def load_merge_targets(
+    index: wsi.WorkspaceIndex,
+    note_paths: list[Path],
+) -> tuple[list[Any], dict[str, dict[str, Any]]]:
+    """The `research_entries` and `by_paper_id` arguments of `merge_notes`.
 
-            if key in {"paper_id", "title", "url", "code_url"}:
-                entry[key] = _strip_backticks(value)
-                continue
+    With a sharded store only the notes' own shards are read (O(notes), not
+    O(registry)), and `research_entries` is a fresh list for created entries.
+    """
+    store = index.store
+    if store is None:
+        return index.research.get("research", []), dict(index.papers)
+    by_paper_id: dict[str, dict[str, Any]] = {}
+    for path in note_paths:
+        paper_id = path.stem.strip()
+        if store.has_entry(paper_id):
+            by_paper_id[paper_id] = store.read_entry(paper_id)
+    return [], by_paper_id
 
-            # Unknown meta keys are ignored on purpose.
-            continue
 
-        if current_label and line.lstrip().startswith("- "):
-            item = line.lstrip()[2:].strip()
-            if _is_placeholder(item):
-                continue
-            if current_label in buckets:
-                buckets[current_label].append(item)
+def write_merge_result(
+    index: wsi.WorkspaceIndex,
+    result: MergeResult,
+    research_entries: list[Any],
+    by_paper_id: dict[str, dict[str, Any]],
+) -> list[Path]:
+    """Writes what `merge_notes` changed and drops the stale index sources.
 
-    if buckets["Problem"]:
-        entry["problem"] = "\n".join(buckets["Problem"])
-    if buckets["Method"]:
-        entry["method"] = "\n".join(buckets["Method"])
+    Args:
+        index: The index `load_merge_targets` read from.
+        result: The merge result (nothing is written if unchanged).
+        research_entries: The list passed to `merge_notes`.
+        by_paper_id: The map passed to `merge_notes`.
 
-    entry["key_claims"] = buckets["Key claims"]
-    entry["limitations"] = buckets["Limitations"]
-    entry["open_questions"] = buckets["Open questions"]
-    entry["what_we_can_reuse"] = buckets["What we can reuse"]
-    entry["hypotheses"] = buckets["Hypotheses we can test"]
+    Returns:
+        The written files: research.json, or the changed shards (plus the
+        store manifest if entries were created).
 
-    return entry
+    Raises:
+        ValueError: If a new note's paper_id cannot name its shard (sharded
+            registry only; nothing is written then).
+    """
+    if not result.changed:
+        return []
+    store = index.store
+    if store is None:
+        data = index.research
+        data["research"] = research_entries
+        _write_json(index.research_json, data)
+        # `data` is what was written: only the maps built from it are stale.
+        index.invalidate("papers")
+        return [index.research_json]
+
+    # A shard is named after its paper_id: a note whose meta block declares
+    # another id would overwrite that paper's shard (check before writing).
+    for paper_id in result.created:
+        declared = str(by_paper_id[paper_id].get("paper_id", "")).strip()
+        if declared != paper_id:
+            raise ValueError(f"note {paper_id}.md declares paper_id {declared}; fix it before md2json")
+        store.shard_path(paper_id)
+
+    written: list[Path] = []
+    for paper_id in result.updated:
+        store.write_entry(by_paper_id[paper_id])
+        written.append(store.shard_path(paper_id))
+    for paper_id in result.created:
+        store.add_entry(by_paper_id[paper_id])
+        written.append(store.shard_path(paper_id))
+    if result.created:
+        written.append(store.manifest_path)
+    index.invalidate("research")
+    return written
 
 
 def main() -> int:
@@ -253,68 +252,69 @@ def main() -> int:
         action="store_true",
         help="Do not write research.json; only print planned changes.",
     )
+    p.add_argument(
+        "--export",
+        action="store_true",
+        help="Sharded registry only: also refresh the monolithic research.json.",
+    )
+    p.add_argument(
+        "--no-parse-cache",
+        action="store_true",
+        help="Parse every note instead of reusing data/cache/parse results.",
+    )
     args = p.parse_args()
 
     if not args.update_existing and not args.create_missing:
         raise ValueError("need at least one of: --update-existing, --create-missing")
+    if not args.no_parse_cache:
+        notes.LOADER.parse_cache = parse_cache.ParseCache()
 
-    data = _load_json(args.research_json)
-    research_entries = data.get("research", [])
-    if not isinstance(research_entries, list):
-        raise ValueError(f"`research` must be a list in {args.research_json}")
-
-    by_paper_id: dict[str, dict[str, Any]] = {}
-    for e in _iter_paper_entries(research_entries):
-        pid = str(e.get("paper_id", "")).strip()
-        if pid:
-            by_paper_id[pid] = e
-
+    index = wsi.get_index(research_json=args.research_json)
     wanted = set(args.paper_id or [])
     note_paths = sorted(args.notes_dir.glob("*.md"), key=lambda x: x.name.lower())
-
-    planned_updates: list[str] = []
-    planned_creates: list[str] = []
-
-    for path in note_paths:
-        if path.name == ".gitkeep":
-            continue
-        paper_id = path.stem.strip()
-        if wanted and paper_id not in wanted:
-            continue
-
-        parsed = parse_paper_note(path)
-        if paper_id in by_paper_id:
-            if not args.update_existing:
-                continue
-            dst = by_paper_id[paper_id]
-            # Update only known fields, keep any extra keys.
-            for k, v in parsed.items():
-                if k == "paper_id":
-                    continue
-                dst[k] = v
-            planned_updates.append(paper_id)
-        else:
-            if not args.create_missing:
-                continue
-            research_entries.append(parsed)
-            by_paper_id[paper_id] = parsed
-            planned_creates.append(paper_id)
+    note_paths = [x for x in note_paths if not wanted or x.stem.strip() in wanted]
+    research_entries, by_paper_id = load_merge_targets(index, note_paths)
+
+    result = merge_notes(
+        note_paths,
+        research_entries,
+        by_paper_id,
+        update_existing=args.update_existing,
+        create_missing=args.create_missing,
+    )
+    if notes.LOADER.parse_cache is not None:
+        notes.LOADER.parse_cache.close()
 
     if args.dry_run:
-        if planned_creates:
+        if result.created:
             print("create:")
-            for pid in planned_creates:
+            for pid in result.created:
                 print(f"- {pid}")
-        if planned_updates:
+        if result.updated:
             print("update:")
-            for pid in planned_updates:
+            for pid in result.updated:
                 print(f"- {pid}")
+                for k, old, new in result.diffs[pid]:
+                    print(f"  - {k}: {_format_value(old)} -> {_format_value(new)}")
+        print(f"unchanged: {len(result.unchanged)}")
         print("dry-run: no files written.")
         return 0
 
-    data["research"] = research_entries
-    _write_json(args.research_json, data)
-    print(f"done: created={len(planned_creates)}, updated={len(planned_updates)}")
+    counts = (
+        f"created={len(result.created)}, updated={len(result.updated)}, "
+        f"unchanged={len(result.unchanged)}"
+    )
+    store = index.store
+    if not result.changed:
+        note = "no shard written" if store is not None else "research.json not written"
+        print(f"done: {counts} ({note})")
+    else:
+        written = write_merge_result(index, result, research_entries, by_paper_id)
+        shards = f" ({len(written)} file(s) in research.d)" if store is not None else ""
+        print(f"done: {counts}{shards}")
+    if store is not None and args.export:
+        state = "written" if store.export(args.research_json) else "unchanged"
+        print(f"export: {wsi.relpath_str(args.research_json)} {state}")
     return 0
 
 
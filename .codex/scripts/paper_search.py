@@ -0,0 +1,581 @@
+#!/usr/bin/env python3
+from __future__ import annotations
+
+"""Full-text search over research.json entries and paper notes (SQLite FTS5).
+
+The index lives in `data/cache/paper_search.sqlite` and holds, per paper_id:
+title, authors, tags, problem, method, key_claims and hypotheses from the
+registry, plus the translated note sections (Abstract, Introduction,
+Methodology, Experiments; template boilerplate lines are skipped). Results are
+ranked with BM25 (title and tags weigh most), and `--year` / `--tag` filter
+them.
+
+Before each query the index is brought up to date from file fingerprints
+(size, mtime_ns, inode): an unchanged research.json, shard or note is only
+stat-ed, and only entries whose indexed fields changed are rewritten.
+
+Query syntax: whitespace-separated terms must all match; `term*` is a prefix
+match and `title:term` (any indexed field, or `note:`) limits a term to one
+field. Chinese text is indexed per character, so `深度学习` matches as a phrase.
+
+Usage:
+  python .codex/scripts/paper_search.py diffusion operator
+  python .codex/scripts/paper_search.py "title:transformer" --year 2020-2023 --tag pde
+  python .codex/scripts/paper_search.py 物理 --facets --format jsonl
+  python .codex/scripts/paper_search.py --tag pde --limit 100
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import sys
+import time
+from dataclasses import asdict, dataclass
+from functools import cached_property
+from pathlib import Path
+from typing import Any
+
+import note_document as notes
+import research_store
+import workspace_index as wsi
+
+
+ROOT = wsi.ROOT
+
+DB_PATH = ROOT / "data" / "cache" / "paper_search.sqlite"
+# Bump when the schema or the indexed text changes (the index is rebuilt).
+INDEX_VERSION = 1
+
+# FTS columns and their BM25 weights.
+COLUMNS = ["title", "authors", "tags", "problem", "method", "key_claims", "hypotheses", "note"]
+WEIGHTS = [10.0, 3.0, 5.0, 2.0, 2.0, 2.0, 1.5, 1.0]
+_BM25_WEIGHTS = ", ".join(map(str, WEIGHTS))
+NOTE_SECTIONS = {"Abstract", "Introduction", "Methodology", "Experiments"}
+
+# Kana, CJK ideographs (+ extension A, compatibility) and Hangul syllables.
+_CJK = r"\u3040-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uac00-\ud7af\uf900-\ufaff"
+_CJK_RE = re.compile(f"([{_CJK}])")
+# For display only: also join full-width punctuation and adjacent highlights.
+_CJK_WIDE = _CJK + r"\u3000-\u303f\uff00-\uffef"
+_CJK_GAP_RE = re.compile(f"(?<=[{_CJK_WIDE}]) +(?=[{_CJK_WIDE}])")
+_CJK_MARK_RE = re.compile(f"(?<=[{_CJK}])\\] +\\[(?=[{_CJK}])")
+
+SCHEMA = [
+    "CREATE TABLE meta (key TEXT PRIMARY KEY, value TEXT NOT NULL)",
+    "CREATE TABLE sources (path TEXT PRIMARY KEY, fp TEXT NOT NULL)",
+    "CREATE TABLE papers ("
+    " id INTEGER PRIMARY KEY, paper_id TEXT NOT NULL UNIQUE, year INTEGER,"
+    " title TEXT NOT NULL, digest TEXT NOT NULL)",
+    "CREATE INDEX papers_year ON papers (year)",
+    "CREATE TABLE paper_tags ("
+    " tag TEXT NOT NULL COLLATE NOCASE, paper INTEGER NOT NULL, PRIMARY KEY (tag, paper))"
+    " WITHOUT ROWID",
+    "CREATE INDEX paper_tags_paper ON paper_tags (paper)",
+    f"CREATE VIRTUAL TABLE docs USING fts5({', '.join(COLUMNS)}, tokenize='unicode61 remove_diacritics 2', prefix='2 3')",
+]
+
+
+@dataclass
+class UpdateStats:
+    """What one `SearchIndex.update()` changed."""
+
+    papers_added: int = 0
+    papers_updated: int = 0
+    papers_removed: int = 0
+    notes_updated: int = 0
+    notes_removed: int = 0
+    files_checked: int = 0
+    wall_s: float = 0.0
+
+    def summary(self) -> str:
+        return (
+            f"papers +{self.papers_added} ~{self.papers_updated} -{self.papers_removed}, "
+            f"notes ~{self.notes_updated} -{self.notes_removed}, "
+            f"{self.files_checked} file(s) checked in {self.wall_s * 1000:.0f} ms"
+        )
+
+
+@dataclass
+class Hit:
+    """One search result (`score`: BM25, lower is better; 0 without a query)."""
+
+    paper_id: str
+    year: int | None
+    title: str
+    score: float
+    snippet: str
+
+
+def _fingerprint(path: Path | str) -> str | None:
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return f"{st.st_size}:{st.st_mtime_ns}:{st.st_ino}"
+
+
+def _split_cjk(text: str) -> str:
+    # unicode61 treats a run of CJK characters as one token; one token per
+    # character makes any Chinese substring searchable as a phrase.
+    return _CJK_RE.sub(r" \1 ", text)
+
+
+def _join_cjk(text: str) -> str:
+    # Undoes `_split_cjk` for display (snippets).
+    return " ".join(_CJK_GAP_RE.sub("", _CJK_MARK_RE.sub("", text)).split())
+
+
+def _as_text(value: Any) -> str:
+    if value is None:
+        return ""
+    if isinstance(value, list):
+        return "\n".join(_as_text(v) for v in value)
+    if isinstance(value, dict):
+        return json.dumps(value, ensure_ascii=False)
+    return str(value)
+
+
+def _entry_fields(entry: dict[str, Any]) -> tuple[int | None, list[str], dict[str, str]]:
+    year = entry.get("year")
+    tags = entry.get("tags")
+    fields = {k: _as_text(entry.get(k)) for k in COLUMNS if k != "note"}
+    return (
+        year if isinstance(year, int) and not isinstance(year, bool) and year > 0 else None,
+        [str(t).strip() for t in tags if str(t).strip()] if isinstance(tags, list) else [],
+        fields,
+    )
+
+
+def _digest(year: int | None, tags: list[str], fields: dict[str, str]) -> str:
+    raw = json.dumps([year, tags, fields], sort_keys=True, ensure_ascii=False)
+    return hashlib.blake2b(raw.encode("utf-8"), digest_size=16).hexdigest()
+
+
+def note_text(text: str, boilerplate: set[str]) -> str:
+    """The translated sections of a paper note, without template lines.
+
+    Args:
+        text: The note markdown.
+        boilerplate: Stripped lines of `.codex/templates/paper_note.md`.
+    """
+    out: list[str] = []
+    keep = False
+    for raw in text.splitlines():
+        line = raw.strip()
+        if line.startswith("## "):
+            keep = notes.heading_label(line) in NOTE_SECTIONS
+            continue
+        if keep and line and line not in boilerplate:
+            out.append(line)
+    return "\n".join(out)
+
+
+def build_match(query: str) -> str:
+    """Turns the CLI query syntax (see the module docstring) into FTS5 MATCH.
+
+    Every term becomes a quoted phrase, so FTS5 operators in user input are
+    matched literally instead of being interpreted.
+    """
+    parts: list[str] = []
+    for term in query.split():
+        column = ""
+        if ":" in term:
+            head, rest = term.split(":", 1)
+            if head in COLUMNS and rest:
+                column, term = head, rest
+        prefix = term.endswith("*") and term.strip("*") != ""
+        word = _split_cjk(term.rstrip("*") if prefix else term).strip()
+        if not word:
+            continue
+        phrase = '"' + word.replace('"', '""') + '"' + (" *" if prefix else "")
+        parts.append(f"{column} : {phrase}" if column else phrase)
+    return " AND ".join(parts)
+
+
+def parse_years(value: str) -> tuple[int, int]:
+    """`2021`, `2018-2021`, `2018-` or `-2021` -> inclusive (min, max)."""
+    m = re.match(r"^\s*(\d{4})?\s*(-)?\s*(\d{4})?\s*$", value)
+    if not m or not (m.group(1) or m.group(3)):
+        raise argparse.ArgumentTypeError(f"invalid year or range: {value!r}")
+    lo = int(m.group(1)) if m.group(1) else 0
+    hi = int(m.group(3)) if m.group(3) else (9999 if m.group(2) else lo)
+    return lo, hi
+
+
+class SearchIndex:
+    """The SQLite FTS5 index (one connection; `update()` then `search()`)."""
+
+    def __init__(self, db_path: Path, research_json: Path, notes_dir: Path) -> None:
+        self.db_path = db_path
+        self.research_json = research_json
+        self.notes_dir = notes_dir
+        db_path.parent.mkdir(parents=True, exist_ok=True)
+        self.conn = sqlite3.connect(db_path)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+
+    def close(self) -> None:
+        self.conn.close()
+
+    # Schema
+
+    def _context(self, mode: str) -> str:
+        return json.dumps(
+            {
+                "version": INDEX_VERSION,
+                "research_json": os.path.abspath(self.research_json),
+                "notes_dir": os.path.abspath(self.notes_dir),
+                "mode": mode,
+            },
+            sort_keys=True,
+        )
+
+    def _ensure_schema(self, mode: str) -> None:
+        # A different version, input path or registry layout rebuilds everything.
+        context = self._context(mode)
+        try:
+            row = self.conn.execute("SELECT value FROM meta WHERE key = 'context'").fetchone()
+        except sqlite3.OperationalError:
+            row = None
+        if row and row[0] == context:
+            return
+        self.reset()
+        self.conn.execute("INSERT INTO meta (key, value) VALUES ('context', ?)", (context,))
+
+    def reset(self) -> None:
+        """Drops all tables and recreates an empty index."""
+        with self.conn:
+            names = self.conn.execute(
+                "SELECT name FROM sqlite_master WHERE type = 'table' AND name IN "
+                "('meta', 'sources', 'papers', 'paper_tags', 'docs')"
+            ).fetchall()
+            for (name,) in names:
+                self.conn.execute(f"DROP TABLE IF EXISTS {name}")
+            try:
+                for stmt in SCHEMA:
+                    self.conn.execute(stmt)
+            except sqlite3.OperationalError as e:
+                if "fts5" in str(e):
+                    raise RuntimeError(f"this Python's sqlite3 has no FTS5 support ({e})") from e
+                raise
+
+    # Update
+
+    def update(self, index: wsi.WorkspaceIndex) -> UpdateStats:
+        """Re-indexes changed notes and registry entries (one transaction)."""
+        t0 = time.perf_counter()
+        stats = UpdateStats()
+        store = index.store
+        with self.conn:
+            self._ensure_schema("store" if store is not None else "json")
+            self._update_notes(stats)
+            if store is None:
+                self._update_research_json(index, stats)
+            else:
+                self._update_store(store, stats)
+        stats.wall_s = time.perf_counter() - t0
+        return stats
+
+    def _changed_sources(
+        self,
+        paths: list[str],
+        prefix: str,
+        stats: UpdateStats,
+    ) -> tuple[dict[str, str], list[str]]:
+        # (path -> new fingerprint for changed files, indexed paths under
+        # `prefix` that disappeared)
+        known = dict(
+            self.conn.execute(
+                "SELECT path, fp FROM sources WHERE path >= ? AND path < ?",
+                (prefix, prefix + "\U0010ffff"),
+            )
+        )
+        changed: dict[str, str] = {}
+        for path in paths:
+            fp = _fingerprint(path)
+            stats.files_checked += 1
+            if fp is not None and known.pop(path, None) != fp:
+                changed[path] = fp
+        return changed, sorted(known)
+
+    def _set_sources(self, changed: dict[str, str], removed: list[str]) -> None:
+        self.conn.executemany(
+            "INSERT INTO sources (path, fp) VALUES (?, ?) "
+            "ON CONFLICT (path) DO UPDATE SET fp = excluded.fp",
+            changed.items(),
+        )
+        self.conn.executemany("DELETE FROM sources WHERE path = ?", ((p,) for p in removed))
+
+    def _update_notes(self, stats: UpdateStats) -> None:
+        prefix = os.path.join(os.path.abspath(self.notes_dir), "")
+        paths: list[str] = []
+        if self.notes_dir.is_dir():
+            with os.scandir(self.notes_dir) as it:
+                paths = [prefix + e.name for e in it if e.name.endswith(".md") and e.is_file()]
+        changed, removed = self._changed_sources(paths, prefix, stats)
+        if not changed and not removed:
+            return
+        for path in sorted(changed):
+            self._set_note(Path(path).stem.strip(), self._read_note(Path(path)))
+            stats.notes_updated += 1
+        for path in removed:
+            self._set_note(Path(path).stem.strip(), "")
+            stats.notes_removed += 1
+        self._set_sources(changed, removed)
+
+    @cached_property
+    def _boilerplate(self) -> set[str]:
+        template = wsi.TEMPLATES_DIR / "paper_note.md"
+        return {ln.strip() for ln in template.read_text(encoding="utf-8").splitlines()}
+
+    def _read_note(self, path: Path) -> str:
+        # The note text is not stored outside the FTS table: a paper that is
+        # (re)inserted reads its note file again.
+        try:
+            return note_text(notes.LOADER.read_text(path), self._boilerplate)
+        except FileNotFoundError:
+            return ""
+
+    def _set_note(self, paper_id: str, text: str) -> None:
+        row = self.conn.execute("SELECT id FROM papers WHERE paper_id = ?", (paper_id,)).fetchone()
+        if row:
+            self.conn.execute("UPDATE docs SET note = ? WHERE rowid = ?", (_split_cjk(text), row[0]))
+
+    def _update_research_json(self, index: wsi.WorkspaceIndex, stats: UpdateStats) -> None:
+        path = os.path.abspath(self.research_json)
+        changed, _ = self._changed_sources([path], path, stats)
+        if not changed:
+            return
+        # Streamed, one entry at a time; a later duplicate paper_id overwrites
+        # the earlier one, like `WorkspaceIndex.papers`.
+        seen: set[str] = set()
+        for e, _ in index.iter_entries():
+            paper_id = str(e.get("paper_id", "")).strip()
+            if paper_id:
+                self._upsert_paper(paper_id, e, stats)
+                seen.add(paper_id)
+        gone = [pid for (pid,) in self.conn.execute("SELECT paper_id FROM papers") if pid not in seen]
+        self._remove_papers(gone, stats)
+        self._set_sources(changed, [])
+
+    def _update_store(self, store: research_store.ResearchStore, stats: UpdateStats) -> None:
+        prefix = os.path.join(os.path.abspath(store.root), "")
+        with os.scandir(store.root) as it:
+            paths = [prefix + e.name for e in it if e.name.endswith(".json") and e.is_file()]
+        changed, removed = self._changed_sources(paths, prefix, stats)
+        # One shard per entry: only changed shards are read.
+        for path in sorted(changed):
+            paper_id = Path(path).stem
+            self._upsert_paper(paper_id, store.read_entry(paper_id), stats)
+        self._remove_papers([Path(p).stem for p in removed], stats)
+        self._set_sources(changed, removed)
+
+    def _upsert_paper(self, paper_id: str, entry: dict[str, Any], stats: UpdateStats) -> None:
+        year, tags, fields = _entry_fields(entry)
+        digest = _digest(year, tags, fields)
+        row = self.conn.execute("SELECT id, digest FROM papers WHERE paper_id = ?", (paper_id,)).fetchone()
+        if row and row[1] == digest:
+            return
+        values = [_split_cjk(fields[k]) for k in COLUMNS if k != "note"]
+        if row:
+            rowid = row[0]
+            self.conn.execute(
+                "UPDATE papers SET year = ?, title = ?, digest = ? WHERE id = ?",
+                (year, fields["title"], digest, rowid),
+            )
+            sets = ", ".join(f"{k} = ?" for k in COLUMNS if k != "note")
+            self.conn.execute(f"UPDATE docs SET {sets} WHERE rowid = ?", (*values, rowid))
+            self.conn.execute("DELETE FROM paper_tags WHERE paper = ?", (rowid,))
+            stats.papers_updated += 1
+        else:
+            cur = self.conn.execute(
+                "INSERT INTO papers (paper_id, year, title, digest) VALUES (?, ?, ?, ?)",
+                (paper_id, year, fields["title"], digest),
+            )
+            rowid = cur.lastrowid
+            note = self._read_note(self.notes_dir / f"{paper_id}.md")
+            self.conn.execute(
+                f"INSERT INTO docs (rowid, {', '.join(COLUMNS)}) "
+                f"VALUES (?, {', '.join('?' * len(COLUMNS))})",
+                (rowid, *values, _split_cjk(note)),
+            )
+            stats.papers_added += 1
+        self.conn.executemany(
+            "INSERT OR IGNORE INTO paper_tags (tag, paper) VALUES (?, ?)", ((t, rowid) for t in tags)
+        )
+
+    def _remove_papers(self, paper_ids: list[str], stats: UpdateStats) -> None:
+        for paper_id in paper_ids:
+            row = self.conn.execute("SELECT id FROM papers WHERE paper_id = ?", (paper_id,)).fetchone()
+            if not row:
+                continue
+            self.conn.execute("DELETE FROM docs WHERE rowid = ?", (row[0],))
+            self.conn.execute("DELETE FROM paper_tags WHERE paper = ?", (row[0],))
+            self.conn.execute("DELETE FROM papers WHERE id = ?", (row[0],))
+            stats.papers_removed += 1
+
+    # Query
+
+    def _where(self, match: str, years: tuple[int, int] | None, tags: list[str]) -> tuple[str, list[Any]]:
+        clauses: list[str] = []
+        params: list[Any] = []
+        if match:
+            clauses.append("docs MATCH ?")
+            params.append(match)
+        if years is not None:
+            clauses.append("p.year BETWEEN ? AND ?")
+            params.extend(years)
+        for tag in tags:
+            clauses.append("p.id IN (SELECT paper FROM paper_tags WHERE tag = ?)")
+            params.append(tag)
+        return (" WHERE " + " AND ".join(clauses)) if clauses else "", params
+
+    def search(
+        self,
+        query: str,
+        years: tuple[int, int] | None = None,
+        tags: list[str] | None = None,
+        limit: int = 20,
+    ) -> list[Hit]:
+        """Best `limit` hits by BM25 (by paper_id if the query is empty)."""
+        match = build_match(query)
+        where, params = self._where(match, years, tags or [])
+        if not match:
+            rows = self.conn.execute(
+                f"SELECT p.paper_id, p.year, p.title FROM papers p{where} ORDER BY p.paper_id LIMIT ?",
+                (*params, limit),
+            ).fetchall()
+            return [Hit(pid, year, title, 0.0, "") for pid, year, title in rows]
+
+        # Rank first, then fetch titles and snippets for the best rows only.
+        # bm25() rather than FTS5's `rank`: with --year/--tag, SQLite then only
+        # scores rows that pass the filters (the join is skipped without them).
+        source = "docs" if years is None and not tags else "docs JOIN papers p ON p.id = docs.rowid"
+        top = self.conn.execute(
+            f"SELECT docs.rowid, bm25(docs, {_BM25_WEIGHTS}) AS score FROM {source}{where} "
+            "ORDER BY score LIMIT ?",
+            (*params, limit),
+        ).fetchall()
+        hits: list[Hit] = []
+        for rowid, score in top:
+            pid, year, title, snip = self.conn.execute(
+                "SELECT p.paper_id, p.year, p.title, snippet(docs, -1, '[', ']', '…', 16) "
+                "FROM docs JOIN papers p ON p.id = docs.rowid WHERE docs MATCH ? AND docs.rowid = ?",
+                (match, rowid),
+            ).fetchone()
+            hits.append(Hit(pid, year, title, score, _join_cjk(snip)))
+        return hits
+
+    def facets(
+        self,
+        query: str,
+        years: tuple[int, int] | None = None,
+        tags: list[str] | None = None,
+        top_tags: int = 20,
+    ) -> dict[str, list[tuple[Any, int]]]:
+        """Hit counts per year and for the most frequent tags among all hits."""
+        match = build_match(query)
+        where, params = self._where(match, years, tags or [])
+        source = "docs JOIN papers p ON p.id = docs.rowid" if match else "papers p"
+        hits = f"SELECT p.id AS id, p.year AS year FROM {source}{where}"
+        by_year = self.conn.execute(
+            f"WITH hits AS ({hits}) SELECT year, COUNT(*) FROM hits GROUP BY year ORDER BY year",
+            params,
+        ).fetchall()
+        by_tag = self.conn.execute(
+            f"WITH hits AS ({hits}) SELECT t.tag, COUNT(*) AS n FROM paper_tags t "
+            "JOIN hits ON hits.id = t.paper GROUP BY t.tag ORDER BY n DESC, t.tag LIMIT ?",
+            (*params, top_tags),
+        ).fetchall()
+        return {"year": by_year, "tag": by_tag}
+
+
+def main() -> int:
+    p = argparse.ArgumentParser()
+    p.add_argument("query", nargs="*", help="Search terms (all must match; see the module docstring).")
+    p.add_argument(
+        "--year",
+        type=parse_years,
+        default=None,
+        help="Only papers from this year or range (2021, 2018-2021, 2018-, -2021).",
+    )
+    p.add_argument(
+        "--tag",
+        action="append",
+        default=[],
+        help="Only papers with this tag (repeatable: all must match; case-insensitive).",
+    )
+    p.add_argument("--limit", type=int, default=20, help="Max results.")
+    p.add_argument("--facets", action="store_true", help="Also print hit counts per year and tag.")
+    p.add_argument(
+        "--format",
+        choices=["text", "jsonl"],
+        default="text",
+        help="text: one line per hit plus a snippet; jsonl: one JSON record per hit.",
+    )
+    p.add_argument(
+        "--no-update",
+        action="store_true",
+        help="Query the index as is (skip the fingerprint check of research.json and notes).",
+    )
+    p.add_argument("--rebuild", action="store_true", help="Drop the index and rebuild it from scratch.")
+    p.add_argument(
+        "--research-json",
+        type=Path,
+        default=ROOT / "0-调研" / "research.json",
+        help="Path to 0-调研/research.json.",
+    )
+    p.add_argument(
+        "--notes-dir",
+        type=Path,
+        default=ROOT / "0-调研" / "notes",
+        help="Directory for notes/<paper_id>.md.",
+    )
+    p.add_argument("--db", type=Path, default=DB_PATH, help="SQLite index path.")
+    args = p.parse_args()
+
+    search = SearchIndex(args.db, args.research_json, args.notes_dir)
+    try:
+        if args.rebuild:
+            search.reset()
+        stats: UpdateStats | None = None
+        if not args.no_update:
+            index = wsi.get_index(research_json=args.research_json, stream=True)
+            stats = search.update(index)
+
+        query = " ".join(args.query)
+        t0 = time.perf_counter()
+        hits = search.search(query, args.year, args.tag, args.limit)
+        facets = search.facets(query, args.year, args.tag) if args.facets else None
+        query_ms = (time.perf_counter() - t0) * 1000
+    finally:
+        search.close()
+
+    if args.format == "jsonl":
+        for hit in hits:
+            print(json.dumps({"type": "hit", **asdict(hit)}, ensure_ascii=False))
+        if facets is not None:
+            for name, counts in facets.items():
+                for value, n in counts:
+                    print(json.dumps({"type": "facet", "facet": name, "value": value, "count": n}, ensure_ascii=False))
+        return 0
+
+    for hit in hits:
+        year = hit.year if hit.year is not None else "----"
+        print(f"{hit.paper_id}  {year}  {hit.title}")
+        if hit.snippet:
+            print(f"    {hit.snippet}")
+    if facets is not None:
+        print("year: " + ", ".join(f"{y if y is not None else '?'}={n}" for y, n in facets["year"]))
+        print("tag: " + ", ".join(f"{t}={n}" for t, n in facets["tag"]))
+    print(f"{len(hits)} hit(s) in {query_ms:.1f} ms", file=sys.stderr)
+    if stats is not None:
+        print(f"index: {stats.summary()}", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,255 @@
+#!/usr/bin/env python3
+from __future__ import annotations
+
+"""On-disk cache of parsed markdown (paper notes, task.md), keyed by content.
+
+`DocumentLoader.parse` (see `note_document.py`) reads a file, hashes its bytes
+(blake2b) and looks the digest up here together with a parser id such as
+`note/1:<paper_id>` or `task_md/1`; only a miss decodes and parses the file.
+Bumping a parser's version in its id makes every older result unreachable.
+
+The cache is one SQLite file, `data/cache/parse/parse.sqlite`, holding each
+result in `marshal` form (compact, and much faster to load than JSON). The
+LRU clock is the number of runs that wrote to the cache: a process works with
+the stored clock + 1 and saves it only when it writes. A hit re-stamps its row
+with it once the old stamp is `STAMP_EVERY` ticks behind, so back-to-back warm
+runs write nothing (the database file is opened and read only), and when the
+stored results exceed `max_bytes` the least recently used rows are evicted
+down to 80% of the cap. New results, stamps and the clock are buffered and
+written by `flush()` (or `close()`), in one transaction.
+
+Scripts that share it: `audit_stage0.py`, `paper_md2json.py` and
+`task_md2json.py` (each has `--no-parse-cache`). Hit/miss counts are in the
+loader's `--io-stats` line and in `stats` below.
+
+Usage:
+  python .codex/scripts/parse_cache.py stats
+  python .codex/scripts/parse_cache.py clear
+"""
+
+import argparse
+import hashlib
+import marshal
+import sqlite3
+import sys
+import threading
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Any
+
+import workspace_index as wsi
+
+
+ROOT = wsi.ROOT
+
+CACHE_DIR = ROOT / "data" / "cache" / "parse"
+DB_NAME = "parse.sqlite"
+MAX_BYTES = 256 * 1024 * 1024
+# LRU stamps are refreshed at most once per this many clock ticks (writing runs).
+STAMP_EVERY = 32
+# marshal data is only guaranteed to load on the Python version that wrote it.
+FORMAT = f"marshal-{marshal.version}-py{sys.version_info[0]}.{sys.version_info[1]}"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL);
+CREATE TABLE IF NOT EXISTS results (
+    digest BLOB NOT NULL,
+    parser TEXT NOT NULL,
+    value BLOB NOT NULL,
+    used INTEGER NOT NULL,
+    PRIMARY KEY (digest, parser)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS results_used ON results (used);
+"""
+
+# Returned by `ParseCache.get` on a miss (None is a valid cached value).
+MISSING = object()
+
+
+@dataclass
+class CacheStats:
+    """Counters of one `ParseCache` (this process only)."""
+
+    hits: int = 0
+    misses: int = 0
+    stored: int = 0
+    evicted: int = 0
+
+    def summary(self) -> str:
+        return ", ".join(f"{k}={v}" for k, v in asdict(self).items())
+
+
+class ParseCache:
+    """Parsed results keyed by (content digest, parser id), with an LRU size cap.
+
+    The database is opened on first use, so a run that parses nothing does
+    not create it. Threads may share an instance (every call holds its lock,
+    which covers only the lookup or the buffering, not the caller's parse);
+    worker processes open their own instance.
+    """
+
+    MISSING = MISSING
+
+    def __init__(self, directory: Path = CACHE_DIR, max_bytes: int = MAX_BYTES) -> None:
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.stats = CacheStats()
+        self._conn: sqlite3.Connection | None = None
+        self._clock = 0
+        self._new: dict[tuple[bytes, str], bytes] = {}
+        self._touched: set[tuple[bytes, str]] = set()
+        self._lock = threading.RLock()
+
+    @property
+    def path(self) -> Path:
+        return self.directory / DB_NAME
+
+    @staticmethod
+    def digest(data: bytes) -> bytes:
+        """The content key: blake2b, 16 bytes."""
+        return hashlib.blake2b(data, digest_size=16).digest()
+
+    def _db(self) -> sqlite3.Connection:
+        if self._conn is not None:
+            return self._conn
+        self.directory.mkdir(parents=True, exist_ok=True)
+        # Calls are serialized by `_lock`, but may come from any thread.
+        conn = sqlite3.connect(self.path, timeout=60, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        with conn:
+            conn.executescript(SCHEMA)
+            meta = dict(conn.execute("SELECT key, value FROM meta"))
+            if meta.get("format") != FORMAT:
+                conn.execute("DELETE FROM results")
+                conn.execute("INSERT OR REPLACE INTO meta VALUES ('format', ?)", (FORMAT,))
+        # Saved by `flush()`, only if this process writes anything.
+        self._clock = int(meta.get("clock", 0)) + 1
+        self._conn = conn
+        return conn
+
+    def get(self, digest: bytes, parser: str) -> Any:
+        """Returns a fresh copy of the cached result, or `MISSING`."""
+        key = (digest, parser)
+        with self._lock:
+            blob = self._new.get(key)
+            if blob is None:
+                row = self._db().execute(
+                    "SELECT value, used FROM results WHERE digest = ? AND parser = ?", key
+                ).fetchone()
+                if row is None:
+                    self.stats.misses += 1
+                    return MISSING
+                blob, used = row
+                if used <= self._clock - STAMP_EVERY:
+                    self._touched.add(key)
+            self.stats.hits += 1
+        return marshal.loads(blob)
+
+    def put(self, digest: bytes, parser: str, value: Any) -> None:
+        """Buffers a result (serialized now, so later mutation does not leak in)."""
+        try:
+            blob = marshal.dumps(value)
+        except ValueError:
+            return  # not marshallable: leave it uncached
+        with self._lock:
+            self._new[(digest, parser)] = blob
+            self._touched.discard((digest, parser))
+
+    def flush(self) -> None:
+        """Writes buffered results and LRU stamps, then evicts over the cap."""
+        with self._lock:
+            self._flush()
+
+    def _flush(self) -> None:
+        if not self._new and not self._touched:
+            return
+        conn = self._db()
+        with conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO results (digest, parser, value, used) VALUES (?, ?, ?, ?)",
+                [(d, p, blob, self._clock) for (d, p), blob in self._new.items()],
+            )
+            conn.executemany(
+                "UPDATE results SET used = ? WHERE digest = ? AND parser = ?",
+                [(self._clock, d, p) for d, p in self._touched],
+            )
+            # Another writer may have saved a later clock meanwhile: keep the max.
+            conn.execute(
+                "INSERT INTO meta VALUES ('clock', ?) ON CONFLICT (key) "
+                "DO UPDATE SET value = MAX(CAST(value AS INTEGER), CAST(excluded.value AS INTEGER))",
+                (str(self._clock),),
+            )
+            self.stats.stored += len(self._new)
+            self._evict(conn)
+        self._new.clear()
+        self._touched.clear()
+
+    def _evict(self, conn: sqlite3.Connection) -> None:
+        total = conn.execute("SELECT COALESCE(SUM(length(value)), 0) FROM results").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        target = self.max_bytes * 0.8
+        doomed: list[tuple[bytes, str]] = []
+        for digest, parser, size in conn.execute(
+            "SELECT digest, parser, length(value) FROM results ORDER BY used"
+        ):
+            if total <= target:
+                break
+            doomed.append((digest, parser))
+            total -= size
+        conn.executemany("DELETE FROM results WHERE digest = ? AND parser = ?", doomed)
+        self.stats.evicted += len(doomed)
+
+    def close(self) -> None:
+        with self._lock:
+            self._flush()
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+    def info(self) -> dict[str, int]:
+        """Row count, stored bytes and clock of the database."""
+        conn = self._db()
+        rows, size = conn.execute("SELECT COUNT(*), COALESCE(SUM(length(value)), 0) FROM results").fetchone()
+        return {"results": rows, "bytes": size, "max_bytes": self.max_bytes, "clock": self._clock}
+
+    def clear(self) -> None:
+        self._new.clear()
+        self._touched.clear()
+        conn = self._db()
+        with conn:
+            conn.execute("DELETE FROM results")
+        conn.execute("VACUUM")
+
+
+def main() -> int:
+    p = argparse.ArgumentParser()
+    p.add_argument("command", choices=["stats", "clear"], help="stats: size and row count; clear: drop all results.")
+    p.add_argument(
+        "--cache-dir",
+        type=Path,
+        default=CACHE_DIR,
+        help="Cache directory. Default: data/cache/parse.",
+    )
+    args = p.parse_args()
+
+    if not (args.cache_dir / DB_NAME).exists():
+        print(f"done: no parse cache at {wsi.relpath_str(args.cache_dir)}")
+        return 0
+    cache = ParseCache(args.cache_dir)
+    if args.command == "clear":
+        cache.clear()
+        print(f"done: cleared {wsi.relpath_str(cache.path)}")
+    else:
+        info = cache.info()
+        print(
+            f"done: {info['results']} result(s), {info['bytes'] / 1e6:.1f} MB of "
+            f"{info['max_bytes'] / 1e6:.0f} MB in {wsi.relpath_str(cache.path)}"
+        )
+    cache.close()
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
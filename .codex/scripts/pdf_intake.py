@@ -0,0 +1,618 @@
+#!/usr/bin/env python3
+from __future__ import annotations
+
+"""Drafts research.json entries for unrecognized PDFs in 0-调研/references.
+
+This is the next step after `check_unrecognized_references.py`: for each PDF
+that is not registered (and is not a byte-identical copy of a registered
+one), it extracts
+- the embedded metadata: the Info dictionary (`/Title`, `/Author`,
+  `/CreationDate`) and XMP (`dc:title`, `dc:creator`, `prism:doi`);
+- the text of the first page (first text-bearing content streams);
+- a DOI, an arXiv id and a year found in either (arXiv id first, then the
+  first-page text, then the creation date for the year).
+
+and writes a draft per PDF, `.codex/templates/paper_entry.json` filled with
+title / year / authors / pdf_path / url, to `0-调研/intake_drafts.json`.
+`paper_id` is left as the template placeholder: pick it when registering.
+
+Extraction uses `pypdf` when it is installed and falls back to a small
+built-in reader (zlib-inflated streams + regex) when it is not, or when pypdf
+fails on a file. Files run on a process pool (`--jobs`, default all cores);
+each worker has an address-space cap (`--max-memory-mb`) and each file a time
+limit (`--timeout`), so a malformed or hostile PDF costs one `error` record,
+not the run. A worker that dies anyway is replaced, and the files it had in
+flight are retried one by one to find the culprit.
+
+Results are cached by content (SHA-256, from the reference hash cache) in
+`data/cache/pdf_intake.json`, so a re-run only extracts new files.
+
+Usage:
+  python .codex/scripts/pdf_intake.py
+  python .codex/scripts/pdf_intake.py --jobs 8 --timeout 20 --output /tmp/drafts.json
+"""
+
+import argparse
+import io
+import json
+import os
+import re
+import signal
+import time
+import zlib
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+from pathlib import Path
+from typing import Any
+
+import check_unrecognized_references as ref_audit
+import workspace_index as wsi
+
+try:
+    import resource
+except ImportError:  # not on Windows: no memory cap there
+    resource = None
+
+try:
+    import pypdf
+except ImportError:  # optional; the built-in reader covers common PDFs
+    pypdf = None
+
+
+ROOT = wsi.ROOT
+
+CACHE_PATH = ROOT / "data" / "cache" / "pdf_intake.json"
+CACHE_VERSION = 1
+DRAFTS_PATH = ROOT / "0-调研" / "intake_drafts.json"
+EXTRACTOR = f"pypdf-{pypdf.__version__}" if pypdf is not None else "builtin/1"
+
+MAX_FILE_BYTES = 256 * 1024 * 1024
+# Caps for the built-in reader: inflated bytes per stream and per file, and
+# how much first-page text is kept.
+MAX_STREAM_BYTES = 8 * 1024 * 1024
+MAX_INFLATED_BYTES = 64 * 1024 * 1024
+FIRST_PAGE_CHARS = 4000
+
+DOI_RE = re.compile(r"\b10\.\d{4,9}/[^\s\"<>()\[\]{},;]+")
+ARXIV_RE = re.compile(r"(?i)\barxiv[:\s]*(\d{4}\.\d{4,5}|[a-z\-]+(?:\.[A-Z]{2})?/\d{7})(?:v\d+)?")
+ARXIV_NAME_RE = re.compile(r"^(\d{4}\.\d{4,5})(?:v\d+)?$")
+YEAR_RE = re.compile(r"\b(19[5-9]\d|20[0-4]\d)\b")
+PDF_DATE_RE = re.compile(r"D:\s*(\d{4})")
+
+# PDF literal string with at most one level of nested parentheses.
+_LITERAL = rb"\((?:\\.|[^\\()]|\((?:\\.|[^\\()])*\))*\)"
+_HEX = rb"<[0-9A-Fa-f\s]*>"
+_INFO_KEY_RE = re.compile(rb"/(Title|Author|CreationDate)\s*(" + _LITERAL + rb"|" + _HEX + rb")", re.S)
+_TEXT_TOKEN_RE = re.compile(
+    rb"(" + _LITERAL + rb")|(" + _HEX + rb")|(\[)|(\])|(-?\d*\.?\d+)"
+    rb"|(?<![A-Za-z])(Tj|TJ|Td|TD|Tm|T\*|ET|'|\")(?![A-Za-z])",
+    re.S,
+)
+_ESCAPES = {b"n": b"\n", b"r": b"\r", b"t": b"\t", b"b": b"\b", b"f": b"\f", b"(": b"(", b")": b")", b"\\": b"\\"}
+_ESCAPE_RE = re.compile(rb"\\([0-7]{1,3}|\r\n|[\s\S])")
+_XMP_RE = re.compile(rb"<x:xmpmeta.*?</x:xmpmeta>", re.S)
+
+
+class _Timeout(Exception):
+    pass
+
+
+def _on_alarm(signum: int, frame: Any) -> None:
+    raise _Timeout()
+
+
+def _init_worker(max_memory_mb: int) -> None:
+    # Runs once per worker process.
+    if resource is not None and max_memory_mb > 0:
+        cap = max_memory_mb * 1024 * 1024
+        _, hard = resource.getrlimit(resource.RLIMIT_AS)
+        if hard != resource.RLIM_INFINITY:
+            cap = min(cap, hard)
+        resource.setrlimit(resource.RLIMIT_AS, (cap, hard))
+    if hasattr(signal, "setitimer"):
+        signal.signal(signal.SIGALRM, _on_alarm)
+
+
+# Built-in reader
+
+
+def _unescape_literal(raw: bytes) -> bytes:
+    def sub(m: re.Match[bytes]) -> bytes:
+        s = m.group(1)
+        if b"0" <= s[:1] <= b"7":
+            return bytes([int(s, 8) & 0xFF])
+        if s in (b"\n", b"\r", b"\r\n"):
+            return b""  # line continuation
+        return _ESCAPES.get(s, s)
+
+    return _ESCAPE_RE.sub(sub, raw)
+
+
+def _decode_string(token: bytes) -> str:
+    """Decodes a PDF literal `(...)` or hex `<...>` string token."""
+    if token.startswith(b"<"):
+        digits = re.sub(rb"\s", b"", token[1:-1])
+        if len(digits) % 2:
+            digits += b"0"
+        data = bytes.fromhex(digits.decode("ascii"))
+    else:
+        data = _unescape_literal(token[1:-1])
+    if data.startswith(b"\xfe\xff"):
+        return data[2:].decode("utf-16-be", "replace")
+    if data.startswith(b"\xef\xbb\xbf"):
+        return data[3:].decode("utf-8", "replace")
+    return data.decode("latin-1")
+
+
+def _readable(text: str) -> bool:
+    # Strings drawn with custom font encodings come out as control bytes.
+    if not text.strip():
+        return False
+    bad = sum(1 for ch in text if ord(ch) < 32 and ch not in "\t\n\r")
+    return bad * 10 < len(text)
+
+
+def _iter_streams(data: bytes) -> Any:
+    """Yields (stream dictionary, inflated content) in file order."""
+    budget = MAX_INFLATED_BYTES
+    pos = 0
+    while budget > 0:
+        pos = data.find(b"stream", pos)
+        if pos < 0:
+            return
+        if data[pos - 3 : pos] == b"end":
+            pos += 6
+            continue
+        # The stream dictionary: from this object's `N 0 obj` to `stream`.
+        head_start = data.rfind(b"obj", max(0, pos - 2048), pos)
+        header = data[head_start:pos] if head_start >= 0 else data[max(0, pos - 256) : pos]
+        start = pos + 6
+        if data[start : start + 2] == b"\r\n":
+            start += 2
+        elif data[start : start + 1] in (b"\n", b"\r"):
+            start += 1
+        end = data.find(b"endstream", start)
+        if end < 0:
+            end = len(data)
+        pos = end + 9
+        raw = data[start:end]
+        if b"/Image" in header or b"/DCTDecode" in header or b"/JPXDecode" in header:
+            continue
+        if b"/FlateDecode" in header or b"/Fl " in header or b"/Fl]" in header:
+            inflater = zlib.decompressobj()
+            try:
+                out = inflater.decompress(raw, min(MAX_STREAM_BYTES, budget))
+            except zlib.error:
+                continue
+        elif b"/Filter" in header:
+            continue  # LZW, ASCII85, ...: not worth it for metadata
+        else:
+            out = raw[: min(MAX_STREAM_BYTES, budget)]
+        budget -= len(out)
+        yield header, out
+
+
+def _content_text(stream: bytes) -> str:
+    lines: list[str] = []
+    line: list[str] = []
+    pending: list[str] = []
+    in_array = False
+    for lit, hexs, open_, close, num, op in _TEXT_TOKEN_RE.findall(stream):
+        if lit or hexs:
+            pending.append(_decode_string(lit or hexs))
+        elif open_:
+            in_array = True
+        elif close:
+            in_array = False
+        elif num:
+            # A large negative kern inside a TJ array is a word gap.
+            if in_array and pending and float(num) < -200:
+                pending.append(" ")
+        elif op:
+            if op in (b"Tj", b"TJ", b"'", b'"'):
+                if op in (b"'", b'"') and line:
+                    lines.append("".join(line))
+                    line = []
+                text = "".join(pending)
+                if _readable(text):
+                    line.append(text)
+            elif line:
+                lines.append("".join(line))
+                line = []
+            pending = []
+    if line:
+        lines.append("".join(line))
+    return "\n".join(s.strip() for s in lines if s.strip())
+
+
+def _split_authors(value: str) -> list[str]:
+    parts = re.split(r"\s*(?:;|,|\band\b|&)\s*", value)
+    return [p.strip() for p in parts if p.strip()]
+
+
+def _info_fields(blob: bytes, out: dict[str, Any]) -> None:
+    # Only dictionaries that look like a document Info dict (not annotations).
+    for m in _INFO_KEY_RE.finditer(blob):
+        key = m.group(1).decode("ascii").lower()
+        if out.get(f"info_{key}"):
+            continue
+        lo = blob.rfind(b"<<", max(0, m.start() - 2048), m.start())
+        hi = blob.find(b">>", m.end(), m.end() + 2048)
+        window = blob[lo if lo >= 0 else m.start() : hi if hi >= 0 else m.end()]
+        if not any(k in window for k in (b"/Producer", b"/Creator", b"/CreationDate", b"/ModDate", b"/Author")):
+            continue
+        value = _decode_string(m.group(2)).strip()
+        if _readable(value):
+            out[f"info_{key}"] = value
+
+
+def _xmp_fields(blob: bytes, out: dict[str, Any]) -> None:
+    m = _XMP_RE.search(blob)
+    if not m or "xmp" in out:
+        return
+    xmp = m.group(0).decode("utf-8", "replace")
+    out["xmp"] = True
+
+    def items(tag: str) -> list[str]:
+        block = re.search(rf"<{tag}\b[^>]*>(.*?)</{tag}>", xmp, re.S)
+        if not block:
+            return []
+        found = re.findall(r"<rdf:li\b[^>]*>(.*?)</rdf:li>", block.group(1), re.S)
+        return [re.sub(r"\s+", " ", x).strip() for x in (found or [block.group(1)]) if x.strip()]
+
+    title = items("dc:title")
+    if title:
+        out["xmp_title"] = title[0]
+    creators = items("dc:creator")
+    if creators:
+        out["xmp_authors"] = creators
+    for tag in ("prism:doi", "pdfx:doi", "dc:identifier"):
+        value = items(tag)
+        if value and DOI_RE.search(value[0]):
+            out["xmp_doi"] = DOI_RE.search(value[0]).group(0)
+            break
+
+
+def _builtin_extract(data: bytes) -> dict[str, Any]:
+    if data.find(b"%PDF-", 0, 1024) < 0:
+        raise ValueError("not a PDF (no %PDF- header)")
+    found: dict[str, Any] = {}
+    _info_fields(data, found)
+    _xmp_fields(data, found)
+    text: list[str] = []
+    size = 0
+    for header, content in _iter_streams(data):
+        # Object streams hold compressed Info dicts; metadata streams hold XMP.
+        if b"/ObjStm" in header or b"/Metadata" in header or b"<x:xmpmeta" in content[:4096]:
+            _info_fields(content, found)
+            _xmp_fields(content, found)
+            continue
+        if size < FIRST_PAGE_CHARS and b"BT" in content:
+            chunk = _content_text(content)
+            if chunk:
+                text.append(chunk)
+                size += len(chunk)
+    return {
+        "title": found.get("info_title") or found.get("xmp_title") or "",
+        "authors": found.get("xmp_authors") or _split_authors(found.get("info_author", "")),
+        "created": found.get("info_creationdate", ""),
+        "doi": found.get("xmp_doi", ""),
+        "first_page": "\n".join(text)[:FIRST_PAGE_CHARS],
+    }
+
+
+def _pypdf_extract(data: bytes) -> dict[str, Any]:
+    reader = pypdf.PdfReader(io.BytesIO(data))
+    meta = reader.metadata or {}
+    out: dict[str, Any] = {
+        "title": str(meta.get("/Title") or "").strip(),
+        "authors": _split_authors(str(meta.get("/Author") or "")),
+        "created": str(meta.get("/CreationDate") or ""),
+        "doi": "",
+        "first_page": "",
+    }
+    try:
+        xmp = reader.xmp_metadata
+    except Exception:
+        xmp = None
+    if xmp is not None:
+        title = getattr(xmp, "dc_title", None) or {}
+        if not out["title"] and isinstance(title, dict) and title:
+            out["title"] = str(next(iter(title.values()))).strip()
+        creators = getattr(xmp, "dc_creator", None) or []
+        if creators:
+            out["authors"] = [str(c).strip() for c in creators if str(c).strip()]
+    if reader.pages:
+        out["first_page"] = (reader.pages[0].extract_text() or "")[:FIRST_PAGE_CHARS]
+    return out
+
+
+# Fields
+
+
+def _title_from_text(text: str) -> tuple[str, list[str]]:
+    # The first line that reads like a title (a few words, not an id or an
+    # address), and the author list if the next line looks like one.
+    lines = [s.strip() for s in text.splitlines()[:12] if s.strip()]
+    for i, s in enumerate(lines):
+        words = s.split()
+        if 3 <= len(words) <= 30 and not DOI_RE.search(s) and not ARXIV_RE.search(s) and "@" not in s:
+            authors = _split_authors(lines[i + 1]) if i + 1 < len(lines) else []
+            if not authors or any(len(a.split()) > 5 or len(a) > 60 for a in authors):
+                authors = []
+            return s, authors
+    return "", []
+
+
+def _year_from_arxiv(arxiv_id: str) -> int | None:
+    m = re.match(r"^(\d{2})(\d{2})\.", arxiv_id) or re.search(r"/(\d{2})(\d{2})\d{3}$", arxiv_id)
+    if not m:
+        return None
+    yy = int(m.group(1))
+    return (1900 if yy >= 91 else 2000) + yy
+
+
+def _finish(raw: dict[str, Any], filename: str) -> dict[str, Any]:
+    text = raw.get("first_page", "")
+    title = raw.get("title", "")
+    authors = raw.get("authors", [])
+    if not title or title.lower() in {"untitled", "title"} or re.search(r"\.(dvi|docx?|tex|pdf)$", title, re.I):
+        title, text_authors = _title_from_text(text)
+        authors = authors or text_authors
+    blob = "\n".join([raw.get("title", ""), text, raw.get("doi", "")])
+    doi = raw.get("doi") or (DOI_RE.search(blob).group(0) if DOI_RE.search(blob) else "")
+    m = ARXIV_RE.search(blob)
+    arxiv_id = m.group(1) if m else ""
+    if not arxiv_id:
+        m = ARXIV_NAME_RE.match(Path(filename).stem)
+        arxiv_id = m.group(1) if m else ""
+    year = _year_from_arxiv(arxiv_id) if arxiv_id else None
+    if year is None:
+        m = YEAR_RE.search(text)
+        year = int(m.group(1)) if m else None
+    if year is None:
+        m = PDF_DATE_RE.search(raw.get("created", ""))
+        year = int(m.group(1)) if m else None
+    return {
+        "title": title,
+        "authors": authors[:50],
+        "year": year or 0,
+        "doi": doi.rstrip("."),
+        "arxiv_id": arxiv_id,
+        "first_page": text,
+    }
+
+
+def extract_pdf(path: str, timeout: float = 0) -> dict[str, Any]:
+    """Extracts metadata from one PDF; never raises.
+
+    Args:
+        path: PDF file.
+        timeout: Seconds before giving up (0 = no limit). Uses `SIGALRM`, so
+            it only applies on the main thread of a Unix process.
+
+    Returns:
+        `title`, `authors`, `year`, `doi`, `arxiv_id`, `first_page` and
+        `source` (`pypdf` or `builtin`), or `error` (and `transient` for
+        timeouts and memory errors, which are not cached).
+    """
+    use_alarm = timeout > 0 and hasattr(signal, "setitimer")
+    try:
+        # The timer is stopped before any handler runs, so a late alarm can
+        # only land in this outer block.
+        if use_alarm:
+            signal.signal(signal.SIGALRM, _on_alarm)
+            signal.setitimer(signal.ITIMER_REAL, timeout)
+        try:
+            return _extract(path)
+        finally:
+            if use_alarm:
+                signal.setitimer(signal.ITIMER_REAL, 0)
+    except _Timeout:
+        return {"error": f"timed out after {timeout:g}s", "transient": True}
+    except MemoryError:
+        return {"error": "memory limit exceeded", "transient": True}
+    except Exception as e:
+        return {"error": f"{type(e).__name__}: {e}"[:300]}
+
+
+def _extract(path: str) -> dict[str, Any]:
+    with open(path, "rb") as f:
+        data = f.read(MAX_FILE_BYTES + 1)
+    if len(data) > MAX_FILE_BYTES:
+        return {"error": f"larger than {MAX_FILE_BYTES >> 20} MB"}
+    raw: dict[str, Any] | None = None
+    source = "builtin"
+    if pypdf is not None:
+        try:
+            raw = _pypdf_extract(data)
+            source = "pypdf"
+        except (_Timeout, MemoryError):
+            raise
+        except Exception:
+            raw = None  # malformed for pypdf: try the built-in reader
+    if raw is None:
+        raw = _builtin_extract(data)
+    return {**_finish(raw, path), "source": source}
+
+
+def _extract_alone(path: str, timeout: float, max_memory_mb: int) -> dict[str, Any]:
+    with ProcessPoolExecutor(max_workers=1, initializer=_init_worker, initargs=(max_memory_mb,)) as ex:
+        try:
+            return ex.submit(extract_pdf, path, timeout).result()
+        except BrokenProcessPool:
+            return {"error": "worker process died", "transient": True}
+
+
+def extract_many(
+    items: list[tuple[str, str]],
+    jobs: int,
+    timeout: float,
+    max_memory_mb: int,
+) -> dict[str, dict[str, Any]]:
+    """Runs `extract_pdf` over `(key, path)` items on a process pool.
+
+    At most `2 * jobs` files are in flight. If a worker dies, the pool is
+    replaced and the files that were in flight are retried one per process.
+
+    Returns:
+        key -> result of `extract_pdf`.
+    """
+    results: dict[str, dict[str, Any]] = {}
+    queue = list(reversed(items))
+    while queue:
+        in_flight: dict[Future[dict[str, Any]], tuple[str, str]] = {}
+        broken = False
+        with ProcessPoolExecutor(max_workers=jobs, initializer=_init_worker, initargs=(max_memory_mb,)) as ex:
+            while (queue or in_flight) and not broken:
+                while queue and len(in_flight) < 2 * jobs:
+                    key, path = queue.pop()
+                    in_flight[ex.submit(extract_pdf, path, timeout)] = (key, path)
+                done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                for fut in done:
+                    try:
+                        results[in_flight[fut][0]] = fut.result()
+                    except BrokenProcessPool:
+                        broken = True
+                        break
+                    except Exception as e:  # e.g. a result that failed to pickle
+                        results[in_flight[fut][0]] = {"error": f"{type(e).__name__}: {e}"[:300]}
+                    del in_flight[fut]
+        for key, path in in_flight.values():
+            results[key] = _extract_alone(path, timeout, max_memory_mb)
+    return results
+
+
+# Cache and drafts
+
+
+def _load_cache(path: Path) -> dict[str, dict[str, Any]]:
+    # A broken or outdated cache only costs a re-extraction.
+    try:
+        data = json.loads(path.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return {}
+    if not isinstance(data, dict) or data.get("version") != CACHE_VERSION or data.get("extractor") != EXTRACTOR:
+        return {}
+    results = data.get("results", {})
+    return results if isinstance(results, dict) else {}
+
+
+def _write_cache(path: Path, results: dict[str, dict[str, Any]]) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    payload = {"version": CACHE_VERSION, "extractor": EXTRACTOR, "results": results}
+    wsi.write_text_atomic(path, json.dumps(payload, ensure_ascii=False, sort_keys=True) + "\n")
+
+
+def draft_entry(rel: str, meta: dict[str, Any]) -> dict[str, Any]:
+    """Fills `paper_entry.json` from extracted metadata (paper_id stays a placeholder)."""
+    entry = json.loads(json.dumps(wsi.load_json(wsi.TEMPLATES_DIR / "paper_entry.json")))
+    entry["title"] = meta.get("title", "")
+    entry["year"] = meta.get("year", 0)
+    entry["authors"] = list(meta.get("authors", []))
+    entry["pdf_path"] = rel
+    if meta.get("arxiv_id"):
+        entry["url"] = f"https://arxiv.org/abs/{meta['arxiv_id']}"
+    elif meta.get("doi"):
+        entry["url"] = f"https://doi.org/{meta['doi']}"
+    return entry
+
+
+def main() -> int:
+    p = argparse.ArgumentParser()
+    p.add_argument(
+        "--research-json",
+        type=Path,
+        default=ROOT / "0-调研" / "research.json",
+        help="Path to 0-调研/research.json.",
+    )
+    p.add_argument(
+        "--references-dir",
+        type=Path,
+        action="append",
+        default=None,
+        help="PDFs directory to scan (repeatable). Default: 0-调研/references/.",
+    )
+    p.add_argument(
+        "--output",
+        type=Path,
+        default=DRAFTS_PATH,
+        help="Drafts file. Default: 0-调研/intake_drafts.json.",
+    )
+    p.add_argument(
+        "--cache",
+        type=Path,
+        default=CACHE_PATH,
+        help="Extraction cache. Default: data/cache/pdf_intake.json.",
+    )
+    p.add_argument("--jobs", type=int, default=0, help="Worker processes (0 = all cores). Default: 0.")
+    p.add_argument("--timeout", type=float, default=30.0, help="Seconds allowed per PDF. Default: 30.")
+    p.add_argument(
+        "--max-memory-mb",
+        type=int,
+        default=1024,
+        help="Address-space cap per worker process in MB (0 = none). Default: 1024.",
+    )
+    p.add_argument("--dry-run", action="store_true", help="Print drafts without writing the drafts file.")
+    args = p.parse_args()
+
+    ref_dirs = ref_audit._find_reference_dirs(args.references_dir)
+    if not ref_dirs:
+        print("No references directory found (expected 0-调研/references/).")
+        return 2
+
+    t0 = time.perf_counter()
+    index = wsi.get_index(research_json=args.research_json)
+    result = ref_audit.audit(
+        research_json=args.research_json,
+        notes_dir=ROOT / "0-调研" / "notes",
+        ref_dirs=ref_dirs,
+        index=index,
+    )
+    sha_by_rel = result.content_index
+    # Copies of registered PDFs are renames, not new papers.
+    todo = [rel for rel in result.unrecognized_pdfs if rel not in result.content_matches and rel in sha_by_rel]
+
+    cache = _load_cache(args.cache)
+    missing: dict[str, str] = {}
+    for rel in todo:
+        sha = sha_by_rel[rel]
+        if sha not in cache and sha not in missing:
+            path = Path(rel)
+            missing[sha] = str(path if path.is_absolute() else ROOT / path)
+    jobs = args.jobs if args.jobs > 0 else (os.cpu_count() or 1)
+    fresh = extract_many(list(missing.items()), jobs, args.timeout, args.max_memory_mb) if missing else {}
+    if fresh:
+        cache.update({sha: r for sha, r in fresh.items() if not r.get("transient")})
+        _write_cache(args.cache, cache)
+
+    drafts: list[dict[str, Any]] = []
+    failed = 0
+    for rel in todo:
+        sha = sha_by_rel[rel]
+        meta = fresh.get(sha) or cache[sha]
+        intake = {k: meta.get(k) for k in ("doi", "arxiv_id", "source", "error") if meta.get(k)}
+        intake["sha256"] = sha
+        intake["first_page"] = (meta.get("first_page") or "")[:500]
+        drafts.append({"entry": draft_entry(rel, meta), "intake": intake})
+        if meta.get("error"):
+            failed += 1
+            print(f"- {rel}: error: {meta['error']}")
+        else:
+            ids = ", ".join(f"{k}:{meta[k]}" for k in ("arxiv_id", "doi") if meta.get(k))
+            print(f"- {rel}: {meta.get('title') or '(no title)'} ({meta.get('year') or '?'}){f' [{ids}]' if ids else ''}")
+
+    if drafts and not args.dry_run:
+        args.output.parent.mkdir(parents=True, exist_ok=True)
+        wsi.write_text_atomic(args.output, json.dumps({"drafts": drafts}, ensure_ascii=False, indent=2) + "\n")
+    where = "" if args.dry_run or not drafts else f" -> {wsi.relpath_str(args.output)}"
+    print(
+        f"done: drafts={len(drafts)}, extracted={len(fresh)}, "
+        f"cached={sum(1 for rel in todo if sha_by_rel[rel] not in fresh)}, failed={failed}, "
+        f"skipped_copies={len(result.content_matches)} ({time.perf_counter() - t0:.1f}s){where}"
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,462 @@
+#!/usr/bin/env python3
+from __future__ import annotations
+
+"""Optional sharded layout of the research registry (`0-调研/research.d/`).
+
+Instead of one `research.json`, every entry lives in its own file and a small
+manifest keeps the `followed` topology:
+- `research.d/<paper_id>.json`: one entry; a `followed` list is stored as `[]`
+  (its items are entries with shards of their own).
+- `research.d/manifest.jsonl`: a header line (`{"version": 1, "doc": {...}}`,
+  the top-level document with `research` emptied) followed by one
+  `["<paper_id>", "<parent paper_id>" | null]` line per entry; lines with the
+  same parent are that parent's `followed` items (or the `research` list for
+  `null`), in file order.
+
+Updating an entry rewrites only its shard and adding one appends a manifest
+line, so a single-paper change is O(1) I/O and two agents rarely touch the
+same file (append-only lines merge cleanly: the repo's `.gitattributes` sets
+`merge=union` for the manifest). When `manifest.jsonl` exists, `workspace_index` (and every
+script reading through it) uses the store, and `research.json` becomes an
+export for tools that need the monolithic file.
+
+Usage:
+  python .codex/scripts/research_store.py shard     # research.json -> research.d/
+  python .codex/scripts/research_store.py export    # research.d/ -> research.json
+  python .codex/scripts/research_store.py check     # manifest/shards/export consistency
+"""
+
+import argparse
+import json
+import os
+import re
+from collections.abc import Iterator
+from pathlib import Path
+from typing import Any
+
+import note_document as notes
+import workspace_index as wsi  # imports this module too: use `wsi` in functions only
+
+try:
+    import orjson
+except ImportError:  # optional fast serializer for `dump_json_text`
+    orjson = None
+
+
+STORE_DIRNAME = "research.d"
+MANIFEST_NAME = "manifest.jsonl"
+STORE_VERSION = 1
+SHARD_ID_RE = re.compile(r"^[0-9A-Za-z][0-9A-Za-z._-]*$")
+
+_INT64_MIN = -(1 << 63)
+_UINT64_MAX = (1 << 64) - 1
+
+
+def _orjson_safe(value: Any) -> bool:
+    # orjson formats floats differently (`1e+20` vs `1e20`), rejects non-str
+    # keys and ints beyond 64 bits; everything else serializes identically.
+    stack = [value]
+    while stack:
+        v = stack.pop()
+        t = type(v)
+        if t is dict:
+            for k in v:
+                if type(k) is not str:
+                    return False
+            stack.extend(v.values())
+        elif t is list:
+            stack.extend(v)
+        elif t is int:
+            if not _INT64_MIN <= v <= _UINT64_MAX:
+                return False
+        elif t is not str and t is not bool and v is not None:
+            return False
+    return True
+
+
+def dump_json_text(data: Any) -> str:
+    """`json.dumps(data, indent=2, ensure_ascii=False) + "\\n"`, byte for byte.
+
+    Uses orjson when it is installed and the value has no floats (about 20x
+    faster on a large registry), the stdlib encoder otherwise.
+    """
+    if orjson is not None and _orjson_safe(data):
+        return orjson.dumps(data, option=orjson.OPT_INDENT_2 | orjson.OPT_APPEND_NEWLINE).decode()
+    return json.dumps(data, indent=2, ensure_ascii=False) + "\n"
+
+
+def store_dir(research_json: Path) -> Path:
+    """The store directory that belongs to a research.json path."""
+    return research_json.parent / STORE_DIRNAME
+
+
+def open_store(research_json: Path) -> ResearchStore | None:
+    """The store next to `research_json`, or None if it was never sharded."""
+    root = store_dir(research_json)
+    if not (root / MANIFEST_NAME).is_file():
+        return None
+    return ResearchStore(root)
+
+
+def _shard_of(entry: dict[str, Any]) -> dict[str, Any]:
+    return {k: ([] if k == "followed" and isinstance(v, list) else v) for k, v in entry.items()}
+
+
+class ResearchStore:
+    """One `research.d/` directory (see the module docstring for the layout)."""
+
+    def __init__(self, root: Path) -> None:
+        self.root = root
+        self.manifest_path = root / MANIFEST_NAME
+
+    # Shards
+
+    def shard_path(self, paper_id: str) -> Path:
+        """`research.d/<paper_id>.json`.
+
+        Raises:
+            ValueError: If `paper_id` cannot be used as a file name.
+        """
+        if not SHARD_ID_RE.match(paper_id):
+            raise ValueError(f"paper_id cannot be used as a shard name: {paper_id!r}")
+        return self.root / f"{paper_id}.json"
+
+    def has_entry(self, paper_id: str) -> bool:
+        return bool(SHARD_ID_RE.match(paper_id)) and self.shard_path(paper_id).is_file()
+
+    def read_entry(self, paper_id: str) -> dict[str, Any]:
+        """Loads one shard (a `followed` list is `[]`; see `iter_entries`).
+
+        Raises:
+            FileNotFoundError: If the shard does not exist.
+            ValueError: If the shard is not a JSON object.
+        """
+        path = self.shard_path(paper_id)
+        try:
+            text = notes.LOADER.read_text(path)
+        except FileNotFoundError as e:
+            raise FileNotFoundError(f"missing file: {path}") from e
+        try:
+            entry = json.loads(text)
+        except json.JSONDecodeError as e:
+            raise ValueError(f"invalid json: {path} ({e})") from e
+        notes.LOADER.stats.parses += 1
+        if not isinstance(entry, dict):
+            raise ValueError(f"shard must be an object: {path}")
+        return entry
+
+    def write_entry(self, entry: dict[str, Any]) -> None:
+        """Atomically rewrites the shard of an existing or new entry.
+
+        A `followed` list is written as `[]`: the topology stays in the
+        manifest (use `add_entry` for a new entry).
+        """
+        paper_id = str(entry.get("paper_id", "")).strip()
+        wsi.write_text_atomic(self.shard_path(paper_id), dump_json_text(_shard_of(entry)))
+
+    def add_entry(self, entry: dict[str, Any], parent: str | None = None) -> None:
+        """Writes a new entry's shard, then appends it to the manifest.
+
+        Args:
+            entry: The entry (must have a `paper_id` not yet in the store).
+            parent: paper_id whose `followed` list gets the entry (None: the
+                top-level `research` list). It goes last in that list.
+        """
+        paper_id = str(entry.get("paper_id", "")).strip()
+        self.write_entry(entry)
+        line = json.dumps([paper_id, parent], ensure_ascii=False) + "\n"
+        # One small O_APPEND write: concurrent appends do not interleave.
+        with open(self.manifest_path, "a", encoding="utf-8") as f:
+            f.write(line)
+            f.flush()
+            os.fsync(f.fileno())
+
+    # Manifest
+
+    def read_manifest(self) -> tuple[dict[str, Any], list[tuple[str, str | None]]]:
+        """Returns (top-level document template, [(paper_id, parent)] links).
+
+        A paper_id listed twice keeps its first line (e.g. after a union
+        merge), and a trailing partial line (an interrupted append) is ignored.
+
+        Raises:
+            FileNotFoundError: If the manifest does not exist.
+            ValueError: If the manifest is malformed.
+        """
+        path = self.manifest_path
+        try:
+            text = notes.LOADER.read_text(path)
+        except FileNotFoundError as e:
+            raise FileNotFoundError(f"missing file: {path}") from e
+        lines = text.split("\n")
+        try:
+            header = json.loads(lines[0])
+        except json.JSONDecodeError as e:
+            raise ValueError(f"invalid json: {path} (line 1: {e})") from e
+        if not isinstance(header, dict) or header.get("version") != STORE_VERSION:
+            raise ValueError(f"unsupported store manifest: {path}")
+        doc = header.get("doc")
+        if not isinstance(doc, dict):
+            raise ValueError(f"manifest header has no `doc` object: {path}")
+
+        links: list[tuple[str, str | None]] = []
+        seen: set[str] = set()
+        for n, line in enumerate(lines[1:], start=2):
+            if not line.strip():
+                continue
+            try:
+                link = json.loads(line)
+            except json.JSONDecodeError as e:
+                if n == len(lines):
+                    break
+                raise ValueError(f"invalid json: {path} (line {n}: {e})") from e
+            if (
+                not isinstance(link, list)
+                or len(link) != 2
+                or not isinstance(link[0], str)
+                or not (link[1] is None or isinstance(link[1], str))
+            ):
+                raise ValueError(f"bad manifest line {n} in {path}: {line}")
+            if link[0] in seen:
+                continue
+            seen.add(link[0])
+            links.append((link[0], link[1]))
+        notes.LOADER.stats.parses += 1
+        return doc, links
+
+    def _children(self) -> tuple[dict[str, Any], dict[str | None, list[str]]]:
+        doc, links = self.read_manifest()
+        children: dict[str | None, list[str]] = {}
+        for paper_id, parent in links:
+            children.setdefault(parent, []).append(paper_id)
+        return doc, children
+
+    # Whole registry
+
+    def iter_entries(self, prefix: str = "research") -> Iterator[tuple[dict[str, Any], str]]:
+        """Yields `(entry, location)` in document order, one shard at a time.
+
+        Same pairs as `workspace_index.iter_paper_entries` over the exported
+        document, with `followed` lists emptied like `research_stream` does.
+        """
+        _, children = self._children()
+        stack: list[tuple[str, str]] = []
+        top = children.get(None, [])
+        for i in range(len(top) - 1, -1, -1):
+            stack.append((top[i], f"{prefix}[{i}]"))
+        while stack:
+            paper_id, loc = stack.pop()
+            entry = self.read_entry(paper_id)
+            kids = children.get(paper_id, [])
+            if kids:
+                entry["followed"] = []
+            yield entry, loc
+            for j in range(len(kids) - 1, -1, -1):
+                stack.append((kids[j], f"{loc}.followed[{j}]"))
+
+    def load_document(self) -> dict[str, Any]:
+        """Assembles the full research.json document (`followed` included)."""
+        doc, children = self._children()
+        top: list[Any] = []
+        stack: list[tuple[str, list[Any]]] = [(pid, top) for pid in reversed(children.get(None, []))]
+        while stack:
+            paper_id, siblings = stack.pop()
+            entry = self.read_entry(paper_id)
+            siblings.append(entry)
+            kids = children.get(paper_id)
+            if kids:
+                entry["followed"] = []
+                stack.extend((k, entry["followed"]) for k in reversed(kids))
+        out = {k: (top if k == "research" else v) for k, v in doc.items()}
+        out.setdefault("research", top)
+        return out
+
+    def export(self, research_json: Path) -> bool:
+        """Writes the monolithic research.json (atomic; skipped if identical).
+
+        Returns:
+            True if research.json was written.
+
+        Raises:
+            ValueError: If `check()` finds a problem (an unreachable entry would
+                silently drop out of the export).
+        """
+        problems = self.check()
+        if problems:
+            shown = "\n".join(f"- {code}: {message}" for code, _, message in problems[:20])
+            raise ValueError(f"cannot export {self.root}:\n{shown}")
+        text = dump_json_text(self.load_document())
+        try:
+            if research_json.read_text(encoding="utf-8") == text:
+                return False
+        except FileNotFoundError:
+            pass
+        wsi.write_text_atomic(research_json, text)
+        return True
+
+    def check(self) -> list[tuple[str, str, str]]:
+        """Structural problems as (code, paper_id or file name, message).
+
+        Codes: `store-missing-shard` (manifest line without a shard),
+        `store-orphan-shard` (shard not in the manifest), and
+        `store-unreachable-entry` (unknown parent or a cycle).
+        """
+        _, links = self.read_manifest()
+        listed = {pid for pid, _ in links}
+        out: list[tuple[str, str, str]] = []
+        for pid, _ in links:
+            if not self.has_entry(pid):
+                out.append(("store-missing-shard", pid, f"manifest lists {pid} but its shard is missing"))
+        with os.scandir(self.root) as it:
+            names = sorted(e.name for e in it if e.name.endswith(".json") and e.is_file())
+        for name in names:
+            if name[: -len(".json")] not in listed:
+                out.append(("store-orphan-shard", name, f"shard not listed in {MANIFEST_NAME}: {name}"))
+
+        parent_of = dict(links)
+        reachable: set[str] = set()
+        for pid, _ in links:
+            path: list[str] = []
+            cur: str | None = pid
+            while cur is not None and cur not in reachable and cur not in path and cur in parent_of:
+                path.append(cur)
+                cur = parent_of[cur]
+            if cur is None or cur in reachable:
+                reachable.update(path)
+        for pid, parent in links:
+            if pid not in reachable:
+                out.append(
+                    ("store-unreachable-entry", pid, f"{pid}: parent {parent} is missing or a cycle")
+                )
+        return out
+
+    # Sharding
+
+    @classmethod
+    def create(cls, root: Path, doc: dict[str, Any]) -> ResearchStore:
+        """Shards a research.json document into `root` (replacing its contents).
+
+        Shards are written first and the manifest last, so the store only
+        becomes active once it is complete. Stale shards are removed.
+        (Any existing store is rewritten, so callers check `open_store` first.)
+
+        Raises:
+            ValueError: If an entry is not an object or has a missing,
+                duplicate or unusable paper_id (nothing is written then).
+        """
+        research = doc.get("research", [])
+        if not isinstance(research, list):
+            raise ValueError("`research` must be a list")
+        errors: list[str] = []
+        entries: list[tuple[str, dict[str, Any]]] = []
+        links: list[tuple[str, str | None]] = []
+        stack: list[tuple[Any, str, str | None]] = [
+            (research[i], f"research[{i}]", None) for i in range(len(research) - 1, -1, -1)
+        ]
+        seen: set[str] = set()
+        while stack:
+            entry, loc, parent = stack.pop()
+            if not isinstance(entry, dict):
+                errors.append(f"{loc}: not an object")
+                continue
+            pid = str(entry.get("paper_id", "")).strip()
+            if not SHARD_ID_RE.match(pid):
+                errors.append(f"{loc}: paper_id {pid!r} cannot be used as a shard name")
+                continue
+            if pid in seen:
+                errors.append(f"{loc}: duplicate paper_id {pid}")
+                continue
+            seen.add(pid)
+            entries.append((pid, entry))
+            links.append((pid, parent))
+            followed = entry.get("followed")
+            if isinstance(followed, list):
+                for j in range(len(followed) - 1, -1, -1):
+                    stack.append((followed[j], f"{loc}.followed[{j}]", pid))
+        if errors:
+            shown = "\n".join(f"- {e}" for e in errors[:20])
+            more = f"\n- ... ({len(errors) - 20} more)" if len(errors) > 20 else ""
+            raise ValueError(f"cannot shard research.json:\n{shown}{more}")
+
+        store = cls(root)
+        root.mkdir(parents=True, exist_ok=True)
+        # Plain (non-atomic) writes: the store is not active until the manifest
+        # (written atomically below) exists. Each shard and then the directory
+        # is fsynced first, so the manifest never lands before its shards.
+        for pid, entry in entries:
+            with open(store.shard_path(pid), "w", encoding="utf-8") as f:
+                f.write(dump_json_text(_shard_of(entry)))
+                f.flush()
+                os.fsync(f.fileno())
+        wsi.fsync_dir(root)
+        with os.scandir(root) as it:
+            stale = [e.path for e in it if e.name.endswith(".json") and e.name[:-5] not in seen]
+        for path in stale:
+            os.unlink(path)
+        header = {"version": STORE_VERSION, "doc": {k: ([] if k == "research" else v) for k, v in doc.items()}}
+        lines = [json.dumps(header, ensure_ascii=False)]
+        lines.extend(json.dumps([pid, parent], ensure_ascii=False) for pid, parent in links)
+        wsi.write_text_atomic(store.manifest_path, "\n".join(lines) + "\n")
+        return store
+
+
+def main() -> int:
+    p = argparse.ArgumentParser()
+    p.add_argument(
+        "command",
+        choices=["shard", "export", "check"],
+        help="shard: research.json -> research.d/; export: research.d/ -> research.json; "
+        "check: report manifest/shard problems and a stale export.",
+    )
+    p.add_argument(
+        "--research-json",
+        type=Path,
+        default=wsi.RESEARCH_JSON,
+        help="Path to 0-调研/research.json (the store is research.d/ next to it).",
+    )
+    p.add_argument(
+        "--force",
+        action="store_true",
+        help="shard: re-shard even if research.d/ already exists (research.json wins).",
+    )
+    args = p.parse_args()
+
+    root = store_dir(args.research_json)
+    if args.command == "shard":
+        if (root / MANIFEST_NAME).exists() and not args.force:
+            raise SystemExit(f"{wsi.relpath_str(root)} already exists; use --force to re-shard")
+        doc = wsi.load_json(args.research_json)
+        if not isinstance(doc, dict):
+            raise ValueError(f"research.json must be an object: {args.research_json}")
+        store = ResearchStore.create(root, doc)
+        _, links = store.read_manifest()
+        print(f"done: shards={len(links)}, dir={wsi.relpath_str(root)}")
+        return 0
+
+    store = open_store(args.research_json)
+    if store is None:
+        raise SystemExit(f"no store at {wsi.relpath_str(root)}; run `research_store.py shard` first")
+
+    if args.command == "export":
+        written = store.export(args.research_json)
+        state = "written" if written else "unchanged"
+        print(f"done: {wsi.relpath_str(args.research_json)} {state}")
+        return 0
+
+    problems = store.check()
+    for code, _, message in problems:
+        print(f"- {code}: {message}")
+    try:
+        current = args.research_json.read_text(encoding="utf-8")
+    except FileNotFoundError:
+        current = None
+    if not problems and current is not None and current != dump_json_text(store.load_document()):
+        problems.append(("store-stale-export", "", ""))
+        print(f"- store-stale-export: {wsi.relpath_str(args.research_json)} differs from the store")
+    if not problems:
+        print("OK: store is consistent.")
+    return 1 if problems else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
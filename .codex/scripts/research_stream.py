@@ -0,0 +1,379 @@
+from __future__ import annotations
+
+"""Streaming, bounded-memory iteration over `research.json` entries.
+
+`iter_research_entries()` yields the same `(entry, location)` pairs as
+`workspace_index.iter_paper_entries()`, in the same order, without loading the
+whole document: the file is read in chunks, and only one top-level entry of
+the `research` list (raw bytes plus the entry being yielded) is held at a time.
+
+Each entry is split at its `followed` list without recursion: a bracket scan
+(regex, skipping strings) records where every object/list of the top-level
+entry ends, an explicit stack walks the `followed` lists, and every entry is
+decoded on its own with the `followed` list cut out. Deep `followed` chains
+therefore never reach the parser's nesting limit or the recursion limit.
+
+Entries are decoded with `orjson` when it is installed and with the stdlib
+`json` module otherwise (same values; `json` is also the fallback for inputs
+orjson rejects, such as NaN or integers beyond 64 bits).
+
+Note: in a yielded entry, a `followed` list is replaced by an empty list (its
+items are yielded as their own entries). A `followed` value that is not a list
+is kept as decoded, so type checks see the same value as with a full load.
+
+Usage:
+  for entry, loc in iter_research_entries(RESEARCH_JSON):
+      print(loc, entry.get("paper_id"))
+"""
+
+import json
+import re
+from collections.abc import Callable, Iterator
+from pathlib import Path
+from typing import Any, BinaryIO
+
+import note_document as notes
+
+try:
+    import orjson
+except ImportError:  # optional fast parser
+    orjson = None
+
+
+CHUNK_SIZE = 1 << 20
+
+_WS = re.compile(rb"[ \t\n\r]*")
+_STRING = re.compile(rb'"[^"\\]*(?:\\.[^"\\]*)*"', re.DOTALL)
+_SCALAR = re.compile(rb"[^,\]}\s]+")
+# Everything up to the next bracket outside a string (or an incomplete string).
+_SKIP = re.compile(rb'(?:[^"\[\]{}]+|"[^"\\]*(?:\\.[^"\\]*)*")*', re.DOTALL)
+# `\u00XX` escapes of ASCII letters could spell a `followed` key that
+# `_is_followed_list` does not see.
+_ASCII_ESCAPE = re.compile(rb"\\u00[4-7]")
+
+_OPEN = frozenset(b"{[")
+_OBJECT = ord("{")
+_LIST = ord("[")
+_QUOTE = ord('"')
+_FOLLOWED_KEY = b'"followed"'
+_WS_BYTES = frozenset(b" \t\n\r")
+_COLON = ord(":")
+_BACKSLASH = ord("\\")
+
+
+def parser_name() -> str:
+    """Name of the parser used for entries (`orjson` or `json`)."""
+    return "orjson" if orjson is not None else "json"
+
+
+def _loads_json(raw: bytes) -> Any:
+    return json.loads(raw)
+
+
+def _loads_orjson(raw: bytes) -> Any:
+    try:
+        return orjson.loads(raw)
+    except orjson.JSONDecodeError:
+        return json.loads(raw)
+
+
+def _get_parser(name: str) -> Callable[[bytes], Any]:
+    if name == "auto":
+        name = parser_name()
+    if name == "orjson":
+        if orjson is None:
+            raise ValueError("parser `orjson` requested but orjson is not installed")
+        return _loads_orjson
+    if name == "json":
+        return _loads_json
+    raise ValueError(f"unknown parser: {name}")
+
+
+class _Reader:
+    # A growing byte buffer over the file; offsets stay valid until `compact()`.
+
+    def __init__(self, f: BinaryIO, path: Path, chunk_size: int) -> None:
+        self.f = f
+        self.path = path
+        self.chunk_size = chunk_size
+        self.buf = b""
+        self.pos = 0
+        self.eof = False
+
+    def fail(self, what: str) -> ValueError:
+        return ValueError(f"invalid json: {self.path} ({what} at byte {self.pos})")
+
+    def fill(self) -> bool:
+        if self.eof:
+            return False
+        chunk = self.f.read(self.chunk_size)
+        if not chunk:
+            self.eof = True
+            return False
+        notes.LOADER.count_read(self.path, len(chunk))
+        self.buf += chunk
+        return True
+
+    def compact(self) -> None:
+        if self.pos >= self.chunk_size:
+            self.buf = self.buf[self.pos :]
+            self.pos = 0
+
+    def peek(self) -> int:
+        """Skips whitespace; returns the next byte (-1 at end of file)."""
+        while True:
+            self.pos = _WS.match(self.buf, self.pos).end()
+            if self.pos < len(self.buf):
+                return self.buf[self.pos]
+            if not self.fill():
+                return -1
+
+    def expect(self, ch: bytes) -> None:
+        if self.peek() != ch[0]:
+            raise self.fail(f"expected {ch.decode()!r}")
+        self.pos += 1
+
+    def value(self) -> tuple[int, int, dict[int, int], dict[int, int]]:
+        """Reads the value at `pos` into the buffer.
+
+        Returns:
+            (start, end, closes, followed): its byte span and, for objects and
+            lists, the end offset of every nested object/list keyed by its
+            start offset, and the start of each object's `followed` list keyed
+            by the object's start offset.
+        """
+        c = self.peek()
+        start = self.pos
+        closes: dict[int, int] = {}
+        followed: dict[int, int] = {}
+        if c in _OPEN:
+            opens: list[int] = []
+            i = start
+            while True:
+                j = _SKIP.match(self.buf, i).end()
+                if j >= len(self.buf) or self.buf[j] == _QUOTE:
+                    # Buffer ends inside the value (or inside a string).
+                    i = j
+                    if not self.fill():
+                        self.pos = j
+                        raise self.fail("unexpected end of file")
+                    continue
+                if self.buf[j] in _OPEN:
+                    if (
+                        self.buf[j] == _LIST
+                        and opens
+                        and self.buf[opens[-1]] == _OBJECT
+                        and _is_followed_list(self.buf, j)
+                    ):
+                        followed[opens[-1]] = j
+                    opens.append(j)
+                else:
+                    if not opens:
+                        self.pos = j
+                        raise self.fail("unbalanced bracket")
+                    closes[opens.pop()] = j + 1
+                    if not opens:
+                        self.pos = j + 1
+                        return start, j + 1, closes, followed
+                i = j + 1
+        pattern = _STRING if c == _QUOTE else _SCALAR
+        while True:
+            m = pattern.match(self.buf, start)
+            if m is not None and (m.end() < len(self.buf) or self.eof):
+                self.pos = m.end()
+                return start, m.end(), closes, followed
+            if m is None and pattern is _SCALAR and start < len(self.buf):
+                raise self.fail("expected value")
+            if not self.fill():
+                raise self.fail("unexpected end of file")
+
+
+def _is_followed_list(buf: bytes, j: int) -> bool:
+    # Whether the `[` at `j` (inside an object) is the value of a `followed` key.
+    k = j - 1
+    while buf[k] in _WS_BYTES:
+        k -= 1
+    if buf[k] != _COLON:
+        return False
+    k -= 1
+    while buf[k] in _WS_BYTES:
+        k -= 1
+    k -= len(_FOLLOWED_KEY) - 1
+    return buf[k : k + len(_FOLLOWED_KEY)] == _FOLLOWED_KEY and buf[k - 1] != _BACKSLASH
+
+
+def _value_end(buf: bytes, i: int, closes: dict[int, int]) -> int:
+    if buf[i] in _OPEN:
+        return closes[i]
+    m = (_STRING if buf[i] == _QUOTE else _SCALAR).match(buf, i)
+    if m is None:
+        raise ValueError(f"unexpected byte at {i}")
+    return m.end()
+
+
+def _skip_ws(buf: bytes, i: int) -> int:
+    return _WS.match(buf, i).end()
+
+
+def _array_items(buf: bytes, start: int, closes: dict[int, int]) -> list[tuple[int, int]]:
+    # Spans of the items of the list starting at `start`.
+    out: list[tuple[int, int]] = []
+    i = _skip_ws(buf, start + 1)
+    if buf[i] == ord("]"):
+        return out
+    while True:
+        end = _value_end(buf, i, closes)
+        out.append((i, end))
+        i = _skip_ws(buf, end)
+        if buf[i] == ord(","):
+            i = _skip_ws(buf, i + 1)
+            continue
+        if buf[i] == ord("]"):
+            return out
+        raise ValueError(f"expected ',' or ']' at {i}")
+
+
+def _followed_span(buf: bytes, start: int, closes: dict[int, int]) -> tuple[int, int] | None:
+    # Span of the (last) `followed` list of the object starting at `start`,
+    # found key by key (used when a key may be spelled with escapes).
+    found: tuple[int, int] | None = None
+    i = _skip_ws(buf, start + 1)
+    if buf[i] == ord("}"):
+        return None
+    while True:
+        m = _STRING.match(buf, i)
+        if m is None:
+            raise ValueError(f"expected key at {i}")
+        key = buf[i : m.end()]
+        i = _skip_ws(buf, m.end())
+        if buf[i] != ord(":"):
+            raise ValueError(f"expected ':' at {i}")
+        i = _skip_ws(buf, i + 1)
+        end = _value_end(buf, i, closes)
+        if buf[i] == ord("[") and (
+            key == _FOLLOWED_KEY or (b"\\" in key and json.loads(key) == "followed")
+        ):
+            found = (i, end)
+        i = _skip_ws(buf, end)
+        if buf[i] == ord(","):
+            i = _skip_ws(buf, i + 1)
+            continue
+        if buf[i] == ord("}"):
+            return found
+        raise ValueError(f"expected ',' or '}}' at {i}")
+
+
+def _walk(
+    buf: bytes,
+    start: int,
+    end: int,
+    closes: dict[int, int],
+    followed: dict[int, int],
+    loc: str,
+    parse: Callable[[bytes], Any],
+) -> Iterator[tuple[dict[str, Any], str]]:
+    # Pre-order walk of one top-level entry and its `followed` subtree.
+    exact = _ASCII_ESCAPE.search(buf, start, end) is not None
+    stack = [(start, end, loc)]
+    while stack:
+        a, b, loc = stack.pop()
+        if buf[a] != _OBJECT:
+            continue
+        if exact:
+            span = _followed_span(buf, a, closes)
+        else:
+            list_start = followed.get(a)
+            span = None if list_start is None else (list_start, closes[list_start])
+        if span is None:
+            entry = parse(buf[a:b])
+        else:
+            entry = parse(buf[a : span[0]] + b"[]" + buf[span[1] : b])
+        yield entry, loc
+        if span is not None:
+            items = _array_items(buf, span[0], closes)
+            for i in range(len(items) - 1, -1, -1):
+                stack.append((*items[i], f"{loc}.followed[{i}]"))
+
+
+def iter_research_entries(
+    path: Path,
+    prefix: str = "research",
+    parser: str = "auto",
+    chunk_size: int = CHUNK_SIZE,
+) -> Iterator[tuple[dict[str, Any], str]]:
+    """Streams `(entry, location)` pairs from a research.json file.
+
+    Args:
+        path: Path to research.json.
+        prefix: Location prefix, e.g. `research`.
+        parser: `auto` (orjson if installed), `orjson` or `json`.
+        chunk_size: Bytes per read.
+
+    Yields:
+        (entry, location) pairs in document order, e.g.
+        `research[0].followed[1]`. Non-dict items are skipped.
+
+    Raises:
+        FileNotFoundError: If the file does not exist.
+        ValueError: If the file is not valid JSON or `research` is not a list.
+    """
+    parse = _get_parser(parser)
+    try:
+        f = open(path, "rb")
+    except FileNotFoundError as e:
+        raise FileNotFoundError(f"missing file: {path}") from e
+    with f:
+        r = _Reader(f, path, chunk_size)
+        notes.LOADER.stats.parses += 1
+        r.expect(b"{")
+        if r.peek() == ord("}"):
+            r.pos += 1
+        else:
+            while True:
+                if r.peek() != _QUOTE:
+                    raise r.fail("expected key")
+                k0, k1, _, _ = r.value()
+                key = json.loads(r.buf[k0:k1])
+                r.expect(b":")
+                if key != "research":
+                    r.value()
+                elif r.peek() != ord("["):
+                    raise ValueError(f"`research` must be a list in {path}")
+                else:
+                    yield from _stream_list(r, prefix, parse)
+                c = r.peek()
+                r.pos += 1
+                if c == ord("}"):
+                    break
+                if c != ord(","):
+                    r.pos -= 1
+                    raise r.fail("expected ',' or '}'")
+        if r.peek() != -1:
+            raise r.fail("extra data")
+
+
+def _stream_list(
+    r: _Reader,
+    prefix: str,
+    parse: Callable[[bytes], Any],
+) -> Iterator[tuple[dict[str, Any], str]]:
+    r.pos += 1
+    if r.peek() == ord("]"):
+        r.pos += 1
+        return
+    i = 0
+    while True:
+        r.compact()
+        start, end, closes, followed = r.value()
+        try:
+            yield from _walk(r.buf, start, end, closes, followed, f"{prefix}[{i}]", parse)
+        except ValueError as e:
+            raise ValueError(f"invalid json: {r.path} ({prefix}[{i}]: {e})") from e
+        i += 1
+        c = r.peek()
+        r.pos += 1
+        if c == ord("]"):
+            return
+        if c != ord(","):
+            r.pos -= 1
+            raise r.fail("expected ',' or ']'")
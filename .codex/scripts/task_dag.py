@@ -0,0 +1,519 @@
+#!/usr/bin/env python3
+from __future__ import annotations
+
+"""Runs validation tasks in dependency order, make-style.
+
+The graph is built from the task.json files under `1-验证/tasks`:
+- `next_tasks`: if A lists B, B runs after A;
+- `outputs` / `inputs`: if B reads a path that A writes (the same path, a
+  file under an output dir, or a dir that contains an output), B runs after A.
+
+A task runs its own `command` if task.json has one, otherwise the `command` of
+every case.json linked to it (`task_id`), in case_id order. Commands run
+through the shell from the workspace root (with `TASK_ID` / `CASE_ID` set) on
+a process pool (`--jobs`, default all cores); a task starts as soon as all of
+its predecessors are done. Each task's output goes to
+`data/cache/task_dag/logs/<task_id>.log`.
+
+Before a task starts, its key is computed from its definition (task.json
+without `result_summary`, `decision` and `next_tasks`, plus the commands), the
+content of its inputs (a file, or every file under a dir) and the keys of its
+predecessors. The task is skipped if the key equals the one stored after its
+last successful run (`data/cache/task_dag_state.json`) and all its outputs
+exist. Input digests are cached by stat fingerprint, so unchanged inputs are
+not read again.
+
+A failed task (non-zero exit, or over `--timeout`) blocks its descendants.
+By default no new task starts after a failure (like make); `--keep-going`
+still runs the tasks that do not depend on it. Dependency cycles and unknown
+`next_tasks` are reported; tasks on or after a cycle are not run. Exit code 1
+if any task failed, was blocked or is on a cycle.
+
+Usage:
+  python .codex/scripts/task_dag.py --dry-run
+  python .codex/scripts/task_dag.py --jobs 8 --keep-going
+  python .codex/scripts/task_dag.py --task 260101-task-003 --force
+"""
+
+import argparse
+import bisect
+import hashlib
+import heapq
+import json
+import os
+import posixpath
+import signal
+import subprocess
+import time
+from collections import Counter
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any
+
+import task_manifest as tm
+import workspace_index as wsi
+
+
+ROOT = wsi.ROOT
+
+STATE_PATH = ROOT / "data" / "cache" / "task_dag_state.json"
+LOG_DIR = ROOT / "data" / "cache" / "task_dag" / "logs"
+STATE_VERSION = 1
+SAVE_INTERVAL = 2.0  # seconds between state saves during a run
+
+# task.json fields that record results or successors, not what the task does.
+_RESULT_FIELDS = {"result_summary", "decision", "next_tasks"}
+_TIMEOUT_EXIT = 124  # as GNU timeout
+
+
+def _norm(path: str) -> str:
+    """Workspace-relative POSIX form of a task input / output path."""
+    path = path.strip()
+    if os.path.isabs(path):
+        path = wsi.relpath_str(path)
+    return posixpath.normpath(path.replace("\\", "/")).lstrip("/")
+
+
+def _str_list(value: Any) -> list[str]:
+    if not isinstance(value, list):
+        return []
+    return [str(x).strip() for x in value if str(x).strip()]
+
+
+@dataclass
+class TaskNode:
+    """One task and its edges."""
+
+    task_id: str
+    task_dir: Path
+    task: dict[str, Any]
+    commands: list[tuple[str, str]]  # (task_id or case_id, shell command)
+    inputs: list[str]
+    outputs: list[str]
+    preds: set[str] = field(default_factory=set)
+    succs: set[str] = field(default_factory=set)
+
+
+@dataclass
+class TaskGraph:
+    """Tasks with their dependency edges."""
+
+    nodes: dict[str, TaskNode]
+    unknown: list[tuple[str, str]]  # (task_id, next_task that does not exist)
+
+    def closure(self, targets: list[str]) -> set[str]:
+        """`targets` and everything they depend on."""
+        out: set[str] = set()
+        stack = list(targets)
+        while stack:
+            tid = stack.pop()
+            if tid not in out:
+                out.add(tid)
+                stack.extend(self.nodes[tid].preds)
+        return out
+
+    def order(self, selected: set[str]) -> tuple[list[str], list[list[str]]]:
+        """Topological order of `selected` (ties by task_id) and the cycles left over.
+
+        Tasks on a cycle, and those that depend on one, are not in the order.
+        """
+        indeg = {tid: len(self.nodes[tid].preds & selected) for tid in selected}
+        ready = [tid for tid, n in indeg.items() if n == 0]
+        heapq.heapify(ready)
+        out: list[str] = []
+        while ready:
+            tid = heapq.heappop(ready)
+            out.append(tid)
+            for s in self.nodes[tid].succs & selected:
+                indeg[s] -= 1
+                if indeg[s] == 0:
+                    heapq.heappush(ready, s)
+        left = selected - set(out)
+        return out, _find_cycles(left, {tid: self.nodes[tid].preds & left for tid in left})
+
+
+def _find_cycles(left: set[str], preds: dict[str, set[str]]) -> list[list[str]]:
+    # Every task left after the topological sort has a predecessor that is
+    # also left, so walking predecessors always ends on a cycle.
+    seen: set[str] = set()
+    cycles: list[list[str]] = []
+    for start in sorted(left):
+        if start in seen:
+            continue
+        path: list[str] = []
+        pos: dict[str, int] = {}
+        cur = start
+        while cur not in pos and cur not in seen:
+            pos[cur] = len(path)
+            path.append(cur)
+            cur = min(preds[cur])
+        if cur in pos:
+            cycle = path[pos[cur] :][::-1]
+            cycles.append([*cycle, cycle[0]])
+        seen.update(path)
+    return cycles
+
+
+def build_graph(index: wsi.WorkspaceIndex) -> TaskGraph:
+    """Builds the task graph from the workspace's task.json and case.json files."""
+    case_commands: dict[str, list[tuple[str, str]]] = {}
+    for case_id, case in sorted(index.cases.items()):
+        command = case.get("command")
+        tid = str(case.get("task_id", "")).strip()
+        if tid and isinstance(command, str) and command.strip():
+            case_commands.setdefault(tid, []).append((case_id, command.strip()))
+
+    nodes: dict[str, TaskNode] = {}
+    for tid, task in index.tasks.items():
+        command = task.get("command")
+        if isinstance(command, str) and command.strip():
+            commands = [(tid, command.strip())]
+        else:
+            commands = case_commands.get(tid, [])
+        nodes[tid] = TaskNode(
+            task_id=tid,
+            task_dir=index.task_dirs[tid],
+            task=task,
+            commands=commands,
+            inputs=[_norm(p) for p in _str_list(task.get("inputs"))],
+            outputs=[_norm(p) for p in _str_list(task.get("outputs"))],
+        )
+
+    unknown: list[tuple[str, str]] = []
+    for tid, node in nodes.items():
+        for nxt in _str_list(node.task.get("next_tasks")):
+            if nxt not in nodes:
+                unknown.append((tid, nxt))
+            elif nxt != tid:
+                node.succs.add(nxt)
+                nodes[nxt].preds.add(tid)
+
+    producers: dict[str, set[str]] = {}
+    for tid, node in nodes.items():
+        for out in node.outputs:
+            producers.setdefault(out, set()).add(tid)
+    outputs = sorted(producers)
+    for tid, node in nodes.items():
+        for path in node.inputs:
+            found: set[str] = set()
+            # The same path, or a file under an output dir.
+            cur = path
+            while cur not in ("", "."):
+                found |= producers.get(cur, set())
+                cur = posixpath.dirname(cur)
+            # A dir that contains outputs.
+            prefix = path + "/"
+            j = bisect.bisect_left(outputs, prefix)
+            while j < len(outputs) and outputs[j].startswith(prefix):
+                found |= producers[outputs[j]]
+                j += 1
+            for p in found - {tid}:
+                node.preds.add(p)
+                nodes[p].succs.add(tid)
+    return TaskGraph(nodes, unknown)
+
+
+class RunState:
+    """Keys of the last successful runs plus cached input digests."""
+
+    def __init__(self, path: Path) -> None:
+        self.path = path
+        self.tasks: dict[str, dict[str, Any]] = {}
+        self.files: dict[str, tm.FileState] = {}
+
+    @classmethod
+    def load(cls, path: Path = STATE_PATH) -> RunState:
+        s = cls(path)
+        try:
+            raw = json.loads(path.read_text(encoding="utf-8"))
+            if raw.get("version") == STATE_VERSION:
+                s.tasks = dict(raw["tasks"])
+                s.files = dict(raw["files"])
+        except (OSError, ValueError, KeyError, TypeError, AttributeError):
+            pass  # missing or broken: every task runs once
+        return s
+
+    def save(self) -> None:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        data = {"version": STATE_VERSION, "tasks": self.tasks, "files": self.files}
+        wsi.write_text_atomic(self.path, json.dumps(data, ensure_ascii=False, sort_keys=True, separators=(",", ":")))
+
+    def file_digest(self, path: Path) -> str:
+        """Content digest of `path`, reused while its stat fingerprint holds."""
+        fp = tm.stat_state(path)
+        if fp is None:
+            return "missing"
+        key = path.as_posix()
+        rec = self.files.get(key)
+        if rec is not None and rec[:3] == fp:
+            return rec[3]
+        h = hashlib.blake2b(digest_size=16)
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(1 << 20), b""):
+                h.update(chunk)
+        self.files[key] = [*fp, h.hexdigest()]
+        return h.hexdigest()
+
+    def path_digest(self, rel: str) -> str:
+        """Digest of a file, of every file under a dir, or `missing`."""
+        path = ROOT / rel
+        if path.is_file():
+            return self.file_digest(path)
+        if not path.is_dir():
+            return "missing"
+        h = hashlib.blake2b(digest_size=16)
+        for dirpath, dirnames, filenames in os.walk(path):
+            dirnames.sort()
+            for name in sorted(filenames):
+                p = Path(dirpath) / name
+                h.update(f"{p.relative_to(path).as_posix()}\0{self.file_digest(p)}\n".encode())
+        return h.hexdigest()
+
+
+def task_key(node: TaskNode, state: RunState, pred_keys: dict[str, str]) -> str:
+    """Key of what running `node` now would depend on."""
+    payload = {
+        "task": {k: v for k, v in node.task.items() if k not in _RESULT_FIELDS},
+        "commands": node.commands,
+        "inputs": {p: state.path_digest(p) for p in node.inputs},
+        "after": sorted(pred_keys.items()),
+    }
+    return tm.digest(json.dumps(payload, ensure_ascii=False, sort_keys=True).encode("utf-8"))
+
+
+def is_current(node: TaskNode, key: str, state: RunState) -> bool:
+    rec = state.tasks.get(node.task_id)
+    return rec is not None and rec.get("key") == key and all((ROOT / p).exists() for p in node.outputs)
+
+
+def run_task(task_id: str, commands: list[tuple[str, str]], log_path: Path, timeout: float) -> int:
+    """Runs the commands of one task in order (in a worker process); returns the exit code.
+
+    Stops at the first failing command. With `timeout > 0`, the whole task
+    gets that many seconds; on expiry the command's process group is killed
+    and the exit code is 124.
+    """
+    deadline = time.monotonic() + timeout if timeout > 0 else None
+    log_path.parent.mkdir(parents=True, exist_ok=True)
+    with open(log_path, "wb") as log:
+        for label, command in commands:
+            log.write(f"$ {command}\n".encode("utf-8"))
+            log.flush()
+            env = {**os.environ, "TASK_ID": task_id}
+            if label != task_id:
+                env["CASE_ID"] = label
+            proc = subprocess.Popen(
+                command,
+                shell=True,
+                cwd=ROOT,
+                env=env,
+                stdin=subprocess.DEVNULL,
+                stdout=log,
+                stderr=subprocess.STDOUT,
+                start_new_session=True,
+            )
+            try:
+                rc = proc.wait(timeout=None if deadline is None else max(deadline - time.monotonic(), 0.01))
+            except subprocess.TimeoutExpired:
+                os.killpg(proc.pid, signal.SIGKILL)
+                proc.wait()
+                log.write(f"\ntimeout: task exceeded {timeout:g}s\n".encode("utf-8"))
+                return _TIMEOUT_EXIT
+            if rc != 0:
+                return rc
+    return 0
+
+
+@dataclass
+class RunCounts:
+    """Per-status totals of one run."""
+
+    ran: int = 0
+    skipped: int = 0
+    failed: int = 0
+    blocked: int = 0
+    no_command: int = 0
+    seconds: float = 0.0
+
+    def summary(self) -> str:
+        tasks = self.ran + self.skipped + self.failed + self.blocked + self.no_command
+        return (
+            f"ran={self.ran}, skipped={self.skipped}, failed={self.failed}, blocked={self.blocked}, "
+            f"no_command={self.no_command} ({tasks} task(s) in {self.seconds:.2f}s)"
+        )
+
+
+def execute(
+    graph: TaskGraph,
+    selected: set[str],
+    state: RunState,
+    jobs: int,
+    force: bool = False,
+    keep_going: bool = False,
+    timeout: float = 0.0,
+    log_dir: Path = LOG_DIR,
+) -> RunCounts:
+    """Runs the `selected` tasks on `jobs` worker processes in dependency order.
+
+    A task is submitted once all its selected predecessors are done (ran,
+    skipped or had nothing to run). The state is saved at most every
+    `SAVE_INTERVAL` seconds while tasks finish and once at the end (also on
+    Ctrl-C), so an interrupted run resumes where it stopped.
+    """
+    counts = RunCounts()
+    t0 = time.perf_counter()
+    nodes = graph.nodes
+    indeg = {tid: len(nodes[tid].preds & selected) for tid in selected}
+    ready = [tid for tid, n in indeg.items() if n == 0]
+    heapq.heapify(ready)
+    keys: dict[str, str] = {}
+    running: dict[Future[int], tuple[str, float]] = {}
+    stopped = False
+    saved_at = time.monotonic()
+
+    def release(tid: str) -> None:
+        for s in nodes[tid].succs & selected:
+            indeg[s] -= 1
+            if indeg[s] == 0:
+                heapq.heappush(ready, s)
+
+    try:
+        with ProcessPoolExecutor(max_workers=jobs) as ex:
+            while ready or running:
+                while ready and not stopped and len(running) < jobs:
+                    tid = heapq.heappop(ready)
+                    node = nodes[tid]
+                    key = keys[tid] = task_key(node, state, {p: keys[p] for p in node.preds & selected})
+                    if not node.commands:
+                        counts.no_command += 1
+                        release(tid)
+                    elif not force and is_current(node, key, state):
+                        counts.skipped += 1
+                        release(tid)
+                    else:
+                        print(f"run: {tid}", flush=True)
+                        fut = ex.submit(run_task, tid, node.commands, log_dir / f"{tid}.log", timeout)
+                        running[fut] = (tid, time.perf_counter())
+                if not running:
+                    break
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for fut in done:
+                    tid, started = running.pop(fut)
+                    seconds = time.perf_counter() - started
+                    try:
+                        rc = fut.result()
+                    except Exception as e:  # noqa: BLE001 - a broken worker fails the task, not the run
+                        rc = -1
+                        print(f"error: {tid}: {e}")
+                    if rc == 0:
+                        counts.ran += 1
+                        state.tasks[tid] = {
+                            "key": keys[tid],
+                            "finished_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+                            "seconds": round(seconds, 3),
+                        }
+                        print(f"ok: {tid} ({seconds:.1f}s)", flush=True)
+                        release(tid)
+                    else:
+                        counts.failed += 1
+                        state.tasks.pop(tid, None)
+                        print(f"failed: {tid}: exit {rc} (log: {wsi.relpath_str(log_dir / f'{tid}.log')})", flush=True)
+                        stopped = stopped or not keep_going
+                    if time.monotonic() - saved_at > SAVE_INTERVAL:
+                        state.save()
+                        saved_at = time.monotonic()
+    finally:
+        state.save()
+    counts.blocked = len(selected) - counts.ran - counts.skipped - counts.failed - counts.no_command
+    counts.seconds = time.perf_counter() - t0
+    return counts
+
+
+def plan(graph: TaskGraph, order: list[str], selected: set[str], state: RunState, force: bool) -> dict[str, str]:
+    """task_id -> `run`, `skip` or `no-command`, without running anything.
+
+    A task that depends on a task planned to run is planned to run too, since
+    its inputs may change.
+    """
+    keys: dict[str, str] = {}
+    out: dict[str, str] = {}
+    for tid in order:
+        node = graph.nodes[tid]
+        preds = node.preds & selected
+        keys[tid] = task_key(node, state, {p: keys[p] for p in preds})
+        if not node.commands:
+            out[tid] = "no-command"
+        elif force or not is_current(node, keys[tid], state) or any(out[p] == "run" for p in preds):
+            out[tid] = "run"
+        else:
+            out[tid] = "skip"
+    return out
+
+
+def main() -> int:
+    p = argparse.ArgumentParser()
+    p.add_argument(
+        "--tasks-root",
+        type=Path,
+        default=wsi.TASKS_ROOT,
+        help="Root folder that contains task directories.",
+    )
+    p.add_argument(
+        "--task",
+        action="append",
+        default=None,
+        help="Run only this task_id and what it depends on (repeatable).",
+    )
+    p.add_argument("--jobs", type=int, default=0, help="Worker processes (0 = all cores). Default: 0.")
+    p.add_argument("--force", action="store_true", help="Run tasks even if their key matches the last successful run.")
+    p.add_argument("--keep-going", action="store_true", help="After a failure, keep running tasks that do not depend on it.")
+    p.add_argument("--timeout", type=float, default=0.0, help="Seconds per task (0 = no limit). Default: 0.")
+    p.add_argument("--dry-run", action="store_true", help="Print the planned order and what would run; run nothing.")
+    p.add_argument(
+        "--state",
+        type=Path,
+        default=STATE_PATH,
+        help="Run state file. Default: data/cache/task_dag_state.json.",
+    )
+    args = p.parse_args()
+
+    tasks_root = args.tasks_root if args.tasks_root.is_absolute() else ROOT / args.tasks_root
+    graph = build_graph(wsi.get_index(tasks_root=tasks_root))
+    for tid, nxt in graph.unknown:
+        print(f"warning: {tid}: next_tasks: unknown task {nxt}")
+
+    if args.task:
+        missing = [t for t in args.task if t not in graph.nodes]
+        if missing:
+            print(f"error: unknown task(s): {', '.join(missing)}")
+            return 1
+        selected = graph.closure(args.task)
+    else:
+        selected = set(graph.nodes)
+    order, cycles = graph.order(selected)
+    for cycle in cycles:
+        print(f"cycle: {' -> '.join(cycle)}")
+    runnable = set(order)
+    state = RunState.load(args.state)
+
+    if args.dry_run:
+        planned = plan(graph, order, runnable, state, args.force)
+        for tid in order:
+            print(f"{planned[tid]}: {tid}")
+        n = Counter(planned.values())
+        print(
+            f"done: run={n['run']}, skip={n['skip']}, no_command={n['no-command']}, "
+            f"blocked={len(selected) - len(order)} (dry run)"
+        )
+        return 1 if cycles else 0
+
+    jobs = args.jobs if args.jobs > 0 else (os.cpu_count() or 1)
+    counts = execute(graph, runnable, state, jobs, args.force, args.keep_going, args.timeout)
+    counts.blocked += len(selected) - len(order)
+    print(f"done: {counts.summary()}")
+    return 1 if counts.failed or counts.blocked else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
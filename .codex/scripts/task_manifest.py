@@ -0,0 +1,229 @@
+#!/usr/bin/env python3
+from __future__ import annotations
+
+"""Sync manifest for task.md / task.json pairs, shared by the task sync tools.
+
+After `task_md2json.py` or `task_json2md.py` leaves a pair in sync (written or
+already identical), the state of both files is recorded in
+`data/cache/task_sync_manifest.json`: `[size, mtime_ns, inode, blake2b]` per
+file. Records are kept per direction (`md2json`, `json2md`): a pair is in
+sync for md2json when merging task.md into task.json changes nothing, and
+for json2md when task.md is exactly the render of task.json, and the two
+can differ (e.g. a placeholder in task.md that md2json ignores). Each tool
+only trusts its own records. On the next run a pair is skipped as
+`unchanged` when
+- both stat fingerprints still match (no file is read), or
+- the fingerprints moved but the content digests did not (e.g. a `touch`,
+  or a checkout that rewrote the same bytes); the new fingerprints are then
+  recorded.
+
+The manifest is dropped when it was made by another version of the sync
+scripts or the task templates, so a renderer or parser change re-syncs every
+pair. `run_pairs` runs a per-pair function on a thread pool (the work is
+mostly file I/O) and keeps results in input order.
+
+Usage:
+  python .codex/scripts/task_manifest.py stats
+  python .codex/scripts/task_manifest.py clear
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import time
+from collections.abc import Callable
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Any
+
+import doc_codec
+import workspace_index as wsi
+
+
+ROOT = wsi.ROOT
+
+MANIFEST_PATH = ROOT / "data" / "cache" / "task_sync_manifest.json"
+MANIFEST_VERSION = 2
+DIRECTIONS = ("md2json", "json2md")
+_SCRIPTS = ["task_md2json.py", "task_json2md.py", "task_manifest.py", "doc_codec.py"]
+
+# Per-file state: [size, mtime_ns, inode, content digest].
+FileState = list[Any]
+
+
+def digest(data: bytes) -> str:
+    return hashlib.blake2b(data, digest_size=16).hexdigest()
+
+
+def stat_state(path: Path) -> list[int] | None:
+    """`[size, mtime_ns, inode]` of `path`, or None if it does not exist."""
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return [st.st_size, st.st_mtime_ns, st.st_ino]
+
+
+def file_state(fingerprint: list[int], data: bytes) -> FileState:
+    """State to record for content `data` read after taking `fingerprint`.
+
+    Take the fingerprint before reading: if the file changes in between, the
+    recorded fingerprint is already stale and the next run re-reads it.
+    """
+    return [*fingerprint, digest(data)]
+
+
+@dataclass
+class PairState:
+    """What the manifest keeps for one task dir."""
+
+    task_id: str
+    md: FileState
+    json: FileState
+
+
+class TaskManifest:
+    """Last synced state of every task.md / task.json pair, for one direction.
+
+    Lookups are read-only and safe from worker threads; `record` and `save`
+    are called from the thread that runs `run_pairs`. `save` keeps the other
+    direction's records as they are on disk at that point.
+    """
+
+    def __init__(self, path: Path, context: dict[str, Any], direction: str) -> None:
+        if direction not in DIRECTIONS:
+            raise ValueError(f"unknown sync direction: {direction!r}")
+        self.path = path
+        self.context = context
+        self.direction = direction
+        self.pairs: dict[str, PairState] = {}
+        self.dirty = False
+
+    @classmethod
+    def load(cls, direction: str, path: Path = MANIFEST_PATH) -> TaskManifest:
+        here = Path(__file__).parent
+        context = {
+            "version": MANIFEST_VERSION,
+            "root": ROOT.as_posix(),
+            "scripts": [stat_state(here / name) for name in _SCRIPTS],
+            "codec": doc_codec.get_codec("task").version,
+        }
+        m = cls(path, context, direction)
+        try:
+            raw = json.loads(path.read_text(encoding="utf-8"))
+            if raw.get("context") == context:
+                m.pairs = {k: PairState(**v) for k, v in raw["pairs"].get(direction, {}).items()}
+        except (OSError, ValueError, KeyError, TypeError, AttributeError):
+            pass  # missing or broken: every pair is synced once
+        return m
+
+    @staticmethod
+    def key(task_dir: Path) -> str:
+        return wsi.relpath_str(task_dir)
+
+    def get(self, task_dir: Path) -> PairState | None:
+        return self.pairs.get(self.key(task_dir))
+
+    def unchanged(self, task_dir: Path, md_fp: list[int] | None, json_fp: list[int] | None) -> PairState | None:
+        """The recorded pair if both files still have their recorded fingerprints."""
+        rec = self.get(task_dir)
+        if rec is None or md_fp is None or json_fp is None:
+            return None
+        return rec if rec.md[:3] == md_fp and rec.json[:3] == json_fp else None
+
+    def same_content(self, task_dir: Path, md: FileState, json_: FileState) -> bool:
+        """True if the recorded digests match (the fingerprints may differ)."""
+        rec = self.get(task_dir)
+        return rec is not None and rec.md[3] == md[3] and rec.json[3] == json_[3]
+
+    def record(self, task_dir: Path, state: PairState) -> None:
+        key = self.key(task_dir)
+        if self.pairs.get(key) != state:
+            self.pairs[key] = state
+            self.dirty = True
+
+    def save(self) -> None:
+        if not self.dirty:
+            return
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        pairs: dict[str, Any] = {}
+        try:
+            raw = json.loads(self.path.read_text(encoding="utf-8"))
+            if raw.get("context") == self.context:
+                pairs = {d: raw["pairs"][d] for d in DIRECTIONS if d in raw["pairs"]}
+        except (OSError, ValueError, KeyError, TypeError, AttributeError):
+            pass
+        pairs[self.direction] = {k: asdict(v) for k, v in sorted(self.pairs.items())}
+        data = {"context": self.context, "pairs": {d: pairs[d] for d in DIRECTIONS if d in pairs}}
+        wsi.write_text_atomic(self.path, json.dumps(data, ensure_ascii=False, separators=(",", ":")))
+        self.dirty = False
+
+
+@dataclass
+class SyncCounts:
+    """Per-action totals of one `run_pairs` call."""
+
+    created: int = 0
+    updated: int = 0
+    unchanged: int = 0
+    skipped: int = 0
+    planned: int = 0  # dry-run writes
+    seconds: float = 0.0
+
+    def summary(self) -> str:
+        pairs = self.created + self.updated + self.unchanged + self.skipped + self.planned
+        rate = pairs / self.seconds if self.seconds > 0 else 0.0
+        return (
+            f"created={self.created}, updated={self.updated}, unchanged={self.unchanged}, "
+            f"skipped={self.skipped} ({pairs} pair(s) in {self.seconds:.2f}s, {rate:.0f} pairs/s)"
+        )
+
+
+def run_pairs(
+    task_dirs: list[Path],
+    sync_one: Callable[[Path], tuple[str, PairState | None]],
+    jobs: int,
+    manifest: TaskManifest | None,
+    on_planned: Callable[[Path, str], None],
+) -> SyncCounts:
+    """Runs `sync_one` over `task_dirs` on `jobs` threads (0 = pool default).
+
+    `sync_one` returns `(action, state)`: `created`, `updated`, `unchanged`
+    or `skipped`, or any other action for a dry-run write (passed to
+    `on_planned` in input order); a `state` is recorded in the manifest.
+    """
+    counts = SyncCounts()
+    t0 = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=jobs if jobs > 0 else None) as ex:
+        for task_dir, (action, state) in zip(task_dirs, ex.map(sync_one, task_dirs)):
+            if state is not None and manifest is not None:
+                manifest.record(task_dir, state)
+            if action in {"created", "updated", "unchanged", "skipped"}:
+                setattr(counts, action, getattr(counts, action) + 1)
+            else:
+                counts.planned += 1
+                on_planned(task_dir, action)
+    counts.seconds = time.perf_counter() - t0
+    if manifest is not None:
+        manifest.save()
+    return counts
+
+
+def main() -> int:
+    p = argparse.ArgumentParser()
+    p.add_argument("command", choices=["stats", "clear"], help="stats: pairs recorded; clear: delete the manifest.")
+    p.add_argument("--manifest", type=Path, default=MANIFEST_PATH, help="Manifest file.")
+    args = p.parse_args()
+    if args.command == "clear":
+        args.manifest.unlink(missing_ok=True)
+        print(f"done: removed {wsi.relpath_str(args.manifest)}")
+        return 0
+    counts = ", ".join(f"{d}={len(TaskManifest.load(d, args.manifest).pairs)}" for d in DIRECTIONS)
+    print(f"done: {counts} pair(s) recorded in {wsi.relpath_str(args.manifest)}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
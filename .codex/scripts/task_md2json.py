@@ -7,181 +7,166 @@ This script syncs files inside a task directory:
   1-验证/tasks/<task_id>/task.md
   1-验证/tasks/<task_id>/task.json
 
-It expects task.md to follow `.codex/templates/task.md` (key:value fields).
+It expects task.md to follow `.codex/templates/task.md` (key:value fields);
+the parser is the task codec of `doc_codec.py`, compiled from that template.
+Parses of unchanged task.md files are reused from `data/cache/parse/` (see
+parse_cache.py); `--no-parse-cache` turns that off.
+
+task.json is only written when the merged result differs from it, and pairs
+that have not changed since md2json last found them in sync are skipped
+without being parsed, using `data/cache/task_sync_manifest.json` (see
+`task_manifest.py`; `--no-manifest` turns it off). The remaining pairs run on
+a thread pool (`--jobs`); reads, hashing and parses run in parallel.
 
 Usage:
   python .codex/scripts/task_md2json.py --task-dir 1-验证/tasks/260101-task-001 \\
     --update-existing
   python .codex/scripts/task_md2json.py --tasks-root 1-验证/tasks --update-existing
+  python .codex/scripts/task_md2json.py --update-existing --jobs 8
 """
 
 import argparse
 import json
-import re
 from pathlib import Path
 from typing import Any
 
+import doc_codec
+import note_document as notes
+import parse_cache
+import task_manifest as tm
+import workspace_index as wsi
 
-ROOT = Path(__file__).resolve().parents[2]
 
+ROOT = wsi.ROOT
 
-HEADER_RE = re.compile(r"^#\s+Task:\s+(?P<task_id>[^.]+)\.\s*$")
-BULLET_RE = re.compile(r"^- \[(?P<state>[ xX])\]\s+(?P<rest>.*)$")
 
+_CODEC = doc_codec.get_codec("task")
 
-def _load_json(path: Path) -> dict[str, Any]:
-    try:
-        return json.loads(path.read_text(encoding="utf-8"))
-    except FileNotFoundError as e:
-        raise FileNotFoundError(f"missing file: {path}") from e
-    except json.JSONDecodeError as e:
-        raise ValueError(f"invalid json: {path} ({e})") from e
+# Parser id in the parse cache; bump when `parse_task_text` output changes.
+# The codec version follows the task templates.
+TASK_PARSER = f"task_md/3:{_CODEC.version}"
 
+# task.md key -> dotted task.json path, as compiled from the templates.
+KEY_MAP: dict[str, str] = {f.key: f.dotted for f in _CODEC.fields if f.kind != "list"}
+LIST_KEYS: dict[str, str] = {f.key: f.dotted for f in _CODEC.fields if f.kind == "list"}
 
-def _write_json(path: Path, data: dict[str, Any]) -> None:
-    path.write_text(
-        json.dumps(data, indent=2, ensure_ascii=False) + "\n",
-        encoding="utf-8",
-    )
 
+def parse_task_md(path: Path) -> dict[str, Any]:
+    """Parses one task markdown into a partial task.json dict.
 
-def _strip_backticks(s: str) -> str:
-    x = s.strip()
-    if len(x) >= 2 and x[0] == "`" and x[-1] == "`":
-        return x[1:-1]
-    return x
-
-
-def _is_placeholder(s: str) -> bool:
-    x = s.strip()
-    return x in {"…", "...", "...", "......", ""} or "…" in x
-
+    Args:
+        path: Markdown file path like `.../task.md`.
 
-def _parse_kv(rest: str) -> tuple[str, str] | None:
-    # Supports both ":" and "：" as delimiter.
-    if "：" in rest:
-        k, v = rest.split("：", 1)
-        return k.strip(), v.strip()
-    if ":" in rest:
-        k, v = rest.split(":", 1)
-        return k.strip(), v.strip()
-    return None
+    Returns:
+        A partial dict containing only fields found in the markdown.
+    """
+    return notes.LOADER.parse(path, TASK_PARSER, parse_task_text)[1]
 
 
-def _parse_json_list(value: str) -> list[Any] | None:
-    v = _strip_backticks(value).strip()
-    if not v.startswith("["):
-        return None
-    try:
-        out = json.loads(v)
-    except json.JSONDecodeError:
-        return None
-    return out if isinstance(out, list) else None
-
-
-def _set_path(obj: dict[str, Any], path: str, value: Any) -> None:
-    parts = path.split(".")
-    cur: dict[str, Any] = obj
-    for k in parts[:-1]:
-        if k not in cur or not isinstance(cur[k], dict):
-            cur[k] = {}
-        cur = cur[k]
-    cur[parts[-1]] = value
-
-
-KEY_MAP: dict[str, str] = {
-    "task_id": "task_id",
-    "stage": "stage",
-    "created_at": "created_at",
-    "paper_id": "source.paper_id",
-    "url": "source.url",
-    "来源补充": "source.desc",
-    "为什么现在做": "background.why_now",
-    "hypothesis": "hypothesis",
-    "variables": "design.variables",
-    "baseline": "design.baseline",
-    "data_split": "design.data_split",
-    "metrics": "design.metrics",
-    "budget": "design.budget",
-    "pass": "acceptance.pass",
-    "fail_but_useful": "acceptance.fail_but_useful",
-    "result_summary": "result_summary",
-    "decision": "decision",
-}
-
-LIST_KEYS: dict[str, str] = {
-    "changes": "changes",
-    "inputs": "inputs",
-    "outputs": "outputs",
-    "next_tasks": "next_tasks",
-}
+def parse_task_text(text: str) -> dict[str, Any]:
+    """Parses task markdown text (see `parse_task_md`)."""
+    return _CODEC.parse(text)
 
 
-def parse_task_md(path: Path) -> dict[str, Any]:
-    """Parses one task markdown into a partial task.json dict.
+def sync_task_dir(
+    task_dir: Path,
+    update_existing: bool,
+    create_missing: bool,
+    wanted: set[str] | None = None,
+    dry_run: bool = False,
+) -> str:
+    """Merges `task.md` of one task dir into its `task.json`.
 
     Args:
-        path: Markdown file path like `.../task.md`.
+        task_dir: Task directory (contains task.md).
+        update_existing: Update task.json if it exists.
+        create_missing: Create task.json if missing.
+        wanted: Only process these task_id (empty/None = all).
+        dry_run: Do not write; return the planned action instead.
 
     Returns:
-        A partial dict containing only fields found in the markdown.
+        `created`, `updated`, `unchanged` (task.json already holds the merge)
+        or `skipped`; with `dry_run`, `create` or `update` for a planned write.
     """
-    lines = path.read_text(encoding="utf-8").splitlines()
-    out: dict[str, Any] = {}
-
-    for raw in lines:
-        line = raw.rstrip()
-        m = HEADER_RE.match(line.strip())
-        if m:
-            out["task_id"] = m.group("task_id").strip()
-            continue
-
-        m = BULLET_RE.match(line.strip())
-        if not m:
-            continue
-
-        rest = m.group("rest").strip()
-        kv = _parse_kv(rest)
-        if kv is None:
-            continue
-        key, value = kv
-        if not key:
-            continue
-
-        if key in LIST_KEYS:
-            parsed = _parse_json_list(value)
-            if parsed is not None:
-                _set_path(out, LIST_KEYS[key], parsed)
-                continue
-            # Allow comma-separated list as fallback.
-            v = _strip_backticks(value).strip()
-            if not v:
-                _set_path(out, LIST_KEYS[key], [])
-                continue
-            if _is_placeholder(v):
-                continue
-            items = [x.strip() for x in v.split(",") if x.strip()]
-            _set_path(out, LIST_KEYS[key], items)
-            continue
-
-        if key in KEY_MAP:
-            v = _strip_backticks(value).strip()
-            if _is_placeholder(v):
-                continue
-            _set_path(out, KEY_MAP[key], v)
-            continue
-
-    return out
-
-
-def _iter_task_dirs(tasks_root: Path) -> list[Path]:
-    if not tasks_root.exists():
-        return []
-    out: list[Path] = []
-    for p in sorted(tasks_root.iterdir(), key=lambda x: x.name.lower()):
-        if p.is_dir() and (p / "task.md").exists():
-            out.append(p)
-    return out
+    return _sync_pair(task_dir, update_existing, create_missing, wanted, dry_run, None)[0]
+
+
+def _load_task_json(path: Path, data: bytes) -> dict[str, Any]:
+    try:
+        return json.loads(notes.decode_text(data))
+    except json.JSONDecodeError as e:
+        raise ValueError(f"invalid json: {path} ({e})") from e
+
+
+def _sync_pair(
+    task_dir: Path,
+    update_existing: bool,
+    create_missing: bool,
+    wanted: set[str] | None,
+    dry_run: bool,
+    manifest: tm.TaskManifest | None,
+) -> tuple[str, tm.PairState | None]:
+    # `sync_task_dir`, plus the pair state to record (None for dry runs and
+    # skipped pairs).
+    task_md = task_dir / "task.md"
+    task_json = task_dir / "task.json"
+    md_fp = tm.stat_state(task_md)
+    if md_fp is None:
+        return "skipped", None
+    json_fp = tm.stat_state(task_json)
+    had_json = json_fp is not None
+    if (had_json and not update_existing) or (not had_json and not create_missing):
+        return "skipped", None
+    if manifest is not None:
+        rec = manifest.unchanged(task_dir, md_fp, json_fp)
+        if rec is not None:
+            return ("skipped" if wanted and rec.task_id not in wanted else "unchanged"), None
+
+    md_data, parsed = notes.LOADER.parse(task_md, TASK_PARSER, parse_task_text)
+    task_id = str(parsed.get("task_id", "")).strip()
+    if wanted and task_id not in wanted:
+        return "skipped", None
+    md_state = tm.file_state(md_fp, md_data)
+
+    old = b""
+    data: dict[str, Any] = {}
+    if had_json:
+        old = notes.LOADER.read_bytes(task_json)
+        json_state = tm.file_state(json_fp, old)
+        if manifest is not None and manifest.same_content(task_dir, md_state, json_state):
+            return "unchanged", None if dry_run else tm.PairState(task_id, md_state, json_state)
+        data = _load_task_json(task_json, old)
+
+    # Merge parsed fields into existing json (keep unknown keys/subkeys).
+    if "task_id" in parsed:
+        data["task_id"] = parsed["task_id"]
+
+    for k in ["stage", "created_at", "hypothesis", "result_summary", "decision"]:
+        if k in parsed:
+            data[k] = parsed[k]
+
+    for nested_key in ["source", "background", "design", "acceptance"]:
+        if nested_key in parsed and isinstance(parsed[nested_key], dict):
+            if nested_key not in data or not isinstance(data.get(nested_key), dict):
+                data[nested_key] = {}
+            data[nested_key].update(parsed[nested_key])
+
+    for list_key in ["changes", "inputs", "outputs", "next_tasks"]:
+        if list_key in parsed:
+            data[list_key] = parsed[list_key]
+
+    text = json.dumps(data, indent=2, ensure_ascii=False) + "\n"
+    out = text.encode("utf-8")
+    if had_json and out == old:
+        return "unchanged", None if dry_run else tm.PairState(task_id, md_state, json_state)
+    if dry_run:
+        return ("update" if had_json else "create"), None
+
+    wsi.write_text_atomic(task_json, text)
+    notes.LOADER.forget(task_json)
+    json_fp = tm.stat_state(task_json)
+    state = tm.PairState(task_id, md_state, tm.file_state(json_fp, out)) if json_fp is not None else None
+    return ("updated" if had_json else "created"), state
 
 
 def main() -> int:
@@ -220,10 +205,28 @@ def main() -> int:
         action="store_true",
         help="Do not write files; only print planned changes.",
     )
+    p.add_argument(
+        "--no-parse-cache",
+        action="store_true",
+        help="Parse every task.md instead of reusing data/cache/parse results.",
+    )
+    p.add_argument(
+        "--jobs",
+        type=int,
+        default=0,
+        help="Threads for the task pairs (0 = Python's default pool size). Default: 0.",
+    )
+    p.add_argument(
+        "--no-manifest",
+        action="store_true",
+        help="Check every pair instead of skipping the ones unchanged since the last sync.",
+    )
     args = p.parse_args()
 
     if not args.update_existing and not args.create_missing:
         raise ValueError("need at least one of: --update-existing, --create-missing")
+    if not args.no_parse_cache:
+        notes.LOADER.parse_cache = parse_cache.ParseCache()
 
     task_dirs: list[Path]
     if args.task_dir:
@@ -232,68 +235,22 @@ def main() -> int:
         tasks_root = args.tasks_root
         if not tasks_root.is_absolute():
             tasks_root = ROOT / tasks_root
-        task_dirs = _iter_task_dirs(tasks_root)
+        task_dirs = wsi.iter_task_dirs(tasks_root, "task.md")
 
     wanted = set(args.task_id or [])
+    manifest = None if args.no_manifest else tm.TaskManifest.load("md2json")
+
+    counts = tm.run_pairs(
+        task_dirs,
+        lambda d: _sync_pair(d, args.update_existing, args.create_missing, wanted, args.dry_run, manifest),
+        args.jobs,
+        manifest,
+        lambda d, action: print(f"{action}: {d / 'task.json'}"),
+    )
+    if notes.LOADER.parse_cache is not None:
+        notes.LOADER.parse_cache.close()
 
-    created = 0
-    updated = 0
-    skipped = 0
-    for task_dir in task_dirs:
-        task_md = task_dir / "task.md"
-        task_json = task_dir / "task.json"
-        if not task_md.exists():
-            skipped += 1
-            continue
-
-        parsed = parse_task_md(task_md)
-        task_id = str(parsed.get("task_id", "")).strip()
-        if wanted and task_id not in wanted:
-            skipped += 1
-            continue
-
-        had_json = task_json.exists()
-        if had_json:
-            if not args.update_existing:
-                skipped += 1
-                continue
-            data = _load_json(task_json)
-        else:
-            if not args.create_missing:
-                skipped += 1
-                continue
-            data = {}
-
-        # Merge parsed fields into existing json (keep unknown keys/subkeys).
-        if "task_id" in parsed:
-            data["task_id"] = parsed["task_id"]
-
-        for k in ["stage", "created_at", "hypothesis", "result_summary", "decision"]:
-            if k in parsed:
-                data[k] = parsed[k]
-
-        for nested_key in ["source", "background", "design", "acceptance"]:
-            if nested_key in parsed and isinstance(parsed[nested_key], dict):
-                if nested_key not in data or not isinstance(data.get(nested_key), dict):
-                    data[nested_key] = {}
-                data[nested_key].update(parsed[nested_key])
-
-        for list_key in ["changes", "inputs", "outputs", "next_tasks"]:
-            if list_key in parsed:
-                data[list_key] = parsed[list_key]
-
-        if args.dry_run:
-            action = "update" if had_json else "create"
-            print(f"{action}: {task_json}")
-            continue
-
-        _write_json(task_json, data)
-        if had_json:
-            updated += 1
-        else:
-            created += 1
-
-    print(f"done: created={created}, updated={updated}, skipped={skipped}")
+    print(f"done: {counts.summary()}")
     return 0
 
 
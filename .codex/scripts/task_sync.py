@@ -0,0 +1,418 @@
+#!/usr/bin/env python3
+from __future__ import annotations
+
+"""Two-way task.md <-> task.json sync with a field-level three-way merge.
+
+`task_md2json.py` and `task_json2md.py` each assume one side is the truth, so
+running the wrong one overwrites edits. This script keeps, per task dir, the
+field values both files agreed on after the last sync (the snapshot, in
+`data/cache/task_sync_state.json`) and merges each md-visible field against
+it:
+- md == json: in sync;
+- only md differs from the snapshot: md -> json;
+- only json differs from the snapshot: json -> md;
+- both differ (and from each other): a conflict. Neither file is touched for
+  that field and it is reported on every run until resolved, by editing one
+  side back or with `--prefer md|json`.
+
+Fields are compared as they appear in task.md: json values go through
+`render_task_md` and the task.md parser, so placeholders, defaults and
+backticks do not count as differences. json keys that task.md does not show
+are left alone. A json -> md change rewrites only the affected lines of
+task.md (checkbox states and any other text are kept); a file is written only
+if its bytes change. A pair whose files are missing the other side is
+created from the one present. Without a snapshot (first run), differing
+fields are conflicts unless `--prefer` is given.
+
+Pairs whose two files still have the stat fingerprints (or content digests)
+recorded after the last sync are skipped without being read, so a no-op run
+over thousands of tasks costs one stat per file; the rest run on a thread
+pool (`--jobs`). Exit code 1 if any conflict is left.
+
+Usage:
+  python .codex/scripts/task_sync.py
+  python .codex/scripts/task_sync.py --task-dir 1-验证/tasks/260101-task-001 --dry-run
+  python .codex/scripts/task_sync.py --prefer md
+"""
+
+import argparse
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any
+
+import doc_codec
+import note_document as notes
+import task_json2md
+import task_manifest as tm
+import task_md2json
+import workspace_index as wsi
+
+
+ROOT = wsi.ROOT
+
+STATE_PATH = ROOT / "data" / "cache" / "task_sync_state.json"
+STATE_VERSION = 1
+_SCRIPTS = ["task_md2json.py", "task_json2md.py", "task_sync.py", "doc_codec.py"]
+_UNSYNCED: tm.FileState = [-1, -1, -1, ""]
+
+_CODEC = doc_codec.get_codec("task")
+
+# Dotted task.json paths that task.md shows.
+FIELDS = [*task_md2json.KEY_MAP.values(), *task_md2json.LIST_KEYS.values()]
+LIST_FIELDS = set(task_md2json.LIST_KEYS.values())
+
+
+def _flatten(parsed: dict[str, Any]) -> dict[str, Any]:
+    out: dict[str, Any] = {}
+    for path in FIELDS:
+        cur: Any = parsed
+        for part in path.split("."):
+            cur = cur.get(part) if isinstance(cur, dict) else None
+        if cur is not None:
+            out[path] = cur
+    return out
+
+
+def md_fields(text: str) -> dict[str, Any]:
+    """Field values of task.md text (placeholders are absent)."""
+    return _flatten(task_md2json.parse_task_text(text))
+
+
+def json_fields(task: dict[str, Any]) -> dict[str, Any]:
+    """Field values of a task.json dict, as task.md would show them."""
+    return _flatten(task_md2json.parse_task_text(task_json2md.render_task_md(task)))
+
+
+@dataclass
+class PairRecord:
+    """Last synced state of one pair: file states and the agreed fields."""
+
+    task_id: str
+    md: tm.FileState
+    json: tm.FileState
+    fields: dict[str, Any]
+
+
+class SyncState:
+    """Snapshots of every pair, plus stat fingerprints for skipping.
+
+    Snapshots survive script changes (they are field values); the
+    fingerprints are only trusted while the sync scripts are unchanged.
+    """
+
+    def __init__(self, path: Path) -> None:
+        self.path = path
+        here = Path(__file__).parent
+        # The codec version changes with the task templates.
+        self.scripts = [*(tm.stat_state(here / name) for name in _SCRIPTS), _CODEC.version]
+        self.fast = True
+        self.pairs: dict[str, PairRecord] = {}
+        self.dirty = False
+
+    @classmethod
+    def load(cls, path: Path = STATE_PATH) -> SyncState:
+        st = cls(path)
+        try:
+            raw = json.loads(path.read_text(encoding="utf-8"))
+            if raw.get("version") == STATE_VERSION and raw.get("root") == ROOT.as_posix():
+                st.pairs = {k: PairRecord(**v) for k, v in raw["pairs"].items()}
+                st.fast = raw.get("scripts") == st.scripts
+        except (OSError, ValueError, KeyError, TypeError, AttributeError):
+            pass  # no snapshots: the first sync treats differences as conflicts
+        return st
+
+    def get(self, task_dir: Path) -> PairRecord | None:
+        return self.pairs.get(wsi.relpath_str(task_dir))
+
+    def record(self, task_dir: Path, rec: PairRecord) -> None:
+        key = wsi.relpath_str(task_dir)
+        if self.pairs.get(key) != rec:
+            self.pairs[key] = rec
+            self.dirty = True
+
+    def save(self) -> None:
+        if not self.dirty and self.fast:
+            return
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        data = {
+            "version": STATE_VERSION,
+            "root": ROOT.as_posix(),
+            "scripts": self.scripts,
+            "pairs": {k: vars(v) for k, v in sorted(self.pairs.items())},
+        }
+        wsi.write_text_atomic(self.path, json.dumps(data, ensure_ascii=False, separators=(",", ":")))
+        self.dirty = False
+
+
+@dataclass
+class PairResult:
+    """Outcome of syncing one task dir."""
+
+    action: str  # created, synced, unchanged, conflict, skipped or error
+    to_json: list[str] = field(default_factory=list)
+    to_md: list[str] = field(default_factory=list)
+    conflicts: list[tuple[str, Any, Any]] = field(default_factory=list)  # (field, md, json)
+    record: PairRecord | None = None
+    message: str = ""
+
+
+def _set_field(task: dict[str, Any], path: str, value: Any) -> None:
+    if value is None:
+        value = [] if path in LIST_FIELDS else ""
+    parts = path.split(".")
+    cur = task
+    for k in parts[:-1]:
+        if not isinstance(cur.get(k), dict):
+            cur[k] = {}
+        cur = cur[k]
+    cur[parts[-1]] = value
+
+
+def _field_lines(lines: list[str]) -> dict[str, int]:
+    # Field path -> index of its (first) bullet line.
+    out: dict[str, int] = {}
+    for i, raw in enumerate(lines):
+        found = _CODEC.match_field(raw.strip())
+        if found is not None and found[0].dotted not in out:
+            out[found[0].dotted] = i
+    return out
+
+
+def _patch_md(md_text: str, task: dict[str, Any], paths: list[str]) -> str:
+    """task.md with the lines of `paths` re-rendered from `task`.
+
+    Falls back to a full render if a line is missing or the task_id changes
+    (it is also in the title).
+    """
+    rendered = task_json2md.render_task_md(task)
+    lines = md_text.split("\n")
+    at = _field_lines(lines)
+    new_lines = rendered.split("\n")
+    new_at = _field_lines(new_lines)
+    if "task_id" in paths or any(p not in at or p not in new_at for p in paths):
+        return rendered
+    for p in paths:
+        old = lines[at[p]]
+        indent = old[: len(old) - len(old.lstrip())]
+        state = old.strip()[3]  # `- [x] key: ...`
+        lines[at[p]] = indent + new_lines[new_at[p]].replace("- [ ]", f"- [{state}]", 1)
+    return "\n".join(lines)
+
+
+def _dump_task(task: dict[str, Any]) -> str:
+    return json.dumps(task, indent=2, ensure_ascii=False) + "\n"
+
+
+def sync_pair(task_dir: Path, state: SyncState, prefer: str | None = None, dry_run: bool = False) -> PairResult:
+    """Three-way merges one task dir's task.md and task.json (see module doc).
+
+    Args:
+        task_dir: Task directory.
+        state: Snapshots; read here, updated by the caller from `record`.
+        prefer: Side that wins conflicts (`md` or `json`), or None to report them.
+        dry_run: Work out the result without writing anything.
+    """
+    task_md = task_dir / "task.md"
+    task_json = task_dir / "task.json"
+    md_fp = tm.stat_state(task_md)
+    json_fp = tm.stat_state(task_json)
+    if md_fp is None and json_fp is None:
+        return PairResult("skipped")
+    rec = state.get(task_dir)
+    if state.fast and rec is not None and md_fp == rec.md[:3] and json_fp == rec.json[:3]:
+        return PairResult("unchanged")
+
+    md_data = notes.LOADER.read_bytes(task_md) if md_fp is not None else None
+    json_data = notes.LOADER.read_bytes(task_json) if json_fp is not None else None
+    if (
+        state.fast
+        and rec is not None
+        and md_data is not None
+        and json_data is not None
+        and tm.digest(md_data) == rec.md[3]
+        and tm.digest(json_data) == rec.json[3]
+    ):
+        new_rec = PairRecord(rec.task_id, tm.file_state(md_fp, md_data), tm.file_state(json_fp, json_data), rec.fields)
+        return PairResult("unchanged", record=None if dry_run else new_rec)
+
+    task: dict[str, Any] = {}
+    if json_data is not None:
+        try:
+            task = json.loads(notes.decode_text(json_data))
+        except json.JSONDecodeError as e:
+            return PairResult("error", message=f"invalid json: {e}")
+        if not isinstance(task, dict):
+            return PairResult("error", message="task.json is not an object")
+    md_text = notes.decode_text(md_data) if md_data is not None else ""
+
+    result = PairResult("unchanged")
+    base = rec.fields if rec is not None else None
+    mine = md_fields(md_text)
+    if md_data is None or json_data is None:
+        # A missing side is created from the other one.
+        result.action = "created"
+        prefer = "json" if md_data is None else "md"
+        base = None
+        if "task_id" in mine:
+            task.setdefault("task_id", mine["task_id"])
+    if not str(task.get("task_id", "") or "").strip():
+        return PairResult("error", message="no task_id in task.json or task.md")
+    theirs = json_fields(task)
+
+    agreed: dict[str, Any] = {}
+    for p in FIELDS:
+        m, j = mine.get(p), theirs.get(p)
+        if m == j:
+            pick = "same"
+        elif base is not None and m == base.get(p):
+            pick = "json"
+        elif base is not None and j == base.get(p):
+            pick = "md"
+        else:
+            pick = prefer or "conflict"
+        if pick == "md":
+            result.to_json.append(p)
+            _set_field(task, p, m)
+        elif pick == "json":
+            result.to_md.append(p)
+        elif pick == "conflict":
+            result.conflicts.append((p, m, j))
+            if base is not None and p in base:
+                agreed[p] = base[p]  # keep the old snapshot until resolved
+            continue
+        value = j if pick == "json" else m
+        if value is not None:
+            agreed[p] = value
+    if result.to_json:
+        # Some md values read back differently from the json (e.g. an empty
+        # `stage` renders as the default): show those in task.md right away.
+        theirs = json_fields(task)
+        for p in result.to_json:
+            if theirs.get(p) != mine.get(p):
+                result.to_md.append(p)
+                if theirs.get(p) is None:
+                    agreed.pop(p, None)
+                else:
+                    agreed[p] = theirs[p]
+
+    new_md = _patch_md(md_text, task, result.to_md) if result.to_md else md_text
+    new_json = _dump_task(task) if result.to_json or json_data is None else json_data.decode("utf-8")
+    if result.action != "created":
+        if result.conflicts:
+            result.action = "conflict"
+        elif result.to_md or result.to_json:
+            result.action = "synced"
+    if dry_run:
+        return result
+
+    md_out, json_out = new_md.encode("utf-8"), new_json.encode("utf-8")
+    if md_out != md_data:
+        wsi.write_text_atomic(task_md, new_md)
+        md_fp = tm.stat_state(task_md)
+    if json_out != json_data:
+        wsi.write_text_atomic(task_json, new_json)
+        json_fp = tm.stat_state(task_json)
+    if md_fp is not None and json_fp is not None:
+        task_id = str(task.get("task_id", "")).strip()
+        if result.conflicts:
+            # States that never match, so the pair is merged (and its
+            # conflicts reported) again on the next run.
+            result.record = PairRecord(task_id, _UNSYNCED, _UNSYNCED, agreed)
+        else:
+            result.record = PairRecord(task_id, tm.file_state(md_fp, md_out), tm.file_state(json_fp, json_out), agreed)
+    return result
+
+
+def _show(value: Any) -> str:
+    return json.dumps(value, ensure_ascii=False) if value is not None else "(empty)"
+
+
+def main() -> int:
+    p = argparse.ArgumentParser()
+    p.add_argument(
+        "--tasks-root",
+        type=Path,
+        default=ROOT / "1-验证" / "tasks",
+        help="Root folder that contains task directories.",
+    )
+    p.add_argument(
+        "--task-dir",
+        type=Path,
+        action="append",
+        default=None,
+        help="Task directory to process (repeatable).",
+    )
+    p.add_argument(
+        "--prefer",
+        choices=["md", "json"],
+        default=None,
+        help="Resolve conflicts (and differences with no snapshot yet) in favour of this side.",
+    )
+    p.add_argument(
+        "--dry-run",
+        action="store_true",
+        help="Do not write files or snapshots; only print planned changes.",
+    )
+    p.add_argument(
+        "--jobs",
+        type=int,
+        default=0,
+        help="Threads for the task pairs (0 = Python's default pool size). Default: 0.",
+    )
+    p.add_argument(
+        "--state",
+        type=Path,
+        default=STATE_PATH,
+        help="Snapshot file. Default: data/cache/task_sync_state.json.",
+    )
+    args = p.parse_args()
+
+    if args.task_dir:
+        task_dirs = [d if d.is_absolute() else (ROOT / d) for d in args.task_dir]
+    else:
+        tasks_root = args.tasks_root if args.tasks_root.is_absolute() else ROOT / args.tasks_root
+        task_dirs = sorted(
+            set(wsi.iter_task_dirs(tasks_root, "task.md")) | set(wsi.iter_task_dirs(tasks_root, "task.json")),
+            key=lambda d: d.name.lower(),
+        )
+
+    state = SyncState.load(args.state)
+    counts = dict.fromkeys(["created", "synced", "unchanged", "conflict", "skipped", "error"], 0)
+    t0 = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.jobs if args.jobs > 0 else None) as ex:
+        results = ex.map(lambda d: sync_pair(d, state, args.prefer, args.dry_run), task_dirs)
+        for task_dir, res in zip(task_dirs, results):
+            counts[res.action] += 1
+            if res.record is not None:
+                state.record(task_dir, res.record)
+            rel = wsi.relpath_str(task_dir)
+            if res.action == "created":
+                print(f"{'create' if args.dry_run else 'created'}: {rel}")
+            moves = []
+            if res.to_json:
+                moves.append(f"md->json {', '.join(res.to_json)}")
+            if res.to_md:
+                moves.append(f"json->md {', '.join(res.to_md)}")
+            if moves and res.action != "created":
+                print(f"{'sync' if args.dry_run else 'synced'}: {rel}: {'; '.join(moves)}")
+            for path, m, j in res.conflicts:
+                print(f"conflict: {rel}: {path}: md={_show(m)} json={_show(j)}")
+            if res.message:
+                print(f"error: {rel}: {res.message}")
+    seconds = time.perf_counter() - t0
+    if not args.dry_run:
+        state.save()
+
+    n = len(task_dirs)
+    print(
+        f"done: {', '.join(f'{k}={v}' for k, v in counts.items())} "
+        f"({n} pair(s) in {seconds:.2f}s, {n / seconds if seconds > 0 else 0:.0f} pairs/s)"
+    )
+    return 1 if counts["conflict"] or counts["error"] else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
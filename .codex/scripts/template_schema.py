@@ -0,0 +1,209 @@
+from __future__ import annotations
+
+"""Validators compiled from the JSON templates in `.codex/templates/`.
+
+A template doubles as a schema: every key is required, and a value's type is
+the type of the template value. Nested objects are checked recursively; a list
+whose template has an element (e.g. `entries` in `session.json`) checks each
+item against that element, while an empty template list (`[]`) only requires a
+list. A `null` value for a key is accepted, like the audit always did.
+
+Each template is compiled once per process (`load_validator`) into a tree of
+nodes with precomputed key tuples and Python types, so validating a record is a
+single pass over its keys and costs no allocations unless something is wrong.
+
+Usage:
+  validator = load_validator(TEMPLATES_DIR / "task.json")
+  for v in validator.violations(task):
+      print(v.kind, v.path, v.want, v.got)
+"""
+
+import os
+from pathlib import Path
+from typing import Any, NamedTuple
+
+import workspace_index as wsi
+
+
+_TYPE_NAMES = {dict: "dict", list: "list", str: "str", int: "int", float: "float", bool: "bool"}
+
+
+class Violation(NamedTuple):
+    """One schema violation.
+
+    Attributes:
+        kind: `missing`, `extra` or `type`.
+        parent: Path of the containing value (`""` for the root).
+        key: Offending key, or `[i]` for a list item.
+        want: Expected type name (`type` only).
+        got: Actual type name (`type` only).
+        depth: Nesting depth of `parent` (0 for keys of the root object).
+    """
+
+    kind: str
+    parent: str
+    key: str
+    want: str = ""
+    got: str = ""
+    depth: int = 0
+
+    @property
+    def path(self) -> str:
+        if not self.parent:
+            return self.key
+        if self.key.startswith("["):
+            return f"{self.parent}{self.key}"
+        return f"{self.parent}.{self.key}"
+
+
+class _Node:
+    __slots__ = ("type", "type_name")
+
+    def __init__(self, py_type: type) -> None:
+        self.type = py_type
+        self.type_name = _TYPE_NAMES.get(py_type, py_type.__name__)
+
+    def check(
+        self, value: Any, path: str, depth: int, max_depth: int, out: list[Violation]
+    ) -> None:
+        return None
+
+
+class _ObjectNode(_Node):
+    __slots__ = ("fields", "known", "keys", "types", "accept", "children", "report_extra")
+
+    def __init__(self, template: dict[str, Any], report_extra: bool) -> None:
+        super().__init__(dict)
+        self.report_extra = report_extra
+        # (key, python type, type name, child node if it has inner structure)
+        self.fields: tuple[tuple[str, type, str, _Node | None], ...] = tuple(
+            (k, node.type, node.type_name, node if _has_structure(node) else None)
+            for k, node in ((k, _compile(v, report_extra)) for k, v in template.items())
+        )
+        # Fast paths for valid records, both running in C: (1) same keys in
+        # template order with exactly the template types, (2) same key set and
+        # isinstance over all keys (`None` accepted). Anything else takes the
+        # per-key loop below, which also reports the violations.
+        self.known = frozenset(template)
+        self.keys = tuple(f[0] for f in self.fields)
+        self.types = tuple(f[1] for f in self.fields)
+        self.accept = tuple((f[1], type(None)) for f in self.fields)
+        self.children = tuple((f[0], f[3]) for f in self.fields if f[3] is not None)
+
+    def check(
+        self, value: Any, path: str, depth: int, max_depth: int, out: list[Violation]
+    ) -> None:
+        if (tuple(value) == self.keys and tuple(map(type, value.values())) == self.types) or (
+            (value.keys() == self.known if self.report_extra else value.keys() >= self.known)
+            and all(map(isinstance, map(value.__getitem__, self.keys), self.accept))
+        ):
+            if self.children and depth < max_depth:
+                for key, child in self.children:
+                    got = value[key]
+                    if got is not None:
+                        child.check(got, f"{path}.{key}" if path else key, depth + 1, max_depth, out)
+            return
+
+        present = 0
+        for key, py_type, type_name, child in self.fields:
+            if key not in value:
+                out.append(Violation("missing", path, key, depth=depth))
+                continue
+            present += 1
+            got = value[key]
+            if got is None:
+                continue
+            if not isinstance(got, py_type):
+                out.append(Violation("type", path, key, type_name, type(got).__name__, depth))
+            elif child is not None and depth < max_depth:
+                child.check(got, f"{path}.{key}" if path else key, depth + 1, max_depth, out)
+        if self.report_extra and present != len(value):
+            for key in value:
+                if key not in self.known:
+                    out.append(Violation("extra", path, key, depth=depth))
+
+
+class _ListNode(_Node):
+    __slots__ = ("item", "descend")
+
+    def __init__(self, item: _Node) -> None:
+        super().__init__(list)
+        self.item = item
+        self.descend = _has_structure(item)
+
+    def check(
+        self, value: Any, path: str, depth: int, max_depth: int, out: list[Violation]
+    ) -> None:
+        item = self.item
+        descend = self.descend and depth < max_depth
+        for i, got in enumerate(value):
+            if not isinstance(got, item.type):
+                got_name = type(got).__name__
+                out.append(Violation("type", path, f"[{i}]", item.type_name, got_name, depth))
+            elif descend:
+                item.check(got, f"{path}[{i}]", depth + 1, max_depth, out)
+
+
+def _has_structure(node: _Node) -> bool:
+    return isinstance(node, _ListNode) or (isinstance(node, _ObjectNode) and bool(node.fields))
+
+
+def _compile(template: Any, report_extra: bool) -> _Node:
+    if isinstance(template, dict):
+        return _ObjectNode(template, report_extra)
+    if isinstance(template, list):
+        # An empty template list accepts any items.
+        return _ListNode(_compile(template[0], report_extra)) if template else _Node(list)
+    return _Node(type(template))
+
+
+class TemplateValidator:
+    """A compiled template; reusable for any number of records."""
+
+    def __init__(self, template: Any, name: str = "", report_extra: bool = True) -> None:
+        self.name = name
+        self.root = _compile(template, report_extra)
+        self._structured = _has_structure(self.root)
+        self.keys: tuple[str, ...] = (
+            tuple(f[0] for f in self.root.fields) if isinstance(self.root, _ObjectNode) else ()
+        )
+
+    def violations(self, value: Any, max_depth: int = 1 << 30) -> list[Violation]:
+        """Checks `value` against the template.
+
+        Args:
+            value: A decoded JSON value (normally the record dict).
+            max_depth: Do not descend below this depth (0 = root keys only).
+
+        Returns:
+            Violations in template key order; for each object, `missing`/`type`
+            come per key and `extra` keys follow in the record's own order.
+            A root that is not an object yields a single `type` violation with
+            an empty key.
+        """
+        out: list[Violation] = []
+        root = self.root
+        if not isinstance(value, root.type):
+            out.append(Violation("type", "", "", root.type_name, type(value).__name__))
+        elif self._structured:
+            root.check(value, "", 0, max_depth, out)
+        return out
+
+
+_VALIDATORS: dict[tuple[str, bool], TemplateValidator] = {}
+
+
+def load_validator(template_path: Path, report_extra: bool = True) -> TemplateValidator:
+    """Compiles a template file once per process and returns the shared validator.
+
+    Raises:
+        FileNotFoundError: If the template does not exist.
+        ValueError: If the template is not valid JSON.
+    """
+    key = (os.path.abspath(template_path), report_extra)
+    validator = _VALIDATORS.get(key)
+    if validator is None:
+        template = wsi.load_json(template_path)
+        validator = TemplateValidator(template, name=template_path.name, report_extra=report_extra)
+        _VALIDATORS[key] = validator
+    return validator
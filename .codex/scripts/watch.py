@@ -0,0 +1,524 @@
+#!/usr/bin/env python3
+from __future__ import annotations
+
+"""Watches notes/tasks and keeps md/json pairs in sync while you edit.
+
+It replaces running md2json/json2md/audit by hand after each edit:
+- `0-调研/notes/<paper_id>.md` saved -> that entry in research.json is updated
+  (or created), like `paper_md2json.py --update-existing --create-missing`.
+- `0-调研/research.json` saved -> notes are created for new entries only
+  (existing notes are never overwritten: they hold the translated sections).
+  With a sharded registry (`research.d/`), notes are synced from the changed
+  shards instead, and only those shards are written back.
+- `1-验证/tasks/<task_id>/task.md` saved -> task.json is updated (md wins if
+  both files changed in the same burst).
+- `1-验证/tasks/<task_id>/task.json` saved -> task.md is re-rendered.
+- After each burst, `audit_stage0.py --incremental` runs in the background and
+  only new/resolved issues are printed.
+
+Directories (not files) are watched, with inotify on Linux (no CPU use while
+idle, independent of the number of files) and a stat-polling fallback
+elsewhere. Saves are debounced, and the script's own writes are ignored.
+
+Usage:
+  python .codex/scripts/watch.py
+  python .codex/scripts/watch.py --no-audit
+  python .codex/scripts/watch.py --backend poll --poll-interval 2
+"""
+
+import argparse
+import ctypes
+import ctypes.util
+import os
+import select
+import struct
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import IO
+
+import note_document as notes
+import paper_json2md as json2md
+import paper_md2json as md2json
+import research_store
+import task_json2md
+import task_md2json
+import workspace_index as wsi
+
+
+ROOT = wsi.ROOT
+
+# <sys/inotify.h>
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ISDIR = 0x40000000
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+WATCH_MASK = IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE
+_EVENT = struct.Struct("iIII")
+
+AUDIT_POLL_S = 0.05
+
+
+def _fingerprint(path: Path) -> list[int] | None:
+    try:
+        st = path.stat()
+    except OSError:
+        return None
+    return [st.st_size, st.st_mtime_ns, st.st_ino]
+
+
+class InotifyBackend:
+    """Linux inotify through libc (one watch per directory).
+
+    Raises:
+        OSError: If inotify is not available.
+    """
+
+    name = "inotify"
+
+    def __init__(self) -> None:
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        if not hasattr(libc, "inotify_init1"):
+            raise OSError("inotify is not available")
+        fd = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if fd < 0:
+            err = ctypes.get_errno()
+            raise OSError(err, f"inotify_init1 failed ({os.strerror(err)})")
+        self._libc = libc
+        self._fd = fd
+        self._dirs: dict[int, Path] = {}
+
+    def add_dir(self, path: Path) -> None:
+        wd = self._libc.inotify_add_watch(self._fd, os.fsencode(path), WATCH_MASK)
+        if wd < 0:
+            err = ctypes.get_errno()
+            raise OSError(err, f"cannot watch {path} ({os.strerror(err)})")
+        self._dirs[wd] = path
+
+    def read(self, timeout: float | None) -> tuple[list[Path], bool]:
+        """Waits up to `timeout` seconds (None = forever) for events.
+
+        Returns:
+            (changed paths, overflowed). `overflowed` means events were lost.
+        """
+        ready, _, _ = select.select([self._fd], [], [], timeout)
+        if not ready:
+            return [], False
+        try:
+            buf = os.read(self._fd, 64 * 1024)
+        except BlockingIOError:
+            return [], False
+
+        out: list[Path] = []
+        overflowed = False
+        off = 0
+        while off < len(buf):
+            wd, mask, _, length = _EVENT.unpack_from(buf, off)
+            off += _EVENT.size
+            name = buf[off : off + length].rstrip(b"\0")
+            off += length
+            if mask & IN_Q_OVERFLOW:
+                overflowed = True
+                continue
+            if mask & IN_IGNORED:
+                self._dirs.pop(wd, None)
+                continue
+            if mask & IN_CREATE and not mask & IN_ISDIR:
+                # A new file is reported again by IN_CLOSE_WRITE once written.
+                continue
+            d = self._dirs.get(wd)
+            if d is not None and name:
+                out.append(d / os.fsdecode(name))
+        return out, overflowed
+
+
+class PollingBackend:
+    """Portable fallback: re-stats every file of the watched dirs per interval."""
+
+    name = "poll"
+
+    def __init__(self, interval: float) -> None:
+        self.interval = interval
+        self._snapshots: dict[Path, dict[str, tuple[int, int, int]]] = {}
+        self._next_scan = time.monotonic() + interval
+
+    @staticmethod
+    def _scan(path: Path) -> dict[str, tuple[int, int, int]]:
+        out: dict[str, tuple[int, int, int]] = {}
+        try:
+            with os.scandir(path) as it:
+                for e in it:
+                    try:
+                        st = e.stat()
+                    except OSError:
+                        continue
+                    out[e.name] = (st.st_size, st.st_mtime_ns, st.st_ino)
+        except (FileNotFoundError, NotADirectoryError):
+            pass
+        return out
+
+    def add_dir(self, path: Path) -> None:
+        self._snapshots[path] = self._scan(path)
+
+    def read(self, timeout: float | None) -> tuple[list[Path], bool]:
+        now = time.monotonic()
+        deadline = self._next_scan if timeout is None else min(self._next_scan, now + timeout)
+        if deadline > now:
+            time.sleep(deadline - now)
+        if time.monotonic() < self._next_scan:
+            return [], False
+        self._next_scan = time.monotonic() + self.interval
+
+        out: list[Path] = []
+        for d, old in list(self._snapshots.items()):
+            if not d.is_dir():
+                del self._snapshots[d]
+                continue
+            new = self._scan(d)
+            for name in sorted(old.keys() | new.keys()):
+                if old.get(name) != new.get(name):
+                    out.append(d / name)
+            self._snapshots[d] = new
+        return out, False
+
+
+def make_backend(kind: str, poll_interval: float) -> InotifyBackend | PollingBackend:
+    """Creates the `inotify` or `poll` backend (`auto`: inotify if available)."""
+    if kind in {"auto", "inotify"}:
+        try:
+            return InotifyBackend()
+        except (OSError, AttributeError) as e:
+            if kind == "inotify":
+                raise
+            print(f"inotify unavailable ({e}); polling every {poll_interval}s")
+    return PollingBackend(poll_interval)
+
+
+class Watcher:
+    """Maps file events to the matching md2json/json2md sync and audit runs."""
+
+    def __init__(self, args: argparse.Namespace, backend: InotifyBackend | PollingBackend) -> None:
+        self.backend = backend
+        self.research_json = Path(os.path.abspath(args.research_json))
+        self.notes_dir = Path(os.path.abspath(args.notes_dir))
+        self.tasks_root = Path(os.path.abspath(args.tasks_root))
+        self.session_dir = Path(os.path.abspath(args.session_dir))
+        self.debounce = args.debounce_ms / 1000
+        self.audit_enabled = not args.no_audit
+        self.index = wsi.get_index(research_json=self.research_json, session_dir=self.session_dir)
+
+        self._watched: set[Path] = set()
+        self._own_writes: dict[Path, list[int] | None] = {}
+        self._audit: subprocess.Popen[bytes] | None = None
+        self._audit_out: IO[bytes] | None = None
+        self._audit_again = False
+        self._audit_issues: list[str] | None = None
+
+    # Setup
+
+    def _watch(self, path: Path) -> None:
+        if path in self._watched or not path.is_dir():
+            return
+        self.backend.add_dir(path)
+        self._watched.add(path)
+
+    def start(self) -> None:
+        for d in [self.notes_dir, self.research_json.parent, self.session_dir, self.tasks_root]:
+            self._watch(d)
+        self._watch(research_store.store_dir(self.research_json))
+        if self.tasks_root.is_dir():
+            for d in sorted(self.tasks_root.iterdir(), key=lambda x: x.name.lower()):
+                self._watch(d)
+        if self.index.store is None:
+            # Load the registry now so the first save does not pay for it.
+            self.index.papers
+        print(f"watching {len(self._watched)} dirs ({self.backend.name}); Ctrl-C to stop")
+        if self.audit_enabled:
+            self._start_audit()
+
+    # Sync
+
+    def _remember(self, path: Path) -> None:
+        self._own_writes[path] = _fingerprint(path)
+
+    def _is_own_write(self, path: Path) -> bool:
+        if path not in self._own_writes:
+            return False
+        if self._own_writes[path] == _fingerprint(path):
+            return True
+        del self._own_writes[path]
+        return False
+
+    def _log(self, action: str, path: Path, detail: str = "") -> None:
+        suffix = f" ({detail})" if detail else ""
+        print(f"{time.strftime('%H:%M:%S')} {action}: {wsi.relpath_str(path)}{suffix}")
+
+    def _sync_research(self, shard_ids: set[str] | None = None) -> None:
+        self.index.invalidate("research")
+        store = self.index.store
+        if shard_ids is None or store is None:
+            entries = [e for e, _ in self.index.paper_entries]
+        else:
+            entries = [store.read_entry(pid) for pid in sorted(shard_ids) if store.has_entry(pid)]
+        for e in entries:
+            paper_id = str(e.get("paper_id", "")).strip()
+            if not paper_id:
+                continue
+            action = json2md.write_paper_note(e, self.notes_dir, create_missing=True, overwrite=False)
+            if action == "created":
+                note_path = self.notes_dir / f"{paper_id}.md"
+                self._remember(note_path)
+                self._log("json2md", note_path, action)
+
+    def _sync_notes(self, note_paths: list[Path]) -> None:
+        research_entries, by_paper_id = md2json.load_merge_targets(self.index, note_paths)
+        result = md2json.merge_notes(
+            note_paths,
+            research_entries,
+            by_paper_id,
+            update_existing=True,
+            create_missing=True,
+        )
+        written = md2json.write_merge_result(self.index, result, research_entries, by_paper_id)
+        if not written:
+            return
+        for path in written:
+            self._remember(path)
+        detail = f"created={len(result.created)}, updated={len(result.updated)}: " + ", ".join(
+            result.created + result.updated
+        )
+        self._log("md2json", written[0] if len(written) == 1 else written[0].parent, detail)
+
+    def _sync_tasks(self, md_dirs: set[Path], json_dirs: set[Path]) -> None:
+        for d in sorted(md_dirs):
+            if d in json_dirs:
+                self._log("conflict", d, "task.md and task.json both changed; task.md wins")
+            action = task_md2json.sync_task_dir(d, update_existing=True, create_missing=True)
+            if action not in {"skipped", "unchanged"}:
+                self._remember(d / "task.json")
+                self._log("md2json", d / "task.json", action)
+        for d in sorted(json_dirs - md_dirs):
+            notes.LOADER.forget(d / "task.json")
+            action = task_json2md.sync_task_dir(d, create_missing=True, overwrite=True)
+            if action not in {"skipped", "unchanged"}:
+                self._remember(d / "task.md")
+                self._log("json2md", d / "task.md", action)
+
+    def sync(self, changed: set[Path], overflowed: bool = False) -> bool:
+        """Syncs one debounced burst of changed paths.
+
+        Returns:
+            True if any watched md/json file changed (the audit should re-run).
+        """
+        research_changed = False
+        shard_ids: set[str] = set()
+        store_root = research_store.store_dir(self.research_json)
+        note_paths: list[Path] = []
+        md_dirs: set[Path] = set()
+        json_dirs: set[Path] = set()
+        relevant = overflowed
+        for path in sorted(changed):
+            if self._is_own_write(path):
+                continue
+            parent = path.parent
+            if path == self.research_json:
+                # With a store, research.json is only an export of it.
+                if self.index.store is None:
+                    research_changed = True
+            elif path == store_root:
+                # `research_store.py shard` ran: switch to the store.
+                self._watch(path)
+                research_changed = True
+            elif parent == store_root:
+                if path.name == research_store.MANIFEST_NAME:
+                    research_changed = True
+                elif path.suffix == ".json":
+                    shard_ids.add(path.stem)
+                else:
+                    continue
+            elif parent == self.notes_dir and path.suffix == ".md":
+                if path.exists():
+                    note_paths.append(path)
+            elif parent == self.tasks_root:
+                if path.is_dir() and path not in self._watched:
+                    # A new task dir: watch it and sync what it already holds.
+                    self._watch(path)
+                    for name, dirs in [("task.md", md_dirs), ("task.json", json_dirs)]:
+                        if (path / name).exists():
+                            dirs.add(path)
+                continue
+            elif parent.parent == self.tasks_root and path.name in {"task.md", "task.json"}:
+                if path.exists():
+                    (md_dirs if path.name == "task.md" else json_dirs).add(parent)
+            elif parent == self.session_dir and wsi.SESSION_FILE_RE.match(path.name):
+                pass
+            else:
+                continue
+            relevant = True
+
+        if overflowed:
+            print("warning: file events were dropped; re-run md2json/json2md by hand if needed")
+        steps = [
+            (research_changed, self._sync_research, ()),
+            (bool(shard_ids) and not research_changed, self._sync_research, (shard_ids,)),
+            (bool(note_paths), self._sync_notes, (note_paths,)),
+            (bool(md_dirs or json_dirs), self._sync_tasks, (md_dirs, json_dirs)),
+        ]
+        for needed, fn, fn_args in steps:
+            if not needed:
+                continue
+            try:
+                fn(*fn_args)
+            except (OSError, ValueError) as e:
+                # Typically a half-written file; the next save retries.
+                print(f"error: {e}")
+        return relevant
+
+    # Audit
+
+    def _start_audit(self) -> None:
+        if self._audit is not None:
+            self._audit_again = True
+            return
+        cmd = [
+            sys.executable,
+            str(Path(__file__).with_name("audit_stage0.py")),
+            "--incremental",
+            "--research-json",
+            str(self.research_json),
+            "--notes-dir",
+            str(self.notes_dir),
+            "--session-dir",
+            str(self.session_dir),
+        ]
+        # A file (not a pipe) so a long report never blocks the child.
+        self._audit_out = tempfile.TemporaryFile()
+        self._audit = subprocess.Popen(cmd, stdout=self._audit_out, stderr=subprocess.STDOUT)
+
+    def _poll_audit(self) -> None:
+        if self._audit is None or self._audit.poll() is None:
+            return
+        assert self._audit_out is not None
+        self._audit_out.seek(0)
+        out = self._audit_out.read().decode("utf-8", errors="replace")
+        self._audit_out.close()
+        code = self._audit.returncode
+        self._audit = None
+        self._audit_out = None
+
+        if code != 0:
+            print(f"audit failed (exit {code}):\n{out.rstrip()}")
+        else:
+            issues = [ln for ln in out.splitlines() if ln.startswith("- ")]
+            if self._audit_issues is None:
+                print(f"audit: {len(issues)} issue(s) (run audit_stage0.py for the list)")
+            else:
+                prev = set(self._audit_issues)
+                cur = set(issues)
+                added = [ln for ln in issues if ln not in prev]
+                resolved = [ln for ln in self._audit_issues if ln not in cur]
+                print(f"audit: {len(issues)} issue(s) (+{len(added)}, -{len(resolved)})")
+                for ln in added:
+                    print(f"+ {ln[2:]}")
+                for ln in resolved:
+                    print(f"- {ln[2:]} (resolved)")
+            self._audit_issues = issues
+
+        if self._audit_again:
+            self._audit_again = False
+            self._start_audit()
+
+    # Loop
+
+    def run(self) -> None:
+        pending: set[Path] = set()
+        overflowed = False
+        while True:
+            timeout: float | None = self.debounce if pending else None
+            if self._audit is not None:
+                timeout = AUDIT_POLL_S if timeout is None else min(timeout, AUDIT_POLL_S)
+            changed, lost = self.backend.read(timeout)
+            self._poll_audit()
+            if changed or lost:
+                # Keep collecting until the burst has been quiet for `debounce`.
+                pending.update(changed)
+                overflowed = overflowed or lost
+                continue
+            if not pending and not overflowed:
+                continue
+            batch, pending = pending, set()
+            if self.sync(batch, overflowed) and self.audit_enabled:
+                self._start_audit()
+            overflowed = False
+
+
+def main() -> int:
+    p = argparse.ArgumentParser()
+    p.add_argument(
+        "--research-json",
+        type=Path,
+        default=ROOT / "0-调研" / "research.json",
+        help="Path to 0-调研/research.json.",
+    )
+    p.add_argument(
+        "--notes-dir",
+        type=Path,
+        default=ROOT / "0-调研" / "notes",
+        help="Directory for notes/<paper_id>.md.",
+    )
+    p.add_argument(
+        "--tasks-root",
+        type=Path,
+        default=ROOT / "1-验证" / "tasks",
+        help="Root folder that contains task directories.",
+    )
+    p.add_argument(
+        "--session-dir",
+        type=Path,
+        default=ROOT / "session",
+        help="Directory for session logs (workspace/session).",
+    )
+    p.add_argument(
+        "--backend",
+        choices=["auto", "inotify", "poll"],
+        default="auto",
+        help="File event source. Default: inotify if available, else poll.",
+    )
+    p.add_argument(
+        "--poll-interval",
+        type=float,
+        default=1.0,
+        help="Seconds between scans for the poll backend. Default: 1.0.",
+    )
+    p.add_argument(
+        "--debounce-ms",
+        type=int,
+        default=100,
+        help="Wait until a burst of saves has been quiet this long. Default: 100.",
+    )
+    p.add_argument(
+        "--no-audit",
+        action="store_true",
+        help="Only sync; do not re-run audit_stage0.py --incremental.",
+    )
+    args = p.parse_args()
+
+    watcher = Watcher(args, make_backend(args.backend, args.poll_interval))
+    watcher.start()
+    try:
+        watcher.run()
+    except KeyboardInterrupt:
+        print("stopped.")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,405 @@
+from __future__ import annotations
+
+"""In-memory index of the workspace, shared by every `.codex/scripts` tool.
+
+It owns what each script used to re-implement (`ROOT`, JSON loading, flattening
+nested `followed` entries, workspace-relative paths, atomic file writes) and
+lazily builds, once per process:
+- paper_id -> entry and pdf_path -> paper_ids from `0-调研/research.json`.
+- task_id -> task.json from `1-验证/tasks/<task_id>/`.
+- case_id -> case.json from `2-实验和写作/runs/<case_id>/`.
+- session date -> (md, json) paths from `session/`.
+- task_id -> leaderboard rows from both leaderboard.csv files.
+
+Each source is loaded on first access only; `load_counts` records how many
+times each one was loaded (expected: at most 1), and `invalidate()` drops a
+source after a script rewrote it. With `stream=True`, `iter_entries()` and
+`pdf_to_paper_ids` read research.json through `research_stream` (one entry in
+memory at a time) instead of loading the whole document. When the registry is
+sharded (`0-调研/research.d/`, see `research_store`), the research sources are
+read from the store instead of research.json.
+"""
+
+import csv
+import os
+import re
+import stat
+from collections import Counter
+from functools import cached_property
+from collections.abc import Iterator
+from pathlib import Path
+from typing import Any
+
+import note_document as notes
+import research_store
+import research_stream
+
+
+ROOT = Path(__file__).resolve().parents[2]
+
+RESEARCH_JSON = ROOT / "0-调研" / "research.json"
+NOTES_DIR = ROOT / "0-调研" / "notes"
+TASKS_ROOT = ROOT / "1-验证" / "tasks"
+RUNS_ROOT = ROOT / "2-实验和写作" / "runs"
+SESSION_DIR = ROOT / "session"
+TEMPLATES_DIR = ROOT / ".codex" / "templates"
+LEADERBOARDS = [
+    ROOT / "1-验证" / "leaderboard.csv",
+    ROOT / "2-实验和写作" / "results" / "leaderboard.csv",
+]
+
+SESSION_FILE_RE = re.compile(r"^(?P<date>\d{6})-session\.(?P<ext>md|json)$")
+
+ROOT_PREFIX = ROOT.resolve().as_posix().rstrip("/") + "/"
+_RELPATH_CACHE: dict[str, str] = {}
+_REALDIR_CACHE: dict[str, str] = {}
+
+
+def load_json(path: Path) -> Any:
+    """Loads a JSON file through the shared loader (one read per process).
+
+    Raises:
+        FileNotFoundError: If the file does not exist.
+        ValueError: If the file is not valid JSON.
+    """
+    return notes.LOADER.json(path)
+
+
+def write_text_atomic(path: Path, text: str) -> None:
+    """Replaces `path` with `text` so readers see either the old or the new file.
+
+    The text goes to a temp file in the same directory, which is fsynced and
+    then renamed over `path` (the mode of an existing file is kept). A crash
+    leaves at most a stray `.<name>.<pid>.tmp` file, never a truncated `path`.
+    """
+    tmp = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+    try:
+        mode = stat.S_IMODE(os.stat(path).st_mode)
+    except FileNotFoundError:
+        mode = None
+    try:
+        with open(tmp, "w", encoding="utf-8") as f:
+            f.write(text)
+            f.flush()
+            os.fsync(f.fileno())
+        if mode is not None:
+            os.chmod(tmp, mode)
+        os.replace(tmp, path)
+    except BaseException:
+        tmp.unlink(missing_ok=True)
+        raise
+    # Persist the rename itself.
+    fsync_dir(path.parent)
+
+
+def fsync_dir(path: Path) -> None:
+    """Persists the entries of directory `path` (not supported on every platform/filesystem)."""
+    try:
+        fd = os.open(path, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+def iter_paper_entries(
+    entries: list[Any] | Any,
+    prefix: str = "research",
+) -> list[tuple[dict[str, Any], str]]:
+    """Flattens research entries and their nested `followed` entries.
+
+    Args:
+        entries: The `research` list (or any `followed` list).
+        prefix: Location prefix, e.g. `research`.
+
+    Returns:
+        (entry, location) pairs in document order, e.g.
+        `research[0].followed[1]`. Non-dict items are skipped.
+    """
+    out: list[tuple[dict[str, Any], str]] = []
+    # Explicit stack (pre-order), so deep `followed` chains cannot hit the
+    # recursion limit.
+    stack: list[tuple[dict[str, Any], str]] = []
+    _push_entries(stack, entries, prefix)
+    while stack:
+        e, loc = stack.pop()
+        out.append((e, loc))
+        _push_entries(stack, e.get("followed", []), f"{loc}.followed")
+    return out
+
+
+def _push_entries(
+    stack: list[tuple[dict[str, Any], str]],
+    entries: list[Any] | Any,
+    prefix: str,
+) -> None:
+    # Pushed in reverse, so the first entry is popped first.
+    if not isinstance(entries, list):
+        return
+    for i in range(len(entries) - 1, -1, -1):
+        if isinstance(entries[i], dict):
+            stack.append((entries[i], f"{prefix}[{i}]"))
+
+
+def _realpath(path: str) -> str:
+    # Same result as `Path.resolve()`, but parent dirs are resolved once and
+    # shared, so a file costs one lstat instead of one per path component.
+    full = os.path.abspath(path)
+    if ".." in full.split(os.sep):
+        return os.path.realpath(full)
+    parent, name = os.path.split(full)
+    real_parent = _REALDIR_CACHE.get(parent)
+    if real_parent is None:
+        real_parent = os.path.realpath(parent)
+        _REALDIR_CACHE[parent] = real_parent
+    if os.path.islink(full):
+        return os.path.realpath(full)
+    return os.path.join(real_parent, name)
+
+
+def relpath_str(path: Path | str) -> str:
+    """Workspace-relative posix path (resolved, memoized per path).
+
+    Paths outside the workspace are returned as resolved absolute paths.
+    """
+    key = os.fspath(path)
+    rel = _RELPATH_CACHE.get(key)
+    if rel is None:
+        real = _realpath(key).replace(os.sep, "/")
+        rel = real[len(ROOT_PREFIX) :] if real.startswith(ROOT_PREFIX) else real
+        _RELPATH_CACHE[key] = rel
+    return rel
+
+
+def iter_task_dirs(tasks_root: Path, marker: str) -> list[Path]:
+    """Lists task dirs under `tasks_root` that contain `marker` (e.g. `task.md`)."""
+    if not tasks_root.exists():
+        return []
+    out: list[Path] = []
+    for p in sorted(tasks_root.iterdir(), key=lambda x: x.name.lower()):
+        if p.is_dir() and (p / marker).exists():
+            out.append(p)
+    return out
+
+
+class WorkspaceIndex:
+    """Lazily loaded, prebuilt maps over one workspace.
+
+    Use `get_index()` to share one instance per process; every property is
+    computed on first access and then reused.
+
+    With `stream=True`, `iter_entries()` streams research.json on every call
+    and `pdf_to_paper_ids` is built from such a pass; `research`,
+    `paper_entries` and `papers` still load the whole document.
+
+    If `store` is set (a sharded registry), `research` is assembled from it
+    and `iter_entries()` streams its shards.
+    """
+
+    def __init__(
+        self,
+        research_json: Path = RESEARCH_JSON,
+        tasks_root: Path = TASKS_ROOT,
+        runs_root: Path = RUNS_ROOT,
+        session_dir: Path = SESSION_DIR,
+        leaderboards: list[Path] | None = None,
+        stream: bool = False,
+    ) -> None:
+        self.research_json = research_json
+        self.stream = stream
+        self.tasks_root = tasks_root
+        self.runs_root = runs_root
+        self.session_dir = session_dir
+        self.leaderboard_paths = list(LEADERBOARDS if leaderboards is None else leaderboards)
+        self.load_counts: Counter[str] = Counter()
+
+    # research.json
+
+    @cached_property
+    def store(self) -> research_store.ResearchStore | None:
+        """The sharded store next to research.json, or None if not sharded."""
+        return research_store.open_store(self.research_json)
+
+    @cached_property
+    def research(self) -> dict[str, Any]:
+        """The whole research.json document (assembled from the store if sharded).
+
+        Raises:
+            ValueError: If `research` is not a list.
+        """
+        self.load_counts["research"] += 1
+        if self.store is not None:
+            return self.store.load_document()
+        data = load_json(self.research_json)
+        if not isinstance(data.get("research", []), list):
+            raise ValueError(f"`research` must be a list in {self.research_json}")
+        return data
+
+    @cached_property
+    def paper_entries(self) -> list[tuple[dict[str, Any], str]]:
+        return iter_paper_entries(self.research.get("research", []))
+
+    def iter_entries(self) -> Iterator[tuple[dict[str, Any], str]]:
+        """(entry, location) pairs, streamed from disk in `stream` mode.
+
+        Streamed entries have `followed` lists emptied (their items are
+        yielded on their own); see `research_stream`.
+        """
+        if not self.stream or "paper_entries" in self.__dict__:
+            yield from self.paper_entries
+            return
+        self.load_counts["research_stream"] += 1
+        if self.store is not None:
+            yield from self.store.iter_entries()
+            return
+        yield from research_stream.iter_research_entries(self.research_json)
+
+    @cached_property
+    def papers(self) -> dict[str, dict[str, Any]]:
+        """paper_id -> entry (a later duplicate wins, like every script before)."""
+        out: dict[str, dict[str, Any]] = {}
+        for e, _ in self.paper_entries:
+            pid = str(e.get("paper_id", "")).strip()
+            if pid:
+                out[pid] = e
+        return out
+
+    @cached_property
+    def pdf_to_paper_ids(self) -> dict[str, list[str]]:
+        """Workspace-relative pdf_path -> paper_ids that reference it."""
+        out: dict[str, list[str]] = {}
+        for e, _ in self.iter_entries():
+            pid = str(e.get("paper_id", "")).strip()
+            pdf_path = str(e.get("pdf_path", "")).strip()
+            if not pid or not pdf_path:
+                continue
+            rel = relpath_str(os.path.join(ROOT, pdf_path))
+            out.setdefault(rel, []).append(pid)
+        return out
+
+    # 1-验证 / 2-实验和写作
+
+    @cached_property
+    def task_dirs(self) -> dict[str, Path]:
+        """task_id -> task dir (dir name if task.json has no task_id)."""
+        return {tid: d for tid, (d, _) in self._tasks.items()}
+
+    @cached_property
+    def tasks(self) -> dict[str, dict[str, Any]]:
+        """task_id -> task.json."""
+        return {tid: t for tid, (_, t) in self._tasks.items()}
+
+    @cached_property
+    def _tasks(self) -> dict[str, tuple[Path, dict[str, Any]]]:
+        self.load_counts["tasks"] += 1
+        out: dict[str, tuple[Path, dict[str, Any]]] = {}
+        for d in iter_task_dirs(self.tasks_root, "task.json"):
+            task = load_json(d / "task.json")
+            if not isinstance(task, dict):
+                continue
+            tid = str(task.get("task_id", "")).strip() or d.name
+            out[tid] = (d, task)
+        return out
+
+    @cached_property
+    def cases(self) -> dict[str, dict[str, Any]]:
+        """case_id -> case.json (dir name if case.json has no case_id)."""
+        self.load_counts["cases"] += 1
+        out: dict[str, dict[str, Any]] = {}
+        for d in iter_task_dirs(self.runs_root, "case.json"):
+            case = load_json(d / "case.json")
+            if not isinstance(case, dict):
+                continue
+            out[str(case.get("case_id", "")).strip() or d.name] = case
+        return out
+
+    # session/ + leaderboards
+
+    @cached_property
+    def sessions(self) -> dict[str, dict[str, Path]]:
+        """Session date (YYMMDD) -> {"md": path, "json": path} (present files only)."""
+        self.load_counts["sessions"] += 1
+        out: dict[str, dict[str, Path]] = {}
+        if not self.session_dir.exists():
+            return out
+        for p in sorted(self.session_dir.iterdir(), key=lambda x: x.name.lower()):
+            m = SESSION_FILE_RE.match(p.name)
+            if m and p.is_file():
+                out.setdefault(m.group("date"), {})[m.group("ext")] = p
+        return out
+
+    @cached_property
+    def leaderboards(self) -> dict[str, list[dict[str, str]]]:
+        """Leaderboard relpath -> rows (csv.DictReader, header from the file)."""
+        self.load_counts["leaderboards"] += 1
+        out: dict[str, list[dict[str, str]]] = {}
+        for path in self.leaderboard_paths:
+            if not path.exists():
+                continue
+            with open(path, encoding="utf-8", newline="") as f:
+                out[relpath_str(path)] = list(csv.DictReader(f))
+        return out
+
+    @cached_property
+    def leaderboard_rows(self) -> dict[str, list[dict[str, str]]]:
+        """task_id -> rows from every leaderboard, in file order."""
+        out: dict[str, list[dict[str, str]]] = {}
+        for rows in self.leaderboards.values():
+            for row in rows:
+                tid = (row.get("task_id") or "").strip()
+                if tid:
+                    out.setdefault(tid, []).append(row)
+        return out
+
+    def invalidate(self, *names: str) -> None:
+        """Drops cached sources (all if no name), e.g. after rewriting research.json.
+
+        Args:
+            names: Any of `research`, `tasks`, `cases`, `sessions`, `leaderboards`;
+                `papers` keeps the loaded document and only drops the maps built
+                from it (after editing `research` in place).
+        """
+        groups = {
+            "research": ["store", "research", "paper_entries", "papers", "pdf_to_paper_ids"],
+            "papers": ["paper_entries", "papers", "pdf_to_paper_ids"],
+            "tasks": ["_tasks", "task_dirs", "tasks"],
+            "cases": ["cases"],
+            "sessions": ["sessions"],
+            "leaderboards": ["leaderboards", "leaderboard_rows"],
+        }
+        names = names or tuple(g for g in groups if g != "papers")
+        if "research" in names:
+            notes.LOADER.forget(self.research_json)
+        if "tasks" in names:
+            for d, _ in self.__dict__.get("_tasks", {}).values():
+                notes.LOADER.forget(d / "task.json")
+        if "cases" in names:
+            for d in iter_task_dirs(self.runs_root, "case.json"):
+                notes.LOADER.forget(d / "case.json")
+        for name in names:
+            for attr in groups[name]:
+                self.__dict__.pop(attr, None)
+
+
+_INDEXES: dict[tuple[str, ...], WorkspaceIndex] = {}
+
+
+def get_index(
+    research_json: Path = RESEARCH_JSON,
+    tasks_root: Path = TASKS_ROOT,
+    runs_root: Path = RUNS_ROOT,
+    session_dir: Path = SESSION_DIR,
+    stream: bool = False,
+) -> WorkspaceIndex:
+    """Returns the process-wide index for these paths (created on first call)."""
+    key = tuple(os.path.abspath(p) for p in (research_json, tasks_root, runs_root, session_dir))
+    key += ("stream",) if stream else ()
+    index = _INDEXES.get(key)
+    if index is None:
+        index = WorkspaceIndex(research_json, tasks_root, runs_root, session_dir, stream=stream)
+        _INDEXES[key] = index
+    return index
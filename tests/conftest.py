@@ -0,0 +1,27 @@
+"""Shared fixtures: the scripts are flat modules under `.codex/scripts`."""
+
+from __future__ import annotations
+
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+REPO = Path(__file__).resolve().parents[1]
+SCRIPTS = REPO / ".codex" / "scripts"
+
+if str(SCRIPTS) not in sys.path:
+    sys.path.insert(0, str(SCRIPTS))
+
+
+@pytest.fixture(scope="session")
+def workspace(tmp_path_factory: pytest.TempPathFactory) -> Path:
+    """A small synthetic workspace (`make_workspace.py`), with its own copy of the scripts."""
+    dest = tmp_path_factory.mktemp("ws") / "workspace"
+    subprocess.run(
+        [sys.executable, str(SCRIPTS / "make_workspace.py"), "--dest", str(dest), "--papers", "60", "--sessions", "5"],
+        check=True,
+        capture_output=True,
+    )
+    return dest
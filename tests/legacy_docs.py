@@ -0,0 +1,450 @@
+"""Test fixtures for the template codecs: the code they replaced and sample documents.
+
+The previous task parser / renderer and session writer are kept verbatim as
+references, so the codec tests do not depend on `bench_doc_codec.py`.
+"""
+
+from __future__ import annotations
+
+import json
+import random
+import re
+from datetime import date, timedelta
+from typing import Any
+
+import doc_codec
+
+_WORDS = ["neural", "operator", "fourier", "graph", "mesh", "flow", "sparse", "latent", "inverse", "surrogate"]
+_ZH = "我们提出一种神经算子 (neural operator)，学习参数化偏微分方程 (PDE) 的解映射，并在多个基准上评估."
+
+
+# The previous task parser / renderer.
+
+_LEGACY_HEADER_RE = re.compile(r"^#\s+Task:\s+(?P<task_id>[^.]+)\.\s*$")
+_LEGACY_BULLET_RE = re.compile(r"^- \[(?P<state>[ xX])\]\s+(?P<rest>.*)$")
+# Hints that the template and `render_task_md` put after some values; they are
+# not part of the value (kept, they would grow by one copy per round trip).
+_LEGACY_HINT_RE = re.compile(r"\s*\((?:例如[:：][^()]*|时间/算力|能指导 next step 的信息)\)\s*$")
+
+
+def _legacy_strip_backticks(s: str) -> str:
+    x = s.strip()
+    if len(x) >= 2 and x[0] == "`" and x[-1] == "`":
+        return x[1:-1]
+    return x
+
+
+def _legacy_is_placeholder(s: str) -> bool:
+    x = s.strip()
+    return x in {"…", "...", "...", "......", ""} or "…" in x
+
+
+def _legacy_parse_kv(rest: str) -> tuple[str, str] | None:
+    # Supports both ":" and "：" as delimiter.
+    if "：" in rest:
+        k, v = rest.split("：", 1)
+        return k.strip(), v.strip()
+    if ":" in rest:
+        k, v = rest.split(":", 1)
+        return k.strip(), v.strip()
+    return None
+
+
+def _legacy_parse_json_list(value: str) -> list[Any] | None:
+    v = _legacy_strip_backticks(value).strip()
+    if not v.startswith("["):
+        return None
+    try:
+        out = json.loads(v)
+    except json.JSONDecodeError:
+        return None
+    return out if isinstance(out, list) else None
+
+
+def _legacy_set_path(obj: dict[str, Any], path: str, value: Any) -> None:
+    parts = path.split(".")
+    cur: dict[str, Any] = obj
+    for k in parts[:-1]:
+        if k not in cur or not isinstance(cur[k], dict):
+            cur[k] = {}
+        cur = cur[k]
+    cur[parts[-1]] = value
+
+
+_LEGACY_KEY_MAP: dict[str, str] = {
+    "task_id": "task_id",
+    "stage": "stage",
+    "created_at": "created_at",
+    "paper_id": "source.paper_id",
+    "url": "source.url",
+    "来源补充": "source.desc",
+    "为什么现在做": "background.why_now",
+    "hypothesis": "hypothesis",
+    "variables": "design.variables",
+    "baseline": "design.baseline",
+    "data_split": "design.data_split",
+    "metrics": "design.metrics",
+    "budget": "design.budget",
+    "pass": "acceptance.pass",
+    "fail_but_useful": "acceptance.fail_but_useful",
+    "result_summary": "result_summary",
+    "decision": "decision",
+}
+
+_LEGACY_LIST_KEYS: dict[str, str] = {
+    "changes": "changes",
+    "inputs": "inputs",
+    "outputs": "outputs",
+    "next_tasks": "next_tasks",
+}
+
+
+def _legacy_parse_task_text(text: str) -> dict[str, Any]:
+    out: dict[str, Any] = {}
+
+    for raw in text.splitlines():
+        line = raw.rstrip()
+        m = _LEGACY_HEADER_RE.match(line.strip())
+        if m:
+            out["task_id"] = m.group("task_id").strip()
+            continue
+
+        m = _LEGACY_BULLET_RE.match(line.strip())
+        if not m:
+            continue
+
+        rest = m.group("rest").strip()
+        kv = _legacy_parse_kv(rest)
+        if kv is None:
+            continue
+        key, value = kv
+        if not key:
+            continue
+
+        if key in _LEGACY_LIST_KEYS:
+            parsed = _legacy_parse_json_list(value)
+            if parsed is not None:
+                _legacy_set_path(out, _LEGACY_LIST_KEYS[key], parsed)
+                continue
+            # Allow comma-separated list as fallback.
+            v = _legacy_strip_backticks(value).strip()
+            if not v:
+                _legacy_set_path(out, _LEGACY_LIST_KEYS[key], [])
+                continue
+            if _legacy_is_placeholder(v):
+                continue
+            items = [x.strip() for x in v.split(",") if x.strip()]
+            _legacy_set_path(out, _LEGACY_LIST_KEYS[key], items)
+            continue
+
+        if key in _LEGACY_KEY_MAP:
+            v = _legacy_strip_backticks(_LEGACY_HINT_RE.sub("", value)).strip()
+            if _legacy_is_placeholder(v):
+                continue
+            _legacy_set_path(out, _LEGACY_KEY_MAP[key], v)
+            continue
+
+    return out
+
+
+# The one intended change from the previous task parser: the title is also
+# read in the template's form (`# Task: <task_id>`, no trailing `.`). The
+# reference feeds such lines to the previous parser as a `task_id` field.
+_TEMPLATE_TITLE_RE = re.compile(r"#\s+Task:\s+(.*?)\.?")
+
+
+def reference_parse_task_text(text: str) -> dict[str, Any]:
+    lines = []
+    for raw in text.splitlines():
+        m = _TEMPLATE_TITLE_RE.fullmatch(raw.strip())
+        if m and not _LEGACY_HEADER_RE.match(raw.strip()):
+            raw = f"- [ ] task_id: {m.group(1)}"
+        lines.append(raw)
+    return _legacy_parse_task_text("\n".join(lines))
+
+
+def _legacy_dump_json_inline(value: Any) -> str:
+    return json.dumps(value, ensure_ascii=False)
+
+
+def _legacy_get_str(x: Any, default: str = "...") -> str:
+    s = str(x or "").strip()
+    return s if s else default
+
+
+def _legacy_get_dict(x: Any) -> dict[str, Any]:
+    return x if isinstance(x, dict) else {}
+
+
+def _legacy_get_list(x: Any) -> list[Any]:
+    return x if isinstance(x, list) else []
+
+
+def legacy_render_task_md(task: dict[str, Any]) -> str:
+    task_id = _legacy_get_str(task.get("task_id", ""), default="")
+    if not task_id:
+        raise ValueError("task.json missing `task_id`")
+
+    stage_raw = str(task.get("stage", "") or "").strip()
+    stage = stage_raw if stage_raw else "1-验证"
+
+    created_at_raw = str(task.get("created_at", "") or "").strip()
+    created_at = created_at_raw if created_at_raw else "YYYY-MM-DD"
+
+    source = _legacy_get_dict(task.get("source", {}))
+    paper_id = _legacy_get_str(source.get("paper_id", ""))
+    url = _legacy_get_str(source.get("url", ""))
+    source_desc = _legacy_get_str(source.get("desc", ""))
+
+    background = _legacy_get_dict(task.get("background", {}))
+    why_now = _legacy_get_str(background.get("why_now", ""))
+
+    hypothesis = _legacy_get_str(task.get("hypothesis", ""))
+
+    design = _legacy_get_dict(task.get("design", {}))
+    variables = _legacy_get_str(design.get("variables", ""))
+    baseline = _legacy_get_str(design.get("baseline", ""))
+    data_split_raw = str(design.get("data_split", "") or "").strip()
+    data_split = data_split_raw if data_split_raw else "遵循 `.codex/EVAL.md`."
+    metrics = _legacy_get_str(design.get("metrics", ""))
+    budget = _legacy_get_str(design.get("budget", ""))
+
+    acceptance = _legacy_get_dict(task.get("acceptance", {}))
+    passed = _legacy_get_str(acceptance.get("pass", ""))
+    fail_but_useful = _legacy_get_str(acceptance.get("fail_but_useful", ""))
+
+    changes = _legacy_get_list(task.get("changes", []))
+    inputs = _legacy_get_list(task.get("inputs", []))
+    outputs = _legacy_get_list(task.get("outputs", []))
+
+    result_summary = _legacy_get_str(task.get("result_summary", ""))
+    decision = _legacy_get_str(task.get("decision", ""))
+    next_tasks = _legacy_get_list(task.get("next_tasks", []))
+
+    md: list[str] = []
+    md.append(f"# Task: {task_id}.")
+    md.append("")
+
+    md.append("## 0. Meta.")
+    md.append(f"- [ ] task_id: {task_id}  ")
+    md.append(f"- [ ] stage: {stage}  ")
+    md.append(f"- [ ] created_at: {created_at}  ")
+    md.append(f"- [ ] paper_id: `{paper_id}`  ")
+    md.append(f"- [ ] url: `{url}`  ")
+    md.append("")
+
+    md.append("## 1. 背景与来源.")
+    md.append(f"- [ ] 来源补充：{source_desc} (例如：论文 issue，对话，直觉)  ")
+    md.append(f"- [ ] 为什么现在做：{why_now}  ")
+    md.append("")
+
+    md.append("## 2. 假设 (Hypothesis).")
+    md.append(f"- [ ] hypothesis：{hypothesis}  ")
+    md.append("")
+
+    md.append("## 3. 实验设计 (Design).")
+    md.append(f"- [ ] variables：{variables}  ")
+    md.append(f"- [ ] baseline：{baseline}  ")
+    md.append(f"- [ ] data_split：{data_split}  ")
+    md.append(f"- [ ] metrics：{metrics}  ")
+    md.append(f"- [ ] budget：{budget} (时间/算力)  ")
+    md.append("")
+
+    md.append("## 4. 验收标准 (Acceptance).")
+    md.append(f"- [ ] pass：{passed}  ")
+    md.append(f"- [ ] fail_but_useful：{fail_but_useful} (能指导 next step 的信息)  ")
+    md.append("")
+
+    md.append("## 5. 产物 (Artifacts).")
+    md.append(f"- [ ] changes: `{_legacy_dump_json_inline(changes)}`  ")
+    md.append(f"- [ ] inputs: `{_legacy_dump_json_inline(inputs)}`  ")
+    md.append(f"- [ ] outputs: `{_legacy_dump_json_inline(outputs)}`  ")
+    md.append("")
+
+    md.append("## 6. 写回 (Write-back).")
+    md.append(f"- [ ] result_summary：{result_summary}  ")
+    md.append(f"- [ ] decision：{decision}  ")
+    md.append(f"- [ ] next_tasks: `{_legacy_dump_json_inline(next_tasks)}`  ")
+    md.append("")
+
+    return "\n".join(md)
+
+
+def legacy_render_session(session: dict[str, Any]) -> str:
+    # The markdown `make_workspace.py` used to write next to session.json.
+    md = [f"# Session: {session['date']}.", ""]
+    for e in session["entries"]:
+        md += [
+            f"## {e['timestamp'][:10]} {e['timestamp'][11:16]} ({e['mode']})",
+            f"- **Context:** {e['context'] or '…'}  ",
+            f"- **Work done:** {'; '.join(e['work_done']) or '…'}  ",
+            f"- **Decisions:** {'; '.join(e['decisions']) or '…'}  ",
+            f"- **Issues:** {'; '.join(e['issues']) or '…'}  ",
+            f"- **Next step:** {'; '.join(e['next_steps']) or '…'}  ",
+            "",
+        ]
+    return "\n".join(md)
+
+
+_FUZZ_TASK_LINES = [
+    "# Task: 260101-task-001.",
+    "# Task: 260101-task-002",
+    "#  Task:  260101-task-003.  ",
+    "#Task: 260101-task-004.",
+    "# Task: a.b.",
+    "## 0. Meta.",
+    "## 3. 实验设计 (Design).",
+    "- [ ] task_id: 260101-task-009  ",
+    "- [x] stage: 2-实验  ",
+    "- [X] decision：go",
+    "- [ ] created_at: YYYY-MM-DD  ",
+    "- [ ] paper_id: `260001-01`  ",
+    "- [ ] paper_id: `...`  ",
+    "- [ ] url: `https://example.org/x`",
+    "- [ ] 来源补充：论文 issue (例如：论文 issue，对话，直觉)  ",
+    "- [ ] 来源补充：... (例如：论文 issue，对话，直觉)  ",
+    "- [ ] 为什么现在做：…  ",
+    "- [ ] hypothesis：如果做 A，那么 B 会下降  ",
+    "- [ ] hypothesis: a: b：c",
+    "- [ ] budget：4 GPU-hours (时间/算力)  ",
+    "- [ ] budget：(时间/算力)",
+    "- [ ] fail_but_useful：rmse < 0.1 (能指导 next step 的信息)  ",
+    "- [ ] metrics：rmse (per field)",
+    "- [ ] changes: `[\"src/a.py\", \"src/b.py\"]`  ",
+    "- [ ] changes: src/a.py, src/b.py , ,",
+    "- [ ] inputs: `[1, 2`",
+    "- [ ] inputs: ",
+    "- [ ] outputs: …",
+    "- [ ] outputs: `{\"a\": 1}`",
+    "- [ ] next_tasks: `[]`",
+    "- [ ] unknown: value",
+    "- [ ] : no key",
+    "- [ ]stage: 3-写作",
+    "- [] stage: 3-写作",
+    "-  [ ] stage: 3-写作",
+    "  - [ ] metrics: indented  ",
+    "- [ ] baseline",
+    "- plain bullet",
+    "",
+    "   ",
+    _ZH,
+]
+
+
+def fuzz_task(rng: random.Random) -> str:
+    lines = [rng.choice(_FUZZ_TASK_LINES) for _ in range(rng.randint(0, 40))]
+    return "\n".join(lines) + ("\n" if rng.random() < 0.7 else "")
+
+
+def make_task(rng: random.Random, k: int, day: date) -> dict[str, Any]:
+    pid = f"260000-{k:02d}"
+    return {
+        "task_id": f"PV1-S{k:04d}",
+        "stage": "1-验证",
+        "created_at": day.isoformat(),
+        "source": {"paper_id": pid, "url": "", "desc": f"reproduce {pid}"},
+        "background": {"why_now": _ZH},
+        "hypothesis": f"H{k}: {' '.join(rng.sample(_WORDS, 6))}",
+        "design": {
+            "variables": rng.choice(_WORDS),
+            "baseline": "FNO",
+            "data_split": "train/val/test = 8/1/1",
+            "metrics": "rmse",
+            "budget": f"{rng.randint(1, 48)} GPU-hours",
+        },
+        "acceptance": {"pass": "rmse < 0.05", "fail_but_useful": "rmse < 0.1"},
+        "changes": [f"src/{rng.choice(_WORDS)}.py"],
+        "inputs": ["data/raw/darcy.h5"],
+        "outputs": [f"2-实验和写作/runs/PE1-S{k:04d}-r1"],
+        "result_summary": "",
+        "decision": rng.choice(["", "go", "stop"]),
+        "next_tasks": [f"PV1-S{k + 1:04d}"] if rng.random() < 0.3 else [],
+    }
+
+
+def make_paper(rng: random.Random, i: int) -> dict[str, Any]:
+    pid = f"260000-{i:02d}"
+    return {
+        "paper_id": pid,
+        "title": f"{' '.join(rng.sample(_WORDS, 4)).title()} ({i})",
+        "year": rng.randint(2015, 2025),
+        "authors": [f"A{rng.randint(1, 999)}. Author" for _ in range(rng.randint(1, 5))],
+        "tags": rng.sample(["pde", "cfd", "operator"], rng.randint(1, 3)),
+        "pdf_path": f"0-调研/references/{pid}.pdf",
+        "url": f"https://arxiv.org/abs/2601.{i:05d}",
+        "code_url": f"https://github.com/example/paper-{i}" if rng.random() < 0.4 else "",
+        "problem": f"{' '.join(rng.choices(_WORDS, k=24)).capitalize()}.",
+        "method": _ZH,
+        "key_claims": [f"claim-{k}: {' '.join(rng.sample(_WORDS, 5))} (evidence: Table {k})" for k in range(1, 4)],
+        "limitations": [_ZH[: rng.randint(10, 40)]],
+        "open_questions": [f"does {rng.choice(_WORDS)} transfer?"] if rng.random() < 0.5 else [],
+        "what_we_can_reuse": [f"the {rng.choice(_WORDS)} layer"],
+        "hypotheses": [f"H1: {rng.choice(_WORDS)} helps (variable: {rng.choice(_WORDS)}; metric: L2)"],
+        "used_in_tasks": [],
+        "followed": [],
+    }
+
+
+def make_session(rng: random.Random, day: date) -> dict[str, Any]:
+    entries = [
+        {
+            "timestamp": f"{day.isoformat()}T{hour:02d}:00:00",
+            "mode": rng.choice(["planning", "audit", "coding", "optimization", "organize"]),
+            "context": _ZH[:30],
+            "work_done": [f"ran {rng.choice(_WORDS)} sweep"],
+            "decisions": rng.sample(_WORDS, rng.randint(0, 2)),
+            "issues": [],
+            "next_steps": [],
+        }
+        for hour in sorted(rng.sample(range(8, 22), rng.randint(1, 4)))
+    ]
+    return {"date": day.strftime("%y%m%d"), "stage": "project", "entries": entries}
+
+
+def make_rethink(rng: random.Random, k: int, day: date) -> dict[str, Any]:
+    def maybe(value: str) -> str:
+        return value if rng.random() < 0.8 else ""
+
+    return {
+        "id": f"{day.strftime('%y%m%d')}-rethink-{k % 100:02d}",
+        "title": maybe(" ".join(rng.sample(_WORDS, 4))),
+        "stage": rng.choice(["1-验证", "2-实验和写作"]),
+        "status": rng.choice(["draft", "polished", "final"]),
+        "source_task": maybe(f"PV1-S{k:04d}"),
+        "created_at": day.isoformat(),
+        "draft": maybe(f"A{k} @ {day.isoformat()}"),
+        "polish": maybe(f"B{k} @ {day.isoformat()}"),
+        "review": maybe(f"C{k} @ {day.isoformat()}"),
+        "conclusion": maybe(_ZH[: rng.randint(10, 40)].strip()),
+        "scope": maybe(f"only {rng.choice(_WORDS)} grids"),
+        "reasoning": [f"{rng.choice(_WORDS)} -> {rng.choice(_WORDS)}" for _ in range(rng.randint(0, 5))],
+    }
+
+
+def corpora(rng: random.Random, docs: int) -> dict[str, list[dict[str, Any]]]:
+    """`docs` documents per kind, some with empty fields."""
+    day = date(2026, 1, 1)
+    tasks = [make_task(rng, k, day + timedelta(days=k % 300)) for k in range(docs)]
+    for task in tasks[::17]:
+        task["hypothesis"] = ""
+        task["design"]["budget"] = ""
+        task["changes"] = []
+    papers = [make_paper(rng, i) for i in range(docs)]
+    papers[::13] = [{"paper_id": e["paper_id"]} for e in papers[::13]]
+    sessions = [make_session(rng, day + timedelta(days=k)) for k in range(docs)]
+    rethinks = [make_rethink(rng, k, day + timedelta(days=k % 300)) for k in range(docs)]
+    return {"task": tasks, "paper": papers, "session": sessions, "rethink": rethinks}
+
+
+def round_trip_error(codec: doc_codec.Codec, doc: dict[str, Any], exact: bool) -> str | None:
+    text = codec.render(doc)
+    d1 = codec.parse(text, str(doc.get("paper_id", "")))
+    # A partial parse only has the fields the document shows.
+    if exact and (any(doc.get(k) != v for k, v in d1.items()) if codec.spec.partial else d1 != doc):
+        return "parse(render(doc)) != doc"
+    text1 = codec.render(d1)
+    if text1 != text:
+        return "render(parse(text)) != text"
+    if codec.parse(text1, str(doc.get("paper_id", ""))) != d1:
+        return "parse is not stable"
+    return None
@@ -0,0 +1,34 @@
+from __future__ import annotations
+
+import argparse
+from pathlib import Path
+
+import pytest
+
+import audit_stage0
+import doc_codec
+import follow_graph
+
+
+def _args(tmp_path: Path) -> argparse.Namespace:
+    templates = audit_stage0.ROOT / ".codex" / "templates"
+    return argparse.Namespace(
+        research_json=tmp_path / "research.json",
+        notes_dir=tmp_path / "notes",
+        session_dir=tmp_path / "session",
+        paper_template=templates / "paper_entry.json",
+        paper_note_template=templates / "paper_note.md",
+    )
+
+
+@pytest.mark.parametrize("module", [doc_codec, follow_graph])
+def test_manifest_context_follows_the_check_modules(
+    module: object, tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    # An edit to any module behind the checks drops the incremental manifest.
+    copy = tmp_path / "module.py"
+    copy.write_text("x = 1\n", encoding="utf-8")
+    monkeypatch.setattr(module, "__file__", str(copy))
+    before = audit_stage0._manifest_context(_args(tmp_path))
+    copy.write_text("x = 22\n", encoding="utf-8")
+    assert audit_stage0._manifest_context(_args(tmp_path)) != before
@@ -0,0 +1,99 @@
+from __future__ import annotations
+
+import csv
+import multiprocessing as mp
+from pathlib import Path
+from typing import Any
+
+import pytest
+
+import leaderboard
+
+WRITERS = 8
+ROWS = 50
+
+
+def _row(writer: int, seq: int) -> list[str]:
+    # Commas, quotes and a newline in `notes` need CSV quoting.
+    notes = f'w{writer}, "seq" {seq}' + ("\nsecond line" if seq % 7 == 0 else "")
+    return ["2026-01-01T00:00:00", f"w{writer}", "rmse", str(seq), "", notes]
+
+
+def _append(path: Path, writer: int, barrier: Any) -> None:
+    barrier.wait()
+    if writer % 2:
+        with leaderboard.LeaderboardWriter(path, max_rows=7) as out:
+            out.add_many(_row(writer, seq) for seq in range(ROWS))
+    else:
+        for seq in range(ROWS):
+            leaderboard.append_row(path, _row(writer, seq))
+
+
+def _records(path: Path) -> list[list[str]]:
+    with open(path, encoding="utf-8", newline="") as f:
+        return list(csv.reader(f))
+
+
+def test_concurrent_appends_from_processes(tmp_path: Path) -> None:
+    path = tmp_path / "leaderboard.csv"
+    barrier = mp.Barrier(WRITERS)
+    procs = [mp.Process(target=_append, args=(path, w, barrier)) for w in range(WRITERS)]
+    for p in procs:
+        p.start()
+    for p in procs:
+        p.join(60)
+    assert [p.exitcode for p in procs] == [0] * WRITERS
+
+    assert leaderboard.check_file(path) == []
+    records = _records(path)
+    assert records[0] == list(leaderboard.HEADER)
+    assert len(records) == 1 + WRITERS * ROWS
+    for w in range(WRITERS):
+        # Each writer's rows are all there, intact and in order.
+        assert [r for r in records[1:] if r[1] == f"w{w}"] == [_row(w, seq) for seq in range(ROWS)]
+
+
+def test_header_mismatch_is_an_error(tmp_path: Path) -> None:
+    path = tmp_path / "leaderboard.csv"
+    path.write_text("timestamp,task_id,score\n", encoding="utf-8")
+    with pytest.raises(ValueError, match="header mismatch"):
+        leaderboard.append_row(path, _row(0, 0))
+    assert path.read_text(encoding="utf-8") == "timestamp,task_id,score\n"
+
+
+def test_torn_last_line_is_closed_before_appending(tmp_path: Path) -> None:
+    # A writer that died mid-line leaves no trailing newline; the next row
+    # must still start on a line of its own.
+    path = tmp_path / "leaderboard.csv"
+    leaderboard.append_row(path, _row(0, 0))
+    with open(path, "a", encoding="utf-8") as f:
+        f.write("2026-01-01T00:00:00,w9,rm")
+    leaderboard.append_row(path, _row(0, 1))
+    records = _records(path)
+    assert records[1:] == [_row(0, 0), ["2026-01-01T00:00:00", "w9", "rm"], _row(0, 1)]
+    [problem] = leaderboard.check_file(path)
+    assert problem.endswith("record 3 has 3 field(s), expected 6")
+
+
+def test_writer_keeps_rows_when_append_fails(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    path = tmp_path / "leaderboard.csv"
+    real = leaderboard.append_rows
+    calls = []
+
+    def flaky(*args: object, **kwargs: object) -> int:
+        calls.append(args)
+        if len(calls) == 1:
+            raise TimeoutError("lock busy")
+        return real(*args, **kwargs)
+
+    monkeypatch.setattr(leaderboard, "append_rows", flaky)
+    out = leaderboard.LeaderboardWriter(path)
+    out.add_many([_row(0, 0), _row(0, 1)])
+    with pytest.raises(TimeoutError):
+        out.flush()
+    assert out.pending == [_row(0, 0), _row(0, 1)]
+    assert out.written == 0
+    out.add(_row(0, 2))
+    assert out.flush() == 3
+    assert (out.pending, out.written) == ([], 3)
+    assert _records(path)[1:] == [_row(0, 0), _row(0, 1), _row(0, 2)]
@@ -0,0 +1,93 @@
+from __future__ import annotations
+
+import json
+import sqlite3
+from collections.abc import Iterator
+from pathlib import Path
+from typing import Any
+
+import pytest
+
+import paper_search as ps
+import workspace_index as wsi
+
+try:
+    sqlite3.connect(":memory:").execute("CREATE VIRTUAL TABLE t USING fts5(x)")
+except sqlite3.OperationalError:
+    pytest.skip("this Python's sqlite3 has no FTS5 support", allow_module_level=True)
+
+
+def _entry(pid: str, year: int, tags: list[str], title: str, problem: str) -> dict[str, Any]:
+    return {"paper_id": pid, "year": year, "tags": tags, "title": title, "problem": problem}
+
+
+def _write_research(path: Path, entries: list[dict[str, Any]]) -> None:
+    path.write_text(json.dumps({"research": entries}, ensure_ascii=False, indent=2) + "\n", encoding="utf-8")
+
+
+def _note(abstract: str) -> str:
+    return f"# Paper Note\n\n## 1. Abstract (摘要)\n\n{abstract}\n\n## 5. Problem (paper)\n- not indexed\n"
+
+
+@pytest.fixture
+def index(tmp_path: Path) -> Iterator[ps.SearchIndex]:
+    entries = [
+        _entry("260000-01", 2019, ["pde", "operator"], "Fourier Neural Operator", "learn solution maps"),
+        _entry("260000-02", 2021, ["pde"], "Graph Mesh Surrogate", "mesh based flow surrogate"),
+        _entry("260000-03", 2023, ["cfd", "PDE"], "Latent Flow Transformer", "turbulent flow prediction"),
+    ]
+    _write_research(tmp_path / "research.json", entries)
+    (tmp_path / "notes").mkdir()
+    (tmp_path / "notes" / "260000-01.md").write_text(_note("我们研究深度学习求解器."), encoding="utf-8")
+    search = ps.SearchIndex(tmp_path / "search.sqlite", tmp_path / "research.json", tmp_path / "notes")
+    yield search
+    search.close()
+
+
+def _update(search: ps.SearchIndex) -> ps.UpdateStats:
+    return search.update(wsi.WorkspaceIndex(search.research_json, stream=True))
+
+
+def _ids(hits: list[ps.Hit]) -> list[str]:
+    return sorted(h.paper_id for h in hits)
+
+
+def test_incremental_updates(index: ps.SearchIndex) -> None:
+    cold = _update(index)
+    assert (cold.papers_added, cold.notes_updated) == (3, 1)
+    assert _ids(index.search("flow")) == ["260000-02", "260000-03"]
+    assert _ids(index.search("深度学习")) == ["260000-01"]
+
+    noop = _update(index)
+    assert (noop.papers_added, noop.papers_updated, noop.papers_removed, noop.notes_updated) == (0, 0, 0, 0)
+
+    # One entry edited, one removed, one added; one note rewritten.
+    entries = json.loads(index.research_json.read_text(encoding="utf-8"))["research"]
+    entries[0]["title"] = "Spectral Assimilation Operator"
+    del entries[1]
+    entries.append(_entry("260000-04", 2024, ["pde"], "Diffusion Flow Prior", "generative flow prior"))
+    _write_research(index.research_json, entries)
+    (index.notes_dir / "260000-01.md").write_text(_note("我们研究数据同化."), encoding="utf-8")
+    stats = _update(index)
+    assert (stats.papers_added, stats.papers_updated, stats.papers_removed, stats.notes_updated) == (1, 1, 1, 1)
+
+    assert _ids(index.search("assimilation")) == ["260000-01"]
+    assert _ids(index.search("fourier")) == []
+    assert _ids(index.search("flow")) == ["260000-03", "260000-04"]
+    assert _ids(index.search("深度学习")) == []
+    assert _ids(index.search("数据同化")) == ["260000-01"]
+    assert _ids(index.search("title:flow")) == ["260000-03", "260000-04"]
+
+
+def test_facet_filters(index: ps.SearchIndex) -> None:
+    _update(index)
+    assert _ids(index.search("flow", years=(2022, 2030))) == ["260000-03"]
+    # Tags match case-insensitively; several tags must all match.
+    assert _ids(index.search("", tags=["pde"])) == ["260000-01", "260000-02", "260000-03"]
+    assert _ids(index.search("", tags=["pde", "cfd"])) == ["260000-03"]
+    assert _ids(index.search("flow", years=(2000, 2021), tags=["PDE"])) == ["260000-02"]
+
+    facets = index.facets("flow")
+    assert facets["year"] == [(2021, 1), (2023, 1)]
+    assert dict(facets["tag"]) == {"pde": 2, "cfd": 1}
+    assert index.facets("", tags=["operator"]) == {"year": [(2019, 1)], "tag": [("operator", 1), ("pde", 1)]}
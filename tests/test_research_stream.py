@@ -0,0 +1,64 @@
+from __future__ import annotations
+
+import json
+from pathlib import Path
+from typing import Any
+
+import pytest
+
+import research_stream
+import workspace_index as wsi
+
+PARSERS = ["json"] + (["orjson"] if research_stream.orjson is not None else [])
+
+
+def _full_load(path: Path) -> list[tuple[dict[str, Any], str]]:
+    # What the streamed entries must equal: the full load, with each `followed`
+    # list emptied (its items come as entries of their own).
+    doc = json.loads(path.read_text(encoding="utf-8"))
+    return [
+        ({k: ([] if k == "followed" and isinstance(v, list) else v) for k, v in e.items()}, loc)
+        for e, loc in wsi.iter_paper_entries(doc["research"])
+    ]
+
+
+def _tricky_doc() -> dict[str, Any]:
+    chain: dict[str, Any] = {"paper_id": "deep-0"}
+    for k in range(1, 300):
+        chain = {"paper_id": f"deep-{k}", "followed": [chain]}
+    return {
+        "version": 1,
+        "note": {"research": "not the list"},
+        "research": [
+            {"paper_id": "a", "title": 'brackets ] } [ { and "quotes" \\ in strings', "followed": []},
+            "not an entry",
+            {"paper_id": "b", "followed": [{"paper_id": "b1", "followed": [{"paper_id": "b11"}]}, 3, {"paper_id": "b2"}]},
+            {"followed": "not a list", "paper_id": "c", "year": 2024.5, "big": 2**70},
+            {"paper_id": "d", "tags": ["漢字", " "], "followed": [{"paper_id": "d1", "followed": None}]},
+            chain,
+        ],
+    }
+
+
+@pytest.mark.parametrize("parser", PARSERS)
+@pytest.mark.parametrize("chunk_size", [64, research_stream.CHUNK_SIZE])
+def test_stream_equals_full_load(tmp_path: Path, parser: str, chunk_size: int) -> None:
+    path = tmp_path / "research.json"
+    path.write_text(json.dumps(_tricky_doc(), ensure_ascii=False), encoding="utf-8")
+    streamed = list(research_stream.iter_research_entries(path, parser=parser, chunk_size=chunk_size))
+    assert streamed == _full_load(path)
+
+
+@pytest.mark.parametrize("parser", PARSERS)
+def test_stream_equals_full_load_on_a_workspace(workspace: Path, parser: str) -> None:
+    path = workspace / "0-调研" / "research.json"
+    streamed = list(research_stream.iter_research_entries(path, parser=parser, chunk_size=4096))
+    assert any(".followed[" in loc for _, loc in streamed)
+    assert streamed == _full_load(path)
+
+
+def test_invalid_document_is_an_error(tmp_path: Path) -> None:
+    path = tmp_path / "research.json"
+    path.write_text('{"research": [{"paper_id": "a"}, {"paper_id": ', encoding="utf-8")
+    with pytest.raises(ValueError):
+        list(research_stream.iter_research_entries(path))
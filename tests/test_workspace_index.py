@@ -0,0 +1,70 @@
+from __future__ import annotations
+
+import json
+import subprocess
+import sys
+from pathlib import Path
+
+import workspace_index as wsi
+
+# Runs both tools in one interpreter inside the workspace (its scripts resolve
+# ROOT to the workspace), then reports what the shared index loaded.
+_ONE_PROCESS = """
+import contextlib, io, json, sys
+sys.path.insert(0, sys.argv[1])
+import audit_stage0, check_unrecognized_references, note_document, workspace_index as wsi
+
+for mod, argv in [(audit_stage0, ["audit_stage0.py"]), (check_unrecognized_references, ["check_unrecognized_references.py"])]:
+    sys.argv = argv
+    with contextlib.redirect_stdout(io.StringIO()):
+        code = mod.main()
+    assert code in (0, 1), code
+
+research = str(wsi.RESEARCH_JSON)
+print(json.dumps({
+    "indexes": [dict(index.load_counts) for index in wsi._INDEXES.values()],
+    "research_reads": note_document.LOADER.stats.reads[research],
+}))
+"""
+
+
+def test_audit_and_reference_check_share_one_load(workspace: Path) -> None:
+    scripts = workspace / ".codex" / "scripts"
+    out = subprocess.run(
+        [sys.executable, "-c", _ONE_PROCESS, str(scripts)],
+        cwd=workspace,
+        check=True,
+        capture_output=True,
+        text=True,
+    )
+    report = json.loads(out.stdout.strip().splitlines()[-1])
+    assert len(report["indexes"]) == 1
+    assert report["indexes"][0]["research"] == 1
+    assert report["research_reads"] == 1
+
+
+def test_sources_load_lazily_and_once(workspace: Path) -> None:
+    index = wsi.WorkspaceIndex(
+        workspace / "0-调研" / "research.json",
+        workspace / "1-验证" / "tasks",
+        workspace / "2-实验和写作" / "runs",
+        workspace / "session",
+        leaderboards=[workspace / "1-验证" / "leaderboard.csv"],
+    )
+    assert sum(index.load_counts.values()) == 0
+
+    first = index.papers
+    assert index.papers is first
+    assert index.pdf_to_paper_ids
+    assert index.load_counts == {"research": 1}
+
+    assert index.tasks and index.tasks is index.tasks
+    assert index.leaderboard_rows and index.leaderboard_rows is index.leaderboard_rows
+    assert index.load_counts["research"] == 1
+    assert index.load_counts["tasks"] == 1
+    assert index.load_counts["leaderboards"] == 1
+
+
+def test_get_index_is_per_process() -> None:
+    assert wsi.get_index() is wsi.get_index()
+    assert wsi.get_index(stream=True) is not wsi.get_index()